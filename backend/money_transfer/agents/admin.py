@@ -1,13 +1,13 @@
 # agents/admin.py
 from django.contrib import admin
-from .models import AgentLocal
+from .models import AgentLocal, MouvementSolde
 
 @admin.register(AgentLocal)
 class AgentLocalAdmin(admin.ModelAdmin):
     list_display = ['nom', 'prenom', 'statut_agent', 'est_disponible', 'date_creation']
     list_filter = ['statut_agent', 'date_creation']
     search_fields = ['nom', 'prenom', 'telephone']
-    readonly_fields = ['est_ouvert', 'est_disponible']
+    readonly_fields = ['est_ouvert', 'est_disponible', 'solde_compte', 'retraits_jour', 'jour_retraits']
     
     fieldsets = (
         ('Informations personnelles', {
@@ -20,6 +20,22 @@ class AgentLocalAdmin(admin.ModelAdmin):
             'fields': ('latitude', 'longitude')
         }),
         ('Finances', {
-            'fields': ('solde_compte', 'limite_retrait_journalier', 'commission_pourcentage')
+            'fields': ('solde_compte', 'retraits_jour', 'jour_retraits', 'limite_retrait_journalier', 'commission_pourcentage')
         }),
-    )
\ No newline at end of file
+    )
+
+@admin.register(MouvementSolde)
+class MouvementSoldeAdmin(admin.ModelAdmin):
+    """Grand livre en lecture seule : les mouvements passent par agents.services.solde"""
+    list_display = ['agent', 'type_mouvement', 'montant', 'retrait', 'created_at']
+    list_filter = ['type_mouvement', 'created_at']
+    search_fields = ['agent__nom', 'agent__telephone', 'libelle']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
\ No newline at end of file
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AgentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'agents'
+    
+    def ready(self):
+        """Import signals when the app is ready."""
+        import agents.signals
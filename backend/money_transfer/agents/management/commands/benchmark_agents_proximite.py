@@ -0,0 +1,142 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+from math import cos, radians
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+
+from agents.models import AgentLocal
+from agents.services.proximite import IndexAgents, encoder, filtre_proximite
+from money_transfer.api_views import calculate_haversine_distance
+
+User = get_user_model()
+
+# Numéros réservés au benchmark : +22175XXXXXXX
+PREFIXE_BENCH = '+22175'
+
+# Villes autour desquelles les agents sont répartis
+VILLES = [
+    (14.6928, -17.4467),   # Dakar
+    (14.7645, -17.3660),   # Pikine
+    (14.7910, -16.9359),   # Thiès
+    (16.0326, -16.4818),   # Saint-Louis
+    (12.6392, -8.0029),    # Bamako
+    (5.3600, -4.0083),     # Abidjan
+]
+
+
+def rectangle(lat, lon, rayon):
+    """Ancien filtre : rectangle latitude / longitude autour du point"""
+    lat_range = rayon / 111
+    lon_range = rayon / (111 * abs(cos(radians(lat))))
+    return {
+        'latitude__range': [lat - lat_range, lat + lat_range],
+        'longitude__range': [lon - lon_range, lon + lon_range],
+    }
+
+
+def plus_proches_historique(lat, lon, rayon, k, geohash=False):
+    """Chemin de agents_list : filtre en base, haversine en boucle Python, tri complet"""
+    agents = AgentLocal.objects.filter(statut_agent='ACTIF')
+    if geohash:
+        agents = agents.filter(filtre_proximite(lat, lon, rayon))
+    agents = agents.filter(**rectangle(lat, lon, rayon))
+    resultats = [
+        (calculate_haversine_distance(lat, lon, float(agent.latitude), float(agent.longitude)), agent.pk)
+        for agent in agents
+    ]
+    resultats.sort()
+    return resultats[:k]
+
+
+class Command(BaseCommand):
+    help = 'Comparer la recherche d\'agents proches (rectangle + boucle, geohash, index mémoire)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--agents', type=int, default=200000, help='Nombre d\'agents générés')
+        parser.add_argument('--requetes', type=int, default=300, help='Positions mesurées')
+        parser.add_argument('--rayon', type=float, default=10, help='Rayon de recherche (km)')
+        parser.add_argument('-k', type=int, default=5, help='Nombre d\'agents demandés')
+        parser.add_argument('--garder', action='store_true', help='Ne pas supprimer les agents générés')
+
+    def handle(self, *args, **options):
+        self.stdout.write('🗺️ Benchmark agents les plus proches...')
+        self._preparer(options['agents'])
+        try:
+            aleatoire = random.Random(1)
+            positions = []
+            for _ in range(options['requetes']):
+                lat, lon = aleatoire.choice(VILLES)
+                positions.append((lat + aleatoire.gauss(0, 0.05), lon + aleatoire.gauss(0, 0.05)))
+
+            index = IndexAgents(ttl=3600)
+            debut = time.perf_counter()
+            index.construire()
+            self.stdout.write(f'  Index mémoire construit en {time.perf_counter() - debut:.2f}s ({len(index)} agents)')
+
+            rayon, k = options['rayon'], options['k']
+            methodes = [
+                ('rectangle + boucle', lambda lat, lon: plus_proches_historique(lat, lon, rayon, k)),
+                ('geohash + boucle', lambda lat, lon: plus_proches_historique(lat, lon, rayon, k, geohash=True)),
+                ('index mémoire', lambda lat, lon: index.plus_proches(lat, lon, k=k, rayon_max_km=rayon,
+                                                                     disponibles=False)),
+            ]
+
+            # Mêmes distances renvoyées (l'ancien calcul arrondit à 10 m : les ex aequo peuvent s'échanger)
+            for lat, lon in positions[:50]:
+                attendus = [distance for distance, _ in methodes[0][1](lat, lon)]
+                obtenus = [round(distance, 2) for distance, _ in methodes[2][1](lat, lon)]
+                if attendus != obtenus:
+                    self.stdout.write(self.style.WARNING(f'  ⚠️ résultats différents en ({lat:.4f}, {lon:.4f})'))
+
+            # ===== RÉSUMÉ =====
+            self.stdout.write('')
+            for nom, methode in methodes:
+                durees = []
+                for lat, lon in positions:
+                    debut = time.perf_counter()
+                    methode(lat, lon)
+                    durees.append((time.perf_counter() - debut) * 1000)
+                centiles = statistics.quantiles(durees, n=100)
+                self.stdout.write(f'  {nom:<20} p50 {centiles[49]:9.3f} ms   p99 {centiles[98]:9.3f} ms')
+            self.stdout.write(self.style.SUCCESS('✅ Benchmark terminé'))
+        finally:
+            if not options['garder']:
+                self._nettoyer()
+
+    def _preparer(self, nombre):
+        if AgentLocal.objects.filter(telephone__startswith=PREFIXE_BENCH).exists():
+            self.stdout.write('  Agents de benchmark déjà présents')
+            return
+
+        debut = time.perf_counter()
+        mot_de_passe = make_password(None)
+        aleatoire = random.Random(0)
+        for lot in range(0, nombre, 10000):
+            numeros = range(lot, min(lot + 10000, nombre))
+            users = User.objects.bulk_create([
+                User(phone_number=f'{PREFIXE_BENCH}{i:07d}', email=f'bench-agent-{i}@example.com',
+                     first_name='Agent', last_name=f'Bench {i}', password=mot_de_passe,
+                     kyc_status='VERIFIED')
+                for i in numeros
+            ])
+            agents = []
+            for user in users:
+                lat, lon = aleatoire.choice(VILLES)
+                lat, lon = lat + aleatoire.gauss(0, 0.08), lon + aleatoire.gauss(0, 0.08)
+                # bulk_create ne passe pas par save() : geohash et KYC recopié renseignés ici
+                agents.append(AgentLocal(
+                    user=user, nom=user.last_name, prenom='Agent', telephone=user.phone_number,
+                    email=user.email, adresse='Benchmark',
+                    latitude=Decimal(f'{lat:.6f}'), longitude=Decimal(f'{lon:.6f}'),
+                    geohash=encoder(round(lat, 6), round(lon, 6)), kyc_user_verifie=True,
+                ))
+            AgentLocal.objects.bulk_create(agents)
+        self.stdout.write(f'  {nombre} agents créés en {time.perf_counter() - debut:.1f}s')
+
+    def _nettoyer(self):
+        AgentLocal.objects.filter(telephone__startswith=PREFIXE_BENCH).delete()
+        User.objects.filter(phone_number__startswith=PREFIXE_BENCH).delete()
@@ -0,0 +1,78 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from agents.services import distances as distances_vectorisees
+from agents.services.distances import LotAgents, classer, classer_positions
+from money_transfer.api_views import calculate_haversine_distance
+
+
+def boucle_scalaire(agents, lat, lon, k):
+    """Chemin historique de agents_list : conversion et haversine agent par agent, tri complet"""
+    resultats = [
+        (calculate_haversine_distance(lat, lon, float(a_lat), float(a_lon)), agent_id)
+        for agent_id, a_lat, a_lon in agents
+    ]
+    resultats.sort()
+    return resultats[:k]
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark : haversine scalaire en boucle contre calcul vectorisé (NumPy)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--agents', type=int, default=10000, help='Agents candidats')
+        parser.add_argument('--positions', type=int, default=200, help='Positions (mode itinéraire)')
+        parser.add_argument('--repetitions', type=int, default=20, help='Mesures par méthode')
+        parser.add_argument('-k', type=int, default=10, help='Agents classés par position')
+
+    def handle(self, *args, **options):
+        moteur = 'NumPy' if distances_vectorisees.np is not None else 'Python pur (NumPy absent)'
+        self.stdout.write(f'📐 Benchmark distances agents ({moteur})...')
+
+        aleatoire = random.Random(0)
+        agents = [
+            (i, Decimal(f'{14.69 + aleatoire.gauss(0, 0.1):.6f}'), Decimal(f'{-17.44 + aleatoire.gauss(0, 0.1):.6f}'))
+            for i in range(options['agents'])
+        ]
+        positions = [(14.69 + aleatoire.gauss(0, 0.1), -17.44 + aleatoire.gauss(0, 0.1))
+                     for _ in range(options['positions'])]
+        k, repetitions = options['k'], options['repetitions']
+        lat, lon = positions[0]
+
+        debut = time.perf_counter()
+        lot = LotAgents(*zip(*agents))
+        self.stdout.write(f'  Lot de {len(lot)} agents préparé en {(time.perf_counter() - debut) * 1000:.1f} ms')
+
+        attendus = [d for d, _ in boucle_scalaire(agents, lat, lon, k)]
+        obtenus = [round(d, 2) for d, _ in classer(lot, lat, lon, k=k)]
+        if attendus != obtenus:
+            self.stdout.write(self.style.WARNING('  ⚠️ classements différents'))
+
+        # ===== RÉSUMÉ =====
+        self.stdout.write('')
+        self.stdout.write(f"  {'une position':<36} {'p50':>10} {'p99':>10}")
+        self._mesurer('boucle scalaire', lambda: boucle_scalaire(agents, lat, lon, k), repetitions)
+        self._mesurer('lot préparé + classement vectorisé',
+                      lambda: classer(LotAgents(*zip(*agents)), lat, lon, k=k), repetitions)
+        self._mesurer('classement vectorisé (lot réutilisé)', lambda: classer(lot, lat, lon, k=k), repetitions)
+
+        self.stdout.write(f"  {f'{len(positions)} positions (itinéraire)':<36}")
+        self._mesurer('boucle scalaire',
+                      lambda: [boucle_scalaire(agents, p_lat, p_lon, k) for p_lat, p_lon in positions],
+                      max(1, repetitions // 10))
+        self._mesurer('classement par lot', lambda: classer_positions(lot, positions, k=k), repetitions)
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark terminé'))
+
+    def _mesurer(self, nom, fonction, repetitions):
+        durees = []
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            fonction()
+            durees.append((time.perf_counter() - debut) * 1000)
+        p50 = statistics.median(durees)
+        p99 = statistics.quantiles(durees, n=100)[98] if len(durees) > 1 else durees[0]
+        self.stdout.write(f'    {nom:<34} {p50:>8.2f}ms {p99:>8.2f}ms')
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+from agents.services.proximite import encoder
+
+
+def calculer_geohash(apps, schema_editor):
+    AgentLocal = apps.get_model('agents', 'AgentLocal')
+    agents = list(AgentLocal.objects.filter(latitude__isnull=False, longitude__isnull=False).only(
+        'id', 'latitude', 'longitude'
+    ))
+    for agent in agents:
+        agent.geohash = encoder(float(agent.latitude), float(agent.longitude))
+    AgentLocal.objects.bulk_update(agents, ['geohash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agentlocal',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, help_text='Cellule geohash de la position (index de proximité)', max_length=12),
+        ),
+        migrations.AddIndex(
+            model_name='agentlocal',
+            index=models.Index(fields=['statut_agent', 'geohash'], name='agents_loca_statut__3df4ef_idx'),
+        ),
+        migrations.RunPython(calculer_geohash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def recopier_kyc(apps, schema_editor):
+    AgentLocal = apps.get_model('agents', 'AgentLocal')
+    AgentLocal.objects.filter(user__kyc_status='VERIFIED').update(kyc_user_verifie=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0003_geohash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='agentlocal',
+            name='agents_loca_statut__4cd638_idx',
+        ),
+        migrations.AddField(
+            model_name='agentlocal',
+            name='kyc_user_verifie',
+            field=models.BooleanField(default=False, editable=False, help_text="Copie du KYC de l'utilisateur (VERIFIED), tenue à jour par signal"),
+        ),
+        migrations.AddIndex(
+            model_name='agentlocal',
+            index=models.Index(fields=['statut_agent', 'kyc_user_verifie', 'heure_ouverture', 'heure_fermeture'], name='agents_loca_statut__91e31c_idx'),
+        ),
+        migrations.RunPython(recopier_kyc, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:47
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def ouvrir_grand_livre(apps, schema_editor):
+    """Solde actuel de chaque agent inscrit comme mouvement d'ouverture"""
+    AgentLocal = apps.get_model('agents', 'AgentLocal')
+    MouvementSolde = apps.get_model('agents', 'MouvementSolde')
+    MouvementSolde.objects.bulk_create([
+        MouvementSolde(agent_id=agent_id, type_mouvement='OUVERTURE', montant=solde, libelle="Solde d'ouverture")
+        for agent_id, solde in AgentLocal.objects.exclude(solde_compte=0).values_list('id', 'solde_compte')
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0004_disponibilite'),
+        ('withdrawals', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agentlocal',
+            name='jour_retraits',
+            field=models.DateField(blank=True, editable=False, help_text='Jour auquel se rapporte retraits_jour', null=True),
+        ),
+        migrations.AddField(
+            model_name='agentlocal',
+            name='retraits_jour',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, help_text='Total retiré le jour jour_retraits (limite journalière)', max_digits=15),
+        ),
+        migrations.CreateModel(
+            name='MouvementSolde',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type_mouvement', models.CharField(choices=[('OUVERTURE', "Solde d'ouverture"), ('APPROVISIONNEMENT', 'Approvisionnement'), ('RETRAIT', 'Retrait client'), ('AJUSTEMENT', 'Ajustement')], max_length=20)),
+                ('montant', models.DecimalField(decimal_places=2, help_text='Montant signé : négatif pour un débit', max_digits=15)),
+                ('libelle', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('agent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mouvements_solde', to='agents.agentlocal')),
+                ('retrait', models.ForeignKey(blank=True, help_text="Retrait à l'origine du débit", null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='mouvements_solde', to='withdrawals.withdrawal')),
+            ],
+            options={
+                'verbose_name': 'Mouvement de solde',
+                'verbose_name_plural': 'Mouvements de solde',
+                'db_table': 'agents_mouvements_solde',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['agent', 'created_at'], name='agents_mouv_agent_i_fedf05_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('type_mouvement', 'RETRAIT')), fields=('retrait',), name='mouvement_solde_retrait_unique')],
+            },
+        ),
+        migrations.RunPython(ouvrir_grand_livre, migrations.RunPython.noop),
+    ]
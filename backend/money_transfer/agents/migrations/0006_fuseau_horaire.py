@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:50
+
+import agents.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0005_grand_livre_solde'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agentlocal',
+            name='fuseau_horaire',
+            field=models.CharField(default='Africa/Dakar', help_text="Fuseau horaire de l'agent (changement de jour des limites de retrait)", max_length=50, validators=[agents.models.valider_fuseau_horaire]),
+        ),
+    ]
@@ -2,14 +2,38 @@
 
 from django.db import models
 from django.conf import settings  # ✅ CORRECT: Utilise AUTH_USER_MODEL
+from django.core.exceptions import ValidationError
 from django.utils import timezone
 from decimal import Decimal
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 class StatutAgent(models.TextChoices):
     ACTIF = 'ACTIF', 'Actif'
     SUSPENDU = 'SUSPENDU', 'Suspendu'
     INACTIF = 'INACTIF', 'Inactif'
 
+@lru_cache(maxsize=None)
+def zone(nom):
+    return ZoneInfo(nom)
+
+def valider_fuseau_horaire(valeur):
+    try:
+        zone(valeur)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValidationError(f"Fuseau horaire inconnu: {valeur}")
+
+class AgentLocalQuerySet(models.QuerySet):
+    def disponibles(self, heure=None):
+        """Agents disponibles à `heure` : statut, KYC et créneau lus sur l'index, sans jointure"""
+        heure = heure or timezone.now().time()
+        return self.filter(
+            statut_agent=StatutAgent.ACTIF,
+            kyc_user_verifie=True,
+            heure_ouverture__lte=heure,
+            heure_fermeture__gte=heure
+        )
+
 class AgentLocal(models.Model):
     # ===== LIEN AVEC VOTRE SYSTÈME USER (DEV 1) =====
     user = models.OneToOneField(
@@ -47,6 +71,12 @@ class AgentLocal(models.Model):
         default='18:00',
         help_text="Heure de fermeture du point de retrait"
     )
+    fuseau_horaire = models.CharField(
+        max_length=50,
+        default='Africa/Dakar',
+        validators=[valider_fuseau_horaire],
+        help_text="Fuseau horaire de l'agent (changement de jour des limites de retrait)"
+    )
     
     # ===== GÉOLOCALISATION =====
     latitude = models.DecimalField(
@@ -63,6 +93,12 @@ class AgentLocal(models.Model):
         blank=True,
         help_text="Longitude GPS du point de retrait"
     )
+    geohash = models.CharField(
+        max_length=12,
+        blank=True,
+        editable=False,
+        help_text="Cellule geohash de la position (index de proximité)"
+    )
     
     # ===== CONFIGURATION FINANCIÈRE =====
     solde_compte = models.DecimalField(
@@ -77,6 +113,19 @@ class AgentLocal(models.Model):
         default=Decimal('1000000.00'),
         help_text="Limite maximum de retraits par jour"
     )
+    retraits_jour = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False,
+        help_text="Total retiré le jour jour_retraits (limite journalière)"
+    )
+    jour_retraits = models.DateField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Jour auquel se rapporte retraits_jour"
+    )
     commission_pourcentage = models.DecimalField(
         max_digits=5, 
         decimal_places=2, 
@@ -89,6 +138,11 @@ class AgentLocal(models.Model):
         default=False,
         help_text="KYC spécifique agent validé (licence, etc.)"
     )
+    kyc_user_verifie = models.BooleanField(
+        default=False,
+        editable=False,
+        help_text="Copie du KYC de l'utilisateur (VERIFIED), tenue à jour par signal"
+    )
     document_licence = models.FileField(
         upload_to='agents_licences/',
         null=True,
@@ -100,6 +154,8 @@ class AgentLocal(models.Model):
     date_creation = models.DateTimeField(auto_now_add=True)
     date_modification = models.DateTimeField(auto_now=True)
     
+    objects = AgentLocalQuerySet.as_manager()
+    
     class Meta:
         db_table = 'agents_local'
         verbose_name = 'Agent Local'
@@ -109,7 +165,8 @@ class AgentLocal(models.Model):
         # Index pour les requêtes fréquentes
         indexes = [
             models.Index(fields=['statut_agent', 'latitude', 'longitude']),
-            models.Index(fields=['statut_agent', 'heure_ouverture', 'heure_fermeture']),
+            models.Index(fields=['statut_agent', 'kyc_user_verifie', 'heure_ouverture', 'heure_fermeture']),
+            models.Index(fields=['statut_agent', 'geohash']),
         ]
     
     def __str__(self):
@@ -135,9 +192,20 @@ class AgentLocal(models.Model):
         return (
             self.statut_agent == StatutAgent.ACTIF and 
             self.est_ouvert and
-            self.user.kyc_status == 'VERIFIED'  # ✅ Utilise KYC du système principal
+            self.kyc_user_verifie  # ✅ KYC du système principal, recopié : pas de requête user
         )
     
+    def jour_local(self, instant=None):
+        """Date du jour (ou de `instant`) dans le fuseau horaire de l'agent"""
+        return timezone.localtime(instant or timezone.now(), zone(self.fuseau_horaire)).date()
+    
+    @property
+    def retraits_du_jour(self):
+        """Total déjà retiré aujourd'hui (compteur tenu par agents.services.solde)"""
+        if self.jour_retraits != self.jour_local():
+            return Decimal('0.00')
+        return self.retraits_jour
+    
     @property
     def user_phone_number(self):
         """Numéro de téléphone principal de l'utilisateur"""
@@ -156,7 +224,7 @@ class AgentLocal(models.Model):
         if montant > self.solde_compte:
             return False, "Solde agent insuffisant"
         
-        if montant > self.limite_retrait_journalier:
+        if montant > self.limite_retrait_journalier - self.retraits_du_jour:
             return False, "Montant dépasse la limite journalière"
         
         return True, "Retrait possible"
@@ -175,8 +243,102 @@ class AgentLocal(models.Model):
             # self.user.save()
             pass
         
+        # Cellule geohash recalculée à partir de la position
+        from .services.proximite import encoder
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = encoder(float(self.latitude), float(self.longitude))
+        else:
+            self.geohash = ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        
+        # KYC de l'utilisateur recopié à la création (ensuite tenu à jour par le signal User)
+        if update_fields is None and (self._state.adding or AgentLocal.user.is_cached(self)):
+            self.kyc_user_verifie = self.user.kyc_status == 'VERIFIED'
+        
+        # Solde et cumul du jour : modifiés uniquement par agents.services.solde (UPDATE
+        # conditionnels). Une instance chargée avant un débit ne doit pas l'écraser.
+        if update_fields is None and not self._state.adding and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in CHAMPS_SOLDE
+            ]
+        
         super().save(*args, **kwargs)
 
+# Champs écrits par les mouvements de solde, jamais par AgentLocal.save()
+CHAMPS_SOLDE = {'solde_compte', 'retraits_jour', 'jour_retraits'}
+
+
+# ===== GRAND LIVRE DU SOLDE AGENT =====
+
+class TypeMouvement(models.TextChoices):
+    OUVERTURE = 'OUVERTURE', "Solde d'ouverture"
+    APPROVISIONNEMENT = 'APPROVISIONNEMENT', 'Approvisionnement'
+    RETRAIT = 'RETRAIT', 'Retrait client'
+    AJUSTEMENT = 'AJUSTEMENT', 'Ajustement'
+
+class MouvementSolde(models.Model):
+    """
+    Ligne du grand livre d'un agent : jamais modifiée ni supprimée.
+    
+    La somme des mouvements d'un agent est égale à solde_compte, que les
+    services de solde mettent à jour dans la même transaction.
+    """
+    agent = models.ForeignKey(
+        AgentLocal,
+        on_delete=models.CASCADE,
+        related_name='mouvements_solde'
+    )
+    type_mouvement = models.CharField(
+        max_length=20,
+        choices=TypeMouvement.choices
+    )
+    montant = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        help_text="Montant signé : négatif pour un débit"
+    )
+    retrait = models.ForeignKey(
+        'withdrawals.Withdrawal',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='mouvements_solde',
+        help_text="Retrait à l'origine du débit"
+    )
+    libelle = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'agents_mouvements_solde'
+        verbose_name = 'Mouvement de solde'
+        verbose_name_plural = 'Mouvements de solde'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['agent', 'created_at']),
+        ]
+        constraints = [
+            # Un retrait ne débite l'agent qu'une fois
+            models.UniqueConstraint(
+                fields=['retrait'],
+                condition=models.Q(type_mouvement='RETRAIT'),
+                name='mouvement_solde_retrait_unique'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_type_mouvement_display()} {self.montant} - agent {self.agent_id}"
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Un mouvement de solde ne peut pas être modifié")
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        raise ValueError("Un mouvement de solde ne peut pas être supprimé")
+
 # ===== INTÉGRATION PARFAITE AVEC VOTRE SYSTÈME =====
 """
 ✅ CORRECTIONS APPORTÉES :
@@ -193,6 +355,7 @@ class AgentLocal(models.Model):
 
 3. 📊 PROPRIÉTÉS INTELLIGENTES :
    - est_disponible() vérifie KYC + horaires + statut
+   - AgentLocal.objects.disponibles() : même règle en une requête
    - user_phone_number accède au téléphone principal
    - Méthodes métier pour retraits
 
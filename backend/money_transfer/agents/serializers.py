@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import AgentLocal
+from .models import AgentLocal, MouvementSolde, TypeMouvement
 from math import radians, cos, sin, asin, sqrt
 
 class AgentLocalSerializer(serializers.ModelSerializer):
@@ -23,6 +23,10 @@ class AgentLocalSerializer(serializers.ModelSerializer):
         return f"{obj.prenom} {obj.nom}"
     
     def get_distance(self, obj):
+        # Distances déjà calculées par l'index de proximité
+        if 'distances' in self.context:
+            return self.context['distances'].get(obj.pk)
+        
         request = self.context.get('request')
         if not request:
             return None
@@ -45,4 +49,27 @@ class AgentLocalSerializer(serializers.ModelSerializer):
         dlon = lon2 - lon1
         a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
         c = 2 * asin(sqrt(a))
-        return round(R * c, 2)
\ No newline at end of file
+        return round(R * c, 2)
+
+class MouvementSoldeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MouvementSolde
+        fields = ['id', 'agent', 'type_mouvement', 'montant', 'libelle', 'created_at']
+        read_only_fields = fields
+
+
+class ApprovisionnementSerializer(serializers.Serializer):
+    """Approvisionnement (montant positif) ou ajustement (signé) du solde d'un agent"""
+    montant = serializers.DecimalField(max_digits=15, decimal_places=2)
+    type_mouvement = serializers.ChoiceField(
+        choices=[TypeMouvement.APPROVISIONNEMENT, TypeMouvement.AJUSTEMENT],
+        default=TypeMouvement.APPROVISIONNEMENT
+    )
+    libelle = serializers.CharField(max_length=200, required=False, allow_blank=True, default='')
+
+    def validate(self, data):
+        if data['montant'] == 0:
+            raise serializers.ValidationError({'montant': 'Le montant ne peut pas être nul'})
+        if data['type_mouvement'] == TypeMouvement.APPROVISIONNEMENT and data['montant'] < 0:
+            raise serializers.ValidationError({'montant': 'Un approvisionnement doit être positif'})
+        return data
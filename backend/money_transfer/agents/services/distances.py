@@ -0,0 +1,197 @@
+# agents/services/distances.py
+import heapq
+from math import asin, cos, radians, sin, sqrt
+
+from django.utils import timezone
+
+from .proximite import RAYON_TERRE_KM
+
+try:
+    import numpy as np
+except ImportError:  # NumPy absent : repli en Python pur, mêmes résultats
+    np = None
+
+# Taille maximale (positions × agents) d'un bloc de la matrice des distances
+ELEMENTS_PAR_BLOC = 2_000_000
+
+
+def _secondes(heure):
+    return -1 if heure is None else heure.hour * 3600 + heure.minute * 60 + heure.second
+
+
+# ===== LOT D'AGENTS EN COLONNES =====
+
+class LotAgents:
+    """
+    Positions et disponibilité d'un ensemble d'agents, rangées en colonnes.
+
+    Les conversions Decimal → float → radians sont faites une seule fois ici,
+    puis chaque calcul de distance porte sur toutes les colonnes d'un coup.
+    Les agents sans coordonnées ne font pas partie du lot.
+    """
+
+    def __init__(self, ids, latitudes, longitudes, ouvertures=None, fermetures=None, actifs=None):
+        taille = len(ids)
+        ouvertures = [_secondes(h) for h in ouvertures] if ouvertures is not None else [-1] * taille
+        fermetures = [_secondes(h) for h in fermetures] if fermetures is not None else [-1] * taille
+        actifs = list(actifs) if actifs is not None else [True] * taille
+
+        if np is not None:
+            self.ids = np.asarray(ids)
+            self.latitudes = np.radians(np.asarray(latitudes, dtype=float))
+            self.longitudes = np.radians(np.asarray(longitudes, dtype=float))
+            self.cos_latitudes = np.cos(self.latitudes)
+            self.ouvertures = np.asarray(ouvertures, dtype=np.int32)
+            self.fermetures = np.asarray(fermetures, dtype=np.int32)
+            self.actifs = np.asarray(actifs, dtype=bool)
+        else:
+            self.ids = list(ids)
+            self.latitudes = [radians(float(v)) for v in latitudes]
+            self.longitudes = [radians(float(v)) for v in longitudes]
+            self.cos_latitudes = [cos(v) for v in self.latitudes]
+            self.ouvertures, self.fermetures, self.actifs = ouvertures, fermetures, actifs
+
+    @classmethod
+    def depuis_agents(cls, agents):
+        """Lot construit à partir d'instances AgentLocal"""
+        from agents.models import StatutAgent
+
+        agents = [a for a in agents if a.latitude is not None and a.longitude is not None]
+        return cls(
+            [a.pk for a in agents],
+            [a.latitude for a in agents],
+            [a.longitude for a in agents],
+            [a.heure_ouverture for a in agents],
+            [a.heure_fermeture for a in agents],
+            [a.statut_agent == StatutAgent.ACTIF and a.kyc_user_verifie for a in agents],
+        )
+
+    @classmethod
+    def depuis_queryset(cls, queryset):
+        """Lot construit en une requête, sans instancier les agents"""
+        lignes = list(queryset.filter(latitude__isnull=False, longitude__isnull=False).values_list(
+            'id', 'latitude', 'longitude', 'heure_ouverture', 'heure_fermeture', 'statut_agent', 'kyc_user_verifie'
+        ))
+        return cls(
+            [ligne[0] for ligne in lignes],
+            [ligne[1] for ligne in lignes],
+            [ligne[2] for ligne in lignes],
+            [ligne[3] for ligne in lignes],
+            [ligne[4] for ligne in lignes],
+            [ligne[5] == 'ACTIF' and ligne[6] for ligne in lignes],
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def masque_disponibles(self, heure=None):
+        """Agents actifs, au KYC vérifié et ouverts à `heure` (même règle que est_disponible)"""
+        maintenant = _secondes(heure or timezone.now().time())
+        if np is not None:
+            return (
+                self.actifs & (self.ouvertures >= 0) & (self.fermetures >= 0)
+                & (self.ouvertures <= maintenant) & (maintenant <= self.fermetures)
+            )
+        return [
+            actif and 0 <= ouverture <= maintenant <= fermeture
+            for actif, ouverture, fermeture in zip(self.actifs, self.ouvertures, self.fermetures)
+        ]
+
+
+# ===== DISTANCES =====
+
+def distances(lot, lat, lon):
+    """Distances haversine (km) du point à chaque agent du lot, dans l'ordre du lot"""
+    if np is not None:
+        return _matrice(lot, np.array([lat], dtype=float), np.array([lon], dtype=float))[0]
+
+    lat, lon = radians(lat), radians(lon)
+    cos_lat = cos(lat)
+    return [
+        2 * RAYON_TERRE_KM * asin(min(1.0, sqrt(
+            sin((a_lat - lat) / 2) ** 2 + cos_lat * cos_a_lat * sin((a_lon - lon) / 2) ** 2
+        )))
+        for a_lat, a_lon, cos_a_lat in zip(lot.latitudes, lot.longitudes, lot.cos_latitudes)
+    ]
+
+
+def distances_par_agent(lot, lat, lon):
+    """{agent_id: distance_km} pour tous les agents du lot"""
+    resultat = distances(lot, lat, lon)
+    if np is not None:
+        return dict(zip(lot.ids.tolist(), resultat.tolist()))
+    return dict(zip(lot.ids, resultat))
+
+
+def _matrice(lot, latitudes, longitudes):
+    """Matrice (positions × agents) des distances, en un seul passage vectorisé"""
+    lat = np.radians(latitudes)[:, None]
+    lon = np.radians(longitudes)[:, None]
+    a = (
+        np.sin((lot.latitudes - lat) / 2) ** 2
+        + np.cos(lat) * lot.cos_latitudes * np.sin((lot.longitudes - lon) / 2) ** 2
+    )
+    return 2 * RAYON_TERRE_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+# ===== CLASSEMENT =====
+
+def classer(lot, lat, lon, k=None, rayon_km=None, disponibles=False, heure=None):
+    """Agents du lot triés par distance : [(distance_km, agent_id)], k premiers si `k`"""
+    return classer_positions(lot, [(lat, lon)], k=k, rayon_km=rayon_km, disponibles=disponibles, heure=heure)[0]
+
+
+def classer_positions(lot, positions, k=None, rayon_km=None, disponibles=False, heure=None):
+    """
+    Classement des agents pour plusieurs positions à la fois (étapes d'un itinéraire).
+
+    Renvoie une liste par position, dans l'ordre de `positions`. La matrice des
+    distances est calculée par blocs de positions pour borner la mémoire.
+    """
+    positions = list(positions)
+    if not positions:
+        return []
+    if not len(lot) or k == 0:
+        return [[] for _ in positions]
+    masque = lot.masque_disponibles(heure) if disponibles else None
+
+    if np is None:
+        return [_classer_python(lot, lat, lon, k, rayon_km, masque) for lat, lon in positions]
+
+    coordonnees = np.asarray(positions, dtype=float)
+    taille_bloc = max(1, ELEMENTS_PAR_BLOC // len(lot))
+    resultats = []
+    for debut in range(0, len(coordonnees), taille_bloc):
+        bloc = coordonnees[debut:debut + taille_bloc]
+        matrice = _matrice(lot, bloc[:, 0], bloc[:, 1])
+        # Agents exclus repoussés à l'infini : ils sortent au tri et sont retirés ensuite
+        if masque is not None:
+            matrice[:, ~masque] = np.inf
+        if rayon_km is not None:
+            matrice[matrice > rayon_km] = np.inf
+
+        if k is not None and k < len(lot):
+            # k plus petits sans trier toute la ligne, puis tri de ces k seulement
+            colonnes = np.argpartition(matrice, k - 1, axis=1)[:, :k]
+        else:
+            colonnes = np.broadcast_to(np.arange(len(lot)), matrice.shape)
+        retenues = np.take_along_axis(matrice, colonnes, axis=1)
+        ordre = np.argsort(retenues, axis=1, kind='stable')
+        colonnes = np.take_along_axis(colonnes, ordre, axis=1)
+        retenues = np.take_along_axis(retenues, ordre, axis=1)
+
+        for ligne_distances, ligne_colonnes in zip(retenues, colonnes):
+            finies = np.isfinite(ligne_distances)
+            resultats.append(list(zip(
+                ligne_distances[finies].tolist(), lot.ids[ligne_colonnes[finies]].tolist()
+            )))
+    return resultats
+
+
+def _classer_python(lot, lat, lon, k, rayon_km, masque):
+    candidats = [
+        (distance, agent_id)
+        for position, (distance, agent_id) in enumerate(zip(distances(lot, lat, lon), lot.ids))
+        if (masque is None or masque[position]) and (rayon_km is None or distance <= rayon_km)
+    ]
+    return heapq.nsmallest(k, candidats) if k is not None else sorted(candidats)
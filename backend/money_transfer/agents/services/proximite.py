@@ -0,0 +1,293 @@
+# agents/services/proximite.py
+import heapq
+import logging
+import threading
+import time
+from math import asin, cos, radians, sin, sqrt
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_time
+
+logger = logging.getLogger(__name__)
+
+RAYON_TERRE_KM = 6371
+KM_PAR_DEGRE = 111.32
+
+# ===== GEOHASH =====
+
+ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Précision stockée sur AgentLocal : cellules d'environ 150 m × 150 m
+PRECISION = 7
+
+
+def _bits(precision):
+    """(bits de longitude, bits de latitude) d'un geohash de `precision` caractères"""
+    total = 5 * precision
+    return (total + 1) // 2, total // 2
+
+
+def cellule(lat, lon, precision):
+    """Indices entiers (i, j) de la cellule geohash contenant le point"""
+    bits_lon, bits_lat = _bits(precision)
+    i = int((lat + 90.0) / 180.0 * (1 << bits_lat))
+    j = int((lon + 180.0) / 360.0 * (1 << bits_lon))
+    return min(i, (1 << bits_lat) - 1), min(j, (1 << bits_lon) - 1)
+
+
+def geohash_cellule(i, j, precision):
+    """Geohash d'une cellule : bits de j (longitude) et i (latitude) entrelacés"""
+    bits_lon, bits_lat = _bits(precision)
+    valeur = 0
+    for position in range(5 * precision):
+        if position % 2 == 0:
+            bits_lon -= 1
+            valeur = (valeur << 1) | ((j >> bits_lon) & 1)
+        else:
+            bits_lat -= 1
+            valeur = (valeur << 1) | ((i >> bits_lat) & 1)
+    return ''.join(ALPHABET[(valeur >> (5 * (precision - 1 - k))) & 31] for k in range(precision))
+
+
+def encoder(lat, lon, precision=PRECISION):
+    return geohash_cellule(*cellule(lat, lon, precision), precision)
+
+
+def dimensions_cellule_km(lat, precision):
+    """(hauteur, largeur) en km d'une cellule à cette latitude"""
+    bits_lon, bits_lat = _bits(precision)
+    hauteur = 180.0 / (1 << bits_lat) * KM_PAR_DEGRE
+    largeur = 360.0 / (1 << bits_lon) * KM_PAR_DEGRE * max(cos(radians(lat)), 1e-6)
+    return hauteur, largeur
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Distance haversine en km"""
+    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * RAYON_TERRE_KM * asin(sqrt(a))
+
+
+def _suivant(prefixe):
+    """Plus petite chaîne supérieure à tous les geohash commençant par `prefixe` (None si aucune)"""
+    while prefixe and prefixe[-1] == ALPHABET[-1]:
+        prefixe = prefixe[:-1]
+    if not prefixe:
+        return None
+    return prefixe[:-1] + ALPHABET[ALPHABET.index(prefixe[-1]) + 1]
+
+
+def cellules_couvrantes(lat, lon, rayon_km, max_cellules=16):
+    """
+    Préfixes geohash couvrant le carré de côté 2·rayon autour du point.
+
+    La précision est la plus fine qui reste sous `max_cellules` cellules.
+    """
+    for precision in range(PRECISION, 0, -1):
+        hauteur, largeur = dimensions_cellule_km(lat, precision)
+        di, dj = int(rayon_km / hauteur) + 1, int(rayon_km / largeur) + 1
+        if (2 * di + 1) * (2 * dj + 1) <= max_cellules or precision == 1:
+            break
+
+    bits_lon, bits_lat = _bits(precision)
+    i_centre, j_centre = cellule(lat, lon, precision)
+    cellules = set()
+    for i in range(max(0, i_centre - di), min((1 << bits_lat) - 1, i_centre + di) + 1):
+        for j in range(j_centre - dj, j_centre + dj + 1):
+            cellules.add(geohash_cellule(i, j % (1 << bits_lon), precision))
+    return sorted(cellules)
+
+
+def filtre_proximite(lat, lon, rayon_km, champ='geohash'):
+    """
+    Q sur l'index geohash remplaçant le filtre latitude/longitude en rectangle.
+
+    Un intervalle [préfixe, suivant) par cellule : utilisable par un index B-tree
+    sur toutes les bases (LIKE 'x%' ne l'est pas sur SQLite).
+    """
+    filtre = Q()
+    for prefixe in cellules_couvrantes(lat, lon, rayon_km):
+        suivant = _suivant(prefixe)
+        condition = Q(**{f'{champ}__gte': prefixe})
+        if suivant:
+            condition &= Q(**{f'{champ}__lt': suivant})
+        filtre |= condition
+    return filtre
+
+
+# ===== INDEX EN MÉMOIRE POUR LES K PLUS PROCHES =====
+
+# Grille de l'index mémoire : geohash 6 (≈ 1,2 km × 0,6 km)
+PRECISION_GRILLE = 6
+
+
+class IndexAgents:
+    """
+    Grille en mémoire des agents actifs localisés, pour les k plus proches voisins.
+
+    Construite en une requête, tenue à jour par les signals des agents et des
+    utilisateurs dans ce processus, reconstruite après `ttl` secondes pour prendre
+    en compte les modifications faites par les autres processus.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = settings.AGENTS_INDEX_TTL if ttl is None else ttl
+        self._cellules = {}   # (i, j) → {agent_id: entrée}
+        self._agents = {}     # agent_id → (i, j)
+        self._construit_a = None
+        self._reconstruction = None
+        self._lock = threading.Lock()
+
+    # ----- construction et mises à jour -----
+
+    @staticmethod
+    def entree(lat, lon, ouverture, fermeture, kyc_verifie):
+        """(lat, lon, ouverture, fermeture, kyc vérifié) d'un agent"""
+        # Une instance tout juste créée garde les valeurs par défaut en texte ('08:00')
+        ouverture = parse_time(ouverture) if isinstance(ouverture, str) else ouverture
+        fermeture = parse_time(fermeture) if isinstance(fermeture, str) else fermeture
+        return float(lat), float(lon), ouverture, fermeture, kyc_verifie
+
+    def construire(self):
+        from agents.models import AgentLocal, StatutAgent
+
+        debut = time.perf_counter()
+        cellules, agents = {}, {}
+        lignes = AgentLocal.objects.filter(
+            statut_agent=StatutAgent.ACTIF, latitude__isnull=False, longitude__isnull=False
+        ).values_list('id', 'latitude', 'longitude', 'heure_ouverture', 'heure_fermeture', 'kyc_user_verifie')
+        for agent_id, *valeurs in lignes.iterator(chunk_size=10000):
+            entree = self.entree(*valeurs)
+            position = cellule(entree[0], entree[1], PRECISION_GRILLE)
+            cellules.setdefault(position, {})[agent_id] = entree
+            agents[agent_id] = position
+
+        with self._lock:
+            self._cellules, self._agents = cellules, agents
+            self._construit_a = time.monotonic()
+        logger.info(f"🗺️ Index agents construit: {len(agents)} agents en {time.perf_counter() - debut:.2f}s")
+
+    def _a_jour(self):
+        if self._construit_a is None:
+            self.construire()
+        elif time.monotonic() - self._construit_a > self.ttl and not (
+            self._reconstruction and self._reconstruction.is_alive()
+        ):
+            # Index périmé : reconstruit en arrière-plan, l'ancien sert en attendant
+            self._reconstruction = threading.Thread(target=self._reconstruire, daemon=True)
+            self._reconstruction.start()
+
+    def _reconstruire(self):
+        from django.db import connection
+
+        try:
+            self.construire()
+        except Exception as e:
+            logger.error(f"❌ Erreur reconstruction index agents: {e}")
+        finally:
+            connection.close()
+
+    def mettre_a_jour(self, agent):
+        """Insérer / déplacer / retirer un agent après modification"""
+        from agents.models import StatutAgent
+
+        if self._construit_a is None:
+            return  # construit à la première recherche
+        entree = None
+        if agent.statut_agent == StatutAgent.ACTIF and agent.latitude is not None and agent.longitude is not None:
+            entree = self.entree(
+                agent.latitude, agent.longitude, agent.heure_ouverture, agent.heure_fermeture, agent.kyc_user_verifie
+            )
+        with self._lock:
+            self._retirer(agent.pk)
+            if entree is not None:
+                position = cellule(entree[0], entree[1], PRECISION_GRILLE)
+                self._cellules[position] = {**self._cellules.get(position, {}), agent.pk: entree}
+                self._agents[agent.pk] = position
+
+    def retirer(self, agent_id):
+        with self._lock:
+            self._retirer(agent_id)
+
+    def _retirer(self, agent_id):
+        # Copie de la cellule : une recherche en cours peut encore parcourir l'ancienne
+        position = self._agents.pop(agent_id, None)
+        if position is not None:
+            cellule_agents = dict(self._cellules[position])
+            cellule_agents.pop(agent_id, None)
+            self._cellules[position] = cellule_agents
+
+    def __len__(self):
+        return len(self._agents)
+
+    # ----- requêtes -----
+
+    def plus_proches(self, lat, lon, k=5, rayon_max_km=50, disponibles=True, heure=None):
+        """
+        Les k agents les plus proches : [(distance_km, agent_id)] triés.
+
+        Parcours de la grille par anneaux autour de la cellule du point ; on s'arrête
+        dès que le k-ième candidat est plus proche que tout anneau non visité.
+        `disponibles` ne garde que les agents ouverts à `heure` et au KYC vérifié.
+        """
+        self._a_jour()
+        if disponibles and heure is None:
+            heure = timezone.now().time()  # même référence que AgentLocal.est_ouvert
+
+        cellules = self._cellules
+        bits_lon, bits_lat = _bits(PRECISION_GRILLE)
+        i_centre, j_centre = cellule(lat, lon, PRECISION_GRILLE)
+        hauteur, largeur = dimensions_cellule_km(lat, PRECISION_GRILLE)
+        pas_km = min(hauteur, largeur)
+        anneaux_max = int(rayon_max_km / pas_km) + 1
+
+        meilleurs = []  # tas max des k meilleurs : (-distance, agent_id)
+        for anneau in range(anneaux_max + 1):
+            for i, j in self._anneau(i_centre, j_centre, anneau):
+                if not 0 <= i < (1 << bits_lat):
+                    continue
+                for agent_id, (a_lat, a_lon, ouverture, fermeture, kyc) in cellules.get(
+                    (i, j % (1 << bits_lon)), {}
+                ).items():
+                    if disponibles and not (kyc and ouverture and fermeture and ouverture <= heure <= fermeture):
+                        continue
+                    distance = distance_km(lat, lon, a_lat, a_lon)
+                    if distance > rayon_max_km:
+                        continue
+                    if len(meilleurs) < k:
+                        heapq.heappush(meilleurs, (-distance, agent_id))
+                    elif distance < -meilleurs[0][0]:
+                        heapq.heapreplace(meilleurs, (-distance, agent_id))
+            # Tout point hors des anneaux visités est à plus de anneau × pas_km
+            if len(meilleurs) == k and -meilleurs[0][0] <= anneau * pas_km:
+                break
+
+        return sorted((-distance, agent_id) for distance, agent_id in meilleurs)
+
+    @staticmethod
+    def _anneau(i, j, r):
+        if r == 0:
+            yield i, j
+            return
+        for dj in range(-r, r + 1):
+            yield i - r, j + dj
+            yield i + r, j + dj
+        for di in range(-r + 1, r):
+            yield i + di, j - r
+            yield i + di, j + r
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index_agents():
+    """Index du processus (construit à la première recherche)"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = IndexAgents()
+    return _index
@@ -0,0 +1,100 @@
+# agents/services/solde.py
+import logging
+from decimal import Decimal
+
+from django.db import transaction as db_transaction
+from django.db.models import Case, DecimalField, F, Sum, Value, When
+from django.db.models.lookups import LessThanOrEqual
+
+from ..models import AgentLocal, MouvementSolde, TypeMouvement
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal('0.00')
+
+
+def cumul_du_jour(jour):
+    """Expression SQL du total déjà retiré `jour` (un cumul d'un autre jour compte pour zéro)"""
+    return Case(
+        When(jour_retraits=jour, then=F('retraits_jour')),
+        default=Value(ZERO),
+        output_field=DecimalField(max_digits=15, decimal_places=2),
+    )
+
+
+def debiter_retrait(retrait, jour=None):
+    """
+    Débiter l'agent du montant d'un retrait : (succès, message) comme peut_effectuer_retrait.
+
+    Solde suffisant et limite journalière sont vérifiés et appliqués par un seul
+    UPDATE conditionnel : pas de verrou applicatif sur la ligne de l'agent, deux
+    retraits simultanés ne peuvent pas passer le solde en négatif.
+    À appeler dans la transaction qui change le statut du retrait.
+    """
+    montant = retrait.montant_retire
+    jour = jour or retrait.agent.jour_local()
+
+    with db_transaction.atomic():
+        debite = AgentLocal.objects.filter(
+            pk=retrait.agent_id,
+            solde_compte__gte=montant,
+        ).filter(
+            LessThanOrEqual(cumul_du_jour(jour) + montant, F('limite_retrait_journalier'))
+        ).update(
+            solde_compte=F('solde_compte') - montant,
+            retraits_jour=cumul_du_jour(jour) + montant,
+            jour_retraits=jour,
+        )
+        if not debite:
+            return False, motif_refus(retrait.agent_id, montant, jour)
+
+        MouvementSolde.objects.create(
+            agent_id=retrait.agent_id,
+            type_mouvement=TypeMouvement.RETRAIT,
+            montant=-montant,
+            retrait=retrait,
+            libelle=f"Retrait {retrait.code_retrait}",
+        )
+
+    logger.info(f"💸 Agent {retrait.agent_id} débité de {montant} (retrait {retrait.code_retrait})")
+    return True, "Agent débité"
+
+
+def motif_refus(agent_id, montant, jour):
+    """Raison pour laquelle le débit conditionnel n'a modifié aucune ligne"""
+    agent = AgentLocal.objects.filter(pk=agent_id).only(
+        'solde_compte', 'retraits_jour', 'jour_retraits', 'limite_retrait_journalier'
+    ).first()
+    if agent is None:
+        return "Agent non disponible"
+    if montant > agent.solde_compte:
+        return "Solde agent insuffisant"
+    return "Montant dépasse la limite journalière"
+
+
+def crediter(agent, montant, type_mouvement=TypeMouvement.APPROVISIONNEMENT, libelle=''):
+    """
+    Créditer (ou ajuster, montant négatif) le solde d'un agent avec sa ligne de grand livre.
+
+    Un ajustement négatif n'est appliqué que si le solde le couvre (UPDATE
+    conditionnel, comme debiter_retrait) : None si rien n'a été modifié.
+    """
+    agent_id = getattr(agent, 'pk', agent)
+    agents = AgentLocal.objects.filter(pk=agent_id)
+    if montant < 0:
+        agents = agents.filter(solde_compte__gte=-montant)
+    with db_transaction.atomic():
+        if not agents.update(solde_compte=F('solde_compte') + montant):
+            return None
+        mouvement = MouvementSolde.objects.create(
+            agent_id=agent_id, type_mouvement=type_mouvement, montant=montant, libelle=libelle
+        )
+    logger.info(f"🏦 Agent {agent_id}: {type_mouvement} de {montant}")
+    return mouvement
+
+
+def ecart_grand_livre(agent_id):
+    """solde_compte moins la somme des mouvements : zéro si le grand livre est cohérent"""
+    solde = AgentLocal.objects.filter(pk=agent_id).values_list('solde_compte', flat=True).get()
+    total = MouvementSolde.objects.filter(agent_id=agent_id).aggregate(total=Sum('montant'))['total']
+    return solde - (total or ZERO)
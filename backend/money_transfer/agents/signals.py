@@ -0,0 +1,42 @@
+# agents/signals.py - Index de proximité, KYC recopié et grand livre tenus à jour
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import AgentLocal, MouvementSolde, TypeMouvement
+from .services.proximite import get_index_agents
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=AgentLocal)
+def indexer_agent(sender, instance, **kwargs):
+    get_index_agents().mettre_a_jour(instance)
+
+
+@receiver(post_save, sender=AgentLocal)
+def ouvrir_grand_livre(sender, instance, created, **kwargs):
+    """Solde initial d'un nouvel agent inscrit au grand livre"""
+    if created and instance.solde_compte:
+        MouvementSolde.objects.create(
+            agent=instance, type_mouvement=TypeMouvement.OUVERTURE, montant=instance.solde_compte,
+            libelle="Solde d'ouverture"
+        )
+
+
+@receiver(post_delete, sender=AgentLocal)
+def retirer_agent(sender, instance, **kwargs):
+    get_index_agents().retirer(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def kyc_agent(sender, instance, created, **kwargs):
+    """Le KYC de l'utilisateur conditionne la disponibilité de son agent"""
+    if created or getattr(instance, '_kyc_status_charge', None) == instance.kyc_status:
+        return
+    agent = AgentLocal.objects.filter(user_id=instance.pk).first()
+    if agent is not None:
+        agent.kyc_user_verifie = instance.kyc_status == 'VERIFIED'
+        AgentLocal.objects.filter(pk=agent.pk).update(kyc_user_verifie=agent.kyc_user_verifie)
+        get_index_agents().mettre_a_jour(agent)
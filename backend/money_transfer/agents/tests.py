@@ -1,3 +1,255 @@
-from django.test import TestCase
+import random
+from datetime import time
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from withdrawals.models import StatutRetrait, Withdrawal
+
+from .models import AgentLocal, MouvementSolde, TypeMouvement
+from .services import distances as distances_vectorisees
+from .services.distances import LotAgents, classer, classer_positions
+from .services.proximite import IndexAgents, distance_km, encoder, filtre_proximite, get_index_agents
+from .services.solde import ecart_grand_livre
+
+User = get_user_model()
+
+DAKAR = (14.6928, -17.4467)
+
+
+class GeohashTests(SimpleTestCase):
+
+    def test_valeurs_de_reference(self):
+        self.assertEqual(encoder(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(encoder(*DAKAR, 7), 'edeedfx')
+
+
+class ProximiteAgentsTests(TestCase):
+    """k plus proches agents par l'index en grille, comparés à un parcours complet"""
+
+    @classmethod
+    def setUpTestData(cls):
+        aleatoire = random.Random(42)
+        users = User.objects.bulk_create([
+            User(phone_number=f'+22176{i:07d}', email=f'agent{i}@example.com', first_name='Agent',
+                 last_name=str(i), kyc_status='VERIFIED' if i % 3 else 'PENDING')
+            for i in range(400)
+        ])
+        AgentLocal.objects.bulk_create([
+            AgentLocal(
+                user=user, nom=user.last_name, prenom='Agent', telephone=user.phone_number,
+                email=user.email, adresse='Dakar',
+                latitude=Decimal(f'{DAKAR[0] + aleatoire.uniform(-0.3, 0.3):.6f}'),
+                longitude=Decimal(f'{DAKAR[1] + aleatoire.uniform(-0.3, 0.3):.6f}'),
+                heure_ouverture=time(8, 0) if i % 2 else time(0, 0),
+                heure_fermeture=time(18, 0) if i % 2 else time(23, 59),
+                kyc_user_verifie=user.kyc_status == 'VERIFIED',
+            )
+            for i, user in enumerate(users)
+        ])
+
+    def force_brute(self, lat, lon, k, heure):
+        candidats = [
+            (distance_km(lat, lon, float(agent.latitude), float(agent.longitude)), agent.pk)
+            for agent in AgentLocal.objects.select_related('user')
+            if agent.user.kyc_status == 'VERIFIED' and agent.heure_ouverture <= heure <= agent.heure_fermeture
+        ]
+        return [agent_id for _, agent_id in sorted(candidats)[:k]]
+
+    def test_resultats_identiques_au_parcours_complet(self):
+        index = IndexAgents(ttl=3600)
+        index.construire()
+        aleatoire = random.Random(7)
+        for heure in (time(7, 0), time(12, 0)):
+            for _ in range(20):
+                lat = DAKAR[0] + aleatoire.uniform(-0.4, 0.4)
+                lon = DAKAR[1] + aleatoire.uniform(-0.4, 0.4)
+                resultats = index.plus_proches(lat, lon, k=5, heure=heure)
+                self.assertEqual([agent_id for _, agent_id in resultats], self.force_brute(lat, lon, 5, heure))
+
+    def test_endpoint_et_mise_a_jour_par_signal(self):
+        get_index_agents().construire()
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(user=User.objects.first())
+
+        # Un agent ouvert en continu déplacé exactement au point demandé passe en tête
+        agent = AgentLocal.objects.filter(user__kyc_status='VERIFIED', heure_ouverture=time(0, 0)).first()
+        agent.latitude, agent.longitude = Decimal('14.500000'), Decimal('-17.100000')
+        agent.save()
+
+        response = client.get('/api/v1/agents/plus_proches/', {'lat': 14.5, 'lon': -17.1, 'k': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(response.data['results'][0]['id'], agent.pk)
+        self.assertEqual(response.data['results'][0]['distance'], 0)
+
+        agent.statut_agent = 'SUSPENDU'
+        agent.save()
+        response = client.get('/api/v1/agents/plus_proches/', {'lat': 14.5, 'lon': -17.1, 'k': 3})
+        self.assertNotIn(agent.pk, [ligne['id'] for ligne in response.data['results']])
+
+    def test_filtre_geohash_sans_perte(self):
+        for agent in AgentLocal.objects.all():
+            agent.save()  # calcule le geohash (bulk_create ne passe pas par save)
+
+        lat, lon, rayon = 14.70, -17.40, 5
+        proches = {
+            agent.pk for agent in AgentLocal.objects.all()
+            if distance_km(lat, lon, float(agent.latitude), float(agent.longitude)) <= rayon
+        }
+        candidats = set(AgentLocal.objects.filter(filtre_proximite(lat, lon, rayon)).values_list('pk', flat=True))
+        self.assertTrue(proches)
+        self.assertLessEqual(proches, candidats)
+
+
+class DistancesVectoriseesTests(SimpleTestCase):
+    """Distances et classement en un passage, comparés au calcul scalaire"""
+
+    def setUp(self):
+        aleatoire = random.Random(3)
+        self.latitudes = [DAKAR[0] + aleatoire.uniform(-0.5, 0.5) for _ in range(500)]
+        self.longitudes = [DAKAR[1] + aleatoire.uniform(-0.5, 0.5) for _ in range(500)]
+        self.ouvertures = [time(8, 0) if i % 2 else time(0, 0) for i in range(500)]
+        self.fermetures = [time(18, 0) if i % 2 else time(23, 59) for i in range(500)]
+        self.actifs = [i % 3 != 0 for i in range(500)]
+        self.positions = [
+            (DAKAR[0] + aleatoire.uniform(-0.5, 0.5), DAKAR[1] + aleatoire.uniform(-0.5, 0.5)) for _ in range(30)
+        ]
+
+    def force_brute(self, lat, lon, k, rayon, heure):
+        candidats = [
+            (distance_km(lat, lon, a_lat, a_lon), position + 1)
+            for position, (a_lat, a_lon) in enumerate(zip(self.latitudes, self.longitudes))
+            if self.actifs[position] and self.ouvertures[position] <= heure <= self.fermetures[position]
+        ]
+        return [ligne for ligne in sorted(candidats) if ligne[0] <= rayon][:k]
+
+    def verifier_classement(self):
+        lot = LotAgents(
+            list(range(1, 501)), [Decimal(f'{v:.6f}') for v in self.latitudes],
+            [Decimal(f'{v:.6f}') for v in self.longitudes], self.ouvertures, self.fermetures, self.actifs,
+        )
+        self.latitudes = [float(Decimal(f'{v:.6f}')) for v in self.latitudes]
+        self.longitudes = [float(Decimal(f'{v:.6f}')) for v in self.longitudes]
+
+        par_lot = classer_positions(lot, self.positions, k=7, rayon_km=20, disponibles=True, heure=time(7, 0))
+        for (lat, lon), obtenus in zip(self.positions, par_lot):
+            attendus = self.force_brute(lat, lon, 7, 20, time(7, 0))
+            self.assertEqual([agent_id for _, agent_id in obtenus], [agent_id for _, agent_id in attendus])
+            for (distance, _), (reference, _) in zip(obtenus, attendus):
+                self.assertAlmostEqual(distance, reference, places=9)
+            self.assertEqual(obtenus, classer(lot, lat, lon, k=7, rayon_km=20, disponibles=True, heure=time(7, 0)))
+
+    def test_classement_identique_au_calcul_scalaire(self):
+        self.verifier_classement()
+
+    def test_repli_sans_numpy(self):
+        with mock.patch.object(distances_vectorisees, 'np', None):
+            self.verifier_classement()
+
+
+class DisponibiliteAgentsTests(TestCase):
+    """Disponibilité sans jointure sur l'utilisateur : KYC recopié sur l'agent"""
+
+    def test_kyc_recopie_et_suivi(self):
+        user = User.objects.create_user(phone_number='+221770000001', email='agent@example.com',
+                                        password='x', first_name='Awa', last_name='Diop')
+        agent = AgentLocal.objects.create(user=user, nom='Diop', prenom='Awa', telephone=user.phone_number,
+                                          email=user.email, adresse='Dakar',
+                                          heure_ouverture=time(0, 0), heure_fermeture=time(23, 59))
+        self.assertFalse(agent.kyc_user_verifie)
+
+        user.kyc_status = 'VERIFIED'
+        user.save()
+        agent = AgentLocal.objects.get(pk=agent.pk)
+        self.assertTrue(agent.kyc_user_verifie)
+        self.assertIn(agent, AgentLocal.objects.disponibles(time(12, 0)))
+        self.assertNotIn(agent, AgentLocal.objects.filter(statut_agent='SUSPENDU').disponibles(time(12, 0)))
+        with self.assertNumQueries(0):
+            self.assertEqual(agent.peut_effectuer_retrait(Decimal('0')), (True, 'Retrait possible'))
+
+        user.kyc_status = 'REJECTED'
+        user.save()
+        self.assertFalse(AgentLocal.objects.get(pk=agent.pk).kyc_user_verifie)
+
+    def test_liste_de_1000_agents_en_une_requete(self):
+        users = User.objects.bulk_create([
+            User(phone_number=f'+22177{i:07d}', email=f'liste{i}@example.com', first_name='Agent',
+                 last_name=str(i), kyc_status='VERIFIED' if i % 2 else 'PENDING')
+            for i in range(1000)
+        ])
+        AgentLocal.objects.bulk_create([
+            AgentLocal(user=user, nom=user.last_name, prenom='Agent', telephone=user.phone_number,
+                       email=user.email, adresse='Dakar', heure_ouverture=time(0, 0), heure_fermeture=time(23, 59),
+                       kyc_user_verifie=user.kyc_status == 'VERIFIED')
+            for user in users
+        ])
+
+        client = APIClient(SERVER_NAME='localhost')
+        with self.assertNumQueries(1):
+            response = client.get('/api/agents/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total'], 1000)
+        disponibles = [agent['est_disponible'] for agent in response.json()['agents']]
+        self.assertEqual(sum(disponibles), 500 if time(0, 0) <= timezone.now().time() <= time(23, 59) else 0)
+
+
+class ApprovisionnementTests(TestCase):
+    """Le solde vidé par les retraits est réapprovisionné par un administrateur"""
+
+    URL = '/api/v1/agents/{}/approvisionner/'
+
+    def setUp(self):
+        self.agent_user = User.objects.create_user(phone_number='+221770000041', email='appro@example.com',
+                                                   password='x', first_name='Agent', last_name='Vide',
+                                                   kyc_status='VERIFIED')
+        self.agent = AgentLocal.objects.create(
+            user=self.agent_user, nom='Vide', prenom='Agent', telephone=self.agent_user.phone_number,
+            email=self.agent_user.email, adresse='Dakar', heure_ouverture=time(0, 0), heure_fermeture=time(23, 59),
+        )
+        self.staff = User.objects.create_user(phone_number='+221770000042', email='staff@example.com',
+                                              password='x', first_name='Admin', last_name='Caisse', is_staff=True)
+        self.client = APIClient(SERVER_NAME='localhost')
+
+    def approvisionner(self, user, **donnees):
+        self.client.force_authenticate(user=user)
+        return self.client.post(self.URL.format(self.agent.pk), donnees, format='json')
+
+    def test_retrait_possible_apres_approvisionnement(self):
+        beneficiaire = User.objects.create_user(phone_number='+221770000043', email='benef@example.com',
+                                                password='x', first_name='Client', last_name='Patient')
+        retrait = Withdrawal.objects.create(agent=self.agent, beneficiaire=beneficiaire,
+                                            montant_retire=Decimal('20000'), statut=StatutRetrait.ACCEPTE)
+        self.assertEqual(retrait.finaliser_retrait(self.agent_user), (False, 'Solde agent insuffisant'))
+
+        response = self.approvisionner(self.staff, montant='50000.00')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['solde_compte'], Decimal('50000.00'))
+        self.assertEqual(response.data['mouvement']['type_mouvement'], TypeMouvement.APPROVISIONNEMENT)
+
+        self.assertTrue(Withdrawal.objects.get(pk=retrait.pk).finaliser_retrait(self.agent_user)[0])
+        self.agent.refresh_from_db()
+        self.assertEqual(self.agent.solde_compte, Decimal('30000.00'))
+        self.assertEqual(ecart_grand_livre(self.agent.pk), 0)
+
+    def test_ajustements_et_refus(self):
+        self.assertEqual(self.approvisionner(self.agent_user, montant='50000').status_code, 403)
+        self.assertEqual(self.approvisionner(self.staff, montant='-100').status_code, 400)
+        self.assertEqual(self.approvisionner(self.staff, montant='0', type_mouvement='AJUSTEMENT').status_code, 400)
+        self.assertEqual(self.approvisionner(self.staff, montant='1000').status_code, 201)
+
+        # Un ajustement négatif ne peut pas rendre le solde négatif
+        refus = self.approvisionner(self.staff, montant='-1500', type_mouvement='AJUSTEMENT')
+        self.assertEqual((refus.status_code, refus.data['error']), (400, 'Solde agent insuffisant'))
+        ajustement = self.approvisionner(self.staff, montant='-400', type_mouvement='AJUSTEMENT', libelle='Erreur')
+        self.assertEqual(ajustement.data['solde_compte'], Decimal('600.00'))
+        self.assertEqual(
+            list(MouvementSolde.objects.order_by('pk').values_list('type_mouvement', 'montant', 'libelle')),
+            [(TypeMouvement.APPROVISIONNEMENT, Decimal('1000.00'), f'Par {self.staff}'),
+             (TypeMouvement.AJUSTEMENT, Decimal('-400.00'), 'Erreur')]
+        )
+        self.assertEqual(ecart_grand_livre(self.agent.pk), 0)
@@ -2,9 +2,12 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db.models import Q
+from django.shortcuts import get_object_or_404
 from math import cos, radians
 from .models import AgentLocal
-from .serializers import AgentLocalSerializer
+from .serializers import AgentLocalSerializer, ApprovisionnementSerializer, MouvementSoldeSerializer
+from .services.proximite import filtre_proximite, get_index_agents
+from .services.solde import crediter
 
 class AgentLocalViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = AgentLocal.objects.all()
@@ -22,7 +25,10 @@ class AgentLocalViewSet(viewsets.ReadOnlyModelViewSet):
             lat_range = float(radius) / 111
             lon_range = float(radius) / (111 * cos(radians(float(lat))))
             
+            # Cellules geohash (index) puis rectangle exact sur les candidats
             queryset = queryset.filter(
+                filtre_proximite(float(lat), float(lon), float(radius))
+            ).filter(
                 latitude__range=[float(lat) - lat_range, float(lat) + lat_range],
                 longitude__range=[float(lon) - lon_range, float(lon) + lon_range]
             )
@@ -36,4 +42,63 @@ class AgentLocalViewSet(viewsets.ReadOnlyModelViewSet):
                 Q(adresse__icontains=search)
             )
         
-        return queryset.order_by('nom')
\ No newline at end of file
+        return queryset.order_by('nom')
+    
+    @action(detail=False, methods=['get'])
+    def plus_proches(self, request):
+        """Les k agents disponibles les plus proches (index mémoire en grille geohash)"""
+        try:
+            lat = float(request.query_params['lat'])
+            lon = float(request.query_params['lon'])
+            k = min(int(request.query_params.get('k', 5)), 50)
+            radius = float(request.query_params.get('radius', 50))
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'Paramètres lat et lon requis (k et radius optionnels)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        disponibles = request.query_params.get('disponibles', 'true').lower() != 'false'
+        
+        resultats = get_index_agents().plus_proches(
+            lat, lon, k=k, rayon_max_km=radius, disponibles=disponibles
+        )
+        agents = AgentLocal.objects.in_bulk([agent_id for _, agent_id in resultats])
+        distances = {agent_id: round(distance, 2) for distance, agent_id in resultats}
+        
+        serializer = AgentLocalSerializer(
+            [agents[agent_id] for _, agent_id in resultats if agent_id in agents],
+            many=True,
+            context={**self.get_serializer_context(), 'distances': distances}
+        )
+        return Response({
+            'count': len(serializer.data),
+            'results': serializer.data
+        })
+    
+    @action(detail=True, methods=['post'])
+    def approvisionner(self, request, pk=None):
+        """Approvisionner ou ajuster le solde d'un agent (administrateurs uniquement)"""
+        if not request.user.is_staff:
+            return Response(
+                {'detail': 'Vous n\'avez pas la permission de modifier le solde d\'un agent.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        # Tous les agents, y compris ceux qui ne sont pas actifs
+        agent = get_object_or_404(AgentLocal, pk=pk)
+        serializer = ApprovisionnementSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        mouvement = crediter(
+            agent,
+            serializer.validated_data['montant'],
+            type_mouvement=serializer.validated_data['type_mouvement'],
+            libelle=serializer.validated_data['libelle'] or f"Par {request.user}"
+        )
+        if mouvement is None:
+            return Response({'error': 'Solde agent insuffisant'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        agent.refresh_from_db(fields=['solde_compte'])
+        return Response({
+            'solde_compte': agent.solde_compte,
+            'mouvement': MouvementSoldeSerializer(mouvement).data
+        }, status=status.HTTP_201_CREATED)
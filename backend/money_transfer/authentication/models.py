@@ -79,6 +79,18 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.phone_number})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Statut KYC chargé : les signals post_save y comparent le nouveau statut
+        instance._kyc_status_charge = instance.__dict__.get('kyc_status')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Après tous les receivers post_save : le statut sauvegardé devient la référence
+        self._kyc_status_charge = self.kyc_status
+    
     def get_full_name(self):
         """Return the first_name plus the last_name, with a space in between."""
         return f"{self.first_name} {self.last_name}"
@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.forms.models import model_to_dict
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from dashboard.models import DashboardStats
+from dashboard.services import METRIQUES, recalculer_metrique
+
+# Champs dérivés du calcul, hors métadonnées
+CHAMPS_IGNORES = {'id', 'date', 'date_creation', 'date_mise_a_jour'}
+
+
+class Command(BaseCommand):
+    help = 'Recalcul complet des statistiques dashboard (réparation nocturne des compteurs incrémentaux)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jours', type=int, default=2,
+                            help='Nombre de jours à recalculer jusqu\'à aujourd\'hui inclus')
+        parser.add_argument('--date', help='Recalculer uniquement ce jour (AAAA-MM-JJ)')
+
+    def handle(self, *args, **options):
+        if options['date']:
+            jour = parse_date(options['date'])
+            if jour is None:
+                raise CommandError(f"Date invalide: {options['date']}")
+            jours = [jour]
+        else:
+            aujourd_hui = timezone.localdate()
+            jours = [aujourd_hui - timedelta(days=i) for i in range(options['jours'])]
+
+        self.stdout.write(f'🔧 Réparation des statistiques sur {len(jours)} jour(s)...')
+
+        for jour in sorted(jours):
+            avant = DashboardStats.objects.filter(date=jour).first()
+            apres = DashboardStats.calculer_stats_jour(jour)
+            ecarts = self._ecarts(avant, apres)
+            if avant is None:
+                self.stdout.write(f'  {jour}: ligne créée')
+            elif ecarts:
+                self.stdout.write(self.style.WARNING(f'  {jour}: corrigé {", ".join(ecarts)}'))
+            else:
+                self.stdout.write(f'  {jour}: ok')
+
+        for cle in METRIQUES:
+            recalculer_metrique(cle)
+
+        self.stdout.write(self.style.SUCCESS('✅ Réparation terminée'))
+
+    @staticmethod
+    def _ecarts(avant, apres):
+        if avant is None:
+            return []
+        valeurs_avant = model_to_dict(avant)
+        apres.refresh_from_db()
+        return [
+            f'{champ} {valeurs_avant[champ]} → {valeur}'
+            for champ, valeur in model_to_dict(apres).items()
+            if champ not in CHAMPS_IGNORES and valeurs_avant[champ] != valeur
+        ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def completer_statistiques(apps, schema_editor):
+    """
+    Compléter les lignes existantes au lieu de les effacer : compteurs bruts des
+    taux et ensembles d'actifs recalculés depuis les transactions et retraits du
+    jour, pour que les deltas suivants partent de valeurs justes. L'historique
+    déjà enregistré (volumes, commissions, ...) est conservé tel quel.
+    """
+    DashboardStats = apps.get_model('dashboard', 'DashboardStats')
+    ActiviteJournaliere = apps.get_model('dashboard', 'ActiviteJournaliere')
+    MetriqueTempReel = apps.get_model('dashboard', 'MetriqueTempReel')
+    Transaction = apps.get_model('transactions', 'Transaction')
+    Withdrawal = apps.get_model('withdrawals', 'Withdrawal')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+
+    for stats in DashboardStats.objects.iterator():
+        transactions_jour = Transaction.objects.filter(created_at__date=stats.date)
+        terminees = transactions_jour.filter(statusTransaction='TERMINE')
+        stats.transactions_terminees = terminees.count()
+        stats.transactions_wave_terminees = terminees.filter(canal_paiement__type_canal='WAVE').count()
+        stats.transactions_orange_terminees = terminees.filter(canal_paiement__type_canal='ORANGE_MONEY').count()
+        stats.save(update_fields=[
+            'transactions_terminees', 'transactions_wave_terminees', 'transactions_orange_terminees',
+        ])
+
+        actifs = [
+            ('UTILISATEUR', transactions_jour.values_list('expediteur_id', flat=True)),
+            ('AGENT', Withdrawal.objects.filter(date_demande__date=stats.date).values_list('agent_id', flat=True)),
+        ]
+        for categorie, identifiants in actifs:
+            ActiviteJournaliere.objects.bulk_create([
+                ActiviteJournaliere(date=stats.date, categorie=categorie, identifiant=str(identifiant))
+                for identifiant in set(identifiants) if identifiant is not None
+            ], batch_size=500)
+
+    # Les métriques deviennent des compteurs incrémentés : valeur de départ exacte
+    metriques = {
+        'transactions_en_attente': Transaction.objects.filter(statusTransaction='EN_ATTENTE').count(),
+        'transactions_total': Transaction.objects.count(),
+        'utilisateurs_total': User.objects.count(),
+    }
+    for cle, valeur in metriques.items():
+        MetriqueTempReel.objects.filter(cle_metrique=cle).update(valeur_numerique=valeur)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+        ('transactions', '0005_statistiques_utilisateur'),
+        ('withdrawals', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dashboardstats',
+            name='transactions_orange_terminees',
+            field=models.IntegerField(default=0, help_text='Transactions Orange Money terminées'),
+        ),
+        migrations.AddField(
+            model_name='dashboardstats',
+            name='transactions_terminees',
+            field=models.IntegerField(default=0, help_text='Transactions terminées (base de taux_reussite)'),
+        ),
+        migrations.AddField(
+            model_name='dashboardstats',
+            name='transactions_wave_terminees',
+            field=models.IntegerField(default=0, help_text='Transactions Wave terminées'),
+        ),
+        migrations.CreateModel(
+            name='ActiviteJournaliere',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('categorie', models.CharField(choices=[('UTILISATEUR', 'Utilisateur'), ('AGENT', 'Agent')], max_length=12)),
+                ('identifiant', models.CharField(max_length=64)),
+            ],
+            options={
+                'verbose_name': 'Activité journalière',
+                'verbose_name_plural': 'Activités journalières',
+                'db_table': 'dashboard_activite_journaliere',
+                'constraints': [models.UniqueConstraint(fields=('date', 'categorie', 'identifiant'), name='activite_unique_par_jour')],
+            },
+        ),
+        migrations.RunPython(completer_statistiques, migrations.RunPython.noop),
+    ]
@@ -88,6 +88,20 @@ class DashboardStats(models.Model):
         help_text="Taux de succès Orange Money"
     )
     
+    # Compteurs bruts des taux : les deltas ne s'appliquent pas à un pourcentage
+    transactions_terminees = models.IntegerField(
+        default=0,
+        help_text="Transactions terminées (base de taux_reussite)"
+    )
+    transactions_wave_terminees = models.IntegerField(
+        default=0,
+        help_text="Transactions Wave terminées"
+    )
+    transactions_orange_terminees = models.IntegerField(
+        default=0,
+        help_text="Transactions Orange Money terminées"
+    )
+    
     # ===== STATISTIQUES INTERNATIONALES (DEV 2) =====
     transactions_internationales = models.IntegerField(
         default=0,
@@ -140,26 +154,34 @@ class DashboardStats(models.Model):
             total=Sum('montantEnvoye')
         )['total'] or Decimal('0.00')
         
+        volume_total = Decimal(str(volume_total))
+        nb_terminees = transactions_terminees.count()
+        
         # Calcul taux de réussite
         if total_transactions > 0:
-            taux_reussite = (transactions_terminees.count() / total_transactions) * 100
+            taux_reussite = (nb_terminees / total_transactions) * 100
         else:
             taux_reussite = Decimal('0.00')
         
         # ===== STATISTIQUES UTILISATEURS =====
         nouveaux_users = User.objects.filter(date_joined__date=date).count()
-        users_actifs = User.objects.filter(
-            transactions_envoyees__created_at__date=date
-        ).distinct().count()
         users_kyc_verifies = User.objects.filter(
             kyc_status='VERIFIED',
             date_joined__date=date
         ).count()
         
+        # Utilisateurs et agents actifs : l'ensemble du jour est conservé pour les
+        # incréments suivants (un nouvel actif n'est compté qu'une fois)
+        users_actifs = ActiviteJournaliere.reconstruire(
+            date, ActiviteJournaliere.UTILISATEUR,
+            transactions_jour.values_list('expediteur_id', flat=True).distinct()
+        )
+        
         # ===== STATISTIQUES AGENTS =====
-        agents_actifs_count = AgentLocal.objects.filter(
-            retraits_geres__date_demande__date=date
-        ).distinct().count()
+        agents_actifs_count = ActiviteJournaliere.reconstruire(
+            date, ActiviteJournaliere.AGENT,
+            Withdrawal.objects.filter(date_demande__date=date).values_list('agent_id', flat=True).distinct()
+        )
         
         retraits_jour = Withdrawal.objects.filter(date_demande__date=date)
         total_retraits = retraits_jour.count()
@@ -193,9 +215,9 @@ class DashboardStats(models.Model):
             extension_internationale__isnull=False
         )
         transactions_internationales = transactions_intl.count()
-        volume_international = transactions_intl.aggregate(
+        volume_international = Decimal(str(transactions_intl.aggregate(
             total=Sum('montantEnvoye')
-        )['total'] or Decimal('0.00')
+        )['total'] or 0))
         
         # ===== TOTAL COMMISSIONS =====
         # Commissions des retraits + frais transactions
@@ -226,6 +248,9 @@ class DashboardStats(models.Model):
                 'transactions_orange': transactions_orange,
                 'taux_succes_wave': taux_succes_wave,
                 'taux_succes_orange': taux_succes_orange,
+                'transactions_terminees': nb_terminees,
+                'transactions_wave_terminees': wave_terminees,
+                'transactions_orange_terminees': orange_terminees,
                 'transactions_internationales': transactions_internationales,
                 'volume_international': volume_international,
             }
@@ -260,14 +285,11 @@ class DashboardStats(models.Model):
         today = timezone.now().date()
         yesterday = today - timedelta(days=1)
         
-        # Calculer les stats d'aujourd'hui
-        stats_today = cls.calculer_stats_jour(today)
-        
-        # Récupérer les stats d'hier pour comparaison
-        try:
-            stats_yesterday = cls.objects.get(date=yesterday)
-        except cls.DoesNotExist:
-            stats_yesterday = cls.calculer_stats_jour(yesterday)
+        # Lignes tenues à jour par deltas (dashboard.services) : une seule requête.
+        # Une ligne absente (premier appel du jour sans activité) est calculée une fois.
+        lignes = {stats.date: stats for stats in cls.objects.filter(date__in=[today, yesterday])}
+        stats_today = lignes.get(today) or cls.calculer_stats_jour(today)
+        stats_yesterday = lignes.get(yesterday) or cls.calculer_stats_jour(yesterday)
         
         # Calculer évolutions
         def calc_evolution(today_val, yesterday_val):
@@ -310,6 +332,47 @@ class DashboardStats(models.Model):
             'derniere_mise_a_jour': stats_today.date_mise_a_jour.isoformat(),
         }
 
+class ActiviteJournaliere(models.Model):
+    """
+    Utilisateurs / agents déjà comptés comme actifs un jour donné.
+    
+    Permet d'incrémenter utilisateurs_actifs et agents_actifs (des comptes
+    distincts) sans recompter : seule la première activité du jour crée la ligne.
+    """
+    UTILISATEUR = 'UTILISATEUR'
+    AGENT = 'AGENT'
+    CATEGORIES = [
+        (UTILISATEUR, 'Utilisateur'),
+        (AGENT, 'Agent'),
+    ]
+    
+    date = models.DateField()
+    categorie = models.CharField(max_length=12, choices=CATEGORIES)
+    identifiant = models.CharField(max_length=64)
+    
+    class Meta:
+        db_table = 'dashboard_activite_journaliere'
+        verbose_name = 'Activité journalière'
+        verbose_name_plural = 'Activités journalières'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'categorie', 'identifiant'], name='activite_unique_par_jour'),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} {self.categorie} {self.identifiant}"
+    
+    @classmethod
+    def reconstruire(cls, date, categorie, identifiants):
+        """Remplacer l'ensemble du jour (recalcul complet), retourne sa taille"""
+        identifiants = {str(identifiant) for identifiant in identifiants if identifiant is not None}
+        cls.objects.filter(date=date, categorie=categorie).delete()
+        cls.objects.bulk_create(
+            [cls(date=date, categorie=categorie, identifiant=identifiant) for identifiant in identifiants],
+            batch_size=500
+        )
+        return len(identifiants)
+
+
 # ===== MODÈLE POUR MÉTRIQUES TEMPS RÉEL =====
 class MetriqueTempReel(models.Model):
     """Métriques calculées en temps réel pour dashboard live"""
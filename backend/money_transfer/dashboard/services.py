@@ -0,0 +1,235 @@
+# dashboard/services.py
+import logging
+import os
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, Value, When
+from django.utils import timezone
+
+from .models import ActiviteJournaliere, DashboardStats, MetriqueTempReel
+
+logger = logging.getLogger(__name__)
+
+# Part estimée des frais dans le volume terminé (même règle que calculer_stats_jour)
+TAUX_FRAIS_TRANSACTIONS = Decimal('0.015')
+
+# Taux stockés → (numérateur, dénominateur) parmi les compteurs bruts
+TAUX = {
+    'taux_reussite': ('transactions_terminees', 'total_transactions'),
+    'taux_succes_wave': ('transactions_wave_terminees', 'transactions_wave'),
+    'taux_succes_orange': ('transactions_orange_terminees', 'transactions_orange'),
+}
+
+CHAMPS_CANAL = {
+    'WAVE': ('transactions_wave', 'transactions_wave_terminees'),
+    'ORANGE_MONEY': ('transactions_orange', 'transactions_orange_terminees'),
+}
+
+
+# ===== DELTAS SUR DashboardStats =====
+
+def _taux(numerateur, denominateur, delta_numerateur, delta_denominateur):
+    """Nouveau taux calculé dans l'UPDATE (les F() y valent encore les anciennes valeurs)"""
+    pourcentage = ExpressionWrapper(
+        (F(numerateur) + delta_numerateur) * Value(100.0) / (F(denominateur) + delta_denominateur),
+        output_field=DecimalField(max_digits=5, decimal_places=2)
+    )
+    return Case(
+        When(**{f'{denominateur}__gt': -delta_denominateur}, then=pourcentage),
+        default=Value(Decimal('0.00')),
+        output_field=DecimalField(max_digits=5, decimal_places=2)
+    )
+
+
+def appliquer_delta(date, deltas):
+    """
+    Appliquer des deltas à la ligne du jour en un seul UPDATE atomique.
+
+    Une ligne absente est calculée entièrement (elle inclut déjà l'événement).
+    """
+    deltas = {champ: valeur for champ, valeur in deltas.items() if valeur}
+    if not deltas:
+        return
+
+    mises_a_jour = {champ: F(champ) + valeur for champ, valeur in deltas.items()}
+    for champ_taux, (numerateur, denominateur) in TAUX.items():
+        if numerateur in deltas or denominateur in deltas:
+            mises_a_jour[champ_taux] = _taux(
+                numerateur, denominateur, deltas.get(numerateur, 0), deltas.get(denominateur, 0)
+            )
+
+    if not DashboardStats.objects.filter(date=date).update(date_mise_a_jour=timezone.now(), **mises_a_jour):
+        DashboardStats.calculer_stats_jour(date)
+
+
+def marquer_actif(date, categorie, identifiant):
+    """Vrai si c'est la première activité du jour pour cet utilisateur / agent"""
+    try:
+        with db_transaction.atomic():
+            _, cree = ActiviteJournaliere.objects.get_or_create(
+                date=date, categorie=categorie, identifiant=str(identifiant)
+            )
+        return cree
+    except IntegrityError:
+        return False
+
+
+# ===== MÉTRIQUES TEMPS RÉEL =====
+
+def _transactions_en_attente():
+    from transactions.models import Transaction, StatutTransaction
+    return Transaction.objects.filter(statusTransaction=StatutTransaction.EN_ATTENTE).count()
+
+
+def _transactions_total():
+    from transactions.models import Transaction
+    return Transaction.objects.count()
+
+
+def _utilisateurs_total():
+    from django.contrib.auth import get_user_model
+    return get_user_model().objects.count()
+
+
+# clé → calcul complet (initialisation et réparation)
+METRIQUES = {
+    'transactions_en_attente': _transactions_en_attente,
+    'transactions_total': _transactions_total,
+    'utilisateurs_total': _utilisateurs_total,
+}
+
+
+def incrementer_metrique(cle, delta):
+    """Compteur MetriqueTempReel ; initialisé par un calcul complet s'il n'existe pas"""
+    if not delta:
+        return
+    if not MetriqueTempReel.objects.filter(cle_metrique=cle).update(
+        valeur_numerique=F('valeur_numerique') + delta, derniere_mise_a_jour=timezone.now()
+    ):
+        recalculer_metrique(cle)
+
+
+def recalculer_metrique(cle):
+    MetriqueTempReel.objects.update_or_create(
+        cle_metrique=cle, defaults={'valeur_numerique': METRIQUES[cle]()}
+    )
+
+
+# ===== RÉSUMÉS EN CACHE =====
+
+def resume_en_cache(nom, calcul):
+    """
+    Résumé du jour calculé par `calcul`, partagé par tous les workers via le cache.
+
+    Recalculé au plus une fois par DASHBOARD_CACHE_TTL, par le premier worker qui
+    le trouve périmé ; les autres servent le résumé précédent en attendant.
+    """
+    cle = f"dashboard:{nom}:{timezone.localdate().isoformat()}"
+    entree = cache.get(cle)  # (time.time() du calcul, résumé)
+    if entree is not None and (
+        time.time() - entree[0] < settings.DASHBOARD_CACHE_TTL
+        or not cache.add(f"{cle}:calcul", os.getpid(), settings.DASHBOARD_CACHE_TTL)
+    ):
+        return entree[1]
+
+    resume = calcul()
+    cache.set(cle, (time.time(), resume), settings.DASHBOARD_CACHE_TTL * 10)
+    return resume
+
+
+# ===== ÉVÉNEMENTS =====
+
+def _contribution_transaction(etat, types_canaux):
+    """Compteurs du jour apportés par une transaction (état etat_statistiques)"""
+    from transactions.models import StatutTransaction
+
+    _, _, canal_id, _, statut, montant = etat
+    compteurs = defaultdict(int)
+    compteurs['total_transactions'] = 1
+    termine = statut == StatutTransaction.TERMINE
+    if termine:
+        volume = Decimal(str(montant or 0))
+        compteurs['transactions_terminees'] = 1
+        compteurs['total_volume'] = volume
+        compteurs['total_commissions'] = volume * TAUX_FRAIS_TRANSACTIONS
+    champs_canal = CHAMPS_CANAL.get(types_canaux.get(canal_id))
+    if champs_canal:
+        compteurs[champs_canal[0]] = 1
+        if termine:
+            compteurs[champs_canal[1]] = 1
+    return compteurs
+
+
+def transaction_changee(instance, ancien, nouveau, created):
+    """Delta du jour de création de la transaction + métriques temps réel"""
+    from transactions.models import CanalPaiement, StatutTransaction
+
+    if ancien is None and not created:
+        # État d'origine inconnu : la réparation nocturne recalculera le jour
+        logger.debug(f"⏭️ Dashboard: état d'origine inconnu pour {instance.codeTransaction}")
+        return
+
+    jour = timezone.localdate(instance.created_at)
+    types_canaux = {}
+    if instance._meta.get_field('canal_paiement').is_cached(instance):
+        types_canaux[instance.canal_paiement_id] = instance.canal_paiement.type_canal
+    manquants = {etat[2] for etat in (ancien, nouveau) if etat} - set(types_canaux)
+    if manquants:
+        types_canaux.update(CanalPaiement.objects.filter(id__in=manquants).values_list('id', 'type_canal'))
+
+    deltas = defaultdict(int)
+    for signe, etat in ((-1, ancien), (1, nouveau)):
+        if etat is not None:
+            for champ, valeur in _contribution_transaction(etat, types_canaux).items():
+                deltas[champ] += signe * valeur
+
+    if created and marquer_actif(jour, ActiviteJournaliere.UTILISATEUR, instance.expediteur_id):
+        deltas['utilisateurs_actifs'] += 1
+
+    appliquer_delta(jour, deltas)
+
+    en_attente = [etat is not None and etat[4] == StatutTransaction.EN_ATTENTE for etat in (ancien, nouveau)]
+    incrementer_metrique('transactions_en_attente', en_attente[1] - en_attente[0])
+    incrementer_metrique('transactions_total', (nouveau is not None) - (ancien is not None))
+
+
+def retrait_cree(withdrawal):
+    jour = timezone.localdate(withdrawal.date_demande)
+    deltas = {
+        'total_retraits': 1,
+        'volume_retraits': withdrawal.montant_retire or Decimal('0.00'),
+        'total_commissions': withdrawal.commission_agent or Decimal('0.00'),
+    }
+    if marquer_actif(jour, ActiviteJournaliere.AGENT, withdrawal.agent_id):
+        deltas['agents_actifs'] = 1
+    appliquer_delta(jour, deltas)
+
+
+def transaction_internationale_creee(internationale):
+    transaction = internationale.transaction_locale
+    appliquer_delta(timezone.localdate(transaction.created_at), {
+        'transactions_internationales': 1,
+        'volume_international': Decimal(str(transaction.montantEnvoye or 0)),
+    })
+
+
+def utilisateur_change(user, kyc_precedent, created):
+    verifie = user.kyc_status == 'VERIFIED'
+    deltas = {'utilisateurs_kyc_verifies': int(verifie) - int(kyc_precedent == 'VERIFIED')}
+    if created:
+        deltas['nouveaux_utilisateurs'] = 1
+        incrementer_metrique('utilisateurs_total', 1)
+    appliquer_delta(timezone.localdate(user.date_joined), deltas)
+
+
+def jours_importes(jours):
+    """Écritures en masse : recalcul complet des jours touchés et des métriques"""
+    for jour in sorted(jours):
+        DashboardStats.calculer_stats_jour(jour)
+    for cle in METRIQUES:
+        recalculer_metrique(cle)
@@ -0,0 +1,54 @@
+# dashboard/signals.py - Statistiques du jour tenues à jour par deltas
+
+import logging
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from transactions.models import TransactionInternationale
+from transactions.signals import etat_transaction_change, transactions_importees
+from withdrawals.models import Withdrawal
+from . import services
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+
+@receiver(etat_transaction_change)
+def dashboard_transaction(sender, instance, ancien, nouveau, created, **kwargs):
+    services.transaction_changee(instance, ancien, nouveau, created)
+
+
+@receiver(transactions_importees)
+def dashboard_import(sender, jours, **kwargs):
+    services.jours_importes(jours)
+
+
+@receiver(post_save, sender=Withdrawal)
+def dashboard_retrait(sender, instance, created, **kwargs):
+    if not created:
+        return
+    try:
+        services.retrait_cree(instance)
+    except Exception as e:
+        logger.error(f"❌ Dashboard: erreur retrait {instance.code_retrait}: {e}")
+
+
+@receiver(post_save, sender=TransactionInternationale)
+def dashboard_international(sender, instance, created, **kwargs):
+    if not created:
+        return
+    try:
+        services.transaction_internationale_creee(instance)
+    except Exception as e:
+        logger.error(f"❌ Dashboard: erreur transaction internationale {instance.pk}: {e}")
+
+
+@receiver(post_save, sender=User)
+def dashboard_utilisateur(sender, instance, created, **kwargs):
+    precedent = None if created else getattr(instance, '_kyc_status_charge', instance.kyc_status)
+    try:
+        services.utilisateur_change(instance, precedent, created)
+    except Exception as e:
+        logger.error(f"❌ Dashboard: erreur utilisateur {instance.pk}: {e}")
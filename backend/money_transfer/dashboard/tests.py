@@ -1,3 +1,150 @@
-from django.test import TestCase
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.forms.models import model_to_dict
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from agents.models import AgentLocal
+from transactions.models import CanalPaiement, StatutTransaction, Transaction
+from withdrawals.models import Withdrawal
+from .models import DashboardStats, MetriqueTempReel
+
+User = get_user_model()
+
+CHAMPS_IGNORES = {'id', 'date', 'date_creation', 'date_mise_a_jour'}
+
+
+class DashboardStatsIncrementalTests(TestCase):
+    """Compteurs du jour tenus par deltas égaux au recalcul complet"""
+
+    def setUp(self):
+        self.jour = timezone.localdate()
+        self.user = User.objects.create_user(
+            phone_number='+221770000021', email='e@example.com', first_name='Awa', last_name='Ba', password='x'
+        )
+        self.autre = User.objects.create_user(
+            phone_number='+221770000022', email='f@example.com', first_name='Modou', last_name='Sarr', password='x'
+        )
+        self.wave = CanalPaiement.objects.create(
+            canal_name='Wave', type_canal='WAVE', country='Sénégal', fees_percentage=Decimal('1.00')
+        )
+        self.orange = CanalPaiement.objects.create(
+            canal_name='Orange Money', type_canal='ORANGE_MONEY', country='Sénégal', fees_percentage=Decimal('1.00')
+        )
+
+    def creer(self, expediteur, canal, montant=5000):
+        return Transaction.objects.create(
+            expediteur=expediteur, destinataire=self.autre, destinataire_phone=self.autre.phone_number,
+            canal_paiement=canal, montantEnvoye=montant, montantConverti=montant, montantRecu=montant,
+        )
+
+    def assertCoherent(self):
+        incremental = model_to_dict(DashboardStats.objects.get(date=self.jour))
+        recalcul = DashboardStats.calculer_stats_jour(self.jour)
+        recalcul.refresh_from_db()
+        for champ, valeur in model_to_dict(recalcul).items():
+            if champ not in CHAMPS_IGNORES:
+                self.assertEqual(incremental[champ], valeur, champ)
+
+    def test_evenements_du_jour(self):
+        premiere = self.creer(self.user, self.wave)
+        self.creer(self.user, self.orange, montant=12000)
+        self.creer(self.autre, self.wave, montant=700)
+
+        premiere.statusTransaction = StatutTransaction.TERMINE
+        premiere.save()
+        seconde = Transaction.objects.get(montantEnvoye=12000)
+        seconde.statusTransaction = StatutTransaction.ANNULE
+        seconde.save()
+
+        agent_user = User.objects.create_user(
+            phone_number='+221770000023', email='g@example.com', first_name='Agent', last_name='Diallo', password='x'
+        )
+        agent = AgentLocal.objects.create(
+            user=agent_user, nom='Diallo', prenom='Agent', telephone='+221770000023',
+            email='g@example.com', adresse='Dakar'
+        )
+        Withdrawal.objects.create(
+            transaction_origine=premiere, agent=agent, beneficiaire=self.autre,
+            montant_retire=Decimal('5000.00'), commission_agent=Decimal('100.00')
+        )
+
+        self.user.kyc_status = 'VERIFIED'
+        self.user.save()
+
+        self.assertCoherent()
+        self.assertEqual(
+            MetriqueTempReel.objects.get(cle_metrique='transactions_en_attente').valeur_numerique, 1
+        )
+
+    def test_reparation(self):
+        self.creer(self.user, self.wave)
+        DashboardStats.objects.filter(date=self.jour).update(total_transactions=42)
+
+        sortie = StringIO()
+        call_command('reparer_dashboard_stats', '--jours', '1', stdout=sortie)
+
+        self.assertIn('total_transactions 42 → 1', sortie.getvalue())
+        self.assertEqual(DashboardStats.objects.get(date=self.jour).total_transactions, 1)
+
+
+class MigrationCompteursTests(TransactionTestCase):
+    """0002 complète les lignes existantes au lieu de les effacer"""
+
+    def setUp(self):
+        # Toutes les applications à jour sauf dashboard, ramené avant 0002
+        self.feuilles = MigrationExecutor(connection).loader.graph.leaf_nodes()
+        self.avant = [('dashboard', '0001_initial')] + [noeud for noeud in self.feuilles if noeud[0] != 'dashboard']
+        self.apres = [('dashboard', '0002_compteurs_incrementaux')] + self.avant[1:]
+
+    def tearDown(self):
+        MigrationExecutor(connection).migrate(self.feuilles)
+
+    def test_historique_conserve_et_compteurs_completes(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.avant)
+        apps = executor.loader.project_state(self.avant).apps
+        jour = timezone.localdate()
+
+        utilisateur = apps.get_model('authentication', 'User').objects.create(
+            phone_number='+221770000023', email='g@example.com', first_name='Fatou', last_name='Diop'
+        )
+        wave = apps.get_model('transactions', 'CanalPaiement').objects.create(
+            canal_name='Wave', type_canal='WAVE', country='Sénégal', fees_percentage=Decimal('1.00')
+        )
+        Transaction = apps.get_model('transactions', 'Transaction')
+        for numero, statut in enumerate([StatutTransaction.TERMINE, StatutTransaction.TERMINE, StatutTransaction.EN_ATTENTE]):
+            Transaction.objects.create(
+                idTransaction=numero + 1, codeTransaction=f'CODE{numero}', expediteur=utilisateur,
+                destinataire_phone='+221770000024', canal_paiement=wave, statusTransaction=statut,
+                montantEnvoye=5000, montantConverti=5000, montantRecu=5000,
+            )
+        apps.get_model('dashboard', 'DashboardStats').objects.create(
+            date=jour, total_transactions=3, total_volume=Decimal('10000.00'), taux_reussite=Decimal('66.67'),
+            transactions_wave=3, utilisateurs_actifs=1,
+        )
+        apps.get_model('dashboard', 'MetriqueTempReel').objects.create(
+            cle_metrique='transactions_en_attente', valeur_numerique=7
+        )
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.apres)
+        apps = executor.loader.project_state(self.apres).apps
+
+        stats = apps.get_model('dashboard', 'DashboardStats').objects.get(date=jour)
+        self.assertEqual((stats.total_transactions, stats.total_volume), (3, Decimal('10000.00')))
+        self.assertEqual((stats.transactions_terminees, stats.transactions_wave_terminees), (2, 2))
+        self.assertEqual(stats.transactions_orange_terminees, 0)
+        self.assertEqual(
+            list(apps.get_model('dashboard', 'ActiviteJournaliere').objects.values_list('categorie', 'identifiant')),
+            [('UTILISATEUR', str(utilisateur.pk))]
+        )
+        self.assertEqual(
+            apps.get_model('dashboard', 'MetriqueTempReel').objects.get(cle_metrique='transactions_en_attente')
+            .valeur_numerique, 1
+        )
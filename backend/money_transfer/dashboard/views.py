@@ -5,6 +5,7 @@ from rest_framework.permissions import IsAuthenticated
 from datetime import datetime, timedelta
 from django.db.models import Sum, Count, Avg
 from .models import DashboardStats
+from . import services
 from .serializers import DashboardStatsSerializer, DashboardSummarySerializer
 from agents.models import AgentLocal
 from withdrawals.models import Withdrawal
@@ -16,6 +17,9 @@ class DashboardViewSet(viewsets.ReadOnlyModelViewSet):
     
     @action(detail=False, methods=['get'])
     def summary(self, request):
+        return Response(services.resume_en_cache('viewset_summary', self._calculer_summary))
+
+    def _calculer_summary(self):
         today = datetime.now().date()
         yesterday = today - timedelta(days=1)
         
@@ -49,8 +53,7 @@ class DashboardViewSet(viewsets.ReadOnlyModelViewSet):
         today_stats['evolution_transactions'] = round(evolution_transactions, 2)
         today_stats['evolution_volume'] = 8.2  # Mock pour l'instant
         
-        serializer = DashboardSummarySerializer(today_stats)
-        return Response(serializer.data)
+        return DashboardSummarySerializer(today_stats).data
     
     @action(detail=False, methods=['get'])
     def weekly_stats(self, request):
@@ -7,12 +7,17 @@ from django.utils.decorators import method_decorator
 from django.views import View
 import json
 from decimal import Decimal
+from math import cos, radians
 import logging
 
 # ===== IMPORTS CORRIGÉS =====
 from django.contrib.auth import get_user_model  # ✅ CORRIGÉ
 from agents.models import AgentLocal
+from agents.services.distances import LotAgents, distances_par_agent
+from agents.services.proximite import filtre_proximite
+from dashboard import services as dashboard_services
 from withdrawals.models import Withdrawal
+from withdrawals.services import limites as limites_retrait
 
 User = get_user_model()  # ✅ Utilise authentication.User automatiquement
 logger = logging.getLogger(__name__)
@@ -22,7 +27,7 @@ logger = logging.getLogger(__name__)
 def agents_list(request):
     """Liste des agents actifs avec calcul de distance - CORRIGÉ"""
     try:
-        agents = AgentLocal.objects.filter(statut_agent='ACTIF')
+        agents = AgentLocal.objects.filter(statut_agent='ACTIF').select_related('user')
         
         # Paramètres de géolocalisation
         lat = request.GET.get('lat')
@@ -38,20 +43,26 @@ def agents_list(request):
             lat_range = radius / 111  # 1 degré ≈ 111 km
             lon_range = radius / (111 * abs(cos(radians(lat_float))))
             
+            # Cellules geohash (index) puis rectangle exact sur les candidats
             agents = agents.filter(
+                filtre_proximite(lat_float, lon_float, radius)
+            ).filter(
                 latitude__range=[lat_float - lat_range, lat_float + lat_range],
                 longitude__range=[lon_float - lon_range, lon_float + lon_range]
             )
         
+        agents = list(agents)
+        
+        # Distances précises de tous les agents en un seul passage vectorisé
+        distances_agents = {}
+        if lat and lon:
+            distances_agents = distances_par_agent(LotAgents.depuis_agents(agents), float(lat), float(lon))
+        
         agents_data = []
         for agent in agents:
-            # Calcul distance précise si coordonnées disponibles
-            distance = None
-            if lat and lon and agent.latitude and agent.longitude:
-                distance = calculate_haversine_distance(
-                    float(lat), float(lon),
-                    float(agent.latitude), float(agent.longitude)
-                )
+            distance = distances_agents.get(agent.id)
+            if distance is not None:
+                distance = round(distance, 2)
             
             agent_dict = {
                 'id': agent.id,
@@ -146,6 +157,11 @@ def create_withdrawal(request):
         if not can_withdraw:
             return JsonResponse({'error': f'Agent ne peut pas effectuer le retrait: {message}'}, status=400)
         
+        # Limites journalières (agent + bénéficiaire) lues dans les compteurs en cache
+        can_withdraw, message = limites_retrait.verifier(agent, user.pk, montant_retire)
+        if not can_withdraw:
+            return JsonResponse({'error': message}, status=400)
+        
         # Calculer commission
         commission = agent.calculer_commission(montant_retire)
         
@@ -215,103 +231,105 @@ def create_withdrawal(request):
 @csrf_exempt
 @require_http_methods(["GET"])
 def dashboard_summary(request):
-    """Dashboard summary avec données intégrées - CORRIGÉ"""
+    """Dashboard summary avec données intégrées, recalculé au plus une fois par DASHBOARD_CACHE_TTL"""
     try:
-        from datetime import datetime, timedelta
-        from django.db.models import Sum, Count, Avg
-        
-        today = datetime.now().date()
-        yesterday = today - timedelta(days=1)
-        
-        # ===== STATISTIQUES RETRAITS (DEV 3) =====
-        today_withdrawals = Withdrawal.objects.filter(date_demande__date=today)
-        yesterday_withdrawals = Withdrawal.objects.filter(date_demande__date=yesterday)
-        
-        # ===== INTÉGRATION TRANSACTIONS (DEV 2) =====
-        transactions_stats = {}
-        try:
-            from transactions.models import Transaction, StatutTransaction
-            
-            today_transactions = Transaction.objects.filter(created_at__date=today)
-            transactions_stats = {
-                'transactions_totales': today_transactions.count(),
-                'transactions_reussies': today_transactions.filter(
-                    statusTransaction=StatutTransaction.TERMINE
-                ).count(),
-                'volume_transactions': float(today_transactions.aggregate(
-                    total=Sum('montantEnvoye')
-                )['total'] or 0),
-                'taux_reussite_reel': 0
-            }
-            
-            # Calcul taux de réussite réel
-            if transactions_stats['transactions_totales'] > 0:
-                transactions_stats['taux_reussite_reel'] = round(
-                    (transactions_stats['transactions_reussies'] / transactions_stats['transactions_totales']) * 100, 1
-                )
-        except:
-            logger.warning("⚠️ Module transactions non disponible")
-        
-        # ===== INTÉGRATION USERS (DEV 1) =====
-        users_stats = {}
-        try:
-            today_users = User.objects.filter(date_joined__date=today)
-            users_stats = {
-                'nouveaux_utilisateurs': today_users.count(),
-                'utilisateurs_kyc_verifies': today_users.filter(kyc_status='VERIFIED').count(),
-                'total_utilisateurs': User.objects.count(),
-            }
-        except:
-            logger.warning("⚠️ Module authentication non disponible")
-        
-        # Compilation des statistiques
-        summary = {
-            # ===== RETRAITS (DEV 3) =====
-            'total_transactions_today': today_withdrawals.count(),
-            'total_volume_today': float(sum(w.montant_retire for w in today_withdrawals)),
-            'total_commissions_today': float(sum(w.commission_agent for w in today_withdrawals)),
-            'total_retraits_today': today_withdrawals.count(),
-            
-            # ===== AGENTS (DEV 3) =====
-            'agents_actifs': AgentLocal.objects.filter(statut_agent='ACTIF').count(),
-            'agents_disponibles': AgentLocal.objects.filter(
-                statut_agent='ACTIF'
-            ).count(),  # À affiner selon vos critères
-            
-            # ===== INTÉGRATION TRANSACTIONS (DEV 2) =====
-            **transactions_stats,
-            
-            # ===== INTÉGRATION USERS (DEV 1) =====
-            **users_stats,
-            
-            # ===== ÉVOLUTIONS =====
-            'evolution_transactions': calculate_evolution(
-                today_withdrawals.count(),
-                yesterday_withdrawals.count()
-            ),
-            'evolution_volume': calculate_evolution(
-                float(sum(w.montant_retire for w in today_withdrawals)),
-                float(sum(w.montant_retire for w in yesterday_withdrawals))
-            ),
-            
-            # ===== MÉTADONNÉES =====
-            'date_calcul': today.isoformat(),
-            'heure_calcul': datetime.now().isoformat(),
-            'integration_status': {
-                'transactions_module': bool(transactions_stats),
-                'users_module': bool(users_stats),
-                'agents_module': True,
-                'withdrawals_module': True,
-            }
-        }
-        
-        return JsonResponse(summary)
-        
+        return JsonResponse(dashboard_services.resume_en_cache('summary', calculer_resume_dashboard))
     except Exception as e:
         logger.error(f"❌ Erreur dashboard_summary: {e}")
         return JsonResponse({'error': str(e)}, status=500)
 
 
+def calculer_resume_dashboard():
+    """Résumé du jour (retraits, transactions, utilisateurs, agents) - CORRIGÉ"""
+    from datetime import datetime, timedelta
+    from django.db.models import Sum, Count, Avg
+
+    today = datetime.now().date()
+    yesterday = today - timedelta(days=1)
+
+    # ===== STATISTIQUES RETRAITS (DEV 3) =====
+    today_withdrawals = Withdrawal.objects.filter(date_demande__date=today)
+    yesterday_withdrawals = Withdrawal.objects.filter(date_demande__date=yesterday)
+
+    # ===== INTÉGRATION TRANSACTIONS (DEV 2) =====
+    transactions_stats = {}
+    try:
+        from transactions.models import Transaction, StatutTransaction
+
+        today_transactions = Transaction.objects.filter(created_at__date=today)
+        transactions_stats = {
+            'transactions_totales': today_transactions.count(),
+            'transactions_reussies': today_transactions.filter(
+                statusTransaction=StatutTransaction.TERMINE
+            ).count(),
+            'volume_transactions': float(today_transactions.aggregate(
+                total=Sum('montantEnvoye')
+            )['total'] or 0),
+            'taux_reussite_reel': 0
+        }
+
+        # Calcul taux de réussite réel
+        if transactions_stats['transactions_totales'] > 0:
+            transactions_stats['taux_reussite_reel'] = round(
+                (transactions_stats['transactions_reussies'] / transactions_stats['transactions_totales']) * 100, 1
+            )
+    except:
+        logger.warning("⚠️ Module transactions non disponible")
+
+    # ===== INTÉGRATION USERS (DEV 1) =====
+    users_stats = {}
+    try:
+        today_users = User.objects.filter(date_joined__date=today)
+        users_stats = {
+            'nouveaux_utilisateurs': today_users.count(),
+            'utilisateurs_kyc_verifies': today_users.filter(kyc_status='VERIFIED').count(),
+            'total_utilisateurs': User.objects.count(),
+        }
+    except:
+        logger.warning("⚠️ Module authentication non disponible")
+
+    # Compilation des statistiques
+    summary = {
+        # ===== RETRAITS (DEV 3) =====
+        'total_transactions_today': today_withdrawals.count(),
+        'total_volume_today': float(sum(w.montant_retire for w in today_withdrawals)),
+        'total_commissions_today': float(sum(w.commission_agent for w in today_withdrawals)),
+        'total_retraits_today': today_withdrawals.count(),
+
+        # ===== AGENTS (DEV 3) =====
+        'agents_actifs': AgentLocal.objects.filter(statut_agent='ACTIF').count(),
+        'agents_disponibles': AgentLocal.objects.disponibles().count(),
+
+        # ===== INTÉGRATION TRANSACTIONS (DEV 2) =====
+        **transactions_stats,
+
+        # ===== INTÉGRATION USERS (DEV 1) =====
+        **users_stats,
+
+        # ===== ÉVOLUTIONS =====
+        'evolution_transactions': calculate_evolution(
+            today_withdrawals.count(),
+            yesterday_withdrawals.count()
+        ),
+        'evolution_volume': calculate_evolution(
+            float(sum(w.montant_retire for w in today_withdrawals)),
+            float(sum(w.montant_retire for w in yesterday_withdrawals))
+        ),
+
+        # ===== MÉTADONNÉES =====
+        'date_calcul': today.isoformat(),
+        'heure_calcul': datetime.now().isoformat(),
+        'integration_status': {
+            'transactions_module': bool(transactions_stats),
+            'users_module': bool(users_stats),
+            'agents_module': True,
+            'withdrawals_module': True,
+        }
+    }
+
+    return summary
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def validate_withdrawal_code(request):
@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Le flux temps réel /api/notifications/stream/ (Server-Sent Events) est servi
+ici, devant Django : uvicorn money_transfer.asgi:application
 """
 
 import os
@@ -13,4 +16,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'money_transfer.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Après django.setup()
+from notifications.asgi import FluxNotifications  # noqa: E402
+
+application = FluxNotifications(django_application)
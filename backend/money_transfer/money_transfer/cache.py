@@ -0,0 +1,165 @@
+# money_transfer/cache.py
+import re
+import threading
+from collections import Counter
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+
+_ABSENT = object()
+
+# LOCATION → compteurs du processus (lectures servies par le niveau 1, le niveau 2, absentes)
+_statistiques = {}
+_lock = threading.Lock()
+
+
+def statistiques(location):
+    """Compteurs de lecture d'un cache à deux niveaux dans ce processus"""
+    with _lock:
+        return _statistiques.setdefault(location, Counter())
+
+
+class CacheDeuxNiveaux(BaseCache):
+    """
+    Cache local au processus (niveau 1) devant le cache partagé entre workers (niveau 2).
+
+    OPTIONS :
+      PARTAGE      alias du cache partagé (Redis en production)
+      L1_TTL       durée maximale, en secondes, d'une entrée dans le niveau 1
+      MAX_ENTRIES  taille du niveau 1
+
+    Les écritures vont aux deux niveaux, les absences ne sont jamais gardées en
+    niveau 1. Après une modification, les autres processus peuvent encore lire
+    l'ancienne valeur pendant L1_TTL secondes : à réserver aux valeurs qui
+    supportent ce décalage (devis immuables, métriques du dashboard).
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.location = location
+        self.alias_partage = options.get('PARTAGE', 'partage')
+        self.l1_ttl = options.get('L1_TTL', 5)
+        self.statistiques = statistiques(location)
+        # Même LOCATION → même stockage pour tous les threads du processus
+        self._l1 = LocMemCache(f'l1:{location}', {
+            'TIMEOUT': self.l1_ttl,
+            'OPTIONS': {'MAX_ENTRIES': self._max_entries, 'CULL_FREQUENCY': self._cull_frequency},
+        })
+
+    @property
+    def partage(self):
+        return caches[self.alias_partage]
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _ttl_l1(self, timeout):
+        return self.l1_ttl if timeout is None else min(timeout, self.l1_ttl)
+
+    # ===== LECTURES =====
+
+    def get(self, key, default=None, version=None):
+        cle = self.make_and_validate_key(key, version=version)
+        valeur = self._l1.get(cle, _ABSENT)
+        if valeur is not _ABSENT:
+            self.statistiques['l1'] += 1
+            return valeur
+        valeur = self.partage.get(cle, _ABSENT)
+        if valeur is _ABSENT:
+            self.statistiques['absents'] += 1
+            return default
+        self.statistiques['l2'] += 1
+        self._l1.set(cle, valeur, self.l1_ttl)
+        return valeur
+
+    def get_many(self, keys, version=None):
+        cles = {self.make_and_validate_key(key, version=version): key for key in keys}
+        trouvees = self._l1.get_many(cles)
+        self.statistiques['l1'] += len(trouvees)
+        manquantes = [cle for cle in cles if cle not in trouvees]
+        if manquantes:
+            partagees = self.partage.get_many(manquantes)
+            self.statistiques['l2'] += len(partagees)
+            self.statistiques['absents'] += len(manquantes) - len(partagees)
+            self._l1.set_many(partagees, self.l1_ttl)
+            trouvees.update(partagees)
+        return {cles[cle]: valeur for cle, valeur in trouvees.items()}
+
+    def has_key(self, key, version=None):
+        cle = self.make_and_validate_key(key, version=version)
+        return self._l1.has_key(cle) or self.partage.has_key(cle)
+
+    # ===== ÉCRITURES =====
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        cle = self.make_and_validate_key(key, version=version)
+        timeout = self._timeout(timeout)
+        self.partage.set(cle, value, timeout)
+        self._l1.set(cle, value, self._ttl_l1(timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        cle = self.make_and_validate_key(key, version=version)
+        timeout = self._timeout(timeout)
+        if not self.partage.add(cle, value, timeout):
+            self._l1.delete(cle)
+            return False
+        self._l1.set(cle, value, self._ttl_l1(timeout))
+        return True
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        cles = {self.make_and_validate_key(key, version=version): key for key in data}
+        valeurs = {cle: data[key] for cle, key in cles.items()}
+        timeout = self._timeout(timeout)
+        echecs = self.partage.set_many(valeurs, timeout)
+        self._l1.set_many({cle: valeur for cle, valeur in valeurs.items() if cle not in echecs},
+                          self._ttl_l1(timeout))
+        return [cles[cle] for cle in echecs]
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        cle = self.make_and_validate_key(key, version=version)
+        return self.partage.touch(cle, self._timeout(timeout))
+
+    def incr(self, key, delta=1, version=None):
+        # Compteur tenu par le cache partagé seulement (atomique avec Redis)
+        cle = self.make_and_validate_key(key, version=version)
+        self._l1.delete(cle)
+        return self.partage.incr(cle, delta)
+
+    def delete(self, key, version=None):
+        cle = self.make_and_validate_key(key, version=version)
+        self._l1.delete(cle)
+        return self.partage.delete(cle)
+
+    def delete_many(self, keys, version=None):
+        cles = [self.make_and_validate_key(key, version=version) for key in keys]
+        self._l1.delete_many(cles)
+        self.partage.delete_many(cles)
+
+    def clear(self):
+        """
+        Vider le niveau 1 de ce processus et, dans le cache partagé, les seules clés
+        de ce cache (son KEY_PREFIX) : les autres alias gardent les leurs.
+        """
+        self._l1.clear()
+        partage = self.partage
+        debut = partage.make_key(f'{self.key_prefix}:')
+        if isinstance(partage, RedisCache):
+            client = partage._cache.get_client(write=True)
+            lot = []
+            # SCAN par pages, pas de KEYS : Redis n'est pas bloqué sur une grande base
+            for cle in client.scan_iter(match=re.sub(r'([*?\[\]\\])', r'\\\1', debut) + '*', count=1000):
+                lot.append(cle)
+                if len(lot) >= 1000:
+                    client.delete(*lot)
+                    lot = []
+            if lot:
+                client.delete(*lot)
+        elif isinstance(partage, LocMemCache):
+            with partage._lock:
+                for cle in [cle for cle in partage._cache if cle.startswith(debut)]:
+                    partage._delete(cle)
+        else:
+            raise NotImplementedError(f"clear() par préfixe non disponible pour {type(partage).__name__}")
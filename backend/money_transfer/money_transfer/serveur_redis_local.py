@@ -0,0 +1,281 @@
+# money_transfer/serveur_redis_local.py
+import fnmatch
+import socketserver
+import threading
+import time
+
+
+class _Statut(str):
+    """Réponse RESP simple (+OK)"""
+
+
+class _Erreur(str):
+    """Réponse RESP d'erreur (-ERR ...)"""
+
+
+OK = _Statut('OK')
+
+
+class _ServeurTCP(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class ServeurRedisLocal:
+    """
+    Faux serveur Redis en mémoire (protocole RESP2), pour les tests et le développement.
+
+    Couvre les commandes du backend RedisCache de Django : GET, SET (EX, PX, NX, XX),
+    MGET, MSET, DEL, EXISTS, EXPIRE, PERSIST, TTL, INCRBY, SCAN (MATCH), FLUSHDB, et MULTI/EXEC
+    pour les pipelines ; SUBSCRIBE et PUBLISH pour le relais des notifications.
+    Une seule base ; `commandes` compte les commandes reçues.
+    """
+
+    def __init__(self, port=0):
+        self.donnees = {}           # clé → (valeur, time.monotonic() d'expiration ou None)
+        self.abonnes = {}           # canal → set des connexions abonnées
+        self.commandes = 0
+        self._lock = threading.Lock()
+        self._serveur = _ServeurTCP(('127.0.0.1', port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"redis://127.0.0.1:{self._serveur.server_address[1]}/0"
+
+    # ===== PROTOCOLE =====
+
+    def _handler(self):
+        serveur = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def setup(self):
+                super().setup()
+                self.verrou_ecriture = threading.Lock()
+
+            def envoyer(self, reponse):
+                # Aussi appelé par le thread d'un PUBLISH : une réponse à la fois
+                with self.verrou_ecriture:
+                    self.wfile.write(_encoder(reponse))
+
+            def handle(self):
+                try:
+                    self._boucle()
+                finally:
+                    serveur.desabonner(self)
+
+            def _boucle(self):
+                transaction = None
+                while True:
+                    commande = self._lire_commande()
+                    if commande is None:
+                        return
+                    if not commande:
+                        continue
+                    nom = commande[0].decode().upper()
+                    if nom == 'SUBSCRIBE':
+                        for canal in commande[1:]:
+                            self.envoyer([b'subscribe', canal, serveur.abonner(canal, self)])
+                        continue
+                    if nom == 'MULTI':
+                        transaction, reponse = [], OK
+                    elif nom == 'EXEC':
+                        reponse = [serveur.executer(nom, args) for nom, args in transaction or []]
+                        transaction = None
+                    elif nom == 'DISCARD':
+                        transaction, reponse = None, OK
+                    elif transaction is not None:
+                        transaction.append((nom, commande[1:]))
+                        reponse = _Statut('QUEUED')
+                    else:
+                        reponse = serveur.executer(nom, commande[1:])
+                    self.envoyer(reponse)
+
+            def _lire_commande(self):
+                ligne = self.rfile.readline()
+                if not ligne:
+                    return None
+                if not ligne.startswith(b'*'):
+                    return ligne.split()  # commande « inline » (redis-cli, telnet)
+                arguments = []
+                for _ in range(int(ligne[1:])):
+                    taille = int(self.rfile.readline()[1:])
+                    arguments.append(self.rfile.read(taille + 2)[:-2])
+                return arguments
+
+        return Handler
+
+    def executer(self, nom, arguments):
+        commande = getattr(self, f'_cmd_{nom.lower()}', None)
+        with self._lock:
+            self.commandes += 1
+            if commande is None:
+                return _Erreur(f"ERR unknown command '{nom}'")
+            try:
+                return commande(*arguments)
+            except (TypeError, ValueError):
+                return _Erreur(f"ERR syntax error or wrong number of arguments for '{nom}'")
+
+    # ===== PUB/SUB =====
+
+    def abonner(self, canal, connexion):
+        """Nombre de canaux de la connexion, comme la réponse de SUBSCRIBE"""
+        with self._lock:
+            self.abonnes.setdefault(canal, set()).add(connexion)
+            return sum(connexion in connexions for connexions in self.abonnes.values())
+
+    def desabonner(self, connexion):
+        with self._lock:
+            for connexions in self.abonnes.values():
+                connexions.discard(connexion)
+
+    def _cmd_publish(self, canal, message):
+        connexions = list(self.abonnes.get(canal, ()))
+        for connexion in connexions:
+            try:
+                connexion.envoyer([b'message', canal, message])
+            except OSError:
+                pass
+        return len(connexions)
+
+    # ===== DONNÉES =====
+
+    def _lire(self, cle):
+        entree = self.donnees.get(cle)
+        if entree is None:
+            return None
+        if entree[1] is not None and entree[1] <= time.monotonic():
+            del self.donnees[cle]
+            return None
+        return entree
+
+    def _expiration(self, secondes):
+        return time.monotonic() + secondes
+
+    # ===== COMMANDES =====
+
+    def _cmd_ping(self, *arguments):
+        return arguments[0] if arguments else _Statut('PONG')
+
+    def _cmd_client(self, *arguments):
+        return OK
+
+    def _cmd_select(self, base):
+        return OK
+
+    def _cmd_get(self, cle):
+        entree = self._lire(cle)
+        return entree[0] if entree else None
+
+    def _cmd_set(self, cle, valeur, *options):
+        options = [option.upper() for option in options]
+        expiration = None
+        if b'EX' in options:
+            expiration = self._expiration(int(options[options.index(b'EX') + 1]))
+        elif b'PX' in options:
+            expiration = self._expiration(int(options[options.index(b'PX') + 1]) / 1000)
+        existe = self._lire(cle) is not None
+        if (b'NX' in options and existe) or (b'XX' in options and not existe):
+            return None
+        self.donnees[cle] = (valeur, expiration)
+        return OK
+
+    def _cmd_mget(self, *cles):
+        return [self._cmd_get(cle) for cle in cles]
+
+    def _cmd_mset(self, *cles_valeurs):
+        if len(cles_valeurs) % 2:
+            raise ValueError
+        for cle, valeur in zip(cles_valeurs[::2], cles_valeurs[1::2]):
+            self.donnees[cle] = (valeur, None)
+        return OK
+
+    def _cmd_del(self, *cles):
+        return sum(self._lire(cle) is not None and self.donnees.pop(cle) is not None for cle in cles)
+
+    def _cmd_exists(self, *cles):
+        return sum(self._lire(cle) is not None for cle in cles)
+
+    def _cmd_expire(self, cle, secondes):
+        entree = self._lire(cle)
+        if entree is None:
+            return 0
+        if int(secondes) <= 0:
+            del self.donnees[cle]
+        else:
+            self.donnees[cle] = (entree[0], self._expiration(int(secondes)))
+        return 1
+
+    def _cmd_persist(self, cle):
+        entree = self._lire(cle)
+        if entree is None or entree[1] is None:
+            return 0
+        self.donnees[cle] = (entree[0], None)
+        return 1
+
+    def _cmd_ttl(self, cle):
+        entree = self._lire(cle)
+        if entree is None:
+            return -2
+        return -1 if entree[1] is None else max(0, round(entree[1] - time.monotonic()))
+
+    def _cmd_incrby(self, cle, delta):
+        entree = self._lire(cle)
+        valeur, expiration = entree if entree else (b'0', None)
+        try:
+            valeur = int(valeur) + int(delta)
+        except ValueError:
+            return _Erreur('ERR value is not an integer or out of range')
+        self.donnees[cle] = (str(valeur).encode(), expiration)
+        return valeur
+
+    def _cmd_incr(self, cle):
+        return self._cmd_incrby(cle, b'1')
+
+    def _cmd_scan(self, curseur, *options):
+        # Une seule page (curseur 0 en retour) ; seule l'option MATCH est interprétée
+        noms = [option.upper() for option in options]
+        motif = options[noms.index(b'MATCH') + 1] if b'MATCH' in noms else b'*'
+        cles = [cle for cle in list(self.donnees) if self._lire(cle) is not None and fnmatch.fnmatchcase(cle, motif)]
+        return [b'0', cles]
+
+    def _cmd_dbsize(self):
+        return len(self.donnees)
+
+    def _cmd_flushdb(self, *options):
+        self.donnees.clear()
+        return OK
+
+    _cmd_flushall = _cmd_flushdb
+
+    # ===== CYCLE DE VIE =====
+
+    def demarrer(self):
+        self._thread = threading.Thread(target=self._serveur.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def arreter(self):
+        self._serveur.shutdown()
+        self._serveur.server_close()
+
+    def __enter__(self):
+        return self.demarrer()
+
+    def __exit__(self, *exc):
+        self.arreter()
+
+
+def _encoder(reponse):
+    """Réponse Python → RESP2"""
+    if reponse is None:
+        return b'$-1\r\n'
+    if isinstance(reponse, _Erreur):
+        return f'-{reponse}\r\n'.encode()
+    if isinstance(reponse, _Statut):
+        return f'+{reponse}\r\n'.encode()
+    if isinstance(reponse, int):
+        return f':{reponse}\r\n'.encode()
+    if isinstance(reponse, list):
+        return f'*{len(reponse)}\r\n'.encode() + b''.join(_encoder(element) for element in reponse)
+    return b'$%d\r\n%s\r\n' % (len(reponse), reponse)
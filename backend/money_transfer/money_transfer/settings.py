@@ -105,6 +105,16 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # Écritures concurrentes (débits de solde agent) : verrou d'écriture pris
+            # dès BEGIN, les autres requêtes attendent au lieu d'échouer en "database is locked"
+            'OPTIONS': {
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
+            # Base de test sur fichier : la base mémoire partagée refuse les écritures concurrentes
+            'TEST': {
+                'NAME': BASE_DIR / 'test_db.sqlite3',
+            },
         }
     }
 
@@ -143,16 +153,166 @@ MEDIA_ROOT = BASE_DIR / 'media'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # ===== CONFIGURATION CACHE =====
+# Cache partagé par tous les workers : Redis si SHARED_CACHE_URL est défini
+# (redis://hôte:6379/0, paquet redis requis), sinon locmem propre à chaque processus.
+SHARED_CACHE_URL = config('SHARED_CACHE_URL', default='')
+# Durée maximale (s) d'une entrée dans le cache local d'un processus, devant le cache partagé
+SHARED_CACHE_L1_TTL = config('SHARED_CACHE_L1_TTL', default=5, cast=int)
+# Résumés du dashboard recalculés au plus une fois par période, tous workers confondus
+DASHBOARD_CACHE_TTL = config('DASHBOARD_CACHE_TTL', default=30, cast=int)
+
 CACHES = {
-    'default': {
+    'partage': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': SHARED_CACHE_URL,
+        'KEY_PREFIX': config('SHARED_CACHE_KEY_PREFIX', default='money_transfer'),
+        'TIMEOUT': 300,
+    } if SHARED_CACHE_URL else {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'partage',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        }
+    },
+    # Niveau 1 en mémoire (SHARED_CACHE_L1_TTL) devant le cache partagé
+    'default': {
+        'BACKEND': 'money_transfer.cache.CacheDeuxNiveaux',
+        'LOCATION': 'default',
+        'KEY_PREFIX': 'default',
         'TIMEOUT': 300,  # 5 minutes
         'OPTIONS': {
+            'PARTAGE': 'partage',
+            'L1_TTL': SHARED_CACHE_L1_TTL,
             'MAX_ENTRIES': 1000,
         }
+    },
+    # Compteurs journaliers des limites de retrait (un par agent et par bénéficiaire actifs).
+    # Avec SHARED_CACHE_URL, le Redis partagé : incr() y est atomique pour tous les workers.
+    # Sinon locmem, propre à chaque processus : TTL court pour borner l'écart entre processus.
+    'limites': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': SHARED_CACHE_URL,
+        'KEY_PREFIX': config('SHARED_CACHE_KEY_PREFIX', default='money_transfer') + ':limites',
+        # Les clés portent la date : deux jours suffisent
+        'TIMEOUT': config('WITHDRAWAL_LIMITS_CACHE_TTL', default=2 * 24 * 3600, cast=int),
+    } if SHARED_CACHE_URL else {
+        'BACKEND': config('WITHDRAWAL_LIMITS_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('WITHDRAWAL_LIMITS_CACHE_LOCATION', default='limites'),
+        'TIMEOUT': config('WITHDRAWAL_LIMITS_CACHE_TTL', default=60, cast=int),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        }
+    },
+    # Devis internationaux réutilisables (quote_id) : le cache partagé permet de retrouver
+    # le devis quel que soit le worker qui reçoit l'envoi ; un devis n'est jamais modifié.
+    'devis': {
+        'BACKEND': 'money_transfer.cache.CacheDeuxNiveaux',
+        'LOCATION': 'devis',
+        'KEY_PREFIX': 'devis',
+        'TIMEOUT': config('INTERNATIONAL_QUOTE_TTL', default=300, cast=int),
+        'OPTIONS': {
+            'PARTAGE': 'partage',
+            'L1_TTL': SHARED_CACHE_L1_TTL,
+            'MAX_ENTRIES': 10000,
+        }
     }
 }
 
+# ===== CONFIGURATION TRAITEMENT DES PAIEMENTS (DEV 2) =====
+# 'sync'  : l'appel gateway est fait dans la requête (comportement historique)
+# 'async' : la transaction est créée EN_ATTENTE, le gateway est appelé par un pool de workers
+PAYMENT_DISPATCH_MODE = config('PAYMENT_DISPATCH_MODE', default='sync')
+PAYMENT_DISPATCH_MAX_WORKERS = config('PAYMENT_DISPATCH_MAX_WORKERS', default=16, cast=int)
+PAYMENT_DISPATCH_MAX_PENDING = config('PAYMENT_DISPATCH_MAX_PENDING', default=256, cast=int)
+# Facteur appliqué aux temps de réponse des simulateurs (1.0 = réaliste, 0 = instantané)
+PAYMENT_SIMULATOR_LATENCY_FACTOR = config('PAYMENT_SIMULATOR_LATENCY_FACTOR', default=1.0, cast=float)
+# Nombre d'idTransaction réservés à la fois par processus (hors PostgreSQL, qui utilise une séquence)
+TRANSACTION_ID_BLOCK_SIZE = config('TRANSACTION_ID_BLOCK_SIZE', default=100, cast=int)
+# Réconciliation des paiements EN_ATTENTE / ACCEPTE (commande reconcile_payments)
+PAYMENT_RECONCILIATION_CHUNK_SIZE = config('PAYMENT_RECONCILIATION_CHUNK_SIZE', default=1000, cast=int)
+PAYMENT_RECONCILIATION_CONCURRENCY = config('PAYMENT_RECONCILIATION_CONCURRENCY', default=100, cast=int)
+PAYMENT_RECONCILIATION_MIN_AGE_MINUTES = config('PAYMENT_RECONCILIATION_MIN_AGE_MINUTES', default=5, cast=int)
+
+# ===== NOTIFICATIONS AUTOMATIQUES =====
+# Intentions publiées au commit puis insérées par lots ('sync' : insérées au commit par
+# l'appelant ; 'async' : worker du processus, file en mémoire perdue si le processus meurt)
+NOTIFICATION_OUTBOX_MODE = config('NOTIFICATION_OUTBOX_MODE', default='sync')
+NOTIFICATION_OUTBOX_BATCH_SIZE = config('NOTIFICATION_OUTBOX_BATCH_SIZE', default=500, cast=int)
+# Attente maximale (s) du worker pour compléter un lot
+NOTIFICATION_OUTBOX_MAX_WAIT = config('NOTIFICATION_OUTBOX_MAX_WAIT', default=0.05, cast=float)
+# Au-delà, les intentions sont insérées par l'appelant
+NOTIFICATION_OUTBOX_MAX_PENDING = config('NOTIFICATION_OUTBOX_MAX_PENDING', default=10000, cast=int)
+
+# ===== CANAUX DE NOTIFICATION (SMS, PUSH) =====
+# Un canal sans URL est désactivé ; chaque canal a son pool de workers et envoie par lots
+NOTIFICATION_SMS_URL = config('NOTIFICATION_SMS_URL', default='')
+NOTIFICATION_SMS_BATCH_SIZE = config('NOTIFICATION_SMS_BATCH_SIZE', default=100, cast=int)
+NOTIFICATION_SMS_WORKERS = config('NOTIFICATION_SMS_WORKERS', default=4, cast=int)
+NOTIFICATION_PUSH_URL = config('NOTIFICATION_PUSH_URL', default='')
+NOTIFICATION_PUSH_BATCH_SIZE = config('NOTIFICATION_PUSH_BATCH_SIZE', default=500, cast=int)
+NOTIFICATION_PUSH_WORKERS = config('NOTIFICATION_PUSH_WORKERS', default=2, cast=int)
+# Attente maximale (s) d'un worker pour compléter un lot, messages en file par canal
+NOTIFICATION_CHANNEL_MAX_WAIT = config('NOTIFICATION_CHANNEL_MAX_WAIT', default=0.05, cast=float)
+NOTIFICATION_CHANNEL_MAX_PENDING = config('NOTIFICATION_CHANNEL_MAX_PENDING', default=10000, cast=int)
+# Essais par message, délai (s) avant le premier réessai (doublé à chaque échec), timeout des appels
+NOTIFICATION_CHANNEL_MAX_RETRIES = config('NOTIFICATION_CHANNEL_MAX_RETRIES', default=5, cast=int)
+NOTIFICATION_CHANNEL_RETRY_DELAY = config('NOTIFICATION_CHANNEL_RETRY_DELAY', default=1.0, cast=float)
+NOTIFICATION_CHANNEL_TIMEOUT = config('NOTIFICATION_CHANNEL_TIMEOUT', default=10, cast=int)
+# Canaux réseau par type de notification (en plus de la base de données)
+NOTIFICATION_ROUTES = {
+    'INFO': config('NOTIFICATION_ROUTES_INFO', default='push', cast=Csv()),
+    'TRANSACTION': config('NOTIFICATION_ROUTES_TRANSACTION', default='sms,push', cast=Csv()),
+    'ALERT': config('NOTIFICATION_ROUTES_ALERT', default='sms,push', cast=Csv()),
+}
+
+# ===== FLUX TEMPS RÉEL (SSE, /api/notifications/stream/) =====
+# Battement de cœur (s) pour les proxys, trames en file par connexion avant de la fermer,
+# notifications rattrapées à la reconnexion (Last-Event-ID), délai de reconnexion du client (ms)
+NOTIFICATION_STREAM_HEARTBEAT = config('NOTIFICATION_STREAM_HEARTBEAT', default=25, cast=int)
+NOTIFICATION_STREAM_MAX_PENDING = config('NOTIFICATION_STREAM_MAX_PENDING', default=100, cast=int)
+NOTIFICATION_STREAM_REPLAY_LIMIT = config('NOTIFICATION_STREAM_REPLAY_LIMIT', default=100, cast=int)
+NOTIFICATION_STREAM_RETRY_MS = config('NOTIFICATION_STREAM_RETRY_MS', default=3000, cast=int)
+# Relais entre workers (Redis pub/sub) : chaque processus reçoit les événements publiés par
+# tous les autres. Par défaut le Redis partagé ; vide = diffusion limitée au processus (un seul worker)
+NOTIFICATION_STREAM_RELAY_URL = config('NOTIFICATION_STREAM_RELAY_URL', default=SHARED_CACHE_URL)
+NOTIFICATION_STREAM_RELAY_CHANNEL = config('NOTIFICATION_STREAM_RELAY_CHANNEL', default='notifications:flux')
+
+# ===== RÉTENTION DES NOTIFICATIONS (commande archiver_notifications) =====
+# Les notifications lues de plus de N jours sont archivées en JSONL compressé puis
+# supprimées par chunks (une transaction courte par chunk)
+NOTIFICATION_RETENTION_DAYS = config('NOTIFICATION_RETENTION_DAYS', default=90, cast=int)
+NOTIFICATION_ARCHIVE_DIR = config('NOTIFICATION_ARCHIVE_DIR', default=str(BASE_DIR / 'archives' / 'notifications'))
+NOTIFICATION_ARCHIVE_CHUNK_SIZE = config('NOTIFICATION_ARCHIVE_CHUNK_SIZE', default=5000, cast=int)
+
+# ===== TAUX DE CHANGE =====
+# API au format exchangerate-api v4 ({url}/{BASE} → toute la table de la base)
+EXCHANGE_RATES_API_URL = config('EXCHANGE_RATES_API_URL', default='https://api.exchangerate-api.com/v4/latest')
+# Bases dont la table est récupérée ; les autres paires sont croisées localement
+EXCHANGE_RATES_BASE_CURRENCIES = config('EXCHANGE_RATES_BASE_CURRENCIES', default='XOF', cast=Csv())
+# Fraîcheur (s) d'une table ; rafraîchie en arrière-plan passé TTL × REFRESH_AHEAD
+EXCHANGE_RATES_TTL = config('EXCHANGE_RATES_TTL', default=300, cast=int)
+EXCHANGE_RATES_REFRESH_AHEAD = config('EXCHANGE_RATES_REFRESH_AHEAD', default=0.8, cast=float)
+# Au-delà, une table périmée n'est plus servie (repli sur TauxChange)
+EXCHANGE_RATES_STALE_TTL = config('EXCHANGE_RATES_STALE_TTL', default=3600, cast=int)
+# Délai (s) avant de retenter l'API après un échec, et timeout des appels
+EXCHANGE_RATES_RETRY_DELAY = config('EXCHANGE_RATES_RETRY_DELAY', default=30, cast=int)
+EXCHANGE_RATES_TIMEOUT = config('EXCHANGE_RATES_TIMEOUT', default=10, cast=int)
+
+# ===== MOTEUR DE DEVIS =====
+# Durée (s) avant rechargement des tables de frais (modifications des autres processus)
+FEE_TABLES_TTL = config('FEE_TABLES_TTL', default=300, cast=int)
+# Seul pays d'origine des envois internationaux (code ISO)
+INTERNATIONAL_ORIGIN_COUNTRY = config('INTERNATIONAL_ORIGIN_COUNTRY', default='SEN')
+
+# ===== RECHERCHE D'AGENTS (DEV 3) =====
+# Durée (s) avant reconstruction de l'index mémoire des agents (modifications des autres processus)
+AGENTS_INDEX_TTL = config('AGENTS_INDEX_TTL', default=300, cast=int)
+
+# ===== LIMITES DE RETRAIT (DEV 3) =====
+# Total (XOF) qu'un bénéficiaire peut demander par jour, tous agents confondus
+WITHDRAWAL_DAILY_LIMIT_PER_USER = config('WITHDRAWAL_DAILY_LIMIT_PER_USER', default=2000000, cast=int)
+
 # ===== CONFIGURATION CORS - FUSIONNÉE =====
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",          # React/Vue frontend (Dev 2)
@@ -0,0 +1,174 @@
+# notifications/asgi.py
+import asyncio
+import json
+import re
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from corsheaders.conf import conf as cors
+from django.conf import settings
+from django.db import close_old_connections
+
+from .services.temps_reel import donnees_notification, evenement_sse, get_hub
+
+CHEMIN_FLUX = '/api/notifications/stream/'
+
+
+def _en_arriere_plan(fonction):
+    """
+    Appel ORM depuis la boucle, sur l'executor partagé de la boucle.
+
+    Pas de thread par connexion (thread_sensitive=True en créerait un par requête
+    ouverte) ; connexion base rendue après chaque appel comme dans les workers.
+    """
+    def appel(*args):
+        close_old_connections()
+        try:
+            return fonction(*args)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(appel, thread_sensitive=False)
+
+
+def _utilisateur(jeton):
+    from rest_framework.exceptions import AuthenticationFailed
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import InvalidToken
+
+    authentification = JWTAuthentication()
+    try:
+        user = authentification.get_user(authentification.get_validated_token(jeton))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    return user if user.is_active else None
+
+
+def _rattrapage(user_id, dernier_id):
+    """Notifications créées après Last-Event-ID (reconnexion), déjà encodées en trames SSE"""
+    from .models import Notification
+
+    try:
+        dernier_id = int(dernier_id)
+    except (TypeError, ValueError):
+        return []
+    notifications = Notification.objects.filter(user_id=user_id, id__gt=dernier_id).order_by('id')
+    return [
+        evenement_sse('notification', donnees_notification(n), n.pk)
+        for n in notifications[:settings.NOTIFICATION_STREAM_REPLAY_LIMIT]
+    ]
+
+
+def _entetes_cors(origine, chemin, preflight=False):
+    """
+    En-têtes CORS de corsheaders.middleware.CorsMiddleware, qui ne voit pas le flux
+    (servi avant Django) : mêmes réglages CORS_*, vide si l'origine n'est pas admise.
+    """
+    if not origine or not re.match(cors.CORS_URLS_REGEX, chemin):
+        return []
+    if not (cors.CORS_ALLOW_ALL_ORIGINS or origine in cors.CORS_ALLOWED_ORIGINS
+            or any(re.match(motif, origine) for motif in cors.CORS_ALLOWED_ORIGIN_REGEXES)):
+        return []
+
+    autorisee = '*' if cors.CORS_ALLOW_ALL_ORIGINS and not cors.CORS_ALLOW_CREDENTIALS else origine
+    entetes = [('access-control-allow-origin', autorisee), ('vary', 'origin')]
+    if cors.CORS_ALLOW_CREDENTIALS:
+        entetes.append(('access-control-allow-credentials', 'true'))
+    if cors.CORS_EXPOSE_HEADERS:
+        entetes.append(('access-control-expose-headers', ', '.join(cors.CORS_EXPOSE_HEADERS)))
+    if preflight:
+        entetes.append(('access-control-allow-headers', ', '.join(cors.CORS_ALLOW_HEADERS)))
+        entetes.append(('access-control-allow-methods', ', '.join(cors.CORS_ALLOW_METHODS)))
+        if cors.CORS_PREFLIGHT_MAX_AGE:
+            entetes.append(('access-control-max-age', str(cors.CORS_PREFLIGHT_MAX_AGE)))
+    return [(nom.encode('latin1'), valeur.encode('latin1')) for nom, valeur in entetes]
+
+
+class FluxNotifications:
+    """
+    Application ASGI placée devant Django : sert le flux Server-Sent Events
+    CHEMIN_FLUX et passe tout le reste à `application`.
+
+    Le flux pousse à l'utilisateur ses notifications et les changements de
+    statut de ses transactions dès le commit (remplace le polling de la liste
+    et de transaction_status_check). Une connexion ouverte n'est qu'une
+    coroutine et un Abonnement du hub : ni middlewares, ni thread. Le
+    handler Django garderait un thread par requête en cours pour ses
+    middlewares synchrones, soit un thread par client connecté.
+
+    Authentification par JWT : `Authorization: Bearer <jwt>` ou `?token=<jwt>`
+    (EventSource ne permet pas d'en-têtes). À la reconnexion, Last-Event-ID
+    (ou `?last_event_id=`) renvoie les notifications manquées. Les en-têtes
+    CORS (réglages corsheaders) sont posés ici, y compris sur les refus.
+    """
+
+    def __init__(self, application, chemin=CHEMIN_FLUX):
+        self.application = application
+        self.chemin = chemin
+        self.utilisateur = _en_arriere_plan(_utilisateur)
+        self.rattrapage = _en_arriere_plan(_rattrapage)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] != self.chemin:
+            return await self.application(scope, receive, send)
+
+        entetes = {nom.decode('latin1').lower(): valeur.decode('latin1') for nom, valeur in scope['headers']}
+        if scope['method'] == 'OPTIONS' and 'access-control-request-method' in entetes:
+            # Preflight (client SSE par fetch avec Authorization)
+            return await self._repondre(send, 200, None, _entetes_cors(entetes.get('origin'), self.chemin, True))
+        cors_reponse = _entetes_cors(entetes.get('origin'), self.chemin)
+        if scope['method'] != 'GET':
+            return await self._repondre(send, 405, {'detail': 'Méthode non autorisée.'}, cors_reponse)
+        parametres = {cle: valeurs[0] for cle, valeurs in parse_qs(scope['query_string'].decode()).items()}
+        autorisation = entetes.get('authorization', '')
+        jeton = parametres.get('token') or (autorisation[7:] if autorisation.startswith('Bearer ') else None)
+        user = await self.utilisateur(jeton) if jeton else None
+        if user is None:
+            return await self._repondre(send, 401, {'detail': 'Authentification requise.'}, cors_reponse)
+
+        hub = get_hub()
+        # Abonné avant le rattrapage : rien ne se perd entre les deux (doublons possibles, même id)
+        abonnement = hub.abonner(user.pk)
+        deconnexion = None
+        try:
+            dernier_id = entetes.get('last-event-id') or parametres.get('last_event_id')
+            rattrapage = await self.rattrapage(user.pk, dernier_id) if dernier_id else []
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+                *cors_reponse,
+            ]})
+            deconnexion = asyncio.ensure_future(self._attendre_deconnexion(receive, abonnement))
+            await self._ecrire(send, f"retry: {settings.NOTIFICATION_STREAM_RETRY_MS}\n\n".encode())
+            for trame in rattrapage:
+                await self._ecrire(send, trame)
+            while (trame := await abonnement.suivant()) is not None:
+                await self._ecrire(send, trame)
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        except OSError:
+            # Écriture vers un client déjà parti
+            pass
+        finally:
+            hub.desabonner(abonnement)
+            if deconnexion is not None:
+                deconnexion.cancel()
+
+    @staticmethod
+    async def _attendre_deconnexion(receive, abonnement):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        abonnement.fermer()
+
+    @staticmethod
+    async def _ecrire(send, trame):
+        await send({'type': 'http.response.body', 'body': trame, 'more_body': True})
+
+    @staticmethod
+    async def _repondre(send, statut, donnees, cors_reponse=()):
+        corps = json.dumps(donnees, ensure_ascii=False).encode() if donnees is not None else b''
+        await send({'type': 'http.response.start', 'status': statut, 'headers': [
+            (b'content-type', b'application/json'), (b'content-length', str(len(corps)).encode()),
+            *cors_reponse,
+        ]})
+        await send({'type': 'http.response.body', 'body': corps})
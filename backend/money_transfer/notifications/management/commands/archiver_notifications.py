@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from notifications.services import retention
+
+
+def taille(octets):
+    return 'inconnue' if octets is None else f'{octets / 1024 / 1024:.1f} Mo'
+
+
+class Command(BaseCommand):
+    help = 'Archiver en JSONL compressé puis supprimer les notifications lues de plus de N jours'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jours', type=int, default=settings.NOTIFICATION_RETENTION_DAYS,
+                            help=f'Rétention en jours (défaut: {settings.NOTIFICATION_RETENTION_DAYS})')
+        parser.add_argument('--dossier', default=settings.NOTIFICATION_ARCHIVE_DIR)
+        parser.add_argument('--chunk-size', type=int, default=settings.NOTIFICATION_ARCHIVE_CHUNK_SIZE)
+        parser.add_argument('--pause', type=float, default=0.0, help='Pause (s) entre deux chunks')
+        parser.add_argument('--sans-suppression', action='store_true',
+                            help='Écrire l\'archive sans supprimer les notifications')
+
+    def handle(self, *args, **options):
+        avant = timezone.now() - timedelta(days=options['jours'])
+        self.stdout.write(f"🗄️ Archivage des notifications lues créées avant {avant:%Y-%m-%d %H:%M}...")
+        rapport = retention.archiver(
+            avant, options['dossier'], options['chunk_size'], options['pause'],
+            supprimer=not options['sans_suppression'],
+        )
+
+        self.stdout.write(f"  Archivées        : {rapport.archivees} en {rapport.duree:.1f}s ({rapport.debit:,.0f}/s)")
+        self.stdout.write(f"  Supprimées       : {rapport.supprimees}")
+        if rapport.fichier:
+            self.stdout.write(f"  Archive          : {rapport.fichier} ({rapport.octets / 1024:,.0f} Ko)")
+        self.stdout.write(f"  Taille de table  : {taille(rapport.taille_avant)} → {taille(rapport.taille_apres)}")
+        self.stdout.write(self.style.SUCCESS('✅ Archivage terminé'))
@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.services.dispatcher import CanalPush, CanalSMS, Message, PoolCanal
+from notifications.services.serveurs_locaux import ServeurPushLocal, ServeurSMSLocal
+
+
+class Command(BaseCommand):
+    help = 'Mesurer le débit des canaux SMS et push : un appel par notification, puis pools par lots'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--notifications', type=int, default=2000)
+        parser.add_argument('--latence', type=float, default=0.05, help='Secondes par requête fournisseur')
+        parser.add_argument('--pannes', type=int, default=3, help='Requêtes en échec (503) au début du run par lots')
+
+    def handle(self, *args, **options):
+        nombre = options['notifications']
+        messages = [
+            Message(i, i + 1, '💰 Argent reçu', f'Vous avez reçu {i} XOF.', 'TRANSACTION', f'+22177{i:07d}')
+            for i in range(nombre)
+        ]
+        self.stdout.write(f'📡 Benchmark canaux : {nombre} notifications, {options["latence"] * 1000:.0f} ms '
+                          f'par requête fournisseur')
+
+        with ServeurSMSLocal(latence=options['latence']) as sms, ServeurPushLocal(latence=options['latence']) as push:
+            # Avant : un appel bloquant par notification et par canal (send() synchrone)
+            canaux = (CanalSMS(sms.url), CanalPush(push.url))
+            echantillon = messages[:min(nombre, 200)]
+            debut = time.perf_counter()
+            for message in echantillon:
+                for canal in canaux:
+                    canal.envoyer_lot([message])
+            unitaire = len(echantillon) / (time.perf_counter() - debut)
+
+            # Après : pools par canal, lots de la taille du fournisseur, réessais
+            sms.pannes_a_venir = push.pannes_a_venir = options['pannes']
+            pools = {
+                'sms': PoolCanal(CanalSMS(sms.url), taille_lot=100, workers=4, delai=0.1),
+                'push': PoolCanal(CanalPush(push.url), taille_lot=500, workers=2, delai=0.1),
+            }
+            debut = time.perf_counter()
+            for pool in pools.values():
+                pool.soumettre(messages)
+            soumission = time.perf_counter() - debut
+            for pool in pools.values():
+                pool.vider(timeout=120)
+            duree = time.perf_counter() - debut
+
+        # ===== RÉSUMÉ =====
+        self.stdout.write('')
+        self.stdout.write(f"  Un appel par notification : {unitaire:,.0f} notifications/s (SMS + push)")
+        self.stdout.write(f"  Pools par canal           : {nombre / duree:,.0f} notifications/s, "
+                          f"soumission {soumission * 1000:.1f} ms pour l'appelant")
+        self.stdout.write('')
+        self.stdout.write(f"  {'canal':<8}{'envoyés':>9}{'lots':>7}{'réessais':>10}{'échecs':>8}"
+                          f"{'débit/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+        for nom, pool in pools.items():
+            m = pool.metriques.instantane()
+            self.stdout.write(
+                f"  {nom:<8}{m['envoyes']:>9}{m['lots']:>7}{m['reessais']:>10}{m['echecs']:>8}"
+                f"{m['debit_par_seconde']:>10,.0f}{m['latence_ms']['p50']:>8.0f}ms"
+                f"{m['latence_ms']['p95']:>8.0f}ms{m['latence_ms']['p99']:>8.0f}ms"
+            )
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark terminé'))
@@ -0,0 +1,125 @@
+import asyncio
+import gc
+import threading
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.tokens import AccessToken
+
+from money_transfer.asgi import application
+from notifications.services.serveurs_locaux import ConnexionSSE
+from notifications.services.temps_reel import get_hub
+
+User = get_user_model()
+
+PREFIXE_TELEPHONE = '+22179'
+CHEMIN = '/api/notifications/stream/'
+
+
+def rss_ko():
+    """Mémoire résidente du processus (Linux), None ailleurs"""
+    try:
+        with open('/proc/self/status') as status:
+            for ligne in status:
+                if ligne.startswith('VmRSS:'):
+                    return int(ligne.split()[1])
+    except OSError:
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Ouvrir N connexions SSE inactives dans ce processus : mémoire par connexion et temps de diffusion'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connexions', type=int, default=10000)
+        parser.add_argument('--utilisateurs', type=int, default=1000)
+        parser.add_argument('--lot', type=int, default=500, help='Connexions ouvertes simultanément')
+        parser.add_argument('--tracemalloc', action='store_true',
+                            help='Mesurer aussi la mémoire Python (lent ; fausse la mesure RSS)')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"📡 Benchmark flux SSE : {options['connexions']} connexions, "
+                          f"{options['utilisateurs']} utilisateurs")
+        users = self._preparer(options['utilisateurs'])
+        try:
+            asyncio.run(self._mesurer(users, options['connexions'], options['lot'], options['tracemalloc']))
+        finally:
+            self._nettoyer()
+
+    async def _mesurer(self, users, nombre, lot, avec_tracemalloc):
+        hub = get_hub()
+        jetons = [f'token={AccessToken.for_user(user)}' for user in users]
+
+        # Première connexion hors mesure : imports, cache d'URL, thread des vues synchrones
+        premiere = await ConnexionSSE(application, CHEMIN, jetons[0]).ouvrir()
+        await premiere.fermer()
+
+        gc.collect()
+        if avec_tracemalloc:
+            tracemalloc.start()
+        rss_avant = rss_ko()
+        memoire_avant = tracemalloc.get_traced_memory()[0]
+        debut = time.perf_counter()
+        connexions = []
+        for debut_lot in range(0, nombre, lot):
+            ouvertes = [
+                ConnexionSSE(application, CHEMIN, jetons[i % len(jetons)])
+                for i in range(debut_lot, min(debut_lot + lot, nombre))
+            ]
+            await asyncio.gather(*(connexion.ouvrir(timeout=60) for connexion in ouvertes))
+            connexions.extend(ouvertes)
+        ouverture = time.perf_counter() - debut
+        await asyncio.sleep(0.5)
+        gc.collect()
+        memoire = tracemalloc.get_traced_memory()[0] - memoire_avant
+        rss_apres = rss_ko()
+        if avec_tracemalloc:
+            tracemalloc.stop()
+        statuts = {connexion.statut for connexion in connexions}
+
+        # Diffusion depuis un thread, comme un signal au commit : un événement par utilisateur
+        debut = time.perf_counter()
+        publication = threading.Thread(target=lambda: [
+            hub.publier([user.pk], 'notification', {'title': 'Benchmark'}, user.pk) for user in users
+        ])
+        publication.start()
+        await asyncio.gather(*(connexion.lire('Benchmark', timeout=60) for connexion in connexions))
+        diffusion = time.perf_counter() - debut
+        publication.join()
+
+        debut = time.perf_counter()
+        await asyncio.gather(*(connexion.fermer(timeout=60) for connexion in connexions))
+        fermeture = time.perf_counter() - debut
+
+        # ===== RÉSUMÉ =====
+        self.stdout.write('')
+        self.stdout.write(f"  Connexions ouvertes      : {len(connexions)} (statuts {sorted(statuts)}) "
+                          f"en {ouverture:.1f}s ({len(connexions) / ouverture:,.0f}/s)")
+        if avec_tracemalloc:
+            self.stdout.write(f"  Mémoire Python           : {memoire / len(connexions) / 1024:.2f} Ko par connexion "
+                              f"(tracemalloc, client simulé compris)")
+        if rss_avant and rss_apres:
+            self.stdout.write(f"  Mémoire résidente (RSS)  : {(rss_apres - rss_avant) / len(connexions):.2f} Ko "
+                              f"par connexion ({rss_avant / 1024:.0f} → {rss_apres / 1024:.0f} Mo)")
+        self.stdout.write(f"  Diffusion                : {len(users)} événements, {len(connexions)} trames remises "
+                          f"en {diffusion * 1000:.0f} ms")
+        self.stdout.write(f"  Fermeture                : {fermeture * 1000:.0f} ms, "
+                          f"{hub.connexions} connexion(s) restante(s) dans le hub")
+        self.stdout.write(f"  Polling équivalent       : {len(connexions) * 6:,} requêtes/min à 10 s d'intervalle")
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark terminé'))
+
+    def _preparer(self, nombre):
+        self._nettoyer()
+        mot_de_passe = make_password(None)
+        User.objects.bulk_create([
+            User(phone_number=f'{PREFIXE_TELEPHONE}{i:07d}', email=f'bench-flux-{i}@example.com',
+                 first_name='Bench', last_name=f'Flux {i}', password=mot_de_passe)
+            for i in range(nombre)
+        ], batch_size=1000)
+        return list(User.objects.filter(phone_number__startswith=PREFIXE_TELEPHONE).order_by('pk'))
+
+    def _nettoyer(self):
+        User.objects.filter(phone_number__startswith=PREFIXE_TELEPHONE).delete()
@@ -0,0 +1,135 @@
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test.utils import override_settings
+
+from notifications.models import Notification
+from notifications.services.outbox import get_outbox
+from notifications.views import DatabaseNotificationChannel
+from transactions.models import CanalPaiement, StatutTransaction, Transaction
+from transactions.signals import send_transaction_notifications
+
+User = get_user_model()
+
+BENCH_EXPEDITEUR = '+221700000899'
+BENCH_DESTINATAIRE = '+221700000898'
+
+MESSAGES = {
+    None: ("💸 Transaction initiée", "💰 Argent reçu"),
+    StatutTransaction.ENVOYE: ("✅ Transaction envoyée", "💰 Retrait disponible"),
+    StatutTransaction.TERMINE: ("🎉 Transaction terminée", "✅ Retrait confirmé"),
+    StatutTransaction.ANNULE: ("❌ Transaction annulée", "ℹ️ Transaction annulée"),
+}
+
+
+def notifications_synchrones(sender, instance, created, **kwargs):
+    """Ancien signal : un INSERT par destinataire, expéditeur et canal relus dans la sauvegarde"""
+    statut = None if created else instance.statusTransaction
+    if statut not in MESSAGES:
+        return
+    titre_expediteur, titre_destinataire = MESSAGES[statut]
+    canal = DatabaseNotificationChannel()
+    details = instance.canal_paiement.canal_name if statut == StatutTransaction.ENVOYE else ''
+    canal.send(user=instance.expediteur, title=titre_expediteur,
+               message=f"Transaction {instance.codeTransaction} {details}", notification_type='TRANSACTION')
+    if instance.destinataire:
+        canal.send(user=instance.destinataire, title=titre_destinataire,
+                   message=f"De {instance.expediteur.get_full_name()} : {instance.codeTransaction}",
+                   notification_type='TRANSACTION')
+
+
+class Command(BaseCommand):
+    help = 'Mesurer latence et requêtes par envoi : notifications synchrones puis outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--envois', type=int, default=300)
+
+    def handle(self, *args, **options):
+        self.stdout.write('📨 Benchmark notifications des transactions...')
+        expediteur, destinataire, canal = self._preparer()
+        try:
+            # Outbox d'abord : le signal d'origine garde sa place parmi les receveurs
+            with override_settings(NOTIFICATION_OUTBOX_MODE='async'):
+                outbox = get_outbox()
+                lots = outbox.lots
+                apres = self._mesurer(expediteur, destinataire, canal, options['envois'])
+                debut = time.perf_counter()
+                outbox.vider()
+                vidage = time.perf_counter() - debut
+                lots = outbox.lots - lots
+
+            post_save.disconnect(send_transaction_notifications, sender=Transaction)
+            post_save.connect(notifications_synchrones, sender=Transaction)
+            try:
+                avant = self._mesurer(expediteur, destinataire, canal, options['envois'])
+            finally:
+                post_save.disconnect(notifications_synchrones, sender=Transaction)
+                post_save.connect(send_transaction_notifications, sender=Transaction)
+
+            # ===== RÉSUMÉ =====
+            self.stdout.write('')
+            self.stdout.write(f"  {'':<12}{'moyenne':>10}{'p50':>10}{'p95':>10}{'requêtes/envoi':>16}"
+                              f"{'dont notifications':>20}")
+            for nom, (durees, requetes) in (('synchrone', avant), ('outbox', apres)):
+                quantiles = statistics.quantiles(durees, n=20)
+                self.stdout.write(
+                    f"  {nom:<12}{statistics.mean(durees) * 1000:>8.2f}ms{quantiles[9] * 1000:>8.2f}ms"
+                    f"{quantiles[18] * 1000:>8.2f}ms{requetes['total'] / len(durees):>16.1f}"
+                    f"{requetes['notifications'] / len(durees):>20.1f}"
+                )
+            get_outbox().vider()
+            notifications = Notification.objects.filter(user__in=[expediteur, destinataire]).count()
+            self.stdout.write(f"  Outbox : {lots} lots insérés par le worker, vidée en {vidage * 1000:.0f} ms "
+                              f"après la dernière sauvegarde ({notifications} notifications au total)")
+            self.stdout.write(self.style.SUCCESS('✅ Benchmark terminé'))
+        finally:
+            self._nettoyer(expediteur, destinataire, canal)
+
+    def _mesurer(self, expediteur, destinataire, canal, envois):
+        """Un envoi : création EN_ATTENTE, passage à ENVOYE, puis TERMINE sur une instance rechargée"""
+        requetes = {'total': 0, 'notifications': 0}
+
+        def compter(execute, sql, params, many, context):
+            requetes['total'] += 1
+            requetes['notifications'] += 'notifications_notification' in sql or 'authentication_user' in sql
+            return execute(sql, params, many, context)
+
+        durees = []
+        with connection.execute_wrapper(compter):
+            for _ in range(envois):
+                debut = time.perf_counter()
+                transaction = Transaction.objects.create(
+                    expediteur=expediteur, destinataire=destinataire, destinataire_phone=destinataire.phone_number,
+                    canal_paiement=canal, montantEnvoye=10000, montantConverti=9900, montantRecu=9900,
+                )
+                transaction.statusTransaction = StatutTransaction.ENVOYE
+                transaction.save()
+                transaction = Transaction.objects.get(pk=transaction.pk)
+                transaction.statusTransaction = StatutTransaction.TERMINE
+                transaction.save()
+                durees.append(time.perf_counter() - debut)
+        return durees, requetes
+
+    def _preparer(self):
+        self._nettoyer_existants()
+        expediteur = User.objects.create_user(phone_number=BENCH_EXPEDITEUR, email='bench-notif-1@example.com',
+                                              first_name='Bench', last_name='Expediteur', password='x')
+        destinataire = User.objects.create_user(phone_number=BENCH_DESTINATAIRE, email='bench-notif-2@example.com',
+                                                first_name='Bench', last_name='Destinataire', password='x')
+        canal = CanalPaiement.objects.create(canal_name='Wave Benchmark notifications', type_canal='WAVE',
+                                             country='Sénégal', fees_percentage=Decimal('1.00'))
+        return expediteur, destinataire, canal
+
+    def _nettoyer(self, expediteur, destinataire, canal):
+        get_outbox().vider(timeout=10)
+        Transaction.objects.filter(canal_paiement=canal).delete()
+        canal.delete()
+        self._nettoyer_existants()
+
+    def _nettoyer_existants(self):
+        User.objects.filter(phone_number__in=[BENCH_EXPEDITEUR, BENCH_DESTINATAIRE]).delete()
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from notifications.models import NotificationInbox
+from notifications.services.boite import recalculer_non_lues
+
+
+class Command(BaseCommand):
+    help = 'Recompter les notifications non lues des boîtes existantes (réparation des compteurs incrémentaux)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.stdout.write('🔧 Réparation des compteurs de notifications non lues...')
+        avant = dict(NotificationInbox.objects.values_list('user_id', 'unread_count'))
+        user_ids = sorted(avant)
+        corriges = 0
+        for debut in range(0, len(user_ids), options['chunk_size']):
+            comptes = recalculer_non_lues(user_ids[debut:debut + options['chunk_size']])
+            corriges += sum(1 for user_id, n in comptes.items() if avant[user_id] != n)
+
+        if corriges:
+            self.stdout.write(self.style.WARNING(f'  {corriges} compteur(s) corrigé(s) sur {len(user_ids)}'))
+        else:
+            self.stdout.write(f'  {len(user_ids)} compteur(s) : ok')
+        self.stdout.write(self.style.SUCCESS('✅ Réparation terminée'))
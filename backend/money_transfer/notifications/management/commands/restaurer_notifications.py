@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from notifications.services import retention
+
+
+class Command(BaseCommand):
+    help = 'Réinsérer une archive de notifications (fichier .jsonl.gz produit par archiver_notifications)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier')
+        parser.add_argument('--chunk-size', type=int, default=settings.NOTIFICATION_ARCHIVE_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"♻️ Restauration de {options['fichier']}...")
+        try:
+            rapport = retention.restaurer(options['fichier'], options['chunk_size'])
+        except OSError as e:
+            raise CommandError(f"Archive illisible: {e}")
+
+        self.stdout.write(f"  Lues             : {rapport.lues}")
+        self.stdout.write(f"  Restaurées       : {rapport.restaurees} en {rapport.duree:.1f}s ({rapport.debit:,.0f}/s)")
+        if rapport.deja_presentes:
+            self.stdout.write(f"  Déjà présentes   : {rapport.deja_presentes}")
+        if rapport.sans_utilisateur:
+            self.stdout.write(self.style.WARNING(f"  Utilisateur supprimé : {rapport.sans_utilisateur} ignorée(s)"))
+        for erreur in rapport.erreurs[:10]:
+            self.stdout.write(self.style.WARNING(f"  Ligne {erreur['ligne']}: {erreur['erreur']}"))
+        self.stdout.write(self.style.SUCCESS('✅ Restauration terminée'))
@@ -60,14 +60,61 @@ class Notification(models.Model):
         verbose_name = _('Notification')
         verbose_name_plural = _('Notifications')
         ordering = ['-created_at']
+        indexes = [
+            # Boîte de réception (pagination par curseur) et non lues d'un utilisateur
+            models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['user', 'status']),
+        ]
     
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.title}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Statut enregistré : le signal en déduit la variation du compteur de non lues
+        instance._status_enregistre = instance.__dict__.get('status')
+        return instance
+    
     def mark_as_read(self):
-        """Marquer la notification comme lue et définir l'horodatage de lecture."""
+        """Marquer la notification comme lue et définir l'horodatage de lecture (une seule fois)."""
+        from django.db import transaction
         from django.utils import timezone
+        from .services.boite import ajuster_non_lues
         
-        self.status = self.Status.READ
-        self.seen_at = timezone.now()
-        self.save(update_fields=['status', 'seen_at'])
+        maintenant = timezone.now()
+        with transaction.atomic():
+            # UPDATE conditionnel : deux lectures simultanées ne décomptent qu'une fois
+            if Notification.objects.filter(pk=self.pk, status=self.Status.UNREAD).update(
+                status=self.Status.READ, seen_at=maintenant
+            ):
+                ajuster_non_lues({self.user_id: -1})
+                self.seen_at = maintenant
+        self.status = self._status_enregistre = self.Status.READ
+
+
+class NotificationInbox(models.Model):
+    """Compteur de notifications non lues d'un utilisateur (badge), tenu à jour à chaque création et lecture."""
+    
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notification_inbox',
+        verbose_name=_('Utilisateur')
+    )
+    unread_count = models.PositiveIntegerField(
+        _('Non lues'),
+        default=0
+    )
+    updated_at = models.DateTimeField(
+        _('Mis à jour le'),
+        auto_now=True
+    )
+    
+    class Meta:
+        verbose_name = _('Boîte de notifications')
+        verbose_name_plural = _('Boîtes de notifications')
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.unread_count} non lue(s)"
@@ -0,0 +1,8 @@
+# notifications/pagination.py
+from transactions.pagination import TransactionCursorPagination
+
+
+class NotificationCursorPagination(TransactionCursorPagination):
+    """Boîte de réception par curseur (created_at, id) : index (user, created_at), sans OFFSET ni COUNT."""
+
+    type_pk = int
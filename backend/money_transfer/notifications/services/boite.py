@@ -0,0 +1,96 @@
+# notifications/services/boite.py
+from collections import defaultdict
+
+from django.db import transaction as db_transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from ..models import Notification, NotificationInbox
+
+# ===== COMPTEUR DE NON LUES =====
+# Une ligne NotificationInbox par utilisateur, créée au premier affichage du badge
+# puis initialisée par un comptage complet ; ensuite ajustée par les créations (une à une ou en
+# masse) et les lectures. Tant qu'elle n'existe pas, il n'y a rien à ajuster :
+# le comptage initial verra toutes les lignes.
+
+
+def ajuster_non_lues(deltas):
+    """Appliquer {user_id: variation} aux compteurs existants : une requête par valeur de variation"""
+    par_delta = defaultdict(list)
+    for user_id, delta in deltas.items():
+        if delta:
+            par_delta[delta].append(user_id)
+
+    maintenant = timezone.now()
+    for delta, user_ids in par_delta.items():
+        valeur = F('unread_count') + delta if delta > 0 else Greatest(F('unread_count') + delta, 0)
+        NotificationInbox.objects.filter(user_id__in=user_ids).update(unread_count=valeur, updated_at=maintenant)
+
+
+def compter_nouvelles(notifications):
+    """Variation des compteurs pour des notifications créées en masse (instances ou dicts de colonnes)"""
+    deltas = defaultdict(int)
+    for notification in notifications:
+        if isinstance(notification, dict):
+            user_id, statut = notification['user_id'], notification.get('status', Notification.Status.UNREAD)
+        else:
+            user_id, statut = notification.user_id, notification.status
+        if statut == Notification.Status.UNREAD:
+            deltas[user_id] += 1
+    return deltas
+
+
+def _compter(user_ids):
+    """Non lues par utilisateur (un GROUP BY), zéro pour ceux qui n'en ont pas"""
+    comptes = dict.fromkeys(user_ids, 0)
+    comptes.update(
+        Notification.objects.filter(user_id__in=user_ids, status=Notification.Status.UNREAD)
+        .order_by().values('user_id').annotate(n=Count('id')).values_list('user_id', 'n')
+    )
+    return comptes
+
+
+def recalculer_non_lues(user_ids):
+    """
+    Recompter les non lues de ces utilisateurs et écrire leurs compteurs ; renvoie {user_id: n}.
+
+    Les lignes manquantes sont d'abord créées et validées : une notification créée
+    ensuite ajuste le compteur au lieu d'être perdue. Le comptage définitif se fait
+    sous verrou des lignes, les ajustements concurrents s'appliquent après lui.
+    """
+    user_ids = list(user_ids)
+    existants = set(NotificationInbox.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+    manquants = [user_id for user_id in user_ids if user_id not in existants]
+    if manquants:
+        NotificationInbox.objects.bulk_create(
+            [NotificationInbox(user_id=user_id, unread_count=n) for user_id, n in _compter(manquants).items()],
+            ignore_conflicts=True,
+        )
+
+    with db_transaction.atomic():
+        list(NotificationInbox.objects.select_for_update().filter(user_id__in=user_ids).values_list('pk', flat=True))
+        comptes = _compter(user_ids)
+        NotificationInbox.objects.bulk_create(
+            [NotificationInbox(user_id=user_id, unread_count=n) for user_id, n in comptes.items()],
+            update_conflicts=True, unique_fields=['user'], update_fields=['unread_count', 'updated_at'],
+        )
+    return comptes
+
+
+def non_lues(user_id):
+    """Badge : lecture du compteur par clé primaire, comptage complet la première fois seulement"""
+    compte = NotificationInbox.objects.filter(user_id=user_id).values_list('unread_count', flat=True).first()
+    if compte is None:
+        compte = recalculer_non_lues([user_id])[user_id]
+    return compte
+
+
+def tout_marquer_lu(user_id):
+    """Marquer toutes les non lues d'un utilisateur en un UPDATE ; renvoie le nombre de notifications lues"""
+    with db_transaction.atomic():
+        lues = Notification.objects.filter(user_id=user_id, status=Notification.Status.UNREAD).update(
+            status=Notification.Status.READ, seen_at=timezone.now()
+        )
+        ajuster_non_lues({user_id: -lues})
+    return lues
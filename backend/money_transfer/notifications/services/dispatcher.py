@@ -0,0 +1,408 @@
+# notifications/services/dispatcher.py
+import atexit
+import heapq
+import itertools
+import logging
+import queue
+import random
+import threading
+import time
+from collections import deque
+from typing import NamedTuple, Optional
+
+import requests
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Message(NamedTuple):
+    """Notification prête à partir sur un canal (aucun accès base dans les workers)"""
+    notification_id: Optional[int]
+    user_id: int
+    title: str
+    message: str
+    notification_type: str = 'INFO'
+    telephone: Optional[str] = None
+
+
+class ErreurCanal(Exception):
+    """Échec temporaire d'un fournisseur (réseau, 429, 5xx) : le lot est réessayé"""
+
+
+# ===== CANAUX =====
+
+class CanalHTTP:
+    """
+    Fournisseur HTTP/JSON : un POST par lot, {cle: [charge(message), ...]}.
+
+    `envoyer_lot` renvoie les positions des messages refusés définitivement
+    (réponse "rejected") et lève ErreurCanal pour un échec à réessayer.
+    """
+
+    nom = None
+    cle = 'messages'
+    telephone_requis = False
+
+    def __init__(self, url, timeout=None):
+        self.url = url
+        self.timeout = timeout or settings.NOTIFICATION_CHANNEL_TIMEOUT
+        self._local = threading.local()
+
+    def charge(self, message):
+        raise NotImplementedError('Les sous-classes doivent implémenter charge()')
+
+    def accepte(self, message):
+        """Le message peut-il partir sur ce canal (numéro connu, etc.)"""
+        return not self.telephone_requis or bool(message.telephone)
+
+    def _session(self):
+        # Une session (connexions réutilisées) par worker
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def envoyer_lot(self, messages):
+        try:
+            reponse = self._session().post(
+                self.url, json={self.cle: [self.charge(m) for m in messages]}, timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            raise ErreurCanal(str(e)) from e
+        if reponse.status_code == 429 or reponse.status_code >= 500:
+            raise ErreurCanal(f"HTTP {reponse.status_code}")
+        if reponse.status_code >= 400:
+            # Lot refusé tel quel (format, taille) : inutile de réessayer
+            logger.error(f"❌ {self.nom}: lot de {len(messages)} refusé (HTTP {reponse.status_code})")
+            return list(range(len(messages)))
+        return reponse.json().get('rejected', [])
+
+
+class CanalSMS(CanalHTTP):
+    nom = 'sms'
+    cle = 'messages'
+    telephone_requis = True
+
+    def charge(self, message):
+        return {'to': message.telephone, 'text': f"{message.title}: {message.message}"}
+
+
+class CanalPush(CanalHTTP):
+    nom = 'push'
+    cle = 'notifications'
+
+    def charge(self, message):
+        return {
+            'user_id': message.user_id, 'title': message.title, 'body': message.message,
+            'type': message.notification_type, 'notification_id': message.notification_id,
+        }
+
+
+# Canaux réseau disponibles : activés par NOTIFICATION_{NOM}_URL
+CANAUX = {
+    'sms': CanalSMS,
+    'push': CanalPush,
+}
+
+
+# ===== MÉTRIQUES =====
+
+class MetriquesCanal:
+    """Compteurs d'un canal et latences (soumission → acceptation) des derniers messages"""
+
+    def __init__(self, fenetre=1000):
+        self._lock = threading.Lock()
+        self._latences = deque(maxlen=fenetre)
+        self.debut = None
+        self.envoyes = 0
+        self.rejetes = 0      # refusés par le fournisseur
+        self.echecs = 0       # abandonnés après le dernier essai
+        self.satures = 0      # non acceptés, file pleine
+        self.reessais = 0
+        self.lots = 0
+
+    def lot_envoye(self, latences, rejetes):
+        with self._lock:
+            self.lots += 1
+            self.envoyes += len(latences)
+            self.rejetes += rejetes
+            self._latences.extend(latences)
+
+    def compter(self, **valeurs):
+        with self._lock:
+            for nom, valeur in valeurs.items():
+                setattr(self, nom, getattr(self, nom) + valeur)
+
+    def instantane(self, en_attente=0):
+        with self._lock:
+            latences = sorted(self._latences)
+            duree = time.monotonic() - self.debut if self.debut else 0
+
+        def quantile(q):
+            return round(latences[min(len(latences) - 1, int(q * len(latences)))] * 1000, 2) if latences else None
+
+        return {
+            'envoyes': self.envoyes,
+            'rejetes': self.rejetes,
+            'echecs': self.echecs,
+            'satures': self.satures,
+            'reessais': self.reessais,
+            'lots': self.lots,
+            'en_attente': en_attente,
+            'taille_lot_moyenne': round(self.envoyes / self.lots, 1) if self.lots else 0,
+            'debit_par_seconde': round(self.envoyes / duree, 1) if duree else 0,
+            'latence_ms': {'p50': quantile(0.50), 'p95': quantile(0.95), 'p99': quantile(0.99)},
+        }
+
+
+# ===== POOL PAR CANAL =====
+
+class _Envoi(NamedTuple):
+    message: Message
+    essai: int
+    soumis_a: float
+
+
+class PoolCanal:
+    """
+    Workers d'un canal : file bornée, envois par lots, réessais avec backoff.
+
+    Chaque worker prend jusqu'à `taille_lot` messages (ou ce qui est arrivé en
+    `attente_max` secondes) et les envoie en une requête. Un lot en échec
+    temporaire est replanifié après `delai × 2^essai` secondes (± 20 %) jusqu'à
+    `max_essais` essais. File pleine, `soumettre` refuse les messages plutôt
+    que de bloquer l'appelant : la notification reste en base.
+    """
+
+    def __init__(self, canal, taille_lot, workers, attente_max=None, max_pending=None,
+                 max_essais=None, delai=None):
+        self.canal = canal
+        self.taille_lot = taille_lot
+        self.workers = workers
+        self.attente_max = attente_max if attente_max is not None else settings.NOTIFICATION_CHANNEL_MAX_WAIT
+        self.max_essais = max_essais or settings.NOTIFICATION_CHANNEL_MAX_RETRIES
+        self.delai = delai if delai is not None else settings.NOTIFICATION_CHANNEL_RETRY_DELAY
+        self.metriques = MetriquesCanal()
+        self._file = queue.Queue(maxsize=max_pending or settings.NOTIFICATION_CHANNEL_MAX_PENDING)
+        self._reessais = []                 # tas (échéance, n°, envoi)
+        self._numero = itertools.count()
+        self._lock = threading.Lock()
+        self._en_cours = 0                  # soumis, pas encore envoyés ni abandonnés
+        self._threads = []
+
+    @property
+    def en_attente(self):
+        return self._en_cours
+
+    def soumettre(self, messages):
+        """Confier des messages aux workers ; renvoie le nombre acceptés"""
+        self._demarrer()
+        maintenant = time.monotonic()
+        acceptes = 0
+        for message in messages:
+            with self._lock:
+                self._en_cours += 1
+            try:
+                self._file.put_nowait(_Envoi(message, 0, maintenant))
+                acceptes += 1
+            except queue.Full:
+                self._terminer(1)
+                self.metriques.compter(satures=len(messages) - acceptes)
+                logger.warning(f"⚠️ File {self.canal.nom} saturée ({self._file.maxsize}), "
+                               f"{len(messages) - acceptes} messages non envoyés")
+                break
+        return acceptes
+
+    def _terminer(self, nombre):
+        with self._lock:
+            self._en_cours -= nombre
+
+    # ----- workers -----
+
+    def _demarrer(self):
+        if self.metriques.debut is None:
+            self.metriques.debut = time.monotonic()
+        if len(self._threads) < self.workers:
+            with self._lock:
+                while len(self._threads) < self.workers:
+                    thread = threading.Thread(target=self._boucle, daemon=True,
+                                              name=f'notifications-{self.canal.nom}-{len(self._threads)}')
+                    thread.start()
+                    self._threads.append(thread)
+
+    def _reessais_dus(self):
+        """Envois dont le délai de réessai est écoulé, et attente jusqu'au prochain"""
+        dus = []
+        with self._lock:
+            maintenant = time.monotonic()
+            while self._reessais and self._reessais[0][0] <= maintenant and len(dus) < self.taille_lot:
+                dus.append(heapq.heappop(self._reessais)[2])
+            prochain = self._reessais[0][0] - maintenant if self._reessais else None
+        return dus, prochain
+
+    def _prendre(self):
+        while True:
+            lot, prochain = self._reessais_dus()
+            if lot:
+                break
+            try:
+                lot = [self._file.get(timeout=min(prochain, 1.0) if prochain is not None else 1.0)]
+                break
+            except queue.Empty:
+                continue
+        limite = time.monotonic() + self.attente_max
+        while len(lot) < self.taille_lot:
+            try:
+                lot.append(self._file.get(timeout=max(0.0, limite - time.monotonic())))
+            except queue.Empty:
+                break
+        return lot
+
+    def _boucle(self):
+        while True:
+            self._envoyer(self._prendre())
+
+    def _envoyer(self, lot):
+        try:
+            rejetes = set(self.canal.envoyer_lot([envoi.message for envoi in lot]))
+        except ErreurCanal as e:
+            self._replanifier(lot, e)
+            return
+        except Exception as e:
+            # Erreur de programmation : réessayer n'y changerait rien
+            logger.error(f"❌ {self.canal.nom}: lot de {len(lot)} abandonné: {e}")
+            self.metriques.compter(echecs=len(lot))
+            self._terminer(len(lot))
+            return
+
+        maintenant = time.monotonic()
+        self.metriques.lot_envoye(
+            [maintenant - envoi.soumis_a for position, envoi in enumerate(lot) if position not in rejetes],
+            len(rejetes),
+        )
+        self._terminer(len(lot))
+
+    def _replanifier(self, lot, erreur):
+        # Un lot peut mêler nouveaux messages et réessais : chacun garde son compte d'essais
+        abandons = [envoi for envoi in lot if envoi.essai + 1 >= self.max_essais]
+        reessais = [envoi for envoi in lot if envoi.essai + 1 < self.max_essais]
+        if abandons:
+            logger.error(f"❌ {self.canal.nom}: {len(abandons)} messages abandonnés après "
+                         f"{self.max_essais} essais ({erreur})")
+            self.metriques.compter(echecs=len(abandons))
+            self._terminer(len(abandons))
+        if not reessais:
+            return
+        logger.warning(f"⚠️ {self.canal.nom}: {len(reessais)} messages en échec ({erreur}), réessai planifié")
+        self.metriques.compter(reessais=len(reessais))
+        with self._lock:
+            for envoi in reessais:
+                attente = self.delai * 2 ** envoi.essai * random.uniform(0.8, 1.2)
+                heapq.heappush(self._reessais, (time.monotonic() + attente, next(self._numero),
+                                                envoi._replace(essai=envoi.essai + 1)))
+
+    def vider(self, timeout=None):
+        """Attendre que tous les messages soumis soient envoyés ou abandonnés ; False si délai dépassé"""
+        limite = None if timeout is None else time.monotonic() + timeout
+        while self._en_cours:
+            if limite is not None and time.monotonic() > limite:
+                return False
+            time.sleep(0.01)
+        return True
+
+
+# ===== ROUTAGE =====
+
+class Dispatcher:
+    """
+    Route chaque notification vers ses canaux (NOTIFICATION_ROUTES, par type) :
+    un pool de workers par canal, les numéros de téléphone lus en une requête.
+    """
+
+    def __init__(self, pools=None, routes=None):
+        self.pools = dict(pools or {})
+        self.routes = routes if routes is not None else settings.NOTIFICATION_ROUTES
+
+    @classmethod
+    def depuis_settings(cls):
+        pools = {}
+        for nom, classe in CANAUX.items():
+            prefixe = f'NOTIFICATION_{nom.upper()}'
+            url = getattr(settings, f'{prefixe}_URL', '')
+            if url:
+                pools[nom] = PoolCanal(classe(url), taille_lot=getattr(settings, f'{prefixe}_BATCH_SIZE'),
+                                       workers=getattr(settings, f'{prefixe}_WORKERS'))
+        return cls(pools)
+
+    def ajouter(self, nom, pool):
+        self.pools[nom] = pool
+
+    def distribuer(self, notifications, canaux=None, telephones=None):
+        """
+        Soumettre des notifications (instances ou objets avec user_id, title,
+        message, notification_type) à leurs canaux ; `canaux` force la route.
+        """
+        envois = {}
+        for notification in notifications:
+            noms = canaux if canaux is not None else self.routes.get(notification.notification_type, ())
+            for nom in noms:
+                if nom in self.pools:
+                    envois.setdefault(nom, []).append(notification)
+        if not envois:
+            return {}
+
+        if telephones is None and any(self.pools[nom].canal.telephone_requis for nom in envois):
+            telephones = self._telephones({n.user_id for nom in envois for n in envois[nom]})
+
+        acceptes = {}
+        for nom, a_envoyer in envois.items():
+            pool = self.pools[nom]
+            messages = [
+                Message(n.pk, n.user_id, n.title, n.message, n.notification_type, (telephones or {}).get(n.user_id))
+                for n in a_envoyer
+            ]
+            acceptes[nom] = pool.soumettre([m for m in messages if pool.canal.accepte(m)])
+        return acceptes
+
+    @staticmethod
+    def _telephones(user_ids):
+        from django.contrib.auth import get_user_model
+        return dict(get_user_model().objects.filter(id__in=user_ids).values_list('id', 'phone_number'))
+
+    def metriques(self):
+        return {nom: pool.metriques.instantane(pool.en_attente) for nom, pool in self.pools.items()}
+
+    def vider(self, timeout=None):
+        limite = None if timeout is None else time.monotonic() + timeout
+        return all(
+            pool.vider(None if limite is None else max(0.0, limite - time.monotonic()))
+            for pool in self.pools.values()
+        )
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    """Instance unique du dispatcher par processus (créée à la demande)"""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = Dispatcher.depuis_settings()
+                atexit.register(_dispatcher.vider, 5)
+    return _dispatcher
+
+
+def distribuer(notifications, canaux=None, telephones=None):
+    """Envoyer des notifications déjà enregistrées sur leurs canaux réseau (sans attendre)"""
+    dispatcher = get_dispatcher()
+    if not dispatcher.pools:
+        return {}
+    try:
+        return dispatcher.distribuer(notifications, canaux, telephones)
+    except Exception as e:
+        # Ne jamais faire échouer l'opération métier pour un SMS ou un push
+        logger.error(f"❌ Erreur distribution de {len(notifications)} notifications: {e}")
+        return {}
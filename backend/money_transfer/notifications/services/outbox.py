@@ -0,0 +1,184 @@
+# notifications/services/outbox.py
+import atexit
+import logging
+import queue
+import threading
+import time
+import uuid
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, transaction as db_transaction
+
+from .dispatcher import distribuer
+from .temps_reel import diffuser_apres_commit, donnees_notification
+
+logger = logging.getLogger(__name__)
+
+# Remplacés à l'insertion par le nom complet de l'expéditeur / le nom du canal :
+# les signaux n'ont pas à charger l'utilisateur ou le canal pour rédiger le message
+EXPEDITEUR = '{expediteur}'
+CANAL = '{canal}'
+# Identifiant absent ou introuvable : jamais d'accolades dans le message envoyé
+EXPEDITEUR_INCONNU = "l'expéditeur"
+CANAL_INCONNU = 'votre canal de paiement'
+
+
+class Intention(NamedTuple):
+    """Notification à créer une fois la transaction de base validée"""
+    user_id: int
+    title: str
+    message: str
+    notification_type: str = 'INFO'
+    expediteur_id: Optional[int] = None    # pour EXPEDITEUR
+    canal_id: Optional[uuid.UUID] = None   # pour CANAL
+
+
+def inserer(intentions):
+    """Créer les notifications d'un lot (noms résolus en une requête, un INSERT par lot) puis les distribuer"""
+    from django.contrib.auth import get_user_model
+    from transactions.models import CanalPaiement
+    from ..models import Notification
+    from .boite import ajuster_non_lues, compter_nouvelles
+
+    expediteurs = {i.expediteur_id for i in intentions if i.expediteur_id and EXPEDITEUR in i.message}
+    canaux = {i.canal_id for i in intentions if i.canal_id and CANAL in i.message}
+    noms = {
+        user_id: f"{prenom} {nom}"
+        for user_id, prenom, nom in get_user_model().objects.filter(id__in=expediteurs).values_list(
+            'id', 'first_name', 'last_name'
+        )
+    } if expediteurs else {}
+    noms_canaux = dict(
+        CanalPaiement.objects.filter(id__in=canaux).values_list('id', 'canal_name')
+    ) if canaux else {}
+
+    notifications = []
+    for intention in intentions:
+        message = intention.message.replace(
+            EXPEDITEUR, noms.get(intention.expediteur_id, EXPEDITEUR_INCONNU)
+        ).replace(CANAL, noms_canaux.get(intention.canal_id, CANAL_INCONNU))
+        notifications.append(Notification(
+            user_id=intention.user_id, title=intention.title, message=message,
+            notification_type=intention.notification_type, auto_sent=True,
+        ))
+    with db_transaction.atomic():
+        notifications = Notification.objects.bulk_create(
+            notifications, batch_size=settings.NOTIFICATION_OUTBOX_BATCH_SIZE
+        )
+        # bulk_create n'envoie pas post_save : compteurs de non lues ajustés ici
+        ajuster_non_lues(compter_nouvelles(notifications))
+    distribuer(notifications)
+    for notification in notifications:
+        diffuser_apres_commit([notification.user_id], 'notification', donnees_notification(notification),
+                              notification.pk)
+    return notifications
+
+
+class Outbox:
+    """
+    Notifications automatiques hors du chemin des sauvegardes.
+
+    `publier` confie les intentions au commit de la transaction en cours (rien
+    n'est envoyé si elle est annulée). En mode 'sync' (par défaut), le lot est
+    inséré au commit par l'appelant. En mode 'async', elles passent ensuite
+    par une file bornée qu'un worker du processus vide par lots (jusqu'à
+    `taille_lot` intentions, ou ce qui est arrivé en `attente_max` secondes) ;
+    file pleine, le lot est inséré par l'appelant (back-pressure). Cette file
+    est en mémoire : un arrêt brutal du processus perd les intentions en attente.
+    """
+
+    def __init__(self, taille_lot=None, attente_max=None, max_pending=None):
+        self.taille_lot = taille_lot or settings.NOTIFICATION_OUTBOX_BATCH_SIZE
+        self.attente_max = attente_max if attente_max is not None else settings.NOTIFICATION_OUTBOX_MAX_WAIT
+        self._file = queue.Queue(maxsize=max_pending or settings.NOTIFICATION_OUTBOX_MAX_PENDING)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.lots = 0
+        self.envoyees = 0
+
+    @property
+    def en_attente(self):
+        """Intentions validées pas encore insérées"""
+        return self._file.unfinished_tasks
+
+    def publier(self, intentions):
+        intentions = list(intentions)
+        if intentions:
+            db_transaction.on_commit(lambda: self._deposer(intentions))
+
+    def _deposer(self, intentions):
+        if getattr(settings, 'NOTIFICATION_OUTBOX_MODE', 'sync') != 'async':
+            self._inserer(intentions)
+            return
+
+        self._demarrer()
+        for position, intention in enumerate(intentions):
+            try:
+                self._file.put_nowait(intention)
+            except queue.Full:
+                logger.warning(f"⚠️ File de notifications saturée ({self._file.maxsize}), insertion directe")
+                self._inserer(intentions[position:])
+                return
+
+    def _inserer(self, intentions):
+        try:
+            inserer(intentions)
+            self.lots += 1
+            self.envoyees += len(intentions)
+        except Exception as e:
+            # Ne jamais faire échouer l'opération métier pour une notification
+            logger.error(f"❌ Erreur insertion de {len(intentions)} notifications: {e}")
+
+    # ----- worker -----
+
+    def _demarrer(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._boucle, name='notifications-outbox', daemon=True)
+                    self._thread.start()
+
+    def _boucle(self):
+        while True:
+            lot = [self._file.get()]
+            limite = time.monotonic() + self.attente_max
+            while len(lot) < self.taille_lot:
+                try:
+                    lot.append(self._file.get(timeout=max(0.0, limite - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                self._inserer(lot)
+            finally:
+                close_old_connections()
+                for _ in lot:
+                    self._file.task_done()
+
+    def vider(self, timeout=None):
+        """Attendre que toutes les intentions validées soient insérées (tests, commandes, arrêt) ; False si délai dépassé"""
+        limite = None if timeout is None else time.monotonic() + timeout
+        while self._file.unfinished_tasks:
+            if limite is not None and time.monotonic() > limite:
+                return False
+            time.sleep(0.01)
+        return True
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox():
+    """Instance unique de l'outbox par processus (créée à la demande)"""
+    global _outbox
+    if _outbox is None:
+        with _outbox_lock:
+            if _outbox is None:
+                _outbox = Outbox()
+                atexit.register(_outbox.vider, 5)
+    return _outbox
+
+
+def publier(intentions):
+    get_outbox().publier(intentions)
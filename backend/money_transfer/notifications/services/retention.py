@@ -0,0 +1,204 @@
+# notifications/services/retention.py
+import gzip
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection, transaction as db_transaction
+from django.utils import timezone
+
+from transactions.services.bulk_import import InsertionEnMasse
+from ..models import Notification
+from .boite import ajuster_non_lues, compter_nouvelles
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+# ===== RÉTENTION =====
+# Les notifications lues plus anciennes que NOTIFICATION_RETENTION_DAYS sont
+# écrites dans une archive JSONL compressée (une ligne par notification, toutes
+# les colonnes) puis supprimées. Parcours par clé primaire, chunk par chunk :
+# mémoire constante, et chaque suppression est une transaction courte écrite
+# après que le chunk est sur disque. Les non lues ne sont jamais archivées :
+# les compteurs de boîte ne bougent pas.
+
+CHAMPS = [champ.attname for champ in Notification._meta.concrete_fields]
+
+
+@dataclass
+class RapportArchivage:
+    fichier: str = ''
+    archivees: int = 0
+    supprimees: int = 0
+    octets: int = 0
+    duree: float = 0.0
+    taille_avant: int = None
+    taille_apres: int = None
+
+    @property
+    def debit(self):
+        return self.archivees / self.duree if self.duree else 0.0
+
+
+@dataclass
+class RapportRestauration:
+    lues: int = 0
+    restaurees: int = 0
+    deja_presentes: int = 0
+    sans_utilisateur: int = 0
+    duree: float = 0.0
+    erreurs: list = field(default_factory=list)
+
+    @property
+    def debit(self):
+        return self.restaurees / self.duree if self.duree else 0.0
+
+
+def taille_table(modele=Notification):
+    """Octets occupés par la table et ses index ; None si le moteur ne sait pas le dire"""
+    table = modele._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT pg_total_relation_size(%s)', [table])
+        elif connection.vendor == 'sqlite':
+            try:
+                cursor.execute(
+                    'SELECT SUM(pgsize) FROM dbstat WHERE name IN (SELECT name FROM sqlite_master WHERE tbl_name = %s)',
+                    [table]
+                )
+            except DatabaseError:
+                # SQLite compilé sans SQLITE_ENABLE_DBSTAT_VTAB
+                return None
+        else:
+            return None
+        return cursor.fetchone()[0]
+
+
+def _iso(valeur):
+    # Dates complètes (DjangoJSONEncoder tronque aux millisecondes)
+    return valeur.isoformat()
+
+
+def a_archiver(avant):
+    return Notification.objects.filter(status=Notification.Status.READ, created_at__lt=avant)
+
+
+def _supprimer(ids):
+    """DELETE par clé primaire, sans collecteur ni signaux (lignes lues : aucun compteur à ajuster)"""
+    table = connection.ops.quote_name(Notification._meta.db_table)
+    par_requete = (connection.features.max_query_params or 10000) - 1
+    supprimees = 0
+    with db_transaction.atomic(), connection.cursor() as cursor:
+        for debut in range(0, len(ids), par_requete):
+            lot = ids[debut:debut + par_requete]
+            cursor.execute(
+                f"DELETE FROM {table} WHERE id IN ({', '.join(['%s'] * len(lot))}) AND status = %s",
+                lot + [Notification.Status.READ]
+            )
+            supprimees += cursor.rowcount
+    return supprimees
+
+
+def archiver(avant, dossier=None, taille_chunk=None, pause=0.0, supprimer=True):
+    """
+    Archiver (et supprimer) les notifications lues créées avant `avant`.
+
+    Chaque chunk est compressé, vidé sur disque (fsync) puis supprimé dans sa
+    propre transaction ; `pause` (s) laisse passer les écritures concurrentes
+    entre deux chunks. Interrompu, le job peut être relancé : ce qui reste en
+    base est archivé dans un nouveau fichier.
+    """
+    dossier = dossier or settings.NOTIFICATION_ARCHIVE_DIR
+    taille_chunk = taille_chunk or settings.NOTIFICATION_ARCHIVE_CHUNK_SIZE
+    os.makedirs(dossier, exist_ok=True)
+    chemin = os.path.join(dossier, f"notifications-{avant:%Y%m%d}-{timezone.now():%Y%m%dT%H%M%S%f}.jsonl.gz")
+    rapport = RapportArchivage(fichier=chemin, taille_avant=taille_table())
+    selection = a_archiver(avant).order_by('pk').values(*CHAMPS)
+
+    debut = time.perf_counter()
+    dernier = 0
+    with open(chemin, 'xb') as brut, gzip.GzipFile(fileobj=brut, mode='wb') as archive:
+        while True:
+            lignes = list(selection.filter(pk__gt=dernier)[:taille_chunk])
+            if not lignes:
+                break
+            archive.write(''.join(
+                json.dumps(ligne, default=_iso, ensure_ascii=False) + '\n' for ligne in lignes
+            ).encode())
+            # Le chunk est sur disque avant d'être supprimé de la base
+            archive.flush()
+            brut.flush()
+            os.fsync(brut.fileno())
+
+            dernier = lignes[-1]['id']
+            rapport.archivees += len(lignes)
+            if supprimer:
+                rapport.supprimees += _supprimer([ligne['id'] for ligne in lignes])
+            if pause:
+                time.sleep(pause)
+    rapport.duree = time.perf_counter() - debut
+
+    if rapport.archivees:
+        rapport.octets = os.path.getsize(chemin)
+    else:
+        os.remove(chemin)
+        rapport.fichier = ''
+    rapport.taille_apres = taille_table()
+    logger.info(f"🗄️ Notifications archivées: {rapport.archivees} ({rapport.supprimees} supprimées) "
+                f"en {rapport.duree:.1f}s → {rapport.fichier or 'aucun fichier'}")
+    return rapport
+
+
+def lire_archive(chemin):
+    """Lignes d'une archive en flux : (numéro de ligne, dict)"""
+    with gzip.open(chemin, 'rt', encoding='utf-8') as archive:
+        for numero, brute in enumerate(archive, start=1):
+            if brute.strip():
+                yield numero, json.loads(brute)
+
+
+def restaurer(chemin, taille_chunk=None):
+    """
+    Réinsérer une archive avec ses clés primaires et dates d'origine.
+
+    Les notifications déjà présentes (archive restaurée deux fois, archivage
+    sans suppression) et celles d'utilisateurs supprimés depuis sont ignorées.
+    """
+    taille_chunk = taille_chunk or settings.NOTIFICATION_ARCHIVE_CHUNK_SIZE
+    insertion = InsertionEnMasse(Notification, CHAMPS, cle_primaire=True)
+    rapport = RapportRestauration()
+
+    def restaurer_chunk(lignes):
+        ids = [ligne['id'] for ligne in lignes]
+        presentes = set(Notification.objects.filter(pk__in=ids).values_list('pk', flat=True))
+        user_ids = set(User.objects.filter(pk__in={ligne['user_id'] for ligne in lignes}).values_list('pk', flat=True))
+        a_inserer = [ligne for ligne in lignes if ligne['id'] not in presentes and ligne['user_id'] in user_ids]
+        rapport.deja_presentes += sum(1 for ligne in lignes if ligne['id'] in presentes)
+        rapport.sans_utilisateur += sum(
+            1 for ligne in lignes if ligne['id'] not in presentes and ligne['user_id'] not in user_ids
+        )
+        with db_transaction.atomic():
+            rapport.restaurees += insertion.inserer(a_inserer)
+            ajuster_non_lues(compter_nouvelles(a_inserer))
+
+    debut = time.perf_counter()
+    lignes = []
+    for numero, ligne in lire_archive(chemin):
+        rapport.lues += 1
+        if not isinstance(ligne, dict) or 'id' not in ligne or 'user_id' not in ligne:
+            rapport.erreurs.append({'ligne': numero, 'erreur': 'id et user_id requis'})
+            continue
+        lignes.append(ligne)
+        if len(lignes) >= taille_chunk:
+            restaurer_chunk(lignes)
+            lignes = []
+    if lignes:
+        restaurer_chunk(lignes)
+    rapport.duree = time.perf_counter() - debut
+
+    logger.info(f"♻️ Archive restaurée: {rapport.restaurees}/{rapport.lues} notifications depuis {chemin}")
+    return rapport
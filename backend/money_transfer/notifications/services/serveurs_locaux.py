@@ -0,0 +1,195 @@
+# notifications/services/serveurs_locaux.py
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ServeurNotificationsLocal:
+    """
+    Faux fournisseur de notifications (HTTP/JSON), pour les tests et le développement.
+
+    POST {url} avec {cle: [message, ...]} ; au-delà de `taille_max` messages par
+    requête, réponse 413. `latence` simule un fournisseur lent, `en_panne` le fait
+    répondre 503, `pannes_a_venir` fait échouer (503) les N requêtes suivantes.
+    Les messages refusés par `valide` sont renvoyés dans "rejected" (indices).
+    `requetes`, `lots` (tailles) et `messages` gardent la trace des envois reçus.
+    """
+
+    chemin = '/'
+    cle = 'messages'
+    taille_max = 100
+
+    def __init__(self, port=0, latence=0.0, taille_max=None):
+        self.latence = latence
+        self.taille_max = taille_max or self.taille_max
+        self.en_panne = False
+        self.pannes_a_venir = 0
+        self.requetes = 0
+        self.lots = []
+        self.messages = []
+        self._lock = threading.Lock()
+        self._serveur = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self._serveur.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._serveur.server_address[1]}{self.chemin}"
+
+    def valide(self, message):
+        return True
+
+    def _recevoir(self, contenu):
+        """(statut HTTP, réponse) pour un corps de requête décodé"""
+        with self._lock:
+            self.requetes += 1
+            if self.en_panne or self.pannes_a_venir:
+                self.pannes_a_venir = max(0, self.pannes_a_venir - 1)
+                return 503, {'error': 'unavailable'}
+        messages = contenu.get(self.cle)
+        if not isinstance(messages, list) or not messages:
+            return 400, {'error': f'{self.cle} requis'}
+        if len(messages) > self.taille_max:
+            return 413, {'error': f'{self.taille_max} messages au plus par requête'}
+        rejetes = [position for position, message in enumerate(messages) if not self.valide(message)]
+        with self._lock:
+            self.lots.append(len(messages))
+            self.messages.extend(message for position, message in enumerate(messages) if position not in rejetes)
+        return 200, {'accepted': len(messages) - len(rejetes), 'rejected': rejetes}
+
+    def _handler(self):
+        serveur = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                time.sleep(serveur.latence)
+                try:
+                    contenu = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                except ValueError:
+                    statut, reponse = 400, {'error': 'JSON invalide'}
+                else:
+                    statut, reponse = serveur._recevoir(contenu)
+                corps = json.dumps(reponse).encode()
+                self.send_response(statut)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(corps)))
+                self.end_headers()
+                self.wfile.write(corps)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def demarrer(self):
+        self._thread = threading.Thread(target=self._serveur.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def arreter(self):
+        self._serveur.shutdown()
+        self._serveur.server_close()
+
+    def __enter__(self):
+        return self.demarrer()
+
+    def __exit__(self, *exc):
+        self.arreter()
+
+
+class ServeurSMSLocal(ServeurNotificationsLocal):
+    """Passerelle SMS : {"messages": [{"to": "+221...", "text": "..."}]}, 100 SMS par requête"""
+
+    chemin = '/sms/messages'
+    cle = 'messages'
+    taille_max = 100
+
+    def valide(self, message):
+        numero = str(message.get('to', ''))
+        return numero.startswith('+') and numero[1:].isdigit()
+
+
+class ServeurPushLocal(ServeurNotificationsLocal):
+    """Push mobile : {"notifications": [{"user_id": 1, "title": "...", "body": "..."}]}, 500 par requête"""
+
+    chemin = '/push/send'
+    cle = 'notifications'
+    taille_max = 500
+
+    def valide(self, message):
+        return bool(message.get('user_id'))
+
+
+class ConnexionSSE:
+    """
+    Client SSE branché directement sur une application ASGI (sans serveur HTTP),
+    pour les tests et les mesures de montée en charge dans un seul processus.
+    La déconnexion passe par le message ASGI http.disconnect, comme un vrai client.
+    """
+
+    __slots__ = ('application', 'scope', 'statut', 'entetes', 'trames', '_tache', '_demarree', '_nouvelle',
+                 '_requete_lue', '_deconnexion')
+
+    def __init__(self, application, chemin, query_string='', headers=(), method='GET'):
+        self.application = application
+        self.scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method,
+            'scheme': 'http', 'path': chemin, 'raw_path': chemin.encode(), 'root_path': '',
+            'query_string': query_string.encode(),
+            'headers': [(b'host', b'localhost')] + [(k.lower().encode(), v.encode()) for k, v in headers],
+            'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+        }
+        self.statut = None
+        self.entetes = {}
+        self.trames = []
+        self._tache = None
+        self._demarree = asyncio.Event()
+        self._nouvelle = None
+        self._requete_lue = False
+        self._deconnexion = asyncio.Event()
+
+    async def ouvrir(self, timeout=10):
+        """Envoyer la requête et attendre l'en-tête de la réponse"""
+        self._tache = asyncio.create_task(self.application(self.scope, self._recevoir, self._envoyer))
+        await asyncio.wait_for(self._demarree.wait(), timeout)
+        return self
+
+    async def _recevoir(self):
+        if not self._requete_lue:
+            self._requete_lue = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self._deconnexion.wait()
+        return {'type': 'http.disconnect'}
+
+    async def _envoyer(self, message):
+        if message['type'] == 'http.response.start':
+            self.statut = message['status']
+            self.entetes = {nom.decode('latin1'): valeur.decode('latin1') for nom, valeur in message.get('headers', [])}
+            self._demarree.set()
+        elif message.get('body'):
+            self.trames.append(message['body'])
+            if self._nouvelle is not None:
+                self._nouvelle.set()
+
+    async def lire(self, texte, timeout=5):
+        """Première trame reçue contenant `texte` (retirée des trames reçues)"""
+        texte = texte.encode()
+
+        async def attendre():
+            while True:
+                for position, trame in enumerate(self.trames):
+                    if texte in trame:
+                        return self.trames.pop(position).decode()
+                self._nouvelle = asyncio.Event()
+                await self._nouvelle.wait()
+
+        try:
+            return await asyncio.wait_for(attendre(), timeout)
+        finally:
+            self._nouvelle = None
+
+    async def fermer(self, timeout=5):
+        self._deconnexion.set()
+        await asyncio.wait_for(self._tache, timeout)
@@ -0,0 +1,257 @@
+# notifications/services/temps_reel.py
+import asyncio
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+
+logger = logging.getLogger(__name__)
+
+BATTEMENT = b': ping\n\n'
+
+
+def evenement_sse(evenement, donnees, identifiant=None):
+    """Trame Server-Sent Events, encodée une fois pour tous les abonnés"""
+    lignes = []
+    if identifiant is not None:
+        lignes.append(f"id: {identifiant}")
+    lignes.append(f"event: {evenement}")
+    lignes.append(f"data: {json.dumps(donnees, ensure_ascii=False, default=str)}")
+    return ('\n'.join(lignes) + '\n\n').encode()
+
+
+def donnees_notification(notification):
+    return {
+        'id': notification.pk,
+        'title': notification.title,
+        'message': notification.message,
+        'notification_type': notification.notification_type,
+        'created_at': notification.created_at,
+    }
+
+
+class Abonnement:
+    """
+    Une connexion ouverte : trames en attente d'écriture (au plus `taille`).
+
+    Plus léger qu'une asyncio.Queue (quelques centaines d'octets au repos) :
+    une liste, et un Future seulement pendant que le flux attend.
+    """
+
+    __slots__ = ('user_id', 'taille', 'trames', 'attente', 'a_fermer')
+
+    def __init__(self, user_id, taille):
+        self.user_id = user_id
+        self.taille = taille
+        self.trames = []
+        self.attente = None
+        self.a_fermer = False
+
+    def deposer(self, trame):
+        """Dans la boucle ; False si la file est pleine"""
+        if len(self.trames) >= self.taille:
+            return False
+        self.trames.append(trame)
+        if self.attente is not None and not self.attente.done():
+            self.attente.set_result(None)
+        return True
+
+    def fermer(self):
+        """Dans la boucle : client parti ou en retard, le flux s'arrête"""
+        self.a_fermer = True
+        if self.attente is not None and not self.attente.done():
+            self.attente.set_result(None)
+
+    async def suivant(self):
+        """Prochaine trame ; None si la connexion doit être fermée"""
+        while not self.trames and not self.a_fermer:
+            self.attente = asyncio.get_running_loop().create_future()
+            try:
+                await self.attente
+            finally:
+                self.attente = None
+        return None if self.a_fermer else self.trames.pop(0)
+
+
+class Hub:
+    """
+    Diffusion par utilisateur vers les connexions ouvertes.
+
+    Les abonnements vivent dans la boucle asyncio du serveur ASGI ; `publier`
+    peut être appelé de n'importe quel thread (signaux, worker de l'outbox) :
+    rien n'est fait pour les utilisateurs sans connexion, sinon la trame est
+    encodée une fois et remise dans la boucle. Une connexion dont la file est
+    pleine est fermée : le client se reconnecte avec
+    Last-Event-ID et rattrape les notifications manquées depuis la base.
+    Un seul minuteur envoie le battement de cœur à toutes les connexions.
+
+    Avec un relais (NOTIFICATION_STREAM_RELAY_URL), `publier` passe par un canal
+    Redis pub/sub : un thread d'écoute, démarré à la première connexion, remet
+    dans la boucle les événements de tous les processus, celui-ci compris.
+    Relais indisponible : diffusion aux seules connexions du processus.
+    """
+
+    def __init__(self, taille_file=None, battement=None, relais=None, canal=None):
+        self.taille_file = taille_file or settings.NOTIFICATION_STREAM_MAX_PENDING
+        self.battement = battement if battement is not None else settings.NOTIFICATION_STREAM_HEARTBEAT
+        self.relais = relais if relais is not None else settings.NOTIFICATION_STREAM_RELAY_URL
+        self.canal = canal or settings.NOTIFICATION_STREAM_RELAY_CHANNEL
+        self._abonnes = {}          # user_id → set d'Abonnement (modifié dans la boucle uniquement)
+        self._boucle = None
+        self._minuteur = None
+        self._client = None         # connexion Redis de publication
+        self._pubsub = None
+        self._ecoute = None         # thread d'écoute du relais
+        self._arret = False
+        self._lock = threading.Lock()
+        self.relais_pret = threading.Event()
+        self.remises = 0
+        self.decroches = 0
+
+    @property
+    def connexions(self):
+        return sum(len(abonnements) for abonnements in list(self._abonnes.values()))
+
+    # ----- dans la boucle -----
+
+    def abonner(self, user_id):
+        boucle = asyncio.get_running_loop()
+        if boucle is not self._boucle:
+            self._boucle = boucle
+            self._minuteur = None
+        abonnement = Abonnement(user_id, self.taille_file)
+        self._abonnes.setdefault(user_id, set()).add(abonnement)
+        if self._minuteur is None and self.battement:
+            self._minuteur = boucle.call_later(self.battement, self._battre)
+        if self.relais and self._ecoute is None:
+            self._ecoute = threading.Thread(target=self._ecouter, name='notifications-relais', daemon=True)
+            self._ecoute.start()
+        return abonnement
+
+    def desabonner(self, abonnement):
+        abonnements = self._abonnes.get(abonnement.user_id)
+        if abonnements is not None:
+            abonnements.discard(abonnement)
+            if not abonnements:
+                del self._abonnes[abonnement.user_id]
+
+    def _remettre(self, user_ids, trame):
+        for user_id in user_ids:
+            for abonnement in list(self._abonnes.get(user_id, ())):
+                if abonnement.deposer(trame):
+                    self.remises += 1
+                elif not abonnement.a_fermer:
+                    abonnement.fermer()
+                    self.decroches += 1
+                    logger.warning(f"⚠️ Flux notifications: connexion de l'utilisateur {user_id} en retard, fermée")
+
+    def _battre(self):
+        if not self._abonnes:
+            self._minuteur = None
+            return
+        for abonnements in self._abonnes.values():
+            for abonnement in abonnements:
+                if not abonnement.trames:
+                    abonnement.deposer(BATTEMENT)
+        self._minuteur = self._boucle.call_later(self.battement, self._battre)
+
+    # ----- depuis n'importe quel thread -----
+
+    def publier(self, user_ids, evenement, donnees, identifiant=None):
+        if self.relais:
+            user_ids = list(set(user_ids))
+            trame = evenement_sse(evenement, donnees, identifiant)
+            try:
+                self._redis().publish(self.canal, json.dumps({'user_ids': user_ids, 'trame': trame.decode()}))
+            except Exception as e:
+                logger.error(f"❌ Relais notifications indisponible, diffusion locale seulement: {e}")
+                self._diffuser(user_ids, lambda: trame)
+            return
+        self._diffuser(user_ids, lambda: evenement_sse(evenement, donnees, identifiant))
+
+    def _diffuser(self, user_ids, trame):
+        """Remettre aux connexions de ce processus ; `trame` n'est encodée que s'il y a des destinataires"""
+        cibles = [user_id for user_id in set(user_ids) if user_id in self._abonnes]
+        if not cibles or self._boucle is None:
+            return
+        trame = trame()
+        try:
+            if asyncio.get_running_loop() is self._boucle:
+                self._remettre(cibles, trame)
+                return
+        except RuntimeError:
+            pass
+        try:
+            self._boucle.call_soon_threadsafe(self._remettre, cibles, trame)
+        except RuntimeError:
+            # Boucle fermée (arrêt du serveur) : plus personne à prévenir
+            pass
+
+    # ----- relais entre processus -----
+
+    def _redis(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import redis
+                    self._client = redis.Redis.from_url(self.relais)
+        return self._client
+
+    def _ecouter(self):
+        """Thread d'écoute : les événements manqués pendant une coupure sont rattrapés par Last-Event-ID"""
+        delai = 0.5
+        while not self._arret:
+            try:
+                self._pubsub = self._redis().pubsub()
+                self._pubsub.subscribe(self.canal)
+                for message in self._pubsub.listen():
+                    if message['type'] == 'subscribe':
+                        delai = 0.5
+                        self.relais_pret.set()
+                    elif message['type'] == 'message':
+                        contenu = json.loads(message['data'])
+                        trame = contenu['trame'].encode()
+                        self._diffuser(contenu['user_ids'], lambda: trame)
+            except Exception as e:
+                if self._arret:
+                    break
+                self.relais_pret.clear()
+                logger.warning(f"⚠️ Relais notifications: écoute interrompue ({e}), reconnexion dans {delai:.1f} s")
+                time.sleep(delai)
+                delai = min(delai * 2, 30)
+
+    def arreter_relais(self):
+        """Arrêter le thread d'écoute (tests, arrêt du serveur)"""
+        self._arret = True
+        if self._pubsub is not None:
+            self._pubsub.close()
+        if self._ecoute is not None:
+            self._ecoute.join(timeout=5)
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub():
+    """Hub unique par processus (créé à la demande)"""
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                _hub = Hub()
+    return _hub
+
+
+def diffuser_apres_commit(user_ids, evenement, donnees, identifiant=None):
+    """Pousser un événement aux connexions de ces utilisateurs une fois la transaction validée"""
+    user_ids = [user_id for user_id in user_ids if user_id]
+    # Avec un relais, même un processus sans connexion publie pour les autres
+    hub = get_hub() if settings.NOTIFICATION_STREAM_RELAY_URL else _hub
+    if not user_ids or hub is None:
+        return
+    db_transaction.on_commit(lambda: hub.publier(user_ids, evenement, donnees, identifiant))
+
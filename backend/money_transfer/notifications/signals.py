@@ -1,9 +1,31 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from kyc.models import KYCDocument
+from .models import Notification
+from .services.boite import ajuster_non_lues
+from .services.temps_reel import diffuser_apres_commit, donnees_notification
 from .views import NotificationChannelFactory
 
 
+@receiver(post_save, sender=Notification)
+def compter_non_lues(sender, instance, created, **kwargs):
+    """Répercuter une création ou un changement de statut sur le compteur de non lues."""
+    non_lue = instance.__dict__.get('status') == Notification.Status.UNREAD
+    etait_non_lue = not created and getattr(instance, '_status_enregistre', None) == Notification.Status.UNREAD
+    if 'status' in instance.__dict__:
+        instance._status_enregistre = instance.status
+    if non_lue != etait_non_lue:
+        ajuster_non_lues({instance.user_id: 1 if non_lue else -1})
+    if created:
+        diffuser_apres_commit([instance.user_id], 'notification', donnees_notification(instance), instance.pk)
+
+
+@receiver(post_delete, sender=Notification)
+def decompter_non_lue_supprimee(sender, instance, **kwargs):
+    if instance.__dict__.get('status') == Notification.Status.UNREAD:
+        ajuster_non_lues({instance.user_id: -1})
+
+
 @receiver(post_save, sender=KYCDocument)
 def send_kyc_notification(sender, instance, created, **kwargs):
     """
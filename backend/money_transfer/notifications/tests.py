@@ -1,3 +1,409 @@
-from django.test import TestCase
+import asyncio
+import os
+import tempfile
+import threading
+import tracemalloc
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction as db_transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from money_transfer.serveur_redis_local import ServeurRedisLocal
+from transactions.models import CanalPaiement, StatutTransaction, Transaction
+from .models import Notification, NotificationInbox
+from .services import boite
+from .services.outbox import inserer
+from .services.dispatcher import CanalPush, CanalSMS, Dispatcher, Message, PoolCanal
+from .services.outbox import CANAL, CANAL_INCONNU, EXPEDITEUR, EXPEDITEUR_INCONNU, Intention, Outbox
+from .services.retention import archiver, lire_archive, restaurer
+from .services.serveurs_locaux import ConnexionSSE, ServeurPushLocal, ServeurSMSLocal
+from .services.temps_reel import Hub, get_hub
+
+User = get_user_model()
+
+
+@override_settings(NOTIFICATION_OUTBOX_MODE='sync')
+class OutboxTransactionsTests(TestCase):
+    """Notifications des transactions publiées au commit, sans requête dans les sauvegardes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.expediteur = User.objects.create_user(
+            phone_number='+221770000011', email='awa@example.com', first_name='Awa', last_name='Diop', password='x'
+        )
+        cls.destinataire = User.objects.create_user(
+            phone_number='+221770000012', email='moussa@example.com', first_name='Moussa', last_name='Fall',
+            password='x'
+        )
+        cls.canal = CanalPaiement.objects.create(
+            canal_name='Wave', type_canal='WAVE', country='Sénégal', fees_percentage=Decimal('1.00')
+        )
+
+    def creer(self):
+        return Transaction.objects.create(
+            expediteur_id=self.expediteur.pk, destinataire_id=self.destinataire.pk,
+            destinataire_phone=self.destinataire.phone_number, canal_paiement_id=self.canal.pk,
+            montantEnvoye=10000, montantConverti=9900, montantRecu=9900,
+        )
+
+    def test_notifications_creees_au_commit(self):
+        with self.captureOnCommitCallbacks() as rappels:
+            with CaptureQueriesContext(connection) as requetes:
+                transaction = self.creer()
+                transaction.statusTransaction = StatutTransaction.ENVOYE
+                transaction.save()
+                transaction.save()  # statut inchangé : rien de plus à notifier
+
+        self.assertFalse([r['sql'] for r in requetes if 'notifications_notification' in r['sql']])
+        self.assertFalse(Notification.objects.exists())
+
+        with CaptureQueriesContext(connection) as requetes:
+            for rappel in rappels:
+                rappel()
+        messages = dict(Notification.objects.filter(user=self.destinataire).values_list('title', 'message'))
+        self.assertEqual(Notification.objects.filter(user=self.expediteur).count(), 2)
+        self.assertEqual(set(messages), {"💰 Argent reçu", "💰 Retrait disponible", "💰 Argent à recevoir"})
+        self.assertIn('de Awa Diop.', messages["💰 Argent reçu"])
+        self.assertIn('via Wave.', Notification.objects.get(title="✅ Transaction envoyée").message)
+        self.assertEqual(Notification.objects.filter(auto_sent=True).count(), 5)
+        # Un lot par publication : noms, INSERT et compteurs de non lues groupés (+ savepoint)
+        self.assertLessEqual(len(requetes), 5 * len(rappels))
+
+    def test_noms_introuvables_remplaces(self):
+        inserer([
+            Intention(self.destinataire.pk, 'Sans expéditeur', f'Reçu de {EXPEDITEUR} via {CANAL}.'),
+            Intention(self.destinataire.pk, 'Supprimés', f'Reçu de {EXPEDITEUR} via {CANAL}.', 'INFO',
+                      expediteur_id=999999, canal_id=uuid.uuid4()),
+        ])
+
+        self.assertEqual(set(Notification.objects.values_list('message', flat=True)),
+                         {f"Reçu de {EXPEDITEUR_INCONNU} via {CANAL_INCONNU}."})
+
+    def test_rien_si_la_transaction_est_annulee(self):
+        with self.captureOnCommitCallbacks() as rappels:
+            try:
+                with db_transaction.atomic():
+                    self.creer()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(rappels, [])
+
+
+@override_settings(NOTIFICATION_OUTBOX_MODE='async')
+class OutboxWorkerTests(TransactionTestCase):
+    """Intentions validées insérées par lots par le worker de l'outbox"""
+
+    def test_insertion_par_lots(self):
+        expediteur = User.objects.create_user(
+            phone_number='+221770000021', email='awa@example.com', first_name='Awa', last_name='Diop', password='x'
+        )
+        outbox = Outbox(taille_lot=50, attente_max=0.2)
+        for i in range(120):
+            outbox.publier([Intention(expediteur.pk, f'Notification {i}', f'De {EXPEDITEUR}', 'INFO', expediteur.pk)])
+
+        self.assertTrue(outbox.vider(timeout=5))
+        self.assertEqual(Notification.objects.filter(message='De Awa Diop').count(), 120)
+        self.assertEqual(outbox.envoyees, 120)
+        self.assertLessEqual(outbox.lots, 4)
+
+
+class DispatcherCanauxTests(TestCase):
+    """Envoi par lots, réessais et routage sur les faux fournisseurs SMS et push"""
+
+    def test_sms_par_lots_du_fournisseur(self):
+        with ServeurSMSLocal(taille_max=100) as serveur:
+            pool = PoolCanal(CanalSMS(serveur.url), taille_lot=100, workers=2, attente_max=0.1)
+            messages = [Message(i, 1, 'Code', f'Message {i}', telephone='+221770000001') for i in range(250)]
+            messages.append(Message(250, 1, 'Code', 'Numéro invalide', telephone='inconnu'))
+            self.assertEqual(pool.soumettre(messages), 251)
+            self.assertTrue(pool.vider(timeout=5))
+
+        self.assertEqual(len(serveur.messages), 250)
+        self.assertTrue(all(taille <= 100 for taille in serveur.lots))
+        self.assertLessEqual(serveur.requetes, 6)
+        metriques = pool.metriques.instantane()
+        self.assertEqual((metriques['envoyes'], metriques['rejetes'], metriques['echecs']), (250, 1, 0))
+        self.assertIsNotNone(metriques['latence_ms']['p95'])
+
+    def test_reessais_avec_backoff(self):
+        with ServeurPushLocal() as serveur:
+            serveur.pannes_a_venir = 2
+            pool = PoolCanal(CanalPush(serveur.url), taille_lot=50, workers=1, attente_max=0.05,
+                             max_essais=4, delai=0.05)
+            pool.soumettre([Message(i, 1, 'Titre', 'Corps') for i in range(20)])
+            self.assertTrue(pool.vider(timeout=5))
+
+            self.assertEqual(len(serveur.messages), 20)
+            self.assertEqual(pool.metriques.echecs, 0)
+            self.assertGreaterEqual(pool.metriques.reessais, 2)
+
+            serveur.en_panne = True
+            pool.soumettre([Message(99, 1, 'Titre', 'Corps')])
+            self.assertTrue(pool.vider(timeout=5))
+        self.assertEqual(pool.metriques.echecs, 1)
+
+    def test_routage_par_type(self):
+        user = User.objects.create_user(
+            phone_number='+221770000031', email='awa@example.com', first_name='Awa', last_name='Diop', password='x'
+        )
+        notifications = [
+            Notification.objects.create(user=user, title='Argent reçu', message='10 000 XOF',
+                                        notification_type='TRANSACTION'),
+            Notification.objects.create(user=user, title='Bienvenue', message='Compte créé', notification_type='INFO'),
+        ]
+        with ServeurSMSLocal() as sms, ServeurPushLocal() as push:
+            dispatcher = Dispatcher(
+                {'sms': PoolCanal(CanalSMS(sms.url), taille_lot=100, workers=1),
+                 'push': PoolCanal(CanalPush(push.url), taille_lot=500, workers=1)},
+                routes={'TRANSACTION': ['sms', 'push'], 'INFO': ['push']},
+            )
+            with self.assertNumQueries(1):
+                self.assertEqual(dispatcher.distribuer(notifications), {'sms': 1, 'push': 2})
+            self.assertTrue(dispatcher.vider(timeout=5))
+
+        self.assertEqual(sms.messages, [{'to': '+221770000031', 'text': 'Argent reçu: 10 000 XOF'}])
+        self.assertEqual([m['title'] for m in push.messages], ['Argent reçu', 'Bienvenue'])
+        self.assertEqual(dispatcher.metriques()['push']['envoyes'], 2)
+
+
+class BoiteNotificationsTests(TestCase):
+    """Compteur de non lues tenu à jour, badge sans COUNT, lecture en masse et pagination par curseur"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            phone_number='+221770000041', email='awa@example.com', first_name='Awa', last_name='Diop', password='x'
+        )
+
+    def setUp(self):
+        self.client = APIClient(SERVER_NAME='localhost')
+        self.client.force_authenticate(self.user)
+
+    def badge(self):
+        return self.client.get('/api/notifications/unread_count/').json()['unread_count']
+
+    def test_compteur_de_non_lues(self):
+        Notification.objects.create(user=self.user, title='Avant le premier badge', message='...')
+        self.assertEqual(self.badge(), 1)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.badge(), 1)
+
+        lue = Notification.objects.create(user=self.user, title='Une', message='...')
+        inserer([Intention(self.user.pk, f'Outbox {i}', '...') for i in range(3)])
+        self.assertEqual(self.badge(), 5)
+
+        self.client.patch(f'/api/notifications/{lue.pk}/read/')
+        self.client.patch(f'/api/notifications/{lue.pk}/read/')
+        self.assertEqual(self.badge(), 4)
+
+        with self.assertNumQueries(5):  # UPDATE notifications et compteur (savepoint), puis badge
+            reponse = self.client.post('/api/notifications/mark_all_read/')
+        self.assertEqual(reponse.json(), {'marked': 4, 'unread_count': 0})
+        self.assertFalse(Notification.objects.filter(status=Notification.Status.UNREAD).exists())
+
+        Notification.objects.create(user=self.user, title='Après', message='...')
+        Notification.objects.filter(title='Après').delete()
+        self.assertEqual(NotificationInbox.objects.get(user=self.user).unread_count, 0)
+
+    def test_creation_pendant_le_premier_comptage(self):
+        Notification.objects.create(user=self.user, title='Avant le premier badge', message='...')
+        compter = boite._compter
+
+        def compter_puis_creer(user_ids):
+            # Notification créée entre le comptage et l'écriture du compteur, avant que la ligne existe
+            comptes = compter(user_ids)
+            if not NotificationInbox.objects.filter(user=self.user).exists():
+                Notification.objects.create(user=self.user, title='Pendant le comptage', message='...')
+            return comptes
+
+        with mock.patch.object(boite, '_compter', side_effect=compter_puis_creer):
+            self.assertEqual(self.badge(), 2)
+        self.assertEqual(self.badge(), 2)
+
+    def test_pagination_par_curseur(self):
+        Notification.objects.bulk_create(
+            [Notification(user=self.user, title=f'Notification {i}', message='...') for i in range(25)]
+        )
+        titres = []
+        url = '/api/notifications/?page_size=10'
+        while url:
+            page = self.client.get(url).json()
+            titres.extend(n['title'] for n in page['results'])
+            url = page['next']
+        self.assertEqual(titres, [f'Notification {i}' for i in reversed(range(25))])
+
+
+class RetentionNotificationsTests(TestCase):
+    """Archivage par chunks des notifications lues anciennes, puis restauration à l'identique"""
+
+    def test_archiver_puis_restaurer(self):
+        user = User.objects.create_user(
+            phone_number='+221770000051', email='fatou@example.com', first_name='Fatou', last_name='Sow', password='x'
+        )
+        Notification.objects.bulk_create([
+            Notification(user=user, title=f'Lue {i}', message='...', status=Notification.Status.READ)
+            for i in range(7)
+        ] + [
+            Notification(user=user, title='Ancienne non lue', message='...'),
+            Notification(user=user, title='Récente lue', message='...', status=Notification.Status.READ),
+        ])
+        il_y_a_un_an = timezone.now() - timedelta(days=365)
+        Notification.objects.exclude(title='Récente lue').update(created_at=il_y_a_un_an)
+        self.client = APIClient(SERVER_NAME='localhost')
+        self.client.force_authenticate(user)
+        self.assertEqual(self.client.get('/api/notifications/unread_count/').json()['unread_count'], 1)
+        originales = {n['id']: n for n in Notification.objects.filter(title__startswith='Lue ').values()}
+
+        with tempfile.TemporaryDirectory() as dossier:
+            rapport = archiver(timezone.now() - timedelta(days=90), dossier, taille_chunk=3)
+            self.assertEqual((rapport.archivees, rapport.supprimees), (7, 7))
+            self.assertEqual(sorted(os.listdir(dossier)), [os.path.basename(rapport.fichier)])
+            self.assertEqual(sorted(ligne['id'] for _, ligne in lire_archive(rapport.fichier)), sorted(originales))
+            self.assertEqual(
+                set(Notification.objects.values_list('title', flat=True)), {'Ancienne non lue', 'Récente lue'}
+            )
+            self.assertFalse(archiver(timezone.now() - timedelta(days=90), dossier).fichier)
+
+            rapport = restaurer(rapport.fichier, taille_chunk=3)
+            self.assertEqual((rapport.lues, rapport.restaurees), (7, 7))
+            self.assertEqual(restaurer(os.path.join(dossier, os.listdir(dossier)[0])).deja_presentes, 7)
+
+        restaurees = {n['id']: n for n in Notification.objects.filter(title__startswith='Lue ').values()}
+        self.assertEqual(restaurees, originales)
+        self.assertEqual(self.client.get('/api/notifications/unread_count/').json()['unread_count'], 1)
+
+
+class HubTempsReelTests(TestCase):
+    """10 000 connexions inactives dans un processus : diffusion ciblée et mémoire par connexion ; relais entre processus"""
+
+    def test_dix_mille_abonnes(self):
+        async def scenario():
+            hub = Hub(taille_file=10, battement=0)
+            tracemalloc.start()
+            avant = tracemalloc.get_traced_memory()[0]
+            abonnements = [hub.abonner(i % 5000) for i in range(10000)]
+            memoire = (tracemalloc.get_traced_memory()[0] - avant) / len(abonnements)
+            tracemalloc.stop()
+
+            # Publication depuis un autre thread, comme un signal au commit
+            publication = threading.Thread(target=hub.publier, args=(range(100), 'notification', {'title': 'Test'}, 1))
+            publication.start()
+            publication.join()
+            await asyncio.sleep(0)
+            recus = [a for a in abonnements if a.trames]
+
+            for abonnement in abonnements:
+                hub.desabonner(abonnement)
+            return memoire, recus, hub
+
+        memoire, recus, hub = asyncio.run(scenario())
+        self.assertEqual(len(recus), 200)
+        self.assertEqual({a.user_id for a in recus}, set(range(100)))
+        self.assertIn(b'event: notification', recus[0].trames[0])
+        self.assertEqual(hub.connexions, 0)
+        self.assertLess(memoire, 1024)
+
+
+    def test_relais_entre_processus(self):
+        with ServeurRedisLocal() as serveur:
+            # Deux workers : le premier publie, seul le second a la connexion de l'utilisateur
+            worker_1 = Hub(battement=0, relais=serveur.url)
+            worker_2 = Hub(battement=0, relais=serveur.url)
+
+            async def scenario():
+                abonnement = worker_2.abonner(7)
+                self.assertTrue(await asyncio.to_thread(worker_2.relais_pret.wait, 5))
+                await asyncio.to_thread(worker_1.publier, [7, 8], 'notification', {'title': 'Relayée'}, 1)
+                return await asyncio.wait_for(abonnement.suivant(), 5)
+
+            try:
+                trame = asyncio.run(scenario())
+            finally:
+                worker_2.arreter_relais()
+
+        self.assertIn('"title": "Relayée"', trame.decode())
+        self.assertEqual(worker_2.remises, 1)
+
+
+@override_settings(NOTIFICATION_OUTBOX_MODE='sync')
+class FluxNotificationsTests(TransactionTestCase):
+    """Flux SSE par l'application ASGI : notifications et statuts poussés au commit, rattrapage par Last-Event-ID"""
+
+    async def test_flux_utilisateur(self):
+        from money_transfer.asgi import application
+
+        user = await sync_to_async(User.objects.create_user)(
+            phone_number='+221770000051', email='awa@example.com', first_name='Awa', last_name='Diop', password='x'
+        )
+        canal = await CanalPaiement.objects.acreate(
+            canal_name='Wave', type_canal='WAVE', country='Sénégal', fees_percentage=Decimal('1.00')
+        )
+        refusee = await ConnexionSSE(application, '/api/notifications/stream/').ouvrir()
+        self.assertEqual(refusee.statut, 401)
+
+        jeton = f'token={AccessToken.for_user(user)}'
+        connexion = await ConnexionSSE(application, '/api/notifications/stream/', jeton).ouvrir()
+        self.assertEqual(connexion.statut, 200)
+        await connexion.lire('retry:')
+
+        notification = await sync_to_async(Notification.objects.create)(user=user, title='Bienvenue', message='...')
+        self.assertIn(f'id: {notification.pk}', await connexion.lire('event: notification'))
+
+        transaction = await sync_to_async(Transaction.objects.create)(
+            expediteur=user, destinataire_phone='+221770000052', canal_paiement=canal,
+            montantEnvoye=10000, montantConverti=9900, montantRecu=9900,
+        )
+        transaction.statusTransaction = StatutTransaction.ENVOYE
+        await sync_to_async(transaction.save)()
+        self.assertIn(transaction.codeTransaction, await connexion.lire('"statut": "ENVOYE"'))
+        await connexion.fermer()
+        self.assertEqual(get_hub().connexions, 0)
+
+        # Reconnexion : notifications manquées renvoyées depuis la base
+        connexion = await ConnexionSSE(application, '/api/notifications/stream/', jeton,
+                                       headers=[('Last-Event-ID', str(notification.pk))]).ouvrir()
+        self.assertIn('event: notification', await connexion.lire('💸 Transaction initiée'))
+        await connexion.fermer()
+
+    @override_settings(CORS_ALLOW_ALL_ORIGINS=False, CORS_ALLOWED_ORIGINS=['http://localhost:3000'])
+    async def test_cors_comme_le_middleware(self):
+        from money_transfer.asgi import application
+
+        user = await sync_to_async(User.objects.create_user)(
+            phone_number='+221770000053', email='cors@example.com', first_name='Moussa', last_name='Ndiaye', password='x'
+        )
+        chemin = '/api/notifications/stream/'
+        origine = [('Origin', 'http://localhost:3000')]
+
+        refusee = await ConnexionSSE(application, chemin, headers=origine).ouvrir()
+        self.assertEqual(refusee.statut, 401)
+        self.assertEqual(refusee.entetes['access-control-allow-origin'], 'http://localhost:3000')
+        self.assertEqual(refusee.entetes['access-control-allow-credentials'], 'true')
+
+        etrangere = await ConnexionSSE(application, chemin, headers=[('Origin', 'https://ailleurs.example')]).ouvrir()
+        self.assertNotIn('access-control-allow-origin', etrangere.entetes)
+
+        preflight = await ConnexionSSE(application, chemin, method='OPTIONS', headers=origine + [
+            ('Access-Control-Request-Method', 'GET'), ('Access-Control-Request-Headers', 'authorization'),
+        ]).ouvrir()
+        self.assertEqual(preflight.statut, 200)
+        self.assertIn('authorization', preflight.entetes['access-control-allow-headers'])
+        self.assertIn('GET', preflight.entetes['access-control-allow-methods'])
+
+        connexion = await ConnexionSSE(application, chemin, f'token={AccessToken.for_user(user)}',
+                                       headers=origine).ouvrir()
+        self.assertEqual(connexion.statut, 200)
+        self.assertEqual(connexion.entetes['access-control-allow-origin'], 'http://localhost:3000')
+        await connexion.fermer()
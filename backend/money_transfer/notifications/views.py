@@ -1,9 +1,13 @@
 from rest_framework import viewsets, permissions, status, generics, mixins
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db import transaction as db_transaction
 from django.utils import timezone
 from .models import Notification
+from .pagination import NotificationCursorPagination
 from .serializers import NotificationSerializer, AdminNotificationSerializer
+from .services.boite import non_lues, tout_marquer_lu
+from .services.dispatcher import distribuer, get_dispatcher
 
 
 class IsOwnerOrAdmin(permissions.BasePermission):
@@ -33,13 +37,14 @@ class NotificationViewSet(mixins.ListModelMixin,
     """
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NotificationCursorPagination
     
     def get_queryset(self):
         user = self.request.user
         # L'administrateur peut voir toutes les notifications, les utilisateurs réguliers ne voient que les leurs
         if user.is_staff:
-            return Notification.objects.all().order_by('-created_at')
-        return Notification.objects.filter(user=user).order_by('-created_at')
+            return Notification.objects.all().order_by('-created_at', '-id')
+        return Notification.objects.filter(user=user).order_by('-created_at', '-id')
     
     def get_serializer_class(self):
         if self.request.method == 'POST' and self.request.user.is_staff:
@@ -71,6 +76,26 @@ class NotificationViewSet(mixins.ListModelMixin,
         serializer = self.get_serializer(notification)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        """Badge : nombre de notifications non lues de l'utilisateur (compteur, sans COUNT)."""
+        return Response({'unread_count': non_lues(request.user.pk)})
+    
+    @action(detail=False, methods=['post'])
+    def mark_all_read(self, request):
+        """Marquer toutes les notifications de l'utilisateur comme lues (un seul UPDATE)."""
+        return Response({'marked': tout_marquer_lu(request.user.pk), 'unread_count': non_lues(request.user.pk)})
+    
+    @action(detail=False, methods=['get'])
+    def canaux(self, request):
+        """Débit, latences et erreurs par canal réseau (administrateurs uniquement)."""
+        if not request.user.is_staff:
+            return Response(
+                {'detail': 'Vous n\'avez pas la permission de consulter les canaux de notification.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return Response(get_dispatcher().metriques())
+
 
 # Classe de base abstraite pour les canaux de notification
 class NotificationChannel:
@@ -85,15 +110,32 @@ class NotificationChannel:
 
 class DatabaseNotificationChannel(NotificationChannel):
     """Implémentation du canal de notification en base de données."""
+    # Canaux réseau forcés (None : routes par type, NOTIFICATION_ROUTES)
+    canaux = None
+
     def send(self, user, title, message, notification_type='INFO'):
-        """Créer une notification dans la base de données."""
-        return Notification.objects.create(
+        """Créer une notification dans la base de données, puis l'envoyer sur les canaux réseau au commit."""
+        notification = Notification.objects.create(
             user=user,
             title=title,
             message=message,
             notification_type=notification_type,
             auto_sent=True
         )
+        # Envoi par les workers des canaux : jamais d'appel réseau dans la requête
+        telephones = {user.pk: user.phone_number}
+        db_transaction.on_commit(lambda: distribuer([notification], self.canaux, telephones))
+        return notification
+
+
+class SMSNotificationChannel(DatabaseNotificationChannel):
+    """Notification en base de données, envoyée par SMS uniquement."""
+    canaux = ('sms',)
+
+
+class PushNotificationChannel(DatabaseNotificationChannel):
+    """Notification en base de données, envoyée en push mobile uniquement."""
+    canaux = ('push',)
 
 
 # Fabrique pour obtenir des canaux de notification
@@ -104,9 +146,9 @@ class NotificationChannelFactory:
         """Obtenir un canal de notification par type."""
         channels = {
             'database': DatabaseNotificationChannel,
-            # Ajouter plus de canaux ici au fur et à mesure de leur implémentation
-            # 'sms': SMSNotificationChannel,
-            # 'fcm': FCMNotificationChannel,
+            'sms': SMSNotificationChannel,
+            'push': PushNotificationChannel,
+            # Ajouter plus de canaux ici (et dans services.dispatcher.CANAUX)
         }
         
         channel_class = channels.get(channel_type.lower())
@@ -0,0 +1,65 @@
+import asyncio
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from payment_gateways.services import PaymentProcessingService
+
+
+class Command(BaseCommand):
+    help = 'Comparer les chemins synchrone et asynchrone des gateways simulés'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--paiements', type=int, default=500, help='Nombre de paiements simultanés')
+        parser.add_argument('--threads', type=int, default=50,
+                            help='Workers du chemin synchrone (équivalent workers WSGI)')
+        parser.add_argument('--latence', type=float, default=0.1,
+                            help='Facteur appliqué aux délais des simulateurs (1.0 = délais réels)')
+
+    def handle(self, *args, **options):
+        nb_paiements = options['paiements']
+        self.stdout.write(f'📈 Benchmark gateways : {nb_paiements} paiements simultanés...')
+
+        # Les logs par paiement fausseraient la mesure
+        logging.getLogger('payment_gateways.services').disabled = True
+
+        service = PaymentProcessingService()
+        for gateway in service.gateways.values():
+            gateway.latency_factor = options['latence']
+
+        payments = [
+            {
+                'gateway_type': random.choice(['WAVE', 'ORANGE_MONEY']),
+                'phone': f'+22177{i:07d}',
+                'amount': Decimal('5000'),
+                'reference': f'BENCH{i:06d}',
+            }
+            for i in range(nb_paiements)
+        ]
+
+        # ===== CHEMIN SYNCHRONE =====
+        debut = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            sync_responses = list(pool.map(lambda p: service.process_payment(**p), payments))
+        duree_sync = time.perf_counter() - debut
+
+        # ===== CHEMIN ASYNCHRONE =====
+        debut = time.perf_counter()
+        async_responses = asyncio.run(service.aprocess_many(payments))
+        duree_async = time.perf_counter() - debut
+
+        self.stdout.write('')
+        self._afficher(f"sync ({options['threads']} threads)", sync_responses, duree_sync)
+        self._afficher('async (1 boucle)', async_responses, duree_async)
+        self.stdout.write(self.style.SUCCESS(f'✅ Accélération : x{duree_sync / duree_async:.1f}'))
+
+    def _afficher(self, label, responses, duree):
+        succes = sum(1 for r in responses if r.success)
+        self.stdout.write(
+            f'  {label:<20} {len(responses) / duree:8.1f} paiements/s  '
+            f'({duree:.2f}s, {succes}/{len(responses)} succès)'
+        )
@@ -1,5 +1,6 @@
 # payment_gateways/services.py - VERSION CORRIGÉE
 
+import asyncio
 import time
 import random
 import uuid
@@ -10,6 +11,8 @@ from dataclasses import dataclass
 from enum import Enum
 import logging
 
+from asgiref.sync import sync_to_async
+
 logger = logging.getLogger(__name__)
 
 class PaymentStatus(Enum):
@@ -41,6 +44,8 @@ class BasePaymentGateway:
         self.name = "Base Gateway"
         self.is_active = True
         self.timeout_seconds = 30
+        # Facteur appliqué aux temps de réponse simulés (1.0 = réaliste, 0 = instantané)
+        self.latency_factor = 1.0
         
     def process_payment(self, phone: str, amount: Decimal, reference: str) -> PaymentResponse:
         """Traiter un paiement - à implémenter par chaque gateway"""
@@ -49,6 +54,18 @@ class BasePaymentGateway:
     def check_status(self, gateway_reference: str) -> PaymentResponse:
         """Vérifier le statut d'un paiement"""
         raise NotImplementedError
+    
+    # ===== CONTRAT ASYNCHRONE (ASGI) =====
+    # Par défaut, les versions async délèguent à la version bloquante dans un thread ;
+    # les gateways qui le peuvent les surchargent avec des appels réellement non bloquants.
+    
+    async def aprocess_payment(self, phone: str, amount: Decimal, reference: str) -> PaymentResponse:
+        """Traiter un paiement sans bloquer la boucle d'événements"""
+        return await sync_to_async(self.process_payment, thread_sensitive=False)(phone, amount, reference)
+    
+    async def acheck_status(self, gateway_reference: str) -> PaymentResponse:
+        """Vérifier le statut d'un paiement sans bloquer la boucle d'événements"""
+        return await sync_to_async(self.check_status, thread_sensitive=False)(gateway_reference)
         
     def validate_phone(self, phone: str) -> bool:
         """Valider le format du numéro selon le gateway"""
@@ -94,6 +111,24 @@ class WaveSimulator(BasePaymentGateway):
     
     def process_payment(self, phone: str, amount: Decimal, reference: str) -> PaymentResponse:
         """Simuler un paiement Wave"""
+        amount, refus, processing_time = self._preparer_paiement(phone, amount, reference)
+        if refus:
+            return refus
+        
+        time.sleep(processing_time * self.latency_factor)
+        return self._resultat_paiement(phone, amount, reference, processing_time)
+    
+    async def aprocess_payment(self, phone: str, amount: Decimal, reference: str) -> PaymentResponse:
+        """Simuler un paiement Wave sans bloquer la boucle d'événements"""
+        amount, refus, processing_time = self._preparer_paiement(phone, amount, reference)
+        if refus:
+            return refus
+        
+        await asyncio.sleep(processing_time * self.latency_factor)
+        return self._resultat_paiement(phone, amount, reference, processing_time)
+    
+    def _preparer_paiement(self, phone: str, amount: Decimal, reference: str):
+        """Valider la demande et tirer le temps de traitement simulé : (amount, refus, processing_time)"""
         logger.info(f"🌊 Wave API: Processing payment {reference} - {amount} XOF to {phone}")
         
         # Convertir amount en Decimal
@@ -103,7 +138,7 @@ class WaveSimulator(BasePaymentGateway):
         # Validation du numéro
         if not self.validate_phone(phone):
             logger.warning(f"🌊 Wave API: Invalid phone number {phone}")
-            return PaymentResponse(
+            return amount, PaymentResponse(
                 success=False,
                 transaction_id=reference,
                 gateway_reference="",
@@ -112,12 +147,12 @@ class WaveSimulator(BasePaymentGateway):
                 currency="XOF",
                 message="Numéro de téléphone invalide pour Wave",
                 error_code="INVALID_PHONE_NUMBER"
-            )
+            ), 0
         
         # Validation du montant
         if amount < Decimal('100') or amount > Decimal('500000'):
             logger.warning(f"🌊 Wave API: Amount {amount} out of range")
-            return PaymentResponse(
+            return amount, PaymentResponse(
                 success=False,
                 transaction_id=reference,
                 gateway_reference="",
@@ -126,13 +161,15 @@ class WaveSimulator(BasePaymentGateway):
                 currency="XOF",
                 message="Montant hors limites Wave (100 - 500,000 XOF)",
                 error_code="AMOUNT_OUT_OF_RANGE"
-            )
+            ), 0
         
         # Simuler le temps de traitement réseau
         processing_time = random.uniform(1.5, 4.0)
         logger.info(f"🌊 Wave API: Processing time: {processing_time:.2f}s")
-        time.sleep(processing_time)
-        
+        return amount, None, processing_time
+    
+    def _resultat_paiement(self, phone: str, amount: Decimal, reference: str, processing_time: float) -> PaymentResponse:
+        """Construire la réponse Wave une fois le traitement simulé écoulé"""
         # Générer référence Wave
         wave_ref = f"WAVE_{datetime.now().strftime('%Y%m%d')}_{uuid.uuid4().hex[:8].upper()}"
         
@@ -212,8 +249,19 @@ class WaveSimulator(BasePaymentGateway):
         logger.info(f"🌊 Wave API: Checking status for {gateway_reference}")
         
         # Simuler vérification de statut
-        time.sleep(random.uniform(0.3, 1.0))
+        time.sleep(random.uniform(0.3, 1.0) * self.latency_factor)
         
+        return self._resultat_statut(gateway_reference)
+    
+    async def acheck_status(self, gateway_reference: str) -> PaymentResponse:
+        """Vérifier le statut d'une transaction Wave sans bloquer la boucle d'événements"""
+        logger.info(f"🌊 Wave API: Checking status for {gateway_reference}")
+        await asyncio.sleep(random.uniform(0.3, 1.0) * self.latency_factor)
+        
+        return self._resultat_statut(gateway_reference)
+    
+    def _resultat_statut(self, gateway_reference: str) -> PaymentResponse:
+        """Réponse de vérification de statut Wave"""
         return PaymentResponse(
             success=True,
             transaction_id="",
@@ -269,6 +317,24 @@ class OrangeMoneySimulator(BasePaymentGateway):
     
     def process_payment(self, phone: str, amount: Decimal, reference: str) -> PaymentResponse:
         """Simuler un paiement Orange Money"""
+        amount, refus, processing_time = self._preparer_paiement(phone, amount, reference)
+        if refus:
+            return refus
+        
+        time.sleep(processing_time * self.latency_factor)
+        return self._resultat_paiement(phone, amount, reference, processing_time)
+    
+    async def aprocess_payment(self, phone: str, amount: Decimal, reference: str) -> PaymentResponse:
+        """Simuler un paiement Orange Money sans bloquer la boucle d'événements"""
+        amount, refus, processing_time = self._preparer_paiement(phone, amount, reference)
+        if refus:
+            return refus
+        
+        await asyncio.sleep(processing_time * self.latency_factor)
+        return self._resultat_paiement(phone, amount, reference, processing_time)
+    
+    def _preparer_paiement(self, phone: str, amount: Decimal, reference: str):
+        """Valider la demande et tirer le temps de traitement simulé : (amount, refus, processing_time)"""
         logger.info(f"🍊 Orange Money API: Processing payment {reference} - {amount} XOF to {phone}")
         
         # Convertir amount en Decimal
@@ -278,7 +344,7 @@ class OrangeMoneySimulator(BasePaymentGateway):
         # Validation du numéro
         if not self.validate_phone(phone):
             logger.warning(f"🍊 Orange Money API: Invalid phone number {phone}")
-            return PaymentResponse(
+            return amount, PaymentResponse(
                 success=False,
                 transaction_id=reference,
                 gateway_reference="",
@@ -287,12 +353,12 @@ class OrangeMoneySimulator(BasePaymentGateway):
                 currency="XOF",
                 message="Numéro de téléphone invalide pour Orange Money",
                 error_code="INVALID_MSISDN"
-            )
+            ), 0
         
         # Validation du montant
         if amount < Decimal('500') or amount > Decimal('750000'):
             logger.warning(f"🍊 Orange Money API: Amount {amount} out of range")
-            return PaymentResponse(
+            return amount, PaymentResponse(
                 success=False,
                 transaction_id=reference,
                 gateway_reference="",
@@ -301,13 +367,15 @@ class OrangeMoneySimulator(BasePaymentGateway):
                 currency="XOF",
                 message="Montant hors limites Orange Money (500 - 750,000 XOF)",
                 error_code="AMOUNT_NOT_ALLOWED"
-            )
+            ), 0
         
         # Simuler le temps de traitement (Orange plus lent)
         processing_time = random.uniform(2.0, 5.5)
         logger.info(f"🍊 Orange Money API: Processing time: {processing_time:.2f}s")
-        time.sleep(processing_time)
-        
+        return amount, None, processing_time
+    
+    def _resultat_paiement(self, phone: str, amount: Decimal, reference: str, processing_time: float) -> PaymentResponse:
+        """Construire la réponse Orange Money une fois le traitement simulé écoulé"""
         # Générer référence Orange Money
         om_ref = f"OM{datetime.now().strftime('%Y%m%d%H%M')}{random.randint(1000, 9999)}"
         
@@ -390,8 +458,19 @@ class OrangeMoneySimulator(BasePaymentGateway):
         logger.info(f"🍊 Orange Money API: Checking status for {gateway_reference}")
         
         # Simuler vérification de statut (plus lent)
-        time.sleep(random.uniform(0.5, 1.5))
+        time.sleep(random.uniform(0.5, 1.5) * self.latency_factor)
+        
+        return self._resultat_statut(gateway_reference)
+    
+    async def acheck_status(self, gateway_reference: str) -> PaymentResponse:
+        """Vérifier le statut d'une transaction Orange Money sans bloquer la boucle d'événements"""
+        logger.info(f"🍊 Orange Money API: Checking status for {gateway_reference}")
+        await asyncio.sleep(random.uniform(0.5, 1.5) * self.latency_factor)
         
+        return self._resultat_statut(gateway_reference)
+    
+    def _resultat_statut(self, gateway_reference: str) -> PaymentResponse:
+        """Réponse de vérification de statut Orange Money"""
         return PaymentResponse(
             success=True,
             transaction_id="",
@@ -438,9 +517,13 @@ class PaymentProcessingService:
     
     def _load_gateways(self):
         """Charger tous les gateways disponibles"""
+        from django.conf import settings
+        latency_factor = getattr(settings, 'PAYMENT_SIMULATOR_LATENCY_FACTOR', 1.0)
+        
         for gateway_type in PaymentGatewayFactory.get_available_gateways():
             try:
                 gateway = PaymentGatewayFactory.create_gateway(gateway_type)
+                gateway.latency_factor = latency_factor
                 self.gateways[gateway_type] = gateway
                 logger.info(f"✅ Payment Gateway {gateway_type} loaded successfully")
             except Exception as e:
@@ -449,17 +532,7 @@ class PaymentProcessingService:
     def process_payment(self, gateway_type: str, phone: str, amount: Decimal, reference: str) -> PaymentResponse:
         """Traiter un paiement via le gateway spécifié"""
         if gateway_type not in self.gateways:
-            logger.error(f"Gateway {gateway_type} not available")
-            return PaymentResponse(
-                success=False,
-                transaction_id=reference,
-                gateway_reference="",
-                status=PaymentStatus.FAILED,
-                amount=amount,
-                currency="XOF",
-                message=f"Gateway {gateway_type} non disponible",
-                error_code="GATEWAY_NOT_AVAILABLE"
-            )
+            return self._gateway_indisponible(gateway_type, amount, reference)
         
         gateway = self.gateways[gateway_type]
         
@@ -468,35 +541,84 @@ class PaymentProcessingService:
             return gateway.process_payment(phone, amount, reference)
             
         except Exception as e:
-            logger.error(f"❌ Payment processing error in {gateway_type}: {e}")
-            return PaymentResponse(
-                success=False,
-                transaction_id=reference,
-                gateway_reference="",
-                status=PaymentStatus.FAILED,
-                amount=amount,
-                currency="XOF",
-                message=f"Erreur technique {gateway_type}: {str(e)}",
-                error_code="TECHNICAL_ERROR"
-            )
+            return self._erreur_technique(gateway_type, e, amount, reference)
     
     def check_payment_status(self, gateway_type: str, gateway_reference: str) -> PaymentResponse:
         """Vérifier le statut d'un paiement"""
         if gateway_type not in self.gateways:
-            return PaymentResponse(
-                success=False,
-                transaction_id="",
-                gateway_reference=gateway_reference,
-                status=PaymentStatus.FAILED,
-                amount=Decimal('0'),
-                currency="XOF",
-                message=f"Gateway {gateway_type} non disponible",
-                error_code="GATEWAY_NOT_AVAILABLE"
-            )
+            return self._gateway_indisponible(gateway_type, Decimal('0'), "", gateway_reference)
         
         gateway = self.gateways[gateway_type]
         return gateway.check_status(gateway_reference)
     
+    # ===== CHEMIN ASYNCHRONE =====
+    
+    async def aprocess_payment(self, gateway_type: str, phone: str, amount: Decimal, reference: str) -> PaymentResponse:
+        """Traiter un paiement via le gateway spécifié sans bloquer la boucle d'événements"""
+        if gateway_type not in self.gateways:
+            return self._gateway_indisponible(gateway_type, amount, reference)
+        
+        gateway = self.gateways[gateway_type]
+        
+        try:
+            logger.info(f"🚀 Processing payment via {gateway_type} (async): {amount} XOF to {phone}")
+            return await gateway.aprocess_payment(phone, amount, reference)
+            
+        except Exception as e:
+            return self._erreur_technique(gateway_type, e, amount, reference)
+    
+    async def acheck_payment_status(self, gateway_type: str, gateway_reference: str) -> PaymentResponse:
+        """Vérifier le statut d'un paiement sans bloquer la boucle d'événements"""
+        if gateway_type not in self.gateways:
+            return self._gateway_indisponible(gateway_type, Decimal('0'), "", gateway_reference)
+        
+        gateway = self.gateways[gateway_type]
+        return await gateway.acheck_status(gateway_reference)
+    
+    async def aprocess_many(self, payments, max_concurrency: Optional[int] = None) -> list:
+        """
+        Traiter un lot de paiements en parallèle sur la boucle courante.
+        
+        `payments` est une liste de dicts (gateway_type, phone, amount, reference) ;
+        les réponses sont retournées dans le même ordre.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        
+        async def traiter(payment):
+            if semaphore is None:
+                return await self.aprocess_payment(**payment)
+            async with semaphore:
+                return await self.aprocess_payment(**payment)
+        
+        return await asyncio.gather(*(traiter(payment) for payment in payments))
+    
+    def _gateway_indisponible(self, gateway_type: str, amount: Decimal, reference: str,
+                              gateway_reference: str = "") -> PaymentResponse:
+        logger.error(f"Gateway {gateway_type} not available")
+        return PaymentResponse(
+            success=False,
+            transaction_id=reference,
+            gateway_reference=gateway_reference,
+            status=PaymentStatus.FAILED,
+            amount=amount,
+            currency="XOF",
+            message=f"Gateway {gateway_type} non disponible",
+            error_code="GATEWAY_NOT_AVAILABLE"
+        )
+    
+    def _erreur_technique(self, gateway_type: str, error: Exception, amount: Decimal, reference: str) -> PaymentResponse:
+        logger.error(f"❌ Payment processing error in {gateway_type}: {error}")
+        return PaymentResponse(
+            success=False,
+            transaction_id=reference,
+            gateway_reference="",
+            status=PaymentStatus.FAILED,
+            amount=amount,
+            currency="XOF",
+            message=f"Erreur technique {gateway_type}: {str(error)}",
+            error_code="TECHNICAL_ERROR"
+        )
+    
     def get_gateway_info(self, gateway_type: str) -> Dict[str, Any]:
         """Obtenir les informations d'un gateway"""
         if gateway_type not in self.gateways:
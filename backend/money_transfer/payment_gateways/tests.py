@@ -0,0 +1,57 @@
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from .services import PaymentProcessingService, PaymentStatus
+
+
+@override_settings(PAYMENT_SIMULATOR_LATENCY_FACTOR=0)
+class GatewaysAsynchronesTests(SimpleTestCase):
+    """Contrat asynchrone des gateways : mêmes réponses que le chemin bloquant"""
+
+    def setUp(self):
+        self.service = PaymentProcessingService()
+
+    def paiement(self, reference='TXN1', phone='+221770000099', amount=Decimal('5000'), gateway_type='WAVE'):
+        return {'gateway_type': gateway_type, 'phone': phone, 'amount': amount, 'reference': reference}
+
+    async def test_succes_echec_et_timeout(self):
+        with mock.patch('payment_gateways.services.random.random', return_value=0.0):
+            succes = await self.service.aprocess_payment(**self.paiement())
+        with mock.patch('payment_gateways.services.random.random', return_value=0.9):
+            echec = await self.service.aprocess_payment(**self.paiement())
+        with mock.patch('payment_gateways.services.random.random', return_value=0.99):
+            timeout = await self.service.aprocess_payment(**self.paiement())
+
+        self.assertTrue(succes.success)
+        self.assertEqual((succes.status, succes.fees), (PaymentStatus.SUCCESS, Decimal('50.00')))
+        self.assertEqual(echec.status, PaymentStatus.FAILED)
+        self.assertIsNotNone(echec.error_code)
+        self.assertEqual((timeout.status, timeout.error_code), (PaymentStatus.TIMEOUT, 'GATEWAY_TIMEOUT'))
+
+    async def test_refus_et_erreurs(self):
+        telephone = await self.service.aprocess_payment(**self.paiement(phone='+33612345678'))
+        montant = await self.service.aprocess_payment(**self.paiement(amount=Decimal('10')))
+        inconnu = await self.service.aprocess_payment(**self.paiement(gateway_type='PAYPAL'))
+        with mock.patch.object(self.service.gateways['WAVE'], 'aprocess_payment', side_effect=ConnectionError('reset')):
+            technique = await self.service.aprocess_payment(**self.paiement())
+
+        self.assertEqual(telephone.error_code, 'INVALID_PHONE_NUMBER')
+        self.assertEqual(montant.error_code, 'AMOUNT_OUT_OF_RANGE')
+        self.assertEqual(inconnu.error_code, 'GATEWAY_NOT_AVAILABLE')
+        self.assertEqual((technique.success, technique.error_code), (False, 'TECHNICAL_ERROR'))
+        self.assertIn('reset', technique.message)
+
+    async def test_lot_concurrent_dans_l_ordre(self):
+        self.service.gateways['WAVE'].latency_factor = 0.05
+        paiements = [self.paiement(reference=f'TXN{i}') for i in range(20)]
+
+        debut = time.perf_counter()
+        reponses = await self.service.aprocess_many(paiements, max_concurrency=10)
+        duree = time.perf_counter() - debut
+
+        self.assertEqual([r.transaction_id for r in reponses], [p['reference'] for p in paiements])
+        # 20 appels de 75 à 200 ms, 10 à la fois : bien moins que leur somme
+        self.assertLess(duree, 1.5)
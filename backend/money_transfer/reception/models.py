@@ -150,16 +150,9 @@ class Reception(models.Model):
         super().save(*args, **kwargs)
     
     def generer_code_reception(self):
-        """Générer un code de réception unique"""
-        max_attempts = 10
-        for _ in range(max_attempts):
-            code = f"RCP{timezone.now().year}{random.randint(100000, 999999)}"
-            if not Reception.objects.filter(code_reception=code).exists():
-                return code
-        
-        # Fallback
-        timestamp = int(timezone.now().timestamp())
-        return f"RCP{timestamp}"
+        """Générer un code de réception unique (séquence dédiée, sans requête de vérification)"""
+        from transactions.services.codes import generer_code
+        return generer_code('RCP', 'reception')
     
     def __str__(self):
         return f"Réception {self.code_reception} - {self.destinataire.get_full_name()}"
@@ -202,17 +195,16 @@ class Reception(models.Model):
         
         try:
             # ===== INTÉGRATION AVEC SYSTÈME NOTIFICATIONS (DEV 1) =====
-            from notifications.views import NotificationChannelFactory
-            
-            notification_channel = NotificationChannelFactory.get_channel('database')
+            # Appelé depuis la sauvegarde de la transaction (ENVOYE) : créée après commit par l'outbox
+            from notifications.services.outbox import Intention, publier
             
             # Créer notification personnalisée
-            notification_channel.send(
-                user=self.destinataire,
-                title="💰 Argent à recevoir",
-                message=f"Vous avez reçu {self.montant_a_recevoir:,.0f} {self.devise_reception} de {self.expediteur_nom}. Code de réception: {self.code_reception}",
-                notification_type='TRANSACTION'
-            )
+            publier([Intention(
+                self.destinataire_id,
+                "💰 Argent à recevoir",
+                f"Vous avez reçu {self.montant_a_recevoir:,.0f} {self.devise_reception} de {self.expediteur_nom}. Code de réception: {self.code_reception}",
+                'TRANSACTION',
+            )])
             
             # Marquer comme envoyée
             self.notification_envoyee = True
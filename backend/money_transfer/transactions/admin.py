@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db import transaction as db_transaction
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
@@ -8,6 +9,7 @@ from datetime import timedelta
 
 from .models import (
     Transaction, 
+    StatutTransaction,
     Beneficiaire, 
     CanalPaiement,
     # Modèles internationaux
@@ -15,7 +17,8 @@ from .models import (
     ServicePaiementInternational, 
     CorridorTransfert, 
     TransactionInternationale,
-    TauxChange
+    TauxChange,
+    HistoriqueTauxChange
 )
 
 # ===== CONFIGURATION GÉNÉRALE ADMIN =====
@@ -297,17 +300,46 @@ class TauxChangeAdmin(admin.ModelAdmin):
             return f"{obj.taux} (base)"
     taux_avec_marge.short_description = 'Taux Client'
 
+@admin.register(HistoriqueTauxChange)
+class HistoriqueTauxChangeAdmin(admin.ModelAdmin):
+    """Historique en lecture seule : écrit à chaque rafraîchissement des taux"""
+    list_display = ['devise_origine', 'devise_destination', 'taux', 'source', 'date_effet']
+    list_filter = ['devise_origine', 'devise_destination', 'source']
+    date_hierarchy = 'date_effet'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 # ===== ACTIONS PERSONNALISÉES =====
 
+def changer_statut(queryset, statut):
+    """
+    Sauvegarder les transactions une à une plutôt qu'un UPDATE en masse :
+    notifications, statistiques, dashboard et index de recherche suivent par signaux.
+    """
+    modifiees = 0
+    with db_transaction.atomic():
+        for transaction in queryset.exclude(statusTransaction=statut).iterator():
+            transaction.statusTransaction = statut
+            transaction.save(update_fields=['statusTransaction', 'updated_at'])
+            modifiees += 1
+    return modifiees
+
 def marquer_comme_termine(modeladmin, request, queryset):
     """Action pour marquer des transactions comme terminées"""
-    updated = queryset.update(statusTransaction='TERMINE')
+    updated = changer_statut(queryset, StatutTransaction.TERMINE)
     modeladmin.message_user(request, f'{updated} transactions marquées comme terminées.')
 marquer_comme_termine.short_description = "Marquer comme terminé"
 
 def marquer_comme_annule(modeladmin, request, queryset):
     """Action pour annuler des transactions"""
-    updated = queryset.update(statusTransaction='ANNULE')
+    updated = changer_statut(queryset, StatutTransaction.ANNULE)
     modeladmin.message_user(request, f'{updated} transactions annulées.')
 marquer_comme_annule.short_description = "Annuler transactions"
 
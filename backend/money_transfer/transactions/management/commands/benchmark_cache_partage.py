@@ -0,0 +1,118 @@
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+
+from money_transfer.api_views import calculer_resume_dashboard
+from money_transfer.serveur_redis_local import ServeurRedisLocal
+from dashboard import services as dashboard_services
+from transactions.services import frais
+from transactions.services.exchange_rates import ExchangeRateService
+from transactions.services.serveur_taux_local import TAUX_XOF, ServeurTauxLocal
+
+
+class Command(BaseCommand):
+    help = ('Mesurer taux de succès du cache et appels évités avec plusieurs workers '
+            '(locmem par processus, Redis partagé, Redis + niveau 1)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--duree', type=float, default=10.0, help='Secondes de charge par mode')
+        parser.add_argument('--pause', type=float, default=0.002, help='Secondes entre deux requêtes d\'un worker')
+        # Usage interne : un worker lancé par le benchmark
+        parser.add_argument('--worker', type=int, default=None)
+        parser.add_argument('--debut', type=float, default=0.0)
+
+    def handle(self, *args, **options):
+        if options['worker'] is not None:
+            return self._worker(options)
+
+        self.stdout.write(f"🗄️ Benchmark cache partagé: {options['workers']} workers, {options['duree']:.0f} s par mode...")
+        with ServeurTauxLocal() as serveur_taux, ServeurRedisLocal() as serveur_redis:
+            modes = [
+                ('locmem par processus', {'SHARED_CACHE_URL': ''}),
+                ('Redis partagé', {'SHARED_CACHE_URL': serveur_redis.url, 'SHARED_CACHE_L1_TTL': '0'}),
+                ('Redis + niveau 1', {'SHARED_CACHE_URL': serveur_redis.url, 'SHARED_CACHE_L1_TTL': '1'}),
+            ]
+            resultats = []
+            for nom, environnement in modes:
+                serveur_taux.requetes = 0
+                serveur_redis.donnees.clear()
+                serveur_redis.commandes = 0
+                totaux = self._lancer_workers(options, {
+                    **environnement,
+                    'EXCHANGE_RATES_API_URL': serveur_taux.url,
+                    'EXCHANGE_RATES_BASE_CURRENCIES': 'XOF',
+                    # Périodes courtes pour observer plusieurs rafraîchissements pendant la mesure
+                    'EXCHANGE_RATES_TTL': '2',
+                    'DASHBOARD_CACHE_TTL': '2',
+                })
+                resultats.append((nom, totaux, serveur_taux.requetes, serveur_redis.commandes))
+
+        # ===== RÉSUMÉ =====
+        self.stdout.write('')
+        self.stdout.write(f"  {'mode':<22}{'requêtes':>10}{'appels API':>12}{'calculs dashboard':>19}"
+                          f"{'devis retrouvés':>17}{'succès L1':>11}{'cmd Redis/req':>15}")
+        for nom, totaux, appels_api, commandes in resultats:
+            lectures = totaux['l1'] + totaux['l2'] + totaux['absents']
+            self.stdout.write(
+                f"  {nom:<22}{totaux['requetes']:>10,}{appels_api:>12}{totaux['calculs_dashboard']:>19}"
+                f"{totaux['devis_trouves'] / max(totaux['devis_lus'], 1):>16.1%} "
+                f"{totaux['l1'] / max(lectures, 1):>10.1%}{commandes / max(totaux['requetes'], 1):>15.2f}"
+            )
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark terminé'))
+
+    def _lancer_workers(self, options, environnement):
+        debut = time.time() + 3  # démarrage de Django dans chaque worker
+        processus = [
+            subprocess.Popen(
+                [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'benchmark_cache_partage', '--worker', str(numero),
+                 '--workers', str(options['workers']), '--duree', str(options['duree']),
+                 '--pause', str(options['pause']), '--debut', str(debut)],
+                env={**os.environ, **environnement}, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+            )
+            for numero in range(options['workers'])
+        ]
+        totaux = Counter()
+        for worker in processus:
+            sortie, _ = worker.communicate()
+            totaux.update(json.loads(sortie.strip().splitlines()[-1]))
+        return totaux
+
+    def _worker(self, options):
+        """Une requête = un taux, un devis créé, le devis d'un autre worker relu, le résumé du dashboard"""
+        numero, workers = options['worker'], options['workers']
+        service = ExchangeRateService()
+        aleatoire = random.Random(numero)
+        devises = list(TAUX_XOF)
+        compteurs = Counter()
+
+        def calcul_dashboard():
+            compteurs['calculs_dashboard'] += 1
+            return calculer_resume_dashboard()
+
+        time.sleep(max(0.0, options['debut'] - time.time()))
+        fin = time.time() + options['duree']
+        while time.time() < fin:
+            requete = compteurs['requetes']
+            service.get_rate(aleatoire.choice(devises), aleatoire.choice(devises))
+            frais.cache.set(f'bench:{numero}:{requete}', requete)
+            if requete:
+                # Devis créé par un autre worker, dont la requête a été servie ailleurs
+                compteurs['devis_lus'] += 1
+                autre = f'bench:{(numero + 1) % workers}:{requete // 2}'
+                compteurs['devis_trouves'] += frais.cache.get(autre) is not None
+            dashboard_services.resume_en_cache('benchmark', calcul_dashboard)
+            compteurs['requetes'] += 1
+            time.sleep(options['pause'])
+
+        for alias in ('default', 'devis'):
+            compteurs.update(caches[alias].statistiques)
+        self.stdout.write(json.dumps(compteurs))
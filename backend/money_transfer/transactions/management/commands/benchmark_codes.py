@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from transactions.services.codes import PREFIXES, code_depuis_id, code_valide
+
+
+class Command(BaseCommand):
+    help = 'Générer des codes de transaction à la chaîne : débit et collisions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--nombre', type=int, default=1_000_000, help='Codes générés par préfixe')
+        parser.add_argument('--prefixes', nargs='+', default=['TXN'], choices=sorted(PREFIXES))
+        parser.add_argument('--premier-id', type=int, default=100000001, help='Premier identifiant de séquence')
+
+    def handle(self, *args, **options):
+        nombre = options['nombre']
+        self.stdout.write(f"🔢 Benchmark codes ({nombre:,} par préfixe)...")
+
+        collisions = 0
+        for prefix in options['prefixes']:
+            debut = time.perf_counter()
+            codes = {code_depuis_id(prefix, options['premier_id'] + i) for i in range(nombre)}
+            duree = time.perf_counter() - debut
+            collisions += nombre - len(codes)
+            invalides = sum(1 for code in codes if not code_valide(code))
+            self.stdout.write(
+                f'  {prefix}: {nombre:,} codes en {duree:.2f}s ({nombre / duree:,.0f} codes/s), '
+                f'collisions={nombre - len(codes)} invalides={invalides}'
+            )
+
+        if collisions:
+            self.stdout.write(self.style.ERROR(f'❌ {collisions} collision(s)'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ Aucune collision'))
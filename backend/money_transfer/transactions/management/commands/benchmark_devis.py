@@ -0,0 +1,109 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from transactions.models import CanalPaiement, CorridorTransfert, Pays, ServicePaiementInternational
+from transactions.services import frais
+
+# Pays réservés au benchmark : 'Benchmark devis', 'Benchmark devis 1'… (codes ISO 'z00', 'z01'…)
+PREFIXE_BENCH = 'z'
+ORIGINE_BENCH = f'{PREFIXE_BENCH}00'
+PAYS_ORIGINE = 'Benchmark devis'
+
+
+def devis_en_base(montant, code_corridor, code_service, taux):
+    """Ancien calcul : corridor, service et canal relus en base à chaque devis"""
+    origine, destination = code_corridor.split('_TO_')
+    corridor = CorridorTransfert.objects.select_related('pays_origine', 'pays_destination').get(
+        pays_origine__code_iso=origine, pays_destination__code_iso=destination
+    )
+    service = ServicePaiementInternational.objects.get(pays__code_iso=destination, code_service=code_service)
+    canal = CanalPaiement.objects.filter(country=PAYS_ORIGINE, is_active=True).first()
+    frais_origine = canal.calculate_fees(montant)
+    commission = (montant * corridor.commission_percentage / 100) + corridor.commission_fixe
+    frais_change = montant * Decimal('0.02') if taux != 1 else Decimal('0')
+    montant_converti = (montant - frais_origine - commission - frais_change) * taux
+    return montant_converti - service.calculate_fees(montant_converti)
+
+
+class Command(BaseCommand):
+    help = 'Mesurer le débit du moteur de devis (frais des envois internationaux)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corridors', type=int, default=20)
+        parser.add_argument('--devis', type=int, default=200000)
+
+    def handle(self, *args, **options):
+        self.stdout.write('🧮 Benchmark moteur de devis...')
+        corridors = self._preparer(options['corridors'])
+        # Le pays d'origine du benchmark tient lieu de pays d'origine des envois
+        reglages = override_settings(INTERNATIONAL_ORIGIN_COUNTRY=ORIGINE_BENCH)
+        reglages.enable()
+        try:
+            aleatoire = random.Random(0)
+            demandes = [
+                (Decimal(aleatoire.randint(10, 5000) * 100), *aleatoire.choice(corridors))
+                for _ in range(options['devis'])
+            ]
+            taux = {('XOF', 'ZZZ'): Decimal('4.5')}
+
+            debut = time.perf_counter()
+            frais.construire()
+            self.stdout.write(f'  Tables chargées en {(time.perf_counter() - debut) * 1000:.1f} ms')
+
+            # ===== RÉSUMÉ =====
+            self.stdout.write('')
+            self._mesurer('lectures en base', demandes[:2000], lambda lot: [
+                devis_en_base(montant, corridor, service, taux.get(('XOF', devise), Decimal('1')))
+                for montant, corridor, service, devise in lot
+            ])
+            self._mesurer('devis()', demandes, lambda lot: [
+                frais.devis(montant, corridor, service, taux=taux.get(('XOF', devise)))
+                for montant, corridor, service, devise in lot
+            ])
+            self._mesurer('devis_lot()', demandes, lambda lot: frais.devis_lot(
+                [demande[:3] for demande in lot], taux=taux
+            ))
+            self.stdout.write(self.style.SUCCESS('✅ Benchmark terminé'))
+        finally:
+            reglages.disable()
+            self._nettoyer()
+
+    def _mesurer(self, nom, demandes, calcul):
+        debut = time.perf_counter()
+        calcul(demandes)
+        duree = time.perf_counter() - debut
+        self.stdout.write(f'  {nom:<18} {len(demandes) / duree:>11,.0f} devis/s   '
+                          f'{duree / len(demandes) * 1e6:8.2f} µs/devis')
+
+    def _preparer(self, nombre):
+        self._nettoyer()
+        origine = Pays.objects.create(code_iso=ORIGINE_BENCH, nom=PAYS_ORIGINE, devise='XOF', prefixe_tel='+0')
+        CanalPaiement.objects.create(canal_name='Benchmark devis', type_canal='WAVE', country=PAYS_ORIGINE,
+                                     fees_percentage=Decimal('1.00'))
+        corridors = []
+        for i in range(1, nombre + 1):
+            # Un corridor sur deux avec change
+            devise = 'ZZZ' if i % 2 else 'XOF'
+            destination = Pays.objects.create(code_iso=f'{PREFIXE_BENCH}{i:02d}', nom=f'{PAYS_ORIGINE} {i}', devise=devise,
+                                              prefixe_tel='+0')
+            CorridorTransfert.objects.create(
+                pays_origine=origine, pays_destination=destination, temps_livraison_min=5, temps_livraison_max=60,
+                commission_fixe=Decimal('50'), montant_min_corridor=Decimal('1000'),
+                montant_max_corridor=Decimal('1000000'),
+            )
+            ServicePaiementInternational.objects.create(
+                pays=destination, nom=f'Service bench {i}', type_service='ORANGE_MONEY', code_service=f'BENCH_{i}',
+                frais_percentage=Decimal('1.5'), frais_fixe=Decimal('25'), frais_min=Decimal('100'),
+                frais_max=Decimal('2000'), limite_min=Decimal('100'), limite_max=Decimal('1000000'),
+                regex_telephone='.*',
+            )
+            corridors.append((f'{origine.code_iso}_TO_{destination.code_iso}', f'BENCH_{i}', devise))
+        return corridors
+
+    def _nettoyer(self):
+        CanalPaiement.objects.filter(country=PAYS_ORIGINE).delete()
+        Pays.objects.filter(nom__startswith=PAYS_ORIGINE).delete()
@@ -0,0 +1,115 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection, models, transaction as db_transaction
+from django.db.models.signals import post_save
+
+from transactions.models import CanalPaiement, Transaction
+from transactions.services.id_allocator import get_id_allocator
+
+User = get_user_model()
+
+BENCH_PHONE = '+221700000997'
+
+
+def generate_id_historique():
+    """Ancienne stratégie : MAX(idTransaction) sous select_for_update puis boucle exists()"""
+    with db_transaction.atomic():
+        max_id = Transaction.objects.select_for_update().aggregate(
+            max_id=models.Max('idTransaction')
+        )['max_id']
+        new_id = max_id + 1 if max_id else 100000001
+        while Transaction.objects.filter(idTransaction=new_id).exists():
+            new_id += 1
+        return new_id
+
+
+class Command(BaseCommand):
+    help = 'Comparer l\'allocation idTransaction historique (MAX) et par séquence / blocs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=50, help='Créateurs en parallèle')
+        parser.add_argument('--par-thread', type=int, default=20, help='Transactions créées par thread')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"📈 Benchmark idTransaction ({connection.vendor}, {options['threads']} créateurs "
+            f"x {options['par_thread']})..."
+        )
+
+        user, _ = User.objects.get_or_create(
+            phone_number=BENCH_PHONE,
+            defaults={'email': 'bench-ids@example.com', 'first_name': 'Bench', 'last_name': 'Ids'}
+        )
+        canal = CanalPaiement.objects.create(
+            canal_name='Benchmark ids', type_canal='WAVE', country='Sénégal', fees_percentage=Decimal('1.00')
+        )
+
+        # Les notifications de création ne font pas partie de la mesure
+        receivers = post_save.receivers
+        post_save.receivers = []
+        post_save.sender_receivers_cache.clear()
+        try:
+            resultats = {
+                'historique': self._mesurer(user, canal, options, generate_id_historique),
+                'allocateur': self._mesurer(user, canal, options, None),
+            }
+        finally:
+            post_save.receivers = receivers
+            post_save.sender_receivers_cache.clear()
+            Transaction.objects.filter(canal_paiement=canal).delete()
+            canal.delete()
+            user.delete()
+
+        self.stdout.write('')
+        for nom, (debit, creees, echecs, doublons, attente_max) in resultats.items():
+            self.stdout.write(
+                f'  {nom:<11} {debit:8.1f} créations/s  créées={creees} échecs={echecs} '
+                f'doublons={doublons} attente max={attente_max * 1000:.0f}ms'
+            )
+        self.stdout.write(self.style.SUCCESS(f'✅ Allocateur : {type(get_id_allocator()).__name__}'))
+
+    def _mesurer(self, user, canal, options, generateur):
+        ids = []
+        echecs = []
+        attentes = []
+        lock = threading.Lock()
+
+        def creer(_):
+            try:
+                for _ in range(options['par_thread']):
+                    transaction = Transaction(
+                        expediteur=user,
+                        destinataire_phone='+221770000000',
+                        canal_paiement=canal,
+                        montantEnvoye=1000,
+                        montantConverti=0,
+                        montantRecu=0,
+                        frais='0 XOF',
+                    )
+                    if generateur:
+                        transaction.generate_id_transaction = generateur
+                    debut = time.perf_counter()
+                    try:
+                        transaction.save()
+                    except Exception as e:
+                        with lock:
+                            echecs.append(str(e))
+                        continue
+                    with lock:
+                        attentes.append(time.perf_counter() - debut)
+                        ids.append(transaction.idTransaction)
+            finally:
+                close_old_connections()
+
+        debut = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            list(pool.map(creer, range(options['threads'])))
+        duree = time.perf_counter() - debut
+
+        Transaction.objects.filter(canal_paiement=canal).delete()
+        return len(ids) / duree, len(ids), len(echecs), len(ids) - len(set(ids)), max(attentes, default=0)
@@ -0,0 +1,154 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from transactions.models import CanalPaiement, IndexRechercheTransaction, Transaction
+from transactions.services.bulk_import import TransactionImporter
+from transactions.services.recherche import rechercher
+
+User = get_user_model()
+
+# Numéros réservés au benchmark : +22179XXXXXXX
+PREFIXE_BENCH = '+22179'
+
+
+def recherche_historique(user, query):
+    """Ancienne implémentation de /search/ : icontains sur toute l'historique"""
+    return list(Transaction.objects.filter(
+        Q(expediteur=user) | Q(destinataire=user)
+    ).filter(
+        Q(codeTransaction__icontains=query) |
+        Q(idTransaction__icontains=query) |
+        Q(destinataire_phone__icontains=query)
+    ).order_by('-created_at')[:10])
+
+
+class Command(BaseCommand):
+    help = 'Mesurer la latence (p50 / p99) de /search/ sur un grand volume de transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transactions', type=int, default=5_000_000, help='Nombre de transactions')
+        parser.add_argument('--utilisateurs', type=int, default=2000, help='Utilisateurs expéditeurs')
+        parser.add_argument('--part-gros', type=float, default=0.05,
+                            help='Part des transactions envoyées par un seul gros utilisateur (marchand)')
+        parser.add_argument('--requetes', type=int, default=200, help='Requêtes mesurées par forme')
+        parser.add_argument('--garder', action='store_true', help='Ne pas supprimer les données générées')
+
+    def handle(self, *args, **options):
+        self.stdout.write('🔎 Benchmark recherche de transactions...')
+        users, canal = self._preparer(options)
+        try:
+            # Entrées tirées au hasard parmi les ids (pas de ORDER BY RANDOM() sur toute la table)
+            ids = IndexRechercheTransaction.objects.filter(expediteur_id__in=[u.pk for u in users]).aggregate(
+                minimum=Min('id'), maximum=Max('id')
+            )
+            echantillon = list(IndexRechercheTransaction.objects.filter(
+                id__in=random.sample(range(ids['minimum'], ids['maximum'] + 1), options['requetes'])
+            ).values('expediteur_id', 'code', 'telephone', 'transaction__idTransaction'))
+            par_id = {user.pk: user for user in users}
+            gros = users[0]
+
+            formes = {
+                'code complet': lambda e: e['code'],
+                'préfixe code': lambda e: e['code'][:10],
+                'préfixe téléphone': lambda e: '+' + e['telephone'][:8],
+                'fragment téléphone': lambda e: e['telephone'][-6:],
+                'idTransaction': lambda e: str(e['transaction__idTransaction']),
+            }
+
+            # ===== RÉSUMÉ =====
+            self.stdout.write('')
+            self.stdout.write(f"  {'forme':<20} {'utilisateur':<12} {'avant p50':>10} {'avant p99':>10} "
+                              f"{'après p50':>10} {'après p99':>10}")
+            for nom, requete in formes.items():
+                for libelle, choisir in (('courant', lambda e: par_id[e['expediteur_id']]), ('gros', lambda e: gros)):
+                    avant, apres = [], []
+                    for entree in echantillon:
+                        user, query = choisir(entree), requete(entree)
+                        avant.append(self._mesurer(lambda: recherche_historique(user, query)))
+                        apres.append(self._mesurer(lambda: list(rechercher(user, query))))
+                    self.stdout.write(
+                        f'  {nom:<20} {libelle:<12} {self._p(avant, 50):>8.2f}ms {self._p(avant, 99):>8.2f}ms '
+                        f'{self._p(apres, 50):>8.2f}ms {self._p(apres, 99):>8.2f}ms'
+                    )
+            self.stdout.write(self.style.SUCCESS('✅ Benchmark terminé'))
+        finally:
+            if not options['garder']:
+                self._nettoyer(users, canal)
+
+    @staticmethod
+    def _mesurer(fonction):
+        debut = time.perf_counter()
+        fonction()
+        return (time.perf_counter() - debut) * 1000
+
+    @staticmethod
+    def _p(mesures, centile):
+        return statistics.quantiles(mesures, n=100)[centile - 1] if len(mesures) > 1 else mesures[0]
+
+    def _preparer(self, options):
+        nombre_users = options['utilisateurs']
+        mot_de_passe = make_password(None)
+        User.objects.bulk_create([
+            User(phone_number=f'{PREFIXE_BENCH}{i:07d}', email=f'bench-recherche-{i}@example.com',
+                 first_name='Bench', last_name=f'Recherche {i}', password=mot_de_passe)
+            for i in range(nombre_users)
+        ], ignore_conflicts=True)
+        users = list(User.objects.filter(phone_number__startswith=PREFIXE_BENCH).order_by('phone_number'))
+        canal = CanalPaiement.objects.create(canal_name='Wave Bench Recherche', type_canal='WAVE',
+                                             country='Sénégal', fees_percentage=Decimal('1.00'))
+
+        phones = [user.phone_number for user in users]
+        maintenant = timezone.now()
+        part_gros = options['part_gros']
+
+        def lignes():
+            for numero in range(options['transactions']):
+                expediteur = phones[0] if random.random() < part_gros else random.choice(phones)
+                # Destinataires surtout non inscrits : numéros aléatoires
+                destinataire = (random.choice(phones) if numero % 10 == 0
+                                else f'+2217{random.randint(0, 99999999):08d}')
+                yield numero, {
+                    'expediteur_phone': expediteur,
+                    'destinataire_phone': destinataire,
+                    'canal': str(canal.id),
+                    'montantEnvoye': random.randint(100, 500000),
+                    'created_at': maintenant - timedelta(seconds=numero),
+                }
+
+        debut = time.perf_counter()
+        TransactionImporter(
+            chunk_size=10000, notifications=False, receptions=False,
+            progression=self._progression,
+        ).importer(lignes())
+        self.stdout.write(f"  {options['transactions']} transactions créées en {time.perf_counter() - debut:.1f}s")
+        return users, canal
+
+    def _progression(self, rapport):
+        if rapport.importees % 500000 == 0:
+            self.stdout.write(f'  … {rapport.importees:>9} importées ({rapport.debit:,.0f} lignes/s)')
+
+    def _nettoyer(self, users, canal):
+        # Suppression SQL directe : pas de signal par ligne pour l'historique de test
+        champ = Transaction._meta.get_field('canal_paiement')
+        valeur = champ.get_db_prep_value(canal.id, connection)
+        index = connection.ops.quote_name(IndexRechercheTransaction._meta.db_table)
+        transactions = connection.ops.quote_name(Transaction._meta.db_table)
+        colonne = connection.ops.quote_name(champ.column)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {index} WHERE transaction_id IN "
+                f"(SELECT id FROM {transactions} WHERE {colonne} = %s)", [valeur]
+            )
+            cursor.execute(f"DELETE FROM {transactions} WHERE {colonne} = %s", [valeur])
+        canal.delete()
+        User.objects.filter(pk__in=[user.pk for user in users]).delete()
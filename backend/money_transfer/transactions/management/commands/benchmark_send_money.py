@@ -0,0 +1,112 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from payment_gateways.services import payment_service
+from transactions.models import CanalPaiement, Transaction, StatutTransaction
+from transactions.services.payment_dispatch import get_dispatcher
+
+User = get_user_model()
+
+BENCH_PHONE = '+221700000999'
+BENCH_BENEFICIAIRE = '+221700000998'
+
+
+class Command(BaseCommand):
+    help = 'Mesurer le débit de /send-money/ en mode synchrone puis asynchrone'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requetes', type=int, default=100, help='Nombre de requêtes par mode')
+        parser.add_argument('--concurrence', type=int, default=20, help='Clients simultanés')
+        parser.add_argument('--latence', type=float, default=0.3,
+                            help='Facteur appliqué aux délais des simulateurs (1.0 = délais réels)')
+        parser.add_argument('--modes', default='sync,async', help='Modes à mesurer, séparés par des virgules')
+
+    def handle(self, *args, **options):
+        self.stdout.write('📈 Benchmark envoi d\'argent...')
+
+        user, canal = self._preparer()
+        facteur_origine = {nom: gw.latency_factor for nom, gw in payment_service.gateways.items()}
+        for gateway in payment_service.gateways.values():
+            gateway.latency_factor = options['latence']
+
+        try:
+            resultats = {}
+            for mode in options['modes'].split(','):
+                with override_settings(PAYMENT_DISPATCH_MODE=mode.strip()):
+                    resultats[mode] = self._mesurer(user, canal, options['requetes'], options['concurrence'])
+
+            # ===== RÉSUMÉ =====
+            self.stdout.write('')
+            for mode, (debit, codes, duree) in resultats.items():
+                self.stdout.write(
+                    f'  {mode:<6} {debit:8.1f} req/s  ({duree:.2f}s)  codes HTTP: {codes}'
+                )
+            self.stdout.write(self.style.SUCCESS('✅ Benchmark terminé'))
+        finally:
+            for nom, facteur in facteur_origine.items():
+                payment_service.gateways[nom].latency_factor = facteur
+            self._nettoyer(user, canal)
+
+    def _preparer(self):
+        user = User.objects.filter(phone_number=BENCH_PHONE).first()
+        if not user:
+            user = User.objects.create_user(
+                phone_number=BENCH_PHONE,
+                email='benchmark@example.com',
+                first_name='Bench',
+                last_name='Mark',
+                password='benchmark'
+            )
+        canal = CanalPaiement.objects.create(
+            canal_name='Wave Benchmark',
+            type_canal='WAVE',
+            country='Sénégal',
+            fees_percentage=Decimal('1.00'),
+        )
+        return user, canal
+
+    def _nettoyer(self, user, canal):
+        Transaction.objects.filter(canal_paiement=canal).delete()
+        canal.delete()
+        user.delete()
+
+    def _mesurer(self, user, canal, nb_requetes, concurrence):
+        payload = {
+            'montant': 1000,
+            'beneficiaire_phone': BENCH_BENEFICIAIRE,
+            'canal_paiement': str(canal.id),
+        }
+
+        def envoyer(_):
+            client = APIClient(SERVER_NAME='localhost')
+            client.force_authenticate(user=user)
+            try:
+                return client.post('/api/v1/transactions/send-money/', payload, format='json').status_code
+            finally:
+                close_old_connections()
+
+        debut = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrence) as pool:
+            status_codes = list(pool.map(envoyer, range(nb_requetes)))
+        duree = time.perf_counter() - debut
+
+        # Attendre la fin des paiements confiés au pool avant de mesurer le mode suivant
+        dispatcher = get_dispatcher()
+        while dispatcher.en_vol:
+            time.sleep(0.05)
+
+        en_attente = Transaction.objects.filter(
+            canal_paiement=canal, statusTransaction=StatutTransaction.EN_ATTENTE
+        ).count()
+        if en_attente:
+            self.stdout.write(self.style.WARNING(f'⚠️ {en_attente} transactions encore EN_ATTENTE'))
+
+        codes = {code: status_codes.count(code) for code in sorted(set(status_codes))}
+        return nb_requetes / duree, codes, duree
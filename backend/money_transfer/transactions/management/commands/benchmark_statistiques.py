@@ -0,0 +1,136 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Avg, Count, Q, Sum
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from transactions.models import CanalPaiement, StatutTransaction, Transaction
+from transactions.services.bulk_import import TransactionImporter
+from transactions.services.statistiques import agreger, statistiques_utilisateur
+
+User = get_user_model()
+
+BENCH_PHONE = '+221700000997'
+BENCH_CORRESPONDANT = '+221700000996'
+
+
+def statistiques_historiques(user):
+    """Ancienne implémentation de /statistics/ : un aggregate() puis cinq count()"""
+    user_transactions = Transaction.objects.filter(Q(expediteur=user) | Q(destinataire=user))
+    stats = user_transactions.aggregate(
+        total_transactions=Count('id'),
+        total_amount=Sum('montantEnvoye'),
+        completed_transactions=Count('id', filter=Q(statusTransaction='TERMINE')),
+        pending_transactions=Count('id', filter=Q(statusTransaction='EN_ATTENTE')),
+        cancelled_transactions=Count('id', filter=Q(statusTransaction='ANNULE')),
+        average_amount=Avg('montantEnvoye')
+    )
+    stats['envois_count'] = user_transactions.filter(expediteur=user).count()
+    stats['receptions_count'] = user_transactions.filter(destinataire=user).count()
+    stats['retraits_count'] = user_transactions.filter(typeTransaction='RETRAIT').count()
+    stats['wave_transactions'] = user_transactions.filter(canal_paiement__type_canal='WAVE').count()
+    stats['orange_money_transactions'] = user_transactions.filter(canal_paiement__type_canal='ORANGE_MONEY').count()
+    return stats
+
+
+class Command(BaseCommand):
+    help = 'Mesurer /statistics/ pour un utilisateur avec un long historique'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transactions', type=int, default=100000, help='Taille de l\'historique')
+        parser.add_argument('--repetitions', type=int, default=20, help='Lectures mesurées par méthode')
+
+    def handle(self, *args, **options):
+        self.stdout.write('📈 Benchmark statistiques utilisateur...')
+
+        user, correspondant, canaux = self._preparer(options['transactions'])
+        try:
+            methodes = [
+                ('aggregate + 5 count()', lambda: statistiques_historiques(user)),
+                ('agrégation conditionnelle', lambda: agreger(user.pk)),
+                ('table de compteurs', lambda: statistiques_utilisateur(user)),
+            ]
+            statistiques_utilisateur(user)  # ligne initialisée une fois
+
+            # ===== RÉSUMÉ =====
+            self.stdout.write('')
+            for nom, methode in methodes:
+                with CaptureQueriesContext(connection) as requetes:
+                    methode()
+                debut = time.perf_counter()
+                for _ in range(options['repetitions']):
+                    methode()
+                duree = (time.perf_counter() - debut) / options['repetitions']
+                self.stdout.write(f'  {nom:<26} {duree * 1000:10.2f} ms  ({len(requetes)} requêtes)')
+
+            # Les compteurs incrémentaux restent égaux au recalcul complet
+            ligne = statistiques_utilisateur(user)
+            transaction = Transaction.objects.filter(
+                expediteur=user, statusTransaction=StatutTransaction.EN_ATTENTE
+            ).first()
+            if transaction:
+                transaction.statusTransaction = StatutTransaction.TERMINE
+                transaction.save()
+            ligne.refresh_from_db()
+            coherent = all(getattr(ligne, champ) == valeur for champ, valeur in agreger(user.pk).items())
+            self.stdout.write(f'  compteurs cohérents après changement de statut : {"oui" if coherent else "NON"}')
+            self.stdout.write(self.style.SUCCESS('✅ Benchmark terminé'))
+        finally:
+            self._nettoyer(user, correspondant, canaux)
+
+    def _preparer(self, nombre):
+        user = User.objects.filter(phone_number=BENCH_PHONE).first() or User.objects.create_user(
+            phone_number=BENCH_PHONE, email='bench-stats@example.com',
+            first_name='Bench', last_name='Stats', password='benchmark'
+        )
+        correspondant = User.objects.filter(phone_number=BENCH_CORRESPONDANT).first() or User.objects.create_user(
+            phone_number=BENCH_CORRESPONDANT, email='bench-stats-2@example.com',
+            first_name='Bench', last_name='Correspondant', password='benchmark'
+        )
+        canaux = [
+            CanalPaiement.objects.create(canal_name='Wave Bench', type_canal='WAVE',
+                                         country='Sénégal', fees_percentage=Decimal('1.00')),
+            CanalPaiement.objects.create(canal_name='OM Bench', type_canal='ORANGE_MONEY',
+                                         country='Sénégal', fees_percentage=Decimal('1.00')),
+        ]
+
+        statuts = list(StatutTransaction.values)
+        maintenant = timezone.now()
+
+        def lignes():
+            for numero in range(nombre):
+                envoi = numero % 2 == 0
+                yield numero, {
+                    'expediteur_phone': BENCH_PHONE if envoi else BENCH_CORRESPONDANT,
+                    'destinataire_phone': BENCH_CORRESPONDANT if envoi else BENCH_PHONE,
+                    'canal': str(random.choice(canaux).id),
+                    'montantEnvoye': random.randint(100, 500000),
+                    'statusTransaction': random.choice(statuts),
+                    'typeTransaction': 'RETRAIT' if numero % 10 == 0 else 'ENVOI',
+                    'created_at': maintenant - timedelta(minutes=numero),
+                }
+
+        debut = time.perf_counter()
+        TransactionImporter(notifications=False, receptions=False).importer(lignes())
+        self.stdout.write(f'  {nombre} transactions créées en {time.perf_counter() - debut:.1f}s')
+        return user, correspondant, canaux
+
+    def _nettoyer(self, user, correspondant, canaux):
+        # Suppression SQL directe : pas de signal par ligne pour l'historique de test
+        champ = Transaction._meta.get_field('canal_paiement')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {connection.ops.quote_name(Transaction._meta.db_table)} "
+                f"WHERE {connection.ops.quote_name(champ.column)} IN (%s, %s)",
+                [champ.get_db_prep_value(canal.id, connection) for canal in canaux]
+            )
+        for canal in canaux:
+            canal.delete()
+        user.delete()
+        correspondant.delete()
@@ -0,0 +1,100 @@
+import csv
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from transactions.models import CanalPaiement, StatutTransaction
+from transactions.services.bulk_import import TransactionImporter, lire_lignes
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Importer en masse des transactions depuis un fichier CSV ou JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier', help='Fichier .csv ou .jsonl')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default=None,
+                            help='Format du fichier (défaut: selon l\'extension)')
+        parser.add_argument('--chunk', type=int, default=5000, help='Lignes par lot inséré')
+        parser.add_argument('--sans-notifications', action='store_true',
+                            help='Ne pas créer les notifications de création')
+        parser.add_argument('--sans-receptions', action='store_true',
+                            help='Ne pas créer les réceptions des transactions ENVOYE')
+        parser.add_argument('--valider-seulement', action='store_true', help='Valider sans rien écrire')
+        parser.add_argument('--rejets', help='Fichier JSONL où écrire les lignes rejetées')
+        parser.add_argument('--exemple', type=int, default=0,
+                            help='Générer un fichier de N lignes synthétiques au lieu d\'importer')
+
+    def handle(self, *args, **options):
+        if options['exemple']:
+            self._generer_exemple(options['fichier'], options['exemple'])
+            return
+
+        self.stdout.write(f"📥 Import de {options['fichier']}...")
+        # Rejets écrits au fil de l'import : la mémoire ne dépend pas de leur nombre
+        sortie_rejets = open(options['rejets'], 'w', encoding='utf-8') if options['rejets'] else None
+        importer = TransactionImporter(
+            chunk_size=options['chunk'],
+            notifications=not options['sans_notifications'],
+            receptions=not options['sans_receptions'],
+            progression=lambda rapport: self.stdout.write(
+                f'  … {rapport.lues:>9} lues  {rapport.importees:>9} importées  '
+                f'{rapport.rejetees:>6} rejetées  ({rapport.debit:,.0f} lignes/s)'
+            ),
+            sortie_rejets=sortie_rejets,
+        )
+        try:
+            rapport = importer.importer(
+                lire_lignes(options['fichier'], options['format']),
+                valider_seulement=options['valider_seulement'],
+            )
+        except FileNotFoundError:
+            raise CommandError(f"Fichier introuvable: {options['fichier']}")
+        finally:
+            if sortie_rejets is not None:
+                sortie_rejets.close()
+
+        # ===== RÉSUMÉ =====
+        self.stdout.write('')
+        self.stdout.write(f'  Lignes lues    : {rapport.lues}')
+        self.stdout.write(f'  Importées      : {rapport.importees}')
+        self.stdout.write(f'  Rejetées       : {rapport.rejetees}')
+        for rejet in importer.rejets[:5]:
+            self.stdout.write(self.style.WARNING(f"    ligne {rejet['ligne']}: {rejet['erreur']}"))
+        self.stdout.write(f'  Notifications  : {rapport.notifications}')
+        self.stdout.write(f'  Réceptions     : {rapport.receptions}')
+        self.stdout.write(
+            f'  Insertion      : {rapport.duree_insertion:.1f}s ({rapport.debit:,.0f} lignes/s)'
+        )
+        self.stdout.write(f'  Effets différés: {rapport.duree_diffusion:.1f}s')
+        self.stdout.write(self.style.SUCCESS('✅ Import terminé'))
+
+    def _generer_exemple(self, chemin, nombre):
+        """Fichier synthétique à partir des utilisateurs et canaux existants"""
+        phones = list(User.objects.values_list('phone_number', flat=True)[:1000])
+        canaux = list(CanalPaiement.objects.filter(is_active=True).values_list('type_canal', flat=True).distinct())
+        if not phones or not canaux:
+            raise CommandError('Il faut au moins un utilisateur et un canal actif')
+
+        statuts = [StatutTransaction.TERMINE, StatutTransaction.ENVOYE, StatutTransaction.ANNULE]
+        maintenant = timezone.now()
+        champs = ['expediteur_phone', 'destinataire_phone', 'canal', 'montantEnvoye',
+                  'statusTransaction', 'created_at']
+
+        with open(chemin, 'w', newline='', encoding='utf-8') as fichier:
+            writer = csv.DictWriter(fichier, fieldnames=champs)
+            writer.writeheader()
+            for _ in range(nombre):
+                writer.writerow({
+                    'expediteur_phone': random.choice(phones),
+                    'destinataire_phone': random.choice(phones),
+                    'canal': random.choice(canaux),
+                    'montantEnvoye': random.randint(100, 500000),
+                    'statusTransaction': random.choice(statuts),
+                    'created_at': (maintenant - timedelta(minutes=random.randint(0, 525600))).isoformat(),
+                })
+        self.stdout.write(self.style.SUCCESS(f'✅ {nombre} lignes écrites dans {chemin}'))
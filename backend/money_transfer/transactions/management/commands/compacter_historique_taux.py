@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from transactions.services import historique_taux
+
+
+class Command(BaseCommand):
+    help = "Compacter l'historique des taux : ne garder que les changements de taux des jours passés"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jours', type=int, default=1,
+                            help="Compacter les observations de plus de N jours (défaut: 1, tout sauf aujourd'hui)")
+
+    def handle(self, *args, **options):
+        avant = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(
+            days=options['jours'] - 1
+        )
+        self.stdout.write(f"🗜️ Compaction de l'historique des taux avant {avant:%Y-%m-%d}...")
+        supprimees = historique_taux.compacter(avant)
+        self.stdout.write(self.style.SUCCESS(f'✅ {supprimees} observations redondantes supprimées'))
@@ -0,0 +1,51 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from transactions.services.reconciliation import ReconciliationEngine
+
+
+class Command(BaseCommand):
+    help = 'Réconcilier les transactions EN_ATTENTE / ACCEPTE avec le statut des gateways'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk', type=int, default=None, help='Taille des lots (défaut: settings)')
+        parser.add_argument('--concurrence', type=int, default=None,
+                            help='Vérifications simultanées par gateway (défaut: settings)')
+        parser.add_argument('--age-min', type=int, default=None,
+                            help='Âge minimum en minutes des transactions à vérifier (défaut: settings)')
+        parser.add_argument('--limite', type=int, default=None, help='Nombre maximum de transactions')
+        parser.add_argument('--sans-signaux', action='store_true',
+                            help='Ne pas envoyer post_save (pas de notifications ni de réceptions)')
+        parser.add_argument('--boucle', type=int, default=0,
+                            help='Mode worker : relancer une passe toutes les N secondes')
+
+    def handle(self, *args, **options):
+        engine = ReconciliationEngine(
+            chunk_size=options['chunk'],
+            concurrence=options['concurrence'],
+            age_minimum=timedelta(minutes=options['age_min']) if options['age_min'] is not None else None,
+            envoyer_signaux=not options['sans_signaux'],
+        )
+
+        while True:
+            self.stdout.write('🔁 Réconciliation des paiements en attente...')
+            rapport = engine.executer(limite=options['limite'])
+
+            self.stdout.write(f'  Vérifiées      : {rapport.verifiees}')
+            for gateway_type, nombre in sorted(rapport.par_gateway.items()):
+                self.stdout.write(f'    {gateway_type:<13}: {nombre}')
+            self.stdout.write(f'  → ENVOYE       : {rapport.envoyees}')
+            self.stdout.write(f'  → ANNULE       : {rapport.annulees}')
+            self.stdout.write(f'  Inchangées     : {rapport.inchangees}')
+            self.stdout.write(f'  Déjà traitées  : {rapport.deja_traitees}')
+            self.stdout.write(f'  Erreurs        : {rapport.erreurs}')
+            self.stdout.write(f'  Lignes écrites : {rapport.lignes_mises_a_jour}')
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ {rapport.debit:.1f} vérifications/s ({rapport.duree:.2f}s)'
+            ))
+
+            if not options['boucle']:
+                break
+            time.sleep(options['boucle'])
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from transactions.models import StatistiquesUtilisateur
+from transactions.services.statistiques import reparer
+
+
+class Command(BaseCommand):
+    help = 'Recompter les statistiques de transactions des utilisateurs (réparation des compteurs incrémentaux)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Seulement cet utilisateur (répétable)')
+
+    def handle(self, *args, **options):
+        self.stdout.write('🔧 Réparation des statistiques utilisateurs...')
+        user_ids = options['user_ids'] or list(
+            StatistiquesUtilisateur.objects.order_by('user_id').values_list('user_id', flat=True)
+        )
+        corriges = 0
+        for user_id in user_ids:
+            ecarts = reparer(user_id)
+            if ecarts:
+                corriges += 1
+                details = ', '.join(f'{champ} {avant} → {apres}' for champ, (avant, apres) in ecarts.items())
+                self.stdout.write(self.style.WARNING(f'  utilisateur {user_id}: corrigé {details}'))
+
+        self.stdout.write(f'  {corriges} ligne(s) corrigée(s) sur {len(user_ids)}')
+        self.stdout.write(self.style.SUCCESS('✅ Réparation terminée'))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from transactions.services.serveur_taux_local import ServeurTauxLocal
+
+
+class Command(BaseCommand):
+    help = "Lancer un faux service de taux de change local (EXCHANGE_RATES_API_URL=<url affichée>)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latence', type=float, default=0.0, help='Secondes ajoutées à chaque réponse')
+
+    def handle(self, *args, **options):
+        with ServeurTauxLocal(port=options['port'], latence=options['latence']) as serveur:
+            self.stdout.write(self.style.SUCCESS(f'💱 Service de taux local sur {serveur.url}'))
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                self.stdout.write(f'🛑 Arrêt ({serveur.requetes} requêtes servies)')
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:47
+
+from django.db import migrations, models
+
+
+def initialiser_sequence_transaction(apps, schema_editor):
+    """Démarrer la séquence idTransaction au-dessus des ids existants"""
+    Transaction = apps.get_model('transactions', 'Transaction')
+    CompteurSequence = apps.get_model('transactions', 'CompteurSequence')
+
+    max_id = Transaction.objects.aggregate(max_id=models.Max('idTransaction'))['max_id']
+    prochaine_valeur = max(100000001, max_id + 1) if max_id else 100000001
+
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE SEQUENCE IF NOT EXISTS transactions_seq_transaction START WITH %s",
+            [prochaine_valeur]
+        )
+    else:
+        CompteurSequence.objects.update_or_create(
+            nom='transaction', defaults={'prochaine_valeur': prochaine_valeur}
+        )
+
+
+def supprimer_sequence_transaction(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP SEQUENCE IF EXISTS transactions_seq_transaction")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0003_add_pays_limits'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompteurSequence',
+            fields=[
+                ('nom', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('prochaine_valeur', models.BigIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Compteur de séquence',
+                'verbose_name_plural': 'Compteurs de séquence',
+            },
+        ),
+        migrations.RunPython(initialiser_sequence_transaction, supprimer_sequence_transaction),
+    ]
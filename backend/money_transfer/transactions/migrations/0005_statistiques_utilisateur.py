@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+        ('transactions', '0004_compteur_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatistiquesUtilisateur',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='statistiques_transactions', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_transactions', models.IntegerField(default=0)),
+                ('montant_total', models.FloatField(default=0)),
+                ('transactions_terminees', models.IntegerField(default=0)),
+                ('transactions_en_attente', models.IntegerField(default=0)),
+                ('transactions_annulees', models.IntegerField(default=0)),
+                ('envois', models.IntegerField(default=0)),
+                ('receptions', models.IntegerField(default=0)),
+                ('retraits', models.IntegerField(default=0)),
+                ('transactions_wave', models.IntegerField(default=0)),
+                ('transactions_orange_money', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Statistiques utilisateur',
+                'verbose_name_plural': 'Statistiques utilisateurs',
+            },
+        ),
+    ]
@@ -0,0 +1,112 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:39
+
+import re
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+TABLE_INDEX = 'transactions_indexrecherchetransaction'
+TABLE_FTS = 'transactions_recherche_fts'
+
+
+def creer_index_trigrammes(apps, schema_editor):
+    """Index des fragments : pg_trgm sur PostgreSQL, table FTS5 synchronisée par triggers sur SQLite"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for colonne in ('code', 'telephone'):
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS {TABLE_INDEX}_{colonne}_trgm "
+                f"ON {TABLE_INDEX} USING gin ({colonne} gin_trgm_ops)"
+            )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {TABLE_FTS} USING fts5(code, telephone, "
+            f"content='{TABLE_INDEX}', content_rowid='id', tokenize='trigram')"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {TABLE_FTS}_ai AFTER INSERT ON {TABLE_INDEX} BEGIN "
+            f"INSERT INTO {TABLE_FTS}(rowid, code, telephone) VALUES (new.id, new.code, new.telephone); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {TABLE_FTS}_ad AFTER DELETE ON {TABLE_INDEX} BEGIN "
+            f"INSERT INTO {TABLE_FTS}({TABLE_FTS}, rowid, code, telephone) "
+            f"VALUES ('delete', old.id, old.code, old.telephone); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {TABLE_FTS}_au AFTER UPDATE OF code, telephone ON {TABLE_INDEX} "
+            f"WHEN old.code IS NOT new.code OR old.telephone IS NOT new.telephone BEGIN "
+            f"INSERT INTO {TABLE_FTS}({TABLE_FTS}, rowid, code, telephone) "
+            f"VALUES ('delete', old.id, old.code, old.telephone); "
+            f"INSERT INTO {TABLE_FTS}(rowid, code, telephone) VALUES (new.id, new.code, new.telephone); END"
+        )
+
+
+def supprimer_index_trigrammes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for colonne in ('code', 'telephone'):
+            schema_editor.execute(f"DROP INDEX IF EXISTS {TABLE_INDEX}_{colonne}_trgm")
+    elif vendor == 'sqlite':
+        for suffixe in ('ai', 'ad', 'au'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {TABLE_FTS}_{suffixe}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {TABLE_FTS}")
+
+
+def indexer_transactions_existantes(apps, schema_editor):
+    """Mêmes normalisations que services.recherche, par lots"""
+    Transaction = apps.get_model('transactions', 'Transaction')
+    IndexRechercheTransaction = apps.get_model('transactions', 'IndexRechercheTransaction')
+
+    def telephone(valeur):
+        valeur = (valeur or '').strip()
+        chiffres = re.sub(r'\D', '', valeur)
+        return chiffres[2:] if valeur.startswith('00') else chiffres
+
+    lot = []
+    for valeurs in Transaction.objects.values(
+        'id', 'expediteur_id', 'destinataire_id', 'codeTransaction', 'destinataire_phone', 'created_at'
+    ).iterator(chunk_size=5000):
+        lot.append(IndexRechercheTransaction(
+            transaction_id=valeurs['id'],
+            expediteur_id=valeurs['expediteur_id'],
+            destinataire_id=valeurs['destinataire_id'],
+            code=re.sub(r'[^0-9A-Z]', '', (valeurs['codeTransaction'] or '').upper()),
+            telephone=telephone(valeurs['destinataire_phone']),
+            created_at=valeurs['created_at'],
+        ))
+        if len(lot) >= 5000:
+            IndexRechercheTransaction.objects.bulk_create(lot)
+            lot = []
+    IndexRechercheTransaction.objects.bulk_create(lot)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0005_statistiques_utilisateur'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexRechercheTransaction',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('code', models.CharField(max_length=20)),
+                ('telephone', models.CharField(max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('destinataire', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('expediteur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('transaction', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='index_recherche', to='transactions.transaction')),
+            ],
+            options={
+                'verbose_name': 'Index de recherche',
+                'verbose_name_plural': 'Index de recherche',
+                'indexes': [models.Index(fields=['expediteur', 'code'], name='transaction_expedit_4c3a92_idx'), models.Index(fields=['destinataire', 'code'], name='transaction_destina_2ffa68_idx'), models.Index(fields=['expediteur', 'telephone'], name='transaction_expedit_9d9c1d_idx'), models.Index(fields=['destinataire', 'telephone'], name='transaction_destina_be59d0_idx')],
+            },
+        ),
+        migrations.RunPython(creer_index_trigrammes, supprimer_index_trigrammes),
+        migrations.RunPython(indexer_transactions_existantes, migrations.RunPython.noop),
+    ]
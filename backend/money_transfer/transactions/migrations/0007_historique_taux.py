@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0006_index_recherche'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoriqueTauxChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('devise_origine', models.CharField(max_length=3)),
+                ('devise_destination', models.CharField(max_length=3)),
+                ('taux', models.DecimalField(decimal_places=12, max_digits=24)),
+                ('source', models.CharField(max_length=20)),
+                ('date_effet', models.DateTimeField(help_text='Réception du taux (en vigueur à partir de cet instant)')),
+            ],
+            options={
+                'verbose_name': 'Historique de taux',
+                'verbose_name_plural': 'Historique des taux',
+                'db_table': 'transactions_historique_taux',
+                'ordering': ['-date_effet'],
+                'indexes': [models.Index(fields=['devise_origine', 'devise_destination', 'date_effet'], name='historique_taux_paire')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0007_historique_taux'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='indexrecherchetransaction',
+            index=models.Index(fields=['expediteur', '-created_at'], name='transaction_expedit_1bfa2a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='indexrecherchetransaction',
+            index=models.Index(fields=['destinataire', '-created_at'], name='transaction_destina_976177_idx'),
+        ),
+    ]
@@ -63,17 +63,19 @@ class CanalPaiement(models.Model):
     def __str__(self):
         return f"{self.canal_name} ({self.type_canal})"
     
+    @property
+    def bareme(self):
+        """Barème de frais (même formule que le moteur de devis)"""
+        from .services.frais import Bareme
+        return Bareme.depuis_pourcentage(self.fees_percentage, self.fees_fixed)
+    
     def calculate_fees(self, amount):
         """Calcule les frais pour un montant donné - VERSION CORRIGÉE"""
         # Convertir amount en Decimal si nécessaire
         if not isinstance(amount, Decimal):
             amount = Decimal(str(amount))
         
-        # Calcul des frais en Decimal
-        percentage_fee = (amount * self.fees_percentage) / Decimal('100')
-        total_fee = percentage_fee + self.fees_fixed
-        
-        return total_fee.quantize(Decimal('0.01'))
+        return self.bareme.frais(amount)
     
     def calculate_total_amount(self, amount):
         """Calcule le montant total avec frais - VERSION CORRIGÉE"""
@@ -227,14 +229,14 @@ class Transaction(models.Model):
         max_attempts = 5
         
         for attempt in range(max_attempts):
-            # Générer le code transaction si nécessaire
-            if not self.codeTransaction:
-                self.codeTransaction = self.generate_code_transaction()
-            
             # Générer l'ID transaction si nécessaire
             if not self.idTransaction:
                 self.idTransaction = self.generate_id_transaction()
             
+            # Générer le code transaction si nécessaire (dérivé de l'ID, sans requête)
+            if not self.codeTransaction:
+                self.codeTransaction = self.generate_code_transaction()
+            
             try:
                 super().save(*args, **kwargs)
                 break
@@ -247,6 +249,8 @@ class Transaction(models.Model):
                     continue
                     
                 elif 'codetransaction' in error_message and attempt < max_attempts - 1:
+                    # Le code dérive de l'ID : changer d'ID pour changer de code
+                    self.idTransaction = self.generate_id_transaction()
                     self.codeTransaction = self.generate_code_transaction()
                     continue
                     
@@ -254,23 +258,42 @@ class Transaction(models.Model):
                     raise e
     
     def generate_code_transaction(self):
-        """Génère un code de transaction unique avec préfixe selon le type"""
-        max_attempts = 10
-        for attempt in range(max_attempts):
-            year = timezone.now().year
-            random_part = ''.join(random.choices(string.digits, k=8))
-            
-            # Préfixe selon le type
-            prefix = self.get_code_prefix()
-            code = f"{prefix}{year}{random_part}"
-            
-            if not Transaction.objects.filter(codeTransaction=code).exists():
-                return code
+        """Génère un code de transaction unique avec préfixe selon le type, dérivé de idTransaction"""
+        from .services.codes import code_depuis_id
         
-        # Fallback avec timestamp
-        timestamp = int(timezone.now().timestamp())
-        prefix = self.get_code_prefix()
-        return f"{prefix}{year}{timestamp}"
+        if not self.idTransaction:
+            self.idTransaction = self.generate_id_transaction()
+        return code_depuis_id(self.get_code_prefix(), self.idTransaction)
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # État chargé : les signals en déduisent le delta de StatistiquesUtilisateur
+        instance._etat_stats = instance.etat_statistiques()
+        instance._cles_recherche = instance.cles_recherche()
+        instance._statut_notifie = instance.__dict__.get('statusTransaction')
+        return instance
+    
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._etat_stats = self.etat_statistiques()
+        self._cles_recherche = self.cles_recherche()
+        self._statut_notifie = self.__dict__.get('statusTransaction')
+    
+    def etat_statistiques(self):
+        """Champs qui comptent dans StatistiquesUtilisateur, None si l'un d'eux est différé"""
+        champs = ['expediteur_id', 'destinataire_id', 'canal_paiement_id',
+                  'typeTransaction', 'statusTransaction', 'montantEnvoye']
+        if any(champ not in self.__dict__ for champ in champs):
+            return None
+        return tuple(self.__dict__[champ] for champ in champs)
+    
+    def cles_recherche(self):
+        """Champs recopiés dans IndexRechercheTransaction, None si l'un d'eux est différé"""
+        champs = ['expediteur_id', 'destinataire_id', 'codeTransaction', 'destinataire_phone', 'created_at']
+        if any(champ not in self.__dict__ for champ in champs):
+            return None
+        return tuple(self.__dict__[champ] for champ in champs)
     
     def get_code_prefix(self):
         """Retourne le préfixe du code selon le type"""
@@ -283,28 +306,10 @@ class Transaction(models.Model):
         return prefixes.get(self.typeTransaction, 'TXN')
     
     def generate_id_transaction(self):
-        """Génère un ID transaction numérique unique"""
-        from django.db import transaction
+        """Génère un ID transaction numérique unique (séquence PostgreSQL ou blocs réservés)"""
+        from .services.id_allocator import get_id_allocator
         
-        with transaction.atomic():
-            max_id = Transaction.objects.select_for_update().aggregate(
-                max_id=models.Max('idTransaction')
-            )['max_id']
-            
-            if max_id:
-                new_id = max_id + 1
-            else:
-                new_id = 100000001
-            
-            while Transaction.objects.filter(idTransaction=new_id).exists():
-                new_id += 1
-                
-                if new_id > max_id + 1000 if max_id else 100001000:
-                    timestamp_part = int(timezone.now().timestamp()) % 1000000
-                    new_id = 100000000 + timestamp_part
-                    break
-            
-            return new_id
+        return get_id_allocator().allocate('transaction')
     
     def __str__(self):
         return f"Transaction {self.codeTransaction} - {self.get_typeTransaction_display()} - {self.montantEnvoye} {self.deviseEnvoi}"
@@ -535,14 +540,19 @@ class ServicePaiementInternational(models.Model):
         import re
         return bool(re.match(self.regex_telephone, phone_number))
     
+    @property
+    def bareme(self):
+        """Barème de frais (même formule que le moteur de devis)"""
+        from .services.frais import Bareme
+        return Bareme.depuis_pourcentage(self.frais_percentage, self.frais_fixe, self.frais_min, self.frais_max)
+    
     def calculate_fees(self, amount):
         """Calculer frais selon la configuration du service"""
         from decimal import Decimal
         if not isinstance(amount, Decimal):
             amount = Decimal(str(amount))
             
-        fee = (amount * self.frais_percentage) / Decimal('100') + self.frais_fixe
-        return max(min(fee, self.frais_max), self.frais_min)
+        return self.bareme.frais(amount)
 class TauxChange(models.Model):
     """Taux de change temps réel entre devises"""
     devise_origine = models.CharField(max_length=3)  # XOF
@@ -573,6 +583,34 @@ class TauxChange(models.Model):
             return self.taux * (1 + self.marge_vente)
         else:
             return self.taux * (1 - self.marge_achat)
+
+
+class HistoriqueTauxChange(models.Model):
+    """
+    Taux observé à un instant : jamais modifié, TauxChange n'en garde que le dernier.
+    
+    Le taux en vigueur à un instant t est la dernière observation de la paire
+    antérieure à t. La compaction supprime les observations qui ne changent pas
+    le taux, sans changer la réponse.
+    """
+    devise_origine = models.CharField(max_length=3)
+    devise_destination = models.CharField(max_length=3)
+    taux = models.DecimalField(max_digits=24, decimal_places=12)
+    source = models.CharField(max_length=20)
+    date_effet = models.DateTimeField(help_text="Réception du taux (en vigueur à partir de cet instant)")
+    
+    class Meta:
+        db_table = 'transactions_historique_taux'
+        verbose_name = 'Historique de taux'
+        verbose_name_plural = 'Historique des taux'
+        ordering = ['-date_effet']
+        indexes = [
+            # Taux en vigueur à un instant : dernière ligne de la paire avant t
+            models.Index(fields=['devise_origine', 'devise_destination', 'date_effet'], name='historique_taux_paire'),
+        ]
+    
+    def __str__(self):
+        return f"{self.devise_origine}→{self.devise_destination} {self.taux} ({self.date_effet:%Y-%m-%d %H:%M})"
         
         
 class CorridorTransfert(models.Model):
@@ -669,4 +707,102 @@ class TransactionInternationale(models.Model):
         if self.date_livraison_reelle:
             delta = self.date_livraison_reelle - self.created_at
             return int(delta.total_seconds() / 60)
-        return None
\ No newline at end of file
+        return None
+
+class CompteurSequence(models.Model):
+    """
+    Compteur des séquences nommées (idTransaction, ...) hors PostgreSQL.
+    
+    `prochaine_valeur` est la première valeur non encore réservée ; les
+    allocateurs réservent des blocs en l'incrémentant avec F().
+    """
+    nom = models.CharField(max_length=50, primary_key=True)
+    prochaine_valeur = models.BigIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Compteur de séquence"
+        verbose_name_plural = "Compteurs de séquence"
+    
+    def __str__(self):
+        return f"{self.nom} → {self.prochaine_valeur}"
+
+
+class StatistiquesUtilisateur(models.Model):
+    """
+    Compteurs de transactions d'un utilisateur (envoyées ou reçues), tenus à jour
+    par deltas à chaque création / changement / suppression de transaction.
+    
+    Une ligne absente est recalculée à la demande (une requête d'agrégation).
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='statistiques_transactions'
+    )
+    total_transactions = models.IntegerField(default=0)
+    montant_total = models.FloatField(default=0)
+    transactions_terminees = models.IntegerField(default=0)
+    transactions_en_attente = models.IntegerField(default=0)
+    transactions_annulees = models.IntegerField(default=0)
+    envois = models.IntegerField(default=0)
+    receptions = models.IntegerField(default=0)
+    retraits = models.IntegerField(default=0)
+    transactions_wave = models.IntegerField(default=0)
+    transactions_orange_money = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Statistiques utilisateur"
+        verbose_name_plural = "Statistiques utilisateurs"
+    
+    def __str__(self):
+        return f"Stats {self.user_id}: {self.total_transactions} transactions"
+
+
+class IndexRechercheTransaction(models.Model):
+    """
+    Clés de recherche normalisées d'une transaction (code, téléphone en chiffres).
+    
+    Index B-tree (utilisateur, clé) pour les recherches exactes et par préfixe,
+    (utilisateur, date) pour les servir des plus récentes aux plus anciennes ;
+    les fragments passent par un index trigrammes créé par la migration : pg_trgm
+    sur PostgreSQL, table FTS5 `transactions_recherche_fts` sur SQLite.
+    L'id auto-incrémenté sert de rowid à la table FTS5.
+    """
+    id = models.BigAutoField(primary_key=True)
+    transaction = models.OneToOneField(
+        Transaction,
+        on_delete=models.CASCADE,
+        related_name='index_recherche'
+    )
+    expediteur = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    destinataire = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+'
+    )
+    code = models.CharField(max_length=20)
+    telephone = models.CharField(max_length=20)
+    created_at = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = "Index de recherche"
+        verbose_name_plural = "Index de recherche"
+        indexes = [
+            models.Index(fields=['expediteur', 'code']),
+            models.Index(fields=['destinataire', 'code']),
+            models.Index(fields=['expediteur', 'telephone']),
+            models.Index(fields=['destinataire', 'telephone']),
+            models.Index(fields=['expediteur', '-created_at']),
+            models.Index(fields=['destinataire', '-created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.code} / {self.telephone}"
@@ -0,0 +1,83 @@
+# transactions/pagination.py
+import uuid
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+class TransactionCursorPagination(CursorPagination):
+    """
+    Pagination par curseur (keyset) sur (created_at, id), des plus récentes aux plus anciennes.
+
+    Le curseur contient le couple (created_at, id) de la dernière ligne renvoyée :
+    chaque page est un simple WHERE ... ORDER BY ... LIMIT, sans OFFSET, quel que
+    soit le nombre de pages déjà parcourues. L'id départage les dates identiques.
+    """
+
+    ordering = ('-created_at', '-id')
+    # Conversion de l'id lu dans le curseur
+    type_pk = uuid.UUID
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+
+        if self.cursor and self.cursor.position:
+            created_at, pk = self._decoder_position(self.cursor.position)
+            if reverse:
+                queryset = queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+            else:
+                queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+        # Une ligne de plus que la page pour savoir s'il en reste
+        queryset = queryset.order_by(*(('created_at', 'id') if reverse else self.ordering))
+        resultats = list(queryset[:self.page_size + 1])
+        encore = len(resultats) > self.page_size
+        self.page = resultats[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = encore
+        else:
+            self.has_next = encore
+            self.has_previous = self.cursor is not None
+
+        self.display_page_controls = self.has_next or self.has_previous
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self._position(self.page[-1]) if self.page else self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self._position(self.page[0]) if self.page else self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    @staticmethod
+    def _position(instance):
+        return f"{instance.created_at.isoformat()}|{instance.pk}"
+
+    def _decoder_position(self, position):
+        try:
+            created_at, pk = position.split('|', 1)
+            created_at = parse_datetime(created_at)
+            if created_at is None:
+                raise ValueError(position)
+            return created_at, self.type_pk(pk)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
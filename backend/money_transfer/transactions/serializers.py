@@ -2,13 +2,22 @@
 
 from rest_framework import serializers
 from .models import Transaction, Beneficiaire, CanalPaiement, TypeTransaction, StatutTransaction,  Pays, ServicePaiementInternational, CorridorTransfert, TransactionInternationale
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db.models import Q
 from decimal import Decimal
 import logging
+import re
 
 # Import du service de paiement simulé
 from payment_gateways.services import payment_service, PaymentStatus
+from .services import frais
+from .services.payment_dispatch import (
+    executer_paiement,
+    get_dispatcher,
+    get_gateway_type,
+    dispatch_asynchrone_actif,
+)
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -48,11 +57,7 @@ class TransactionSerializers(serializers.ModelSerializer):
     
     def _get_gateway_type(self, canal_type):
         """Mapper le type de canal vers le type de gateway"""
-        mapping = {
-            'WAVE': 'WAVE',
-            'ORANGE_MONEY': 'ORANGE_MONEY',
-        }
-        return mapping.get(canal_type)
+        return get_gateway_type(canal_type)
         
     def create(self, validated_data):
         """Créer une transaction avec simulation gateway INTÉGRÉE - VERSION CORRIGÉE"""
@@ -120,69 +125,17 @@ class TransactionSerializers(serializers.ModelSerializer):
             transaction.save()
             raise serializers.ValidationError(f"Type de gateway {canal.type_canal} non supporté")
         
-        try:
-            # 3. Appeler le simulateur de gateway
-            logger.info(f"🔄 Appel {gateway_type} pour transaction {transaction.codeTransaction}")
-            
-            # CORRECTION: Convertir le montant en Decimal
-            montant_decimal = Decimal(str(montant_envoye))
-            
-            payment_response = payment_service.process_payment(
-                gateway_type=gateway_type,
-                phone=beneficiaire_phone,
-                amount=montant_decimal,  # UTILISER DECIMAL
-                reference=transaction.codeTransaction
-            )
-            
-            # 4. Traiter la réponse du gateway - VERSION CORRIGÉE
-            if payment_response.success:
-                # ✅ SUCCÈS - Calculer les frais réels du gateway
-                frais_gateway = payment_response.fees if payment_response.fees else Decimal('0')
-                
-                # CORRECTION: Tous les calculs en Decimal
-                montant_envoye_decimal = Decimal(str(montant_envoye))
-                montant_converti = montant_envoye_decimal - frais_gateway
-                
-                # Mettre à jour la transaction avec les données du gateway
-                transaction.montantConverti = float(montant_converti)
-                transaction.montantRecu = float(montant_converti)
-                transaction.frais = f"{frais_gateway:.2f} XOF"
-                transaction.statusTransaction = StatutTransaction.ENVOYE  # Prêt pour retrait
-                transaction.save()
-                
-                logger.info(f"✅ {gateway_type}: Transaction {transaction.codeTransaction} SUCCESS")
-                logger.info(f"💰 Frais {gateway_type}: {frais_gateway} XOF")
-                
-            else:
-                # ❌ ÉCHEC - Gateway a refusé
-                # Calculer les frais prévus pour information
-                frais_calcules_decimal = canal.calculate_fees(Decimal(str(montant_envoye)))
-                montant_envoye_decimal = Decimal(str(montant_envoye))
-                montant_converti = montant_envoye_decimal - frais_calcules_decimal
-                
-                transaction.montantConverti = float(montant_converti)
-                transaction.montantRecu = float(montant_converti)
-                transaction.frais = f"{frais_calcules_decimal:.2f} XOF (calculé)"
-                transaction.statusTransaction = StatutTransaction.ANNULE
-                transaction.save()
-                
-                logger.warning(f"❌ {gateway_type}: Transaction {transaction.codeTransaction} FAILED")
-                logger.warning(f"🚫 Raison: {payment_response.message}")
-                
-        except Exception as e:
-            # 🔥 ERREUR TECHNIQUE
-            logger.error(f"💥 Erreur technique gateway pour {transaction.codeTransaction}: {e}")
-            
-            # Calculer les frais prévus pour information
-            frais_calcules_decimal = canal.calculate_fees(Decimal(str(montant_envoye)))
-            montant_envoye_decimal = Decimal(str(montant_envoye))
-            montant_converti = montant_envoye_decimal - frais_calcules_decimal
-            
-            transaction.montantConverti = float(montant_converti)
-            transaction.montantRecu = float(montant_converti)
-            transaction.frais = f"{frais_calcules_decimal:.2f} XOF (calculé)"
-            transaction.statusTransaction = StatutTransaction.ANNULE
-            transaction.save()
+        # 3. Appeler le gateway : via le pool de workers en mode asynchrone
+        #    (la transaction reste EN_ATTENTE), sinon dans la requête
+        dispatche = False
+        if dispatch_asynchrone_actif():
+            dispatche = get_dispatcher().soumettre(transaction.pk, gateway_type, beneficiaire_phone)
+            if dispatche:
+                logger.info(f"📤 Transaction {transaction.codeTransaction} confiée au pool de paiement")
+        
+        if not dispatche:
+            # 4. Traiter la réponse du gateway (ENVOYE / ANNULE)
+            executer_paiement(transaction, gateway_type, beneficiaire_phone)
         
         # 5. Mettre à jour ou créer le bénéficiaire si nécessaire
         if not destinataire_user:
@@ -592,55 +545,70 @@ class CompleteRetraitSerializer(serializers.Serializer):
 class SendMoneyInternationalSerializer(serializers.Serializer):
     """Serializer pour envoi international"""
     
+    # Devis du calculateur : montant, destination et canal repris tels quels
+    quote_id = serializers.CharField(max_length=32, required=False)
+    
     # Destinataire
     destinataire_phone = serializers.CharField(max_length=20)
     destinataire_nom = serializers.CharField(max_length=100, required=False)
     
     # Montant et devise
-    montant = serializers.DecimalField(max_digits=10, decimal_places=2)
+    montant = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
     devise_envoi = serializers.CharField(max_length=3, default='XOF')
     
     # Destination
-    pays_destination = serializers.CharField(max_length=3)  # Code ISO
-    service_destination = serializers.CharField(max_length=20)
+    pays_destination = serializers.CharField(max_length=3, required=False)  # Code ISO
+    service_destination = serializers.CharField(max_length=20, required=False)
     
     # Canal de paiement local
-    canal_paiement_id = serializers.UUIDField()
+    canal_paiement_id = serializers.UUIDField(required=False)
     
     def validate(self, data):
         """Validation complète transaction internationale"""
-        # Vérifier corridor actif
-        try:
-            corridor = CorridorTransfert.objects.get(
-                pays_origine__code_iso='SEN',  # Votre pays de base
-                pays_destination__code_iso=data['pays_destination'],
-                is_active=True
-            )
-        except CorridorTransfert.DoesNotExist:
-            raise serializers.ValidationError("Corridor non disponible")
+        if data.get('quote_id'):
+            return self.validate_devis(data)
         
-        # Vérifier service destination
-        try:
-            service = ServicePaiementInternational.objects.get(
-                pays__code_iso=data['pays_destination'],
-                code_service=data['service_destination'],
-                is_active=True
-            )
-        except ServicePaiementInternational.DoesNotExist:
-            raise serializers.ValidationError("Service de destination non disponible")
+        manquants = [champ for champ in ('montant', 'pays_destination', 'service_destination', 'canal_paiement_id')
+                     if champ not in data]
+        if manquants:
+            raise serializers.ValidationError({champ: "Ce champ est obligatoire sans quote_id." for champ in manquants})
         
-        # Vérifier limites
-        if not (corridor.montant_min_corridor <= data['montant'] <= corridor.montant_max_corridor):
-            raise serializers.ValidationError(
-                f"Montant doit être entre {corridor.montant_min_corridor} et {corridor.montant_max_corridor}"
-            )
+        # Moteur de devis : mêmes règles (origine, limites, montant reçu) que le calculateur,
+        # au taux du service de change
+        try:
+            corridor = frais.corridor((settings.INTERNATIONAL_ORIGIN_COUNTRY, data['pays_destination']))
+            devis_client = frais.preparer_envoi(frais.devis(
+                data['montant'], corridor.code, data['service_destination'],
+                canal=data['canal_paiement_id'], taux=frais.taux_du_jour(corridor),
+            ))
+        except frais.FraisIndisponibles as e:
+            raise serializers.ValidationError(str(e))
         
         # Valider numéro destinataire
-        if not service.validate_phone(data['destinataire_phone']):
+        if not re.match(devis_client.regex_telephone, data['destinataire_phone']):
             raise serializers.ValidationError("Numéro destinataire invalide pour ce service")
         
-        data['corridor'] = corridor
-        data['service_destination_obj'] = service
+        data['devis_client'] = devis_client
+        return data
+    
+    def validate_devis(self, data):
+        """Envoi sur devis : tout vient du cache, sans relire corridor ni services"""
+        devis_client = frais.devis_enregistre(data['quote_id'])
+        if devis_client is None:
+            raise serializers.ValidationError({'quote_id': "Devis expiré ou inconnu, recalculez les frais."})
+        devis = devis_client.devis
+        
+        # Les champs fournis en plus du devis doivent lui correspondre
+        corridor_devis = devis.corridor.split('_TO_')[1]
+        for champ, valeur in (('montant', devis.montant_envoye), ('pays_destination', corridor_devis),
+                              ('service_destination', devis.service), ('canal_paiement_id', devis.canal)):
+            if champ in data and str(data[champ]) != str(valeur):
+                raise serializers.ValidationError({champ: "Ne correspond pas au devis."})
+        
+        if not re.match(devis_client.regex_telephone, data['destinataire_phone']):
+            raise serializers.ValidationError("Numéro destinataire invalide pour ce service")
+        
+        data['devis_client'] = devis_client
         return data
 
 class CalculateurFraisInternationalSerializer(serializers.Serializer):
@@ -649,72 +617,16 @@ class CalculateurFraisInternationalSerializer(serializers.Serializer):
     montant = serializers.DecimalField(max_digits=10, decimal_places=2)
     corridor = serializers.CharField(max_length=10)  # SEN_TO_COG
     service_destination = serializers.CharField(max_length=20)
+    canal_paiement_id = serializers.UUIDField(required=False)
     
-    def calculate_all_fees(self):
-        """Calculer tous les frais et retourner détail"""
-        from .services.exchange_rates import ExchangeRateService
-        
+    def creer_devis(self):
+        """Calculer tous les frais et conserver le devis (quote_id) pour l'envoi"""
         data = self.validated_data
-        corridor_code = data['corridor']
         
-        # Obtenir objets
-        origine_code, dest_code = corridor_code.split('_TO_')
-        corridor = CorridorTransfert.objects.get(
-            pays_origine__code_iso=origine_code,
-            pays_destination__code_iso=dest_code
+        # Configuration des frais en mémoire : aucune requête pour le corridor et les services
+        corridor = frais.corridor(data['corridor'])
+        devis = frais.devis(
+            data['montant'], corridor.code, data['service_destination'],
+            canal=data.get('canal_paiement_id'), taux=frais.taux_du_jour(corridor),
         )
-        
-        service_dest = ServicePaiementInternational.objects.get(
-            pays__code_iso=dest_code,
-            code_service=data['service_destination']
-        )
-        
-        # Calculs
-        montant = data['montant']
-        
-        # 1. Frais service origine (Wave/OM Sénégal)
-        canal_origine = CanalPaiement.objects.filter(
-            country="Sénégal", is_active=True
-        ).first()
-        frais_origine = canal_origine.calculate_fees(montant)
-        
-        # 2. Commission corridor
-        commission = (montant * corridor.commission_percentage / 100) + corridor.commission_fixe
-        
-        # 3. Taux de change
-        exchange_service = ExchangeRateService()
-        devise_orig = corridor.pays_origine.devise
-        devise_dest = corridor.pays_destination.devise
-        
-        if devise_orig != devise_dest:
-            taux = exchange_service.get_rate(devise_orig, devise_dest)
-            montant_converti = exchange_service.calculate_conversion(
-                montant - frais_origine - commission, 
-                devise_orig, devise_dest
-            )
-            frais_change = montant_converti * Decimal('0.02')  # 2% frais change
-        else:
-            montant_converti = montant - frais_origine - commission
-            frais_change = Decimal('0')
-            taux = Decimal('1')
-        
-        # 4. Frais service destination
-        frais_destination = service_dest.calculate_fees(montant_converti)
-        
-        # Montant final reçu
-        montant_final = montant_converti - frais_destination
-        
-        return {
-            'montant_envoye': montant,
-            'frais_origine': frais_origine,
-            'commission_corridor': commission,
-            'frais_change': frais_change,
-            'frais_destination': frais_destination,
-            'frais_total': frais_origine + commission + frais_change,
-            'taux_applique': taux,
-            'montant_converti': montant_converti,
-            'montant_recu': montant_final,
-            'devise_origine': devise_orig,
-            'devise_destination': devise_dest,
-            'temps_estime': f"{corridor.temps_livraison_min}-{corridor.temps_livraison_max} min"
-        }
\ No newline at end of file
+        return frais.enregistrer_devis(devis)
\ No newline at end of file
@@ -0,0 +1,531 @@
+# transactions/services/bulk_import.py
+import csv
+import json
+import logging
+import time
+import uuid
+from array import array
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction as db_transaction
+from django.db.models.fields import AutoFieldMixin
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ..models import Transaction, CanalPaiement, IndexRechercheTransaction, StatutTransaction, TypeTransaction
+from .codes import code_depuis_id
+from .id_allocator import get_id_allocator
+from .recherche import entree_index
+from ..signals import transactions_importees
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+CHAMPS_REQUIS = ['expediteur_phone', 'destinataire_phone', 'canal', 'montantEnvoye']
+
+# Types passés tels quels au driver : pas de conversion valeur par valeur
+TYPES_DIRECTS = {
+    'CharField', 'TextField', 'FloatField', 'IntegerField', 'PositiveIntegerField',
+    'BigIntegerField', 'BooleanField', 'AutoField', 'BigAutoField',
+}
+
+
+class LigneInvalide(Exception):
+    """Ligne rejetée par la validation"""
+
+
+class InsertionEnMasse:
+    """
+    INSERT multi-lignes sans instancier de modèles (bulk_create allégé).
+
+    Les lignes sont des dicts {attname: valeur} ; les champs absents prennent leur
+    valeur par défaut statique, '' / NULL si le champ le permet, ou maintenant pour
+    les dates auto. Aucun signal n'est envoyé. Avec `cle_primaire`, la clé
+    auto-incrémentée est insérée telle quelle (restauration d'archives).
+    """
+
+    def __init__(self, modele, champs, cle_primaire=False):
+        self.champs = []
+        self.defauts = {}
+        maintenant = timezone.now()
+
+        for champ in modele._meta.concrete_fields:
+            if isinstance(champ, AutoFieldMixin) and not cle_primaire:
+                continue
+            self.champs.append(champ)
+            if champ.attname in champs:
+                continue
+            if getattr(champ, 'auto_now', False) or getattr(champ, 'auto_now_add', False):
+                self.defauts[champ.attname] = maintenant
+            elif champ.has_default() and not callable(champ.default):
+                self.defauts[champ.attname] = champ.default
+            elif champ.null:
+                self.defauts[champ.attname] = None
+            elif champ.blank and champ.empty_strings_allowed:
+                self.defauts[champ.attname] = ''
+            else:
+                raise ValueError(f"{modele.__name__}.{champ.attname} doit être fourni")
+
+        self.convertisseurs = [self._convertisseur(champ) for champ in self.champs]
+        colonnes = ', '.join(connection.ops.quote_name(champ.column) for champ in self.champs)
+        self.sql = f"INSERT INTO {connection.ops.quote_name(modele._meta.db_table)} ({colonnes}) VALUES "
+        self.marqueurs = '(' + ', '.join(['%s'] * len(self.champs)) + ')'
+        # Même limite de paramètres par requête que bulk_create
+        self.lignes_par_requete = max(1, (connection.features.max_query_params or 10000) // len(self.champs))
+
+    @staticmethod
+    def _convertisseur(champ):
+        cible = champ.target_field if champ.is_relation else champ
+        if cible.get_internal_type() in TYPES_DIRECTS:
+            return None
+        return lambda valeur: cible.get_db_prep_save(valeur, connection)
+
+    def inserer(self, lignes):
+        """Insérer une liste de dicts, retourne le nombre de lignes"""
+        valeurs = []
+        for ligne in lignes:
+            for champ, convertir in zip(self.champs, self.convertisseurs):
+                valeur = ligne.get(champ.attname, self.defauts.get(champ.attname))
+                valeurs.append(valeur if convertir is None or valeur is None else convertir(valeur))
+
+        nb_champs = len(self.champs)
+        with connection.cursor() as cursor:
+            for debut in range(0, len(lignes), self.lignes_par_requete):
+                fin = min(debut + self.lignes_par_requete, len(lignes))
+                cursor.execute(
+                    self.sql + ', '.join([self.marqueurs] * (fin - debut)),
+                    valeurs[debut * nb_champs:fin * nb_champs]
+                )
+        return len(lignes)
+
+
+@contextmanager
+def cache_sqlite(taille_ko):
+    """
+    Agrandir le cache de pages SQLite le temps de l'import (2 Mo par défaut).
+
+    Les index sur des valeurs aléatoires (UUID, codes) ne tiennent plus dans le
+    cache au-delà de quelques centaines de milliers de lignes et chaque INSERT
+    relit alors des pages depuis le disque. Sans effet sur les autres bases.
+    """
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA cache_size')
+        precedent = cursor.fetchone()[0]
+        cursor.execute(f'PRAGMA cache_size = -{int(taille_ko)}')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA cache_size = {int(precedent)}')
+
+
+@dataclass
+class RapportImport:
+    """Compteurs d'un import"""
+    lues: int = 0
+    importees: int = 0
+    rejetees: int = 0
+    notifications: int = 0
+    receptions: int = 0
+    duree_insertion: float = 0.0
+    duree_diffusion: float = 0.0
+    par_canal: dict = field(default_factory=dict)
+
+    @property
+    def debit(self):
+        """Lignes importées par seconde (phase d'insertion)"""
+        return self.importees / self.duree_insertion if self.duree_insertion else 0.0
+
+
+def lire_lignes(chemin, format_fichier=None):
+    """Lire un fichier CSV ou JSONL en flux : (numéro de ligne, dict ou LigneInvalide)"""
+    format_fichier = format_fichier or ('jsonl' if chemin.endswith(('.jsonl', '.ndjson')) else 'csv')
+
+    with open(chemin, newline='', encoding='utf-8') as fichier:
+        if format_fichier == 'csv':
+            for numero, ligne in enumerate(csv.DictReader(fichier), start=2):
+                yield numero, ligne
+        else:
+            for numero, brute in enumerate(fichier, start=1):
+                if not brute.strip():
+                    continue
+                # Une ligne illisible est rejetée comme une ligne invalide, l'import continue
+                try:
+                    ligne = json.loads(brute)
+                except ValueError as e:
+                    yield numero, LigneInvalide(f"JSON invalide: {e}")
+                    continue
+                yield numero, ligne if isinstance(ligne, dict) else LigneInvalide("Objet JSON attendu")
+
+
+class TransactionImporter:
+    """
+    Import en masse de transactions.
+
+    Phase 1 : validation par lots, ids et codes pré-alloués, INSERT multi-lignes
+    par chunk (aucun signal) avec les entrées d'index de recherche. Phase 2 : les effets de bord des signals post_save
+    (notifications de création, réceptions pour les ENVOYE) sont rejoués par lots.
+    """
+
+    PREFIXES = {
+        TypeTransaction.ENVOI: 'TXN',
+        TypeTransaction.RECEPTION: 'RCP',
+        TypeTransaction.RETRAIT: 'RET',
+        TypeTransaction.RECHARGE: 'RCH',
+    }
+
+    CHAMPS_TRANSACTION = {
+        'id', 'idTransaction', 'expediteur_id', 'destinataire_id', 'destinataire_phone',
+        'destinataire_nom', 'canal_paiement_id', 'typeTransaction', 'statusTransaction',
+        'montantEnvoye', 'montantConverti', 'montantRecu', 'frais', 'deviseEnvoi',
+        'deviseReception', 'codeTransaction', 'created_at', 'updated_at', 'dateTraitement',
+    }
+
+    # Cache SQLite pendant l'import, en Ko
+    CACHE_SQLITE_KO = 512 * 1024
+
+    # Rejets gardés en mémoire pour le résumé ; la liste complète va dans `sortie_rejets`
+    ECHANTILLON_REJETS = 20
+
+    def __init__(self, chunk_size=5000, notifications=True, receptions=True, progression=None, sortie_rejets=None):
+        self.chunk_size = chunk_size
+        self.notifications = notifications
+        self.receptions = receptions
+        self.progression = progression or (lambda rapport: None)
+        self.sortie_rejets = sortie_rejets
+        self._users = {}
+        self._noms = {}
+        self._canaux = {}
+        self._ids_importes = array('q')
+        self._codes_vus = set()
+        self._jours = set()
+        self.rejets = []
+
+    # ===== PHASE 1 : INSERTION =====
+
+    def importer(self, lignes, valider_seulement=False):
+        with cache_sqlite(self.CACHE_SQLITE_KO):
+            return self._importer(lignes, valider_seulement)
+
+    def _importer(self, lignes, valider_seulement):
+        rapport = RapportImport()
+        self._charger_canaux()
+        self._insertion = InsertionEnMasse(Transaction, self.CHAMPS_TRANSACTION)
+        self._insertion_index = InsertionEnMasse(IndexRechercheTransaction, {
+            'transaction_id', 'expediteur_id', 'destinataire_id', 'code', 'telephone', 'created_at',
+        })
+
+        debut = time.perf_counter()
+        lot = []
+        try:
+            for numero, ligne in lignes:
+                rapport.lues += 1
+                if isinstance(ligne, LigneInvalide):
+                    self._rejeter(rapport, numero, ligne, None)
+                    continue
+                lot.append((numero, ligne))
+                if len(lot) >= self.chunk_size:
+                    self._traiter_lot(lot, rapport, valider_seulement)
+                    rapport.duree_insertion = time.perf_counter() - debut
+                    self.progression(rapport)
+                    lot = []
+            if lot:
+                self._traiter_lot(lot, rapport, valider_seulement)
+        except BaseException:
+            # Import interrompu : les chunks déjà validés ont leurs effets de bord,
+            # sans masquer l'erreur d'origine
+            rapport.duree_insertion = time.perf_counter() - debut
+            if not valider_seulement and self._ids_importes:
+                try:
+                    self._finaliser(rapport)
+                except Exception:
+                    logger.exception("❌ Effets différés de l'import interrompu non appliqués")
+            raise
+
+        rapport.duree_insertion = time.perf_counter() - debut
+        if not valider_seulement and self._ids_importes:
+            self._finaliser(rapport)
+        return rapport
+
+    def _rejeter(self, rapport, numero, erreur, donnees):
+        """Compter un rejet, l'écrire dans `sortie_rejets` (JSONL) et n'en garder qu'un échantillon"""
+        rapport.rejetees += 1
+        rejet = {'ligne': numero, 'erreur': str(erreur), 'donnees': donnees}
+        if len(self.rejets) < self.ECHANTILLON_REJETS:
+            self.rejets.append(rejet)
+        if self.sortie_rejets is not None:
+            self.sortie_rejets.write(json.dumps(rejet, ensure_ascii=False, default=str) + '\n')
+
+    def _finaliser(self, rapport):
+        # Insertions sans signal par ligne : les compteurs se resynchronisent
+        transactions_importees.send(
+            sender=Transaction,
+            jours=self._jours,
+            user_ids={user_id for user_id in self._users.values() if user_id},
+        )
+
+        debut = time.perf_counter()
+        self._diffuser(rapport)
+        rapport.duree_diffusion = time.perf_counter() - debut
+
+    def _charger_canaux(self):
+        """Les canaux sont peu nombreux : résolus par id ou par type en mémoire"""
+        for canal in CanalPaiement.objects.filter(is_active=True).order_by('created_at'):
+            self._canaux[str(canal.id)] = canal
+            self._canaux.setdefault(canal.type_canal, canal)
+
+    def _resoudre_users(self, phones):
+        """Une requête par lot pour les numéros pas encore vus"""
+        inconnus = {phone for phone in phones if phone not in self._users}
+        if not inconnus:
+            return
+        trouves = dict(User.objects.filter(phone_number__in=inconnus).values_list('phone_number', 'id'))
+        for phone in inconnus:
+            self._users[phone] = trouves.get(phone)
+
+    def _traiter_lot(self, lot, rapport, valider_seulement):
+        self._resoudre_users(
+            {ligne.get('expediteur_phone') for _, ligne in lot}
+            | {ligne.get('destinataire_phone') for _, ligne in lot}
+        )
+
+        # Codes fournis par le partenaire : une seule requête de vérification par lot
+        codes_fournis = {ligne['codeTransaction'] for _, ligne in lot if ligne.get('codeTransaction')}
+        codes_en_base = set(
+            Transaction.objects.filter(codeTransaction__in=codes_fournis).values_list('codeTransaction', flat=True)
+        ) if codes_fournis else set()
+
+        valides = []
+        for numero, ligne in lot:
+            try:
+                valeurs = self._construire(ligne, codes_en_base)
+                if valeurs['codeTransaction']:
+                    self._codes_vus.add(valeurs['codeTransaction'])  # doublons dans le fichier
+                valides.append(valeurs)
+            except (LigneInvalide, InvalidOperation, ValueError, TypeError) as e:
+                self._rejeter(rapport, numero, e, ligne)
+
+        if valider_seulement or not valides:
+            return
+
+        # Ids et codes pré-alloués : une réservation pour tout le lot
+        ids = get_id_allocator().allocate_many(len(valides), 'transaction')
+        for valeurs, id_transaction in zip(valides, ids):
+            valeurs['idTransaction'] = id_transaction
+            if not valeurs['codeTransaction']:
+                valeurs['codeTransaction'] = code_depuis_id(
+                    self.PREFIXES.get(valeurs['typeTransaction'], 'TXN'),
+                    id_transaction,
+                    annee=valeurs['created_at'].year
+                )
+
+        with db_transaction.atomic():
+            self._insertion.inserer(valides)
+            self._insertion_index.inserer([entree_index(valeurs) for valeurs in valides])
+
+        self._ids_importes.extend(ids)
+        rapport.importees += len(valides)
+        for valeurs in valides:
+            self._jours.add(valeurs['dateTraitement'])
+            nom = self._canaux[str(valeurs['canal_paiement_id'])].canal_name
+            rapport.par_canal[nom] = rapport.par_canal.get(nom, 0) + 1
+
+    def _construire(self, ligne, codes_en_base):
+        """Valider une ligne et retourner les valeurs de colonnes à insérer"""
+        manquants = [champ for champ in CHAMPS_REQUIS if not ligne.get(champ)]
+        if manquants:
+            raise LigneInvalide(f"Champs manquants: {', '.join(manquants)}")
+
+        expediteur_id = self._users.get(ligne['expediteur_phone'])
+        if not expediteur_id:
+            raise LigneInvalide(f"Expéditeur inconnu: {ligne['expediteur_phone']}")
+
+        canal = self._canaux.get(str(ligne['canal']))
+        if not canal:
+            raise LigneInvalide(f"Canal inconnu ou inactif: {ligne['canal']}")
+
+        montant = self._montant(ligne['montantEnvoye'])
+        if montant <= 0:
+            raise LigneInvalide("Le montant envoyé doit être supérieur à 0")
+
+        statut = ligne.get('statusTransaction') or StatutTransaction.EN_ATTENTE
+        if statut not in StatutTransaction.values:
+            raise LigneInvalide(f"Statut invalide: {statut}")
+        type_transaction = ligne.get('typeTransaction') or TypeTransaction.ENVOI
+        if type_transaction not in TypeTransaction.values:
+            raise LigneInvalide(f"Type invalide: {type_transaction}")
+
+        code = ligne.get('codeTransaction') or ''
+        if code and (code in codes_en_base or code in self._codes_vus):
+            raise LigneInvalide(f"Code déjà utilisé: {code}")
+
+        created_at = self._date(ligne.get('created_at'))
+        montant_recu = self._montant(ligne.get('montantRecu') or montant)
+
+        return {
+            'id': uuid.uuid4(),
+            'expediteur_id': expediteur_id,
+            'destinataire_id': self._users.get(ligne['destinataire_phone']),
+            'destinataire_phone': ligne['destinataire_phone'],
+            'destinataire_nom': ligne.get('destinataire_nom') or '',
+            'canal_paiement_id': canal.id,
+            'typeTransaction': type_transaction,
+            'statusTransaction': statut,
+            'montantEnvoye': montant,
+            'montantConverti': self._montant(ligne.get('montantConverti') or montant_recu),
+            'montantRecu': montant_recu,
+            'frais': ligne.get('frais') or '0 XOF',
+            'deviseEnvoi': ligne.get('deviseEnvoi') or 'XOF',
+            'deviseReception': ligne.get('deviseReception') or 'XOF',
+            'codeTransaction': code,
+            'created_at': created_at,
+            'updated_at': created_at,
+            'dateTraitement': timezone.localdate(created_at),
+        }
+
+    @staticmethod
+    def _montant(valeur):
+        montant = Decimal(str(valeur))
+        # NaN et infini passeraient les comparaisons une fois convertis en float
+        if not montant.is_finite():
+            raise LigneInvalide(f"Montant invalide: {valeur}")
+        return float(montant)
+
+    @staticmethod
+    def _date(valeur):
+        if not valeur:
+            return timezone.now()
+        date = parse_datetime(valeur) if isinstance(valeur, str) else valeur
+        if date is None:
+            raise LigneInvalide(f"Date invalide: {valeur}")
+        if isinstance(date, datetime) and timezone.is_naive(date):
+            date = timezone.make_aware(date)
+        return date
+
+    # ===== PHASE 2 : EFFETS DE BORD DIFFÉRÉS =====
+
+    def _diffuser(self, rapport):
+        """Rejouer par lots ce que feraient les signals post_save(created=True)"""
+        if not (self.notifications or self.receptions):
+            return
+
+        from notifications.models import Notification
+        from notifications.services.boite import ajuster_non_lues, compter_nouvelles
+        from reception.models import Reception
+
+        insertion_notifications = InsertionEnMasse(
+            Notification, {'user_id', 'title', 'message', 'notification_type', 'auto_sent'}
+        )
+        insertion_receptions = InsertionEnMasse(Reception, {
+            'transaction_origine_id', 'destinataire_id', 'code_reception', 'montant_a_recevoir',
+            'devise_reception', 'mode_reception', 'canal_paiement_id', 'statut',
+            'notification_envoyee', 'date_notification', 'expediteur_nom', 'expediteur_telephone',
+        })
+
+        for debut in range(0, len(self._ids_importes), self.chunk_size):
+            ids = self._ids_importes[debut:debut + self.chunk_size].tolist()
+            transactions = list(Transaction.objects.filter(idTransaction__in=ids).values(
+                'id', 'codeTransaction', 'statusTransaction', 'expediteur_id', 'destinataire_id',
+                'destinataire_phone', 'montantEnvoye', 'montantRecu', 'deviseEnvoi',
+                'deviseReception', 'canal_paiement_id',
+            ))
+            self._charger_noms(
+                {t['expediteur_id'] for t in transactions}
+                | {t['destinataire_id'] for t in transactions if t['destinataire_id']}
+            )
+
+            notifications = []
+            receptions = []
+            if self.notifications:
+                notifications.extend(self._notifications_creation(transactions))
+            if self.receptions:
+                receptions, notifications_receptions = self._receptions(transactions)
+                notifications.extend(notifications_receptions)
+
+            with db_transaction.atomic():
+                rapport.receptions += insertion_receptions.inserer(receptions)
+                rapport.notifications += insertion_notifications.inserer(notifications)
+                ajuster_non_lues(compter_nouvelles(notifications))
+
+        for canal, nombre in rapport.par_canal.items():
+            logger.info(f"🏦 Import {canal}: {nombre} transactions")
+
+    def _charger_noms(self, user_ids):
+        """(nom complet, téléphone) des utilisateurs pas encore vus, en une requête"""
+        inconnus = [user_id for user_id in user_ids if user_id not in self._noms]
+        if not inconnus:
+            return
+        for user_id, prenom, nom, phone in User.objects.filter(id__in=inconnus).values_list(
+            'id', 'first_name', 'last_name', 'phone_number'
+        ):
+            self._noms[user_id] = (f"{prenom} {nom}", phone)
+
+    def _notifications_creation(self, transactions):
+        """Mêmes notifications que send_transaction_notifications(created=True)"""
+        notifications = []
+        for t in transactions:
+            notifications.append({
+                'user_id': t['expediteur_id'],
+                'title': "💸 Transaction initiée",
+                'message': f"Votre transaction de {t['montantEnvoye']:,.0f} {t['deviseEnvoi']} vers {t['destinataire_phone']} a été créée. Code: {t['codeTransaction']}",
+                'notification_type': 'TRANSACTION',
+                'auto_sent': True,
+            })
+            if t['destinataire_id']:
+                notifications.append({
+                    'user_id': t['destinataire_id'],
+                    'title': "💰 Argent reçu",
+                    'message': f"Vous avez reçu {t['montantRecu']:,.0f} {t['deviseReception']} de {self._noms[t['expediteur_id']][0]}. Code de retrait: {t['codeTransaction']}",
+                    'notification_type': 'TRANSACTION',
+                    'auto_sent': True,
+                })
+        return notifications
+
+    def _receptions(self, transactions):
+        """Équivalent groupé de Reception.creer_depuis_transaction pour les ENVOYE"""
+        from reception.models import Reception, StatutReception
+
+        eligibles = [
+            t for t in transactions
+            if t['statusTransaction'] == StatutTransaction.ENVOYE and t['destinataire_id']
+        ]
+        if not eligibles:
+            return [], []
+
+        maintenant = timezone.now()
+        ids = get_id_allocator().allocate_many(len(eligibles), 'reception')
+        receptions = []
+        notifications = []
+        for t, id_reception in zip(eligibles, ids):
+            expediteur_nom, expediteur_telephone = self._noms[t['expediteur_id']]
+            code_reception = code_depuis_id('RCP', id_reception, 'reception')
+            montant = Decimal(str(t['montantRecu']))
+            receptions.append({
+                'transaction_origine_id': t['id'],
+                'destinataire_id': t['destinataire_id'],
+                'code_reception': code_reception,
+                'montant_a_recevoir': montant,
+                'devise_reception': t['deviseReception'],
+                'mode_reception': Reception._map_canal_to_mode(self._canaux.get(str(t['canal_paiement_id']))),
+                'canal_paiement_id': t['canal_paiement_id'],
+                'statut': StatutReception.NOTIFIE,
+                'notification_envoyee': True,
+                'date_notification': maintenant,
+                'expediteur_nom': expediteur_nom,
+                'expediteur_telephone': expediteur_telephone,
+            })
+            notifications.append({
+                'user_id': t['destinataire_id'],
+                'title': "💰 Argent à recevoir",
+                'message': f"Vous avez reçu {montant:,.0f} {t['deviseReception']} de {expediteur_nom}. Code de réception: {code_reception}",
+                'notification_type': 'TRANSACTION',
+                'auto_sent': True,
+            })
+        return receptions, notifications
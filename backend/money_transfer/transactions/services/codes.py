@@ -0,0 +1,65 @@
+# transactions/services/codes.py
+import hashlib
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils import timezone
+
+from .id_allocator import get_id_allocator
+
+# Partie numérique : 10 chiffres obtenus par permutation de l'identifiant, + 1 chiffre de contrôle
+NB_CHIFFRES = 10
+MODULO = 10 ** NB_CHIFFRES
+
+# Préfixes connus (Transaction, Withdrawal, Reception)
+PREFIXES = {'TXN', 'RCP', 'RET', 'RCH', 'WTH'}
+
+
+@lru_cache(maxsize=None)
+def _cle_permutation(nom):
+    """
+    Coefficients (a, b) de la permutation affine n → (a·n + b) mod 10^10 d'une séquence.
+
+    `a` est premier avec 10, donc deux identifiants distincts donnent toujours deux
+    codes distincts. Les coefficients dépendent de SECRET_KEY pour que les codes ne
+    se suivent pas ; ce n'est qu'un brouillage, pas une protection cryptographique.
+    """
+    empreinte = hashlib.sha256(f"{settings.SECRET_KEY}:{nom}".encode()).digest()
+    a = int.from_bytes(empreinte[:8], 'big') % MODULO
+    a = a - a % 10 + 7  # dernier chiffre 7 : impair et non multiple de 5
+    b = int.from_bytes(empreinte[8:16], 'big') % MODULO
+    return a, b
+
+
+def chiffre_luhn(chiffres):
+    """Chiffre de contrôle de Luhn d'une chaîne de chiffres"""
+    total = 0
+    for position, chiffre in enumerate(reversed(chiffres)):
+        valeur = int(chiffre)
+        if position % 2 == 0:
+            valeur *= 2
+            if valeur > 9:
+                valeur -= 9
+        total += valeur
+    return str((10 - total % 10) % 10)
+
+
+def code_depuis_id(prefix, identifiant, nom='transaction', annee=None):
+    """Code unique dérivé d'un identifiant de séquence : PREFIX + année + 10 chiffres + contrôle"""
+    a, b = _cle_permutation(nom)
+    chiffres = f"{(a * identifiant + b) % MODULO:0{NB_CHIFFRES}d}"
+    annee = annee or timezone.now().year
+    return f"{prefix}{annee}{chiffres}{chiffre_luhn(chiffres)}"
+
+
+def generer_code(prefix, nom):
+    """Allouer un identifiant dans la séquence `nom` et en dériver un code (une seule écriture par bloc)"""
+    return code_depuis_id(prefix, get_id_allocator().allocate(nom), nom)
+
+
+def code_valide(code):
+    """Vérifier le format et le chiffre de contrôle d'un code (détecte les fautes de saisie)"""
+    if len(code) != 3 + 4 + NB_CHIFFRES + 1 or code[:3] not in PREFIXES or not code[3:].isdigit():
+        return False
+    chiffres = code[7:-1]
+    return chiffre_luhn(chiffres) == code[-1]
@@ -1,66 +1,232 @@
 # transactions/services/exchange_rates.py
-import requests
+import logging
+import os
+import threading
+import time
 from decimal import Decimal
-from django.core.cache import cache
-from django.utils import timezone
+from typing import NamedTuple
+
+import requests
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, connection
+from django.db.models import Q
+
 from ..models import TauxChange
+from . import historique_taux
+
+logger = logging.getLogger(__name__)
+
+SOURCE_API = 'api'
+SOURCE_BASE = 'base'
+
+
+class TableTaux(NamedTuple):
+    """Tous les taux depuis une devise de base, tels que renvoyés par l'API (remplacée, jamais modifiée)"""
+    base: str
+    taux: dict                         # devise → Decimal, base comprise (1) ; jamais modifié
+    recue_a: float                     # time.time() : comparable entre processus via le cache partagé
+    date: str
+    source: str
+
+    def croise(self, from_currency, to_currency):
+        """Taux from → to déduit de la table : taux[to] / taux[from]"""
+        origine = self.taux.get(from_currency)
+        destination = self.taux.get(to_currency)
+        if not origine or destination is None:
+            return None
+        return destination / origine
+
+
+# ===== CACHE DES TABLES =====
+# Niveau 1 : tables de ce processus ; niveau 2 : cache partagé entre workers (Redis) ;
+# niveau 3 : lignes TauxChange. Le réseau n'est appelé que par les rafraîchissements en arrière-plan,
+# par un seul processus à la fois (verrou dans le cache partagé).
+
+cache = caches['partage']
+
+# Délai (s) avant de relire la table partagée quand un autre processus la rafraîchit
+ATTENTE_VERROU = 1.0
+
+_tables = {}                # base → TableTaux
+_rafraichissements = {}     # base → Thread en cours
+_prochain_essai = {}        # base → time.monotonic() avant lequel on ne retente pas l'API
+_lock = threading.Lock()
+
+
+def _cle_table(base):
+    return f"exchange_rates_table_{base}"
+
+
+def _cle_verrou(base):
+    return f"exchange_rates_refresh_{base}"
+
 
 class ExchangeRateService:
     """Service pour gérer les taux de change temps réel"""
-    
+
     def __init__(self):
         self.api_key = "YOUR_XE_API_KEY"  # Remplacer par vraie clé
-        self.base_url = "https://api.exchangerate-api.com/v4/latest"
-        self.cache_timeout = 300  # 5 minutes
-    
+        self.base_url = settings.EXCHANGE_RATES_API_URL
+        self.cache_timeout = settings.EXCHANGE_RATES_TTL
+        self.bases = settings.EXCHANGE_RATES_BASE_CURRENCIES
+
     def get_rate(self, from_currency, to_currency):
-        """Obtenir taux temps réel avec cache"""
-        cache_key = f"exchange_rate_{from_currency}_{to_currency}"
-        cached_rate = cache.get(cache_key)
-        
-        if cached_rate:
-            return Decimal(str(cached_rate))
-        
-        # Appel API externe
+        """
+        Taux from → to sans jamais attendre le réseau.
+
+        Lu dans la table de from_currency si elle fait partie des bases récupérées,
+        sinon croisé depuis une autre base ; à défaut depuis TauxChange. Les
+        tables sont rafraîchies en arrière-plan avant leur expiration.
+        """
+        if from_currency == to_currency:
+            return Decimal('1')
+
+        bases = sorted(self.bases, key=lambda base: base != from_currency)
+        for base in bases:
+            table = self.table(base)
+            taux = table.croise(from_currency, to_currency) if table else None
+            if taux is not None:
+                return taux
+
+        # Fallback vers base de données
+        return self.get_rate_from_db(from_currency, to_currency)
+
+    def table(self, base):
+        """
+        TableTaux d'une devise de base, éventuellement périmée (stale-while-revalidate).
+
+        Une table plus vieille que EXCHANGE_RATES_TTL × EXCHANGE_RATES_REFRESH_AHEAD
+        déclenche un rafraîchissement en arrière-plan ; au-delà de
+        EXCHANGE_RATES_STALE_TTL elle est remplacée par le cache partagé ou TauxChange.
+        """
+        maintenant = time.time()
+        table = _tables.get(base)
+        if table is None or maintenant - table.recue_a > settings.EXCHANGE_RATES_STALE_TTL:
+            table = cache.get(_cle_table(base)) or self._table_depuis_base(base)
+            if table is not None:
+                _tables[base] = table
+
+        if table is None or table.source != SOURCE_API or (
+            maintenant - table.recue_a > self.cache_timeout * settings.EXCHANGE_RATES_REFRESH_AHEAD
+        ):
+            self._planifier(base)
+        return table
+
+    # ----- rafraîchissement -----
+
+    def _planifier(self, base):
+        """Lancer un rafraîchissement en arrière-plan (un seul à la fois par base)"""
+        with _lock:
+            en_cours = _rafraichissements.get(base)
+            if (en_cours and en_cours.is_alive()) or time.monotonic() < _prochain_essai.get(base, 0):
+                return
+            thread = threading.Thread(target=self._rafraichir_en_arriere_plan, args=(base,), daemon=True)
+            _rafraichissements[base] = thread
+        thread.start()
+
+    def _rafraichir_en_arriere_plan(self, base):
+        try:
+            # Un autre processus a peut-être déjà rafraîchi la table partagée
+            partagee = cache.get(_cle_table(base))
+            if partagee is not None and time.time() - partagee.recue_a < (
+                self.cache_timeout * settings.EXCHANGE_RATES_REFRESH_AHEAD
+            ):
+                _tables[base] = partagee
+            elif cache.add(_cle_verrou(base), os.getpid(), settings.EXCHANGE_RATES_TIMEOUT * 2):
+                try:
+                    self.rafraichir(base)
+                finally:
+                    cache.delete(_cle_verrou(base))
+            else:
+                # Un autre processus interroge l'API : reprendre sa table un peu plus tard
+                _prochain_essai[base] = time.monotonic() + ATTENTE_VERROU
+        finally:
+            connection.close()
+
+    def rafraichir(self, base):
+        """Récupérer toute la table d'une base auprès de l'API (appel bloquant) ; None si échec"""
+        try:
+            response = requests.get(f"{self.base_url}/{base}", timeout=settings.EXCHANGE_RATES_TIMEOUT)
+            response.raise_for_status()
+            data = response.json(parse_float=Decimal, parse_int=Decimal)
+            table = TableTaux(
+                base, {**data['rates'], base: Decimal('1')}, time.time(),
+                data.get('date', ''), SOURCE_API,
+            )
+        except (requests.RequestException, ValueError, KeyError) as e:
+            _prochain_essai[base] = time.monotonic() + settings.EXCHANGE_RATES_RETRY_DELAY
+            logger.warning(f"⚠️ Taux {base} non rafraîchis: {e}")
+            return None
+
+        _tables[base] = table
+        cache.set(_cle_table(base), table, settings.EXCHANGE_RATES_STALE_TTL)
+        logger.info(f"💱 Taux {base} rafraîchis: {len(table.taux)} devises")
+
+        # Sauvegarder en base pour historique : toutes les paires en deux requêtes
         try:
-            response = requests.get(f"{self.base_url}/{from_currency}", timeout=10)
-            data = response.json()
-            rate = data['rates'].get(to_currency)
-            
-            if rate:
-                rate_decimal = Decimal(str(rate))
-                cache.set(cache_key, float(rate_decimal), self.cache_timeout)
-                
-                # Sauvegarder en base pour historique
-                self.save_rate_to_db(from_currency, to_currency, rate_decimal)
-                return rate_decimal
-                
-        except Exception as e:
-            # Fallback vers base de données
-            return self.get_rate_from_db(from_currency, to_currency)
-    
-    def save_rate_to_db(self, from_curr, to_curr, rate):
-        """Sauvegarder taux en base"""
-        TauxChange.objects.update_or_create(
-            devise_origine=from_curr,
-            devise_destination=to_curr,
-            defaults={
-                'taux': rate,
-                'taux_inverse': 1 / rate,
-                'last_updated': timezone.now()
-            }
+            historique_taux.enregistrer_table(table)
+        except DatabaseError as e:
+            logger.error(f"❌ Historique des taux {base} non enregistré: {e}")
+        return table
+
+    def attendre_rafraichissements(self, timeout=None):
+        """Attendre les rafraîchissements en cours (tests, commandes)"""
+        for thread in list(_rafraichissements.values()):
+            thread.join(timeout)
+
+    # ----- base de données -----
+
+    def _table_depuis_base(self, base):
+        """TableTaux reconstituée depuis les lignes TauxChange de la base (aller ou retour)"""
+        taux = {base: Decimal('1')}
+        date = None
+        for origine, destination, valeur, inverse, mise_a_jour in TauxChange.objects.filter(
+            Q(devise_origine=base) | Q(devise_destination=base), is_active=True
+        ).values_list('devise_origine', 'devise_destination', 'taux', 'taux_inverse', 'last_updated'):
+            if origine == base:
+                taux[destination] = valeur
+            elif inverse:
+                taux.setdefault(origine, inverse)
+            date = max(date, mise_a_jour) if date else mise_a_jour
+        if len(taux) == 1:
+            return None
+        return TableTaux(base, taux, time.time(), date.date().isoformat(), SOURCE_BASE)
+
+    def get_rate_from_db(self, from_currency, to_currency):
+        """Taux depuis TauxChange : paire directe, inverse ou croisée par une origine commune"""
+        lignes = TauxChange.objects.filter(
+            Q(devise_origine__in=[from_currency, to_currency]) | Q(devise_destination__in=[from_currency, to_currency]),
+            is_active=True,
+        ).values_list('devise_origine', 'devise_destination', 'taux', 'taux_inverse')
+        par_origine = {}
+        for origine, destination, taux, taux_inverse in lignes:
+            if (origine, destination) == (from_currency, to_currency):
+                return taux
+            if (origine, destination) == (to_currency, from_currency) and taux_inverse:
+                return taux_inverse
+            par_origine.setdefault(origine, {origine: Decimal('1')})[destination] = taux
+        for taux in par_origine.values():
+            if taux.get(from_currency) and to_currency in taux:
+                return taux[to_currency] / taux[from_currency]
+        return None
+
+    def save_rate_to_db(self, from_curr, to_curr, rate, source=SOURCE_API):
+        """Sauvegarder un taux en base (historique + dernier taux)"""
+        historique_taux.enregistrer_table(
+            TableTaux(from_curr, {from_curr: Decimal('1'), to_curr: rate}, time.time(), '', source)
         )
-    
+
     def calculate_conversion(self, amount, from_curr, to_curr, include_margin=True):
         """Convertir montant avec marge business"""
         rate = self.get_rate(from_curr, to_curr)
-        
+
         if include_margin:
             # Ajouter marge business 2%
             rate = rate * Decimal('0.98')
-        
+
         return amount * rate
-    
+
     def get_supported_currencies(self):
         """Liste des devises supportées"""
-        return ['XOF', 'CDF', 'XAF', 'EUR', 'USD', 'GBP', 'CAD', 'MAD']
\ No newline at end of file
+        return ['XOF', 'CDF', 'XAF', 'EUR', 'USD', 'GBP', 'CAD', 'MAD']
@@ -0,0 +1,422 @@
+# transactions/services/frais.py
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import MappingProxyType
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal('0.00')
+UN = Decimal('1')
+CENTIME = Decimal('0.01')
+
+# Frais de change : 2 % du montant envoyé quand les devises diffèrent
+TAUX_FRAIS_CHANGE = Decimal('0.02')
+
+
+class FraisIndisponibles(LookupError):
+    """Corridor, service, canal ou taux inconnu : pas de devis possible"""
+
+
+class DevisRefuse(FraisIndisponibles):
+    """Envoi hors règles : pays d'origine, limites de montant, montant reçu nul"""
+
+
+# ===== BARÈMES =====
+
+class Bareme(NamedTuple):
+    """Pourcentage + fixe, éventuellement borné : la seule formule de frais du projet"""
+    taux: Decimal                      # pourcentage / 100, précalculé
+    fixe: Decimal = ZERO
+    minimum: Optional[Decimal] = None
+    maximum: Optional[Decimal] = None
+
+    @classmethod
+    def depuis_pourcentage(cls, pourcentage, fixe=ZERO, minimum=None, maximum=None):
+        # str() : une valeur par défaut float (2.5, 0.5) ne doit pas devenir 2.4999…
+        en_decimal = lambda valeur: None if valeur is None else Decimal(str(valeur))
+        return cls(en_decimal(pourcentage) / 100, en_decimal(fixe), en_decimal(minimum), en_decimal(maximum))
+
+    def frais(self, montant):
+        frais = montant * self.taux + self.fixe
+        # Même ordre que l'ancien calcul des services : le minimum l'emporte sur le maximum
+        if self.maximum is not None and frais > self.maximum:
+            frais = self.maximum
+        if self.minimum is not None and frais < self.minimum:
+            frais = self.minimum
+        return frais.quantize(CENTIME)
+
+
+class LigneCanal(NamedTuple):
+    id: str
+    pays: str                          # CanalPaiement.country (nom du pays)
+    bareme: Bareme
+    is_active: bool
+
+
+class LigneService(NamedTuple):
+    id: int
+    nom: str
+    bareme: Bareme
+    limite_min: Decimal
+    limite_max: Decimal
+    regex_telephone: str
+
+
+class LigneCorridor(NamedTuple):
+    id: int
+    code: str
+    pays_origine_id: int
+    pays_destination_id: int
+    pays_origine: str                  # nom, pour le canal par défaut
+    pays_destination: str
+    devise_origine: str
+    devise_destination: str
+    commission: Bareme
+    montant_min: Decimal
+    montant_max: Decimal
+    temps_min: int
+    temps_max: int
+
+
+class Devis(NamedTuple):
+    """Détail complet d'un envoi international, tout en Decimal"""
+    corridor: str
+    service: str
+    canal: str
+    montant_envoye: Decimal
+    frais_origine: Decimal
+    commission_corridor: Decimal
+    frais_change: Decimal
+    frais_total: Decimal
+    montant_net: Decimal
+    taux_applique: Decimal
+    montant_converti: Decimal
+    frais_destination: Decimal
+    montant_recu: Decimal
+    devise_origine: str
+    devise_destination: str
+    temps_min: int
+    temps_max: int
+
+    def detail(self):
+        """Dict renvoyé par l'API du calculateur"""
+        return {
+            'montant_envoye': self.montant_envoye,
+            'frais_origine': self.frais_origine,
+            'commission_corridor': self.commission_corridor,
+            'frais_change': self.frais_change,
+            'frais_destination': self.frais_destination,
+            'frais_total': self.frais_total,
+            'taux_applique': self.taux_applique,
+            'montant_converti': self.montant_converti,
+            'montant_recu': self.montant_recu,
+            'devise_origine': self.devise_origine,
+            'devise_destination': self.devise_destination,
+            'temps_estime': f"{self.temps_min}-{self.temps_max} min",
+        }
+
+
+# ===== TABLES EN MÉMOIRE =====
+
+class TablesFrais(NamedTuple):
+    """
+    Toute la configuration des frais, en lecture seule.
+
+    Jamais modifiées en place : une modification (admin, signals) les fait
+    reconstruire entièrement et remplacer d'un bloc.
+    """
+    canaux: MappingProxyType           # str(id) → LigneCanal
+    canal_par_pays: MappingProxyType   # nom du pays → str(id) du premier canal actif
+    services: MappingProxyType         # (code ISO pays, code_service) → LigneService
+    service_origine: MappingProxyType  # id pays → id du service enregistré côté origine (Wave de préférence)
+    corridors: MappingProxyType        # (ISO origine, ISO destination) → LigneCorridor
+    expire_a: float
+
+
+_tables = None
+_generation = 0
+_lock = threading.Lock()
+
+
+def construire():
+    """Charger les tables (3 requêtes) ; remplacées seulement si rien n'a été invalidé entre-temps"""
+    global _tables
+    from ..models import CanalPaiement, CorridorTransfert, ServicePaiementInternational
+
+    generation = _generation
+    debut = time.perf_counter()
+
+    canaux, canal_par_pays = {}, {}
+    for canal in CanalPaiement.objects.only(
+        'id', 'canal_name', 'country', 'is_active', 'fees_percentage', 'fees_fixed'
+    ).order_by('canal_name'):
+        cle = str(canal.id)
+        canaux[cle] = LigneCanal(
+            cle, canal.country, Bareme.depuis_pourcentage(canal.fees_percentage, canal.fees_fixed), canal.is_active
+        )
+        if canal.is_active:
+            canal_par_pays.setdefault(canal.country, cle)
+
+    services, premier, wave = {}, {}, {}
+    for (service_id, pays_id, pays, code, type_service, nom, pourcentage, fixe, minimum, maximum,
+         limite_min, limite_max, regex) in ServicePaiementInternational.objects.filter(is_active=True).values_list(
+        'id', 'pays_id', 'pays__code_iso', 'code_service', 'type_service', 'nom', 'frais_percentage', 'frais_fixe',
+        'frais_min', 'frais_max', 'limite_min', 'limite_max', 'regex_telephone',
+    ).order_by('id'):
+        services[(pays, code)] = LigneService(
+            service_id, nom, Bareme.depuis_pourcentage(pourcentage, fixe, minimum, maximum), limite_min, limite_max,
+            regex,
+        )
+        # Service côté origine : le premier Wave du pays, à défaut son premier service
+        premier.setdefault(pays_id, service_id)
+        if type_service == 'WAVE':
+            wave.setdefault(pays_id, service_id)
+    service_origine = {**premier, **wave}
+
+    corridors = {}
+    for (corridor_id, origine_id, destination_id, origine, destination, nom_origine, nom_destination,
+         devise_origine, devise_destination, pourcentage, fixe, montant_min, montant_max, temps_min,
+         temps_max) in CorridorTransfert.objects.filter(is_active=True).values_list(
+        'id', 'pays_origine_id', 'pays_destination_id', 'pays_origine__code_iso', 'pays_destination__code_iso',
+        'pays_origine__nom', 'pays_destination__nom', 'pays_origine__devise', 'pays_destination__devise',
+        'commission_percentage', 'commission_fixe', 'montant_min_corridor', 'montant_max_corridor',
+        'temps_livraison_min', 'temps_livraison_max',
+    ):
+        corridors[(origine, destination)] = LigneCorridor(
+            corridor_id, f"{origine}_TO_{destination}", origine_id, destination_id, nom_origine, nom_destination,
+            devise_origine, devise_destination,
+            Bareme.depuis_pourcentage(pourcentage, fixe), montant_min, montant_max, temps_min, temps_max,
+        )
+
+    tables = TablesFrais(
+        MappingProxyType(canaux), MappingProxyType(canal_par_pays), MappingProxyType(services),
+        MappingProxyType(service_origine), MappingProxyType(corridors), time.monotonic() + settings.FEE_TABLES_TTL,
+    )
+    with _lock:
+        if generation == _generation:
+            _tables = tables
+    logger.info(f"🧮 Tables de frais chargées: {len(canaux)} canaux, {len(services)} services, "
+                f"{len(corridors)} corridors en {(time.perf_counter() - debut) * 1000:.1f} ms")
+    return tables
+
+
+def get_tables():
+    """
+    Tables du processus, rechargées après invalidation ou après FEE_TABLES_TTL
+    secondes (modifications faites par les autres processus).
+    """
+    tables = _tables
+    if tables is None or tables.expire_a < time.monotonic():
+        tables = construire()
+    return tables
+
+
+def invalider(**kwargs):
+    """Receiver des signals : configuration modifiée, tables rechargées au prochain devis"""
+    global _tables, _generation
+    with _lock:
+        _generation += 1
+        _tables = None
+
+
+# ===== CONSULTATION =====
+
+def _cle_corridor(corridor):
+    if isinstance(corridor, str):
+        origine, _, destination = corridor.partition('_TO_')
+        return origine, destination
+    return corridor
+
+
+def corridor(code, tables=None):
+    """LigneCorridor d'un corridor actif : 'SEN_TO_COG' ou ('SEN', 'COG')"""
+    ligne = (tables or get_tables()).corridors.get(_cle_corridor(code))
+    if ligne is None:
+        raise FraisIndisponibles(f"Corridor {code} non disponible")
+    return ligne
+
+
+def _canal(tables, canal, ligne_corridor):
+    if canal is None:
+        canal = tables.canal_par_pays.get(ligne_corridor.pays_origine)
+    ligne = tables.canaux.get(str(canal)) if canal is not None else None
+    if ligne is None:
+        raise FraisIndisponibles(f"Aucun canal de paiement pour {ligne_corridor.pays_origine}")
+    if not ligne.is_active:
+        # Canal demandé explicitement : le canal par défaut est toujours actif
+        raise FraisIndisponibles(f"Canal de paiement {canal} inactif")
+    return ligne
+
+
+def frais_canal(canal_id, montant):
+    """Frais d'un canal de paiement local (remplace canal.calculate_fees sans charger le canal)"""
+    ligne = get_tables().canaux.get(str(canal_id))
+    if ligne is None:
+        # Canal créé sans signal (bulk_create) : l'id vient d'une clé étrangère, on recharge
+        ligne = construire().canaux.get(str(canal_id))
+    if ligne is None:
+        raise FraisIndisponibles(f"Canal de paiement {canal_id} inconnu")
+    return ligne.bareme.frais(montant if isinstance(montant, Decimal) else Decimal(str(montant)))
+
+
+# ===== DEVIS =====
+
+def _verifier(ligne_corridor, ligne_service, montant):
+    """Règles d'envoi, communes au calculateur et à l'envoi : pays d'origine, limites du corridor et du service"""
+    if _cle_corridor(ligne_corridor.code)[0] != settings.INTERNATIONAL_ORIGIN_COUNTRY:
+        raise DevisRefuse(f"Corridor {ligne_corridor.code} non ouvert à l'envoi")
+    minimum = max(ligne_corridor.montant_min, ligne_service.limite_min)
+    maximum = min(ligne_corridor.montant_max, ligne_service.limite_max)
+    if not minimum <= montant <= maximum:
+        raise DevisRefuse(f"Montant doit être entre {minimum} et {maximum}")
+
+
+def _devis(ligne_corridor, code_service, ligne_service, ligne_canal, montant, taux):
+    if ligne_corridor.devise_origine == ligne_corridor.devise_destination:
+        taux, frais_change = UN, ZERO
+    elif taux is None:
+        raise FraisIndisponibles(
+            f"Taux {ligne_corridor.devise_origine}→{ligne_corridor.devise_destination} non disponible"
+        )
+    else:
+        frais_change = (montant * TAUX_FRAIS_CHANGE).quantize(CENTIME)
+
+    frais_origine = ligne_canal.bareme.frais(montant)
+    commission = ligne_corridor.commission.frais(montant)
+    frais_total = frais_origine + commission + frais_change
+    montant_net = montant - frais_total
+    montant_converti = (montant_net * taux).quantize(CENTIME)
+    frais_destination = ligne_service.bareme.frais(montant_converti)
+    if montant_converti - frais_destination <= 0:
+        raise DevisRefuse("Montant insuffisant : les frais dépassent le montant envoyé")
+
+    return Devis(
+        ligne_corridor.code, code_service, ligne_canal.id, montant, frais_origine, commission, frais_change, frais_total,
+        montant_net, taux, montant_converti, frais_destination, montant_converti - frais_destination,
+        ligne_corridor.devise_origine, ligne_corridor.devise_destination,
+        ligne_corridor.temps_min, ligne_corridor.temps_max,
+    )
+
+
+def taux_du_jour(ligne_corridor):
+    """Taux du service de change pour un corridor (None si les devises sont identiques)"""
+    if ligne_corridor.devise_origine == ligne_corridor.devise_destination:
+        return None
+    from .exchange_rates import ExchangeRateService
+    return ExchangeRateService().get_rate(ligne_corridor.devise_origine, ligne_corridor.devise_destination)
+
+
+def devis(montant, corridor_code, service, canal=None, taux=None):
+    """
+    Devis complet d'un envoi international, sans requête SQL.
+
+    Frais du canal local, commission du corridor et frais de change (2 %) sont
+    déduits du montant envoyé ; le reste est converti au `taux` puis le service
+    de destination prélève ses frais. `canal` : id du CanalPaiement (par défaut le
+    premier canal actif du pays d'origine). `taux` n'est requis que si les devises
+    diffèrent. Lève FraisIndisponibles si un élément manque, DevisRefuse si
+    l'envoi sort des règles (origine, limites, montant reçu nul).
+    """
+    tables = get_tables()
+    ligne_corridor = corridor(corridor_code, tables)
+    cle_service = (_cle_corridor(corridor_code)[1], service)
+    ligne_service = tables.services.get(cle_service)
+    if ligne_service is None:
+        raise FraisIndisponibles(f"Service {service} non disponible")
+    if not isinstance(montant, Decimal):
+        montant = Decimal(str(montant))
+    _verifier(ligne_corridor, ligne_service, montant)
+    return _devis(ligne_corridor, service, ligne_service, _canal(tables, canal, ligne_corridor), montant, taux)
+
+
+def devis_lot(demandes, taux=None):
+    """
+    Devis d'un lot de demandes (montant, corridor, service[, canal]) : [Devis].
+
+    `taux` : {(devise origine, devise destination): taux} pour les corridors à
+    change. Les lignes de configuration ne sont résolues qu'une fois par
+    combinaison ; une demande impossible lève FraisIndisponibles pour tout le lot.
+    """
+    tables = get_tables()
+    taux = taux or {}
+    resolues = {}
+    resultats = []
+    for demande in demandes:
+        montant, corridor_code, service = demande[:3]
+        canal = demande[3] if len(demande) > 3 else None
+        cle = (corridor_code, service, canal)
+        lignes = resolues.get(cle)
+        if lignes is None:
+            ligne_corridor = corridor(corridor_code, tables)
+            ligne_service = tables.services.get((_cle_corridor(corridor_code)[1], service))
+            if ligne_service is None:
+                raise FraisIndisponibles(f"Service {service} non disponible")
+            lignes = resolues[cle] = (
+                ligne_corridor, ligne_service, _canal(tables, canal, ligne_corridor),
+                taux.get((ligne_corridor.devise_origine, ligne_corridor.devise_destination)),
+            )
+        ligne_corridor, ligne_service, ligne_canal, taux_corridor = lignes
+        if not isinstance(montant, Decimal):
+            montant = Decimal(str(montant))
+        _verifier(ligne_corridor, ligne_service, montant)
+        resultats.append(_devis(ligne_corridor, service, ligne_service, ligne_canal, montant, taux_corridor))
+    return resultats
+
+
+# ===== DEVIS RÉUTILISABLES (quote_id) =====
+
+# Devis conservés dans leur propre cache, durée de vie INTERNATIONAL_QUOTE_TTL
+cache = caches['devis']
+
+
+class DevisClient(NamedTuple):
+    """Devis plus tout ce qu'il faut pour l'envoi : aucune relecture du corridor ni des services"""
+    quote_id: Optional[str]
+    devis: Devis
+    corridor_id: int
+    pays_origine_id: int
+    pays_destination_id: int
+    pays_destination: str
+    service_id: int
+    service_nom: str
+    service_origine_id: Optional[int]
+    regex_telephone: str
+    expire_le: Optional[datetime]
+
+
+def preparer_envoi(devis, quote_id=None, expire_le=None):
+    """DevisClient d'un devis, références résolues dans les tables en mémoire"""
+    tables = get_tables()
+    ligne_corridor = corridor(devis.corridor, tables)
+    ligne_service = tables.services.get((_cle_corridor(devis.corridor)[1], devis.service))
+    if ligne_service is None:
+        raise FraisIndisponibles(f"Service {devis.service} non disponible")
+    return DevisClient(
+        quote_id, devis, ligne_corridor.id, ligne_corridor.pays_origine_id, ligne_corridor.pays_destination_id,
+        ligne_corridor.pays_destination, ligne_service.id, ligne_service.nom,
+        tables.service_origine.get(ligne_corridor.pays_origine_id), ligne_service.regex_telephone, expire_le,
+    )
+
+
+def enregistrer_devis(devis):
+    """Conserver un devis : le client l'utilisera tel quel pour l'envoi tant qu'il n'a pas expiré"""
+    duree = cache.default_timeout
+    devis_client = preparer_envoi(
+        devis, quote_id=uuid.uuid4().hex, expire_le=timezone.now() + timedelta(seconds=duree)
+    )
+    cache.set(f'devis:{devis_client.quote_id}', devis_client, duree)
+    return devis_client
+
+
+def devis_enregistre(quote_id):
+    """DevisClient encore valide, sinon None"""
+    return cache.get(f'devis:{quote_id}')
@@ -0,0 +1,101 @@
+# transactions/services/historique_taux.py
+import logging
+from decimal import Decimal
+
+from django.db import transaction as db_transaction
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Value, When, Window
+from django.db.models.functions import Lag
+from django.utils import timezone
+
+from ..models import HistoriqueTauxChange, TauxChange
+
+logger = logging.getLogger(__name__)
+
+# TauxChange : 12 chiffres dont 6 décimales, pour le taux comme pour son inverse
+TAUX_MIN = Decimal('0.000001')
+TAUX_MAX = Decimal('1000000')
+SIX_DECIMALES = Decimal('0.000001')
+
+TAILLE_LOT = 500
+
+
+def _stockable(taux):
+    """Taux et inverse, arrondis à 6 décimales, tous deux non nuls et sous TAUX_MAX ?"""
+    return all(
+        TAUX_MIN <= valeur.quantize(SIX_DECIMALES) < TAUX_MAX
+        for valeur in (taux, 1 / taux)
+    )
+
+
+def enregistrer_table(table, instant=None):
+    """
+    Table de taux reçue : toutes les paires de la base en un INSERT d'historique
+    et un upsert de TauxChange (dernier taux), dans une même transaction.
+    """
+    instant = instant or timezone.now()
+    paires = [(devise, taux) for devise, taux in table.taux.items() if devise != table.base and taux > 0]
+
+    with db_transaction.atomic():
+        HistoriqueTauxChange.objects.bulk_create([
+            HistoriqueTauxChange(devise_origine=table.base, devise_destination=devise, taux=taux,
+                                 source=table.source, date_effet=instant)
+            for devise, taux in paires
+        ], batch_size=TAILLE_LOT)
+
+        # is_active et les marges ne sont pas touchés : réglés dans l'admin
+        TauxChange.objects.bulk_create([
+            TauxChange(devise_origine=table.base, devise_destination=devise, taux=taux, taux_inverse=1 / taux,
+                       source=table.source, last_updated=instant)
+            for devise, taux in paires if _stockable(taux)
+        ], batch_size=TAILLE_LOT, update_conflicts=True, unique_fields=['devise_origine', 'devise_destination'],
+            update_fields=['taux', 'taux_inverse', 'source', 'last_updated'])
+
+    return len(paires)
+
+
+def taux_a(devise_origine, devise_destination, instant):
+    """Taux en vigueur à `instant` (dernière observation antérieure), inverse à défaut ; None si inconnu"""
+    if devise_origine == devise_destination:
+        return Decimal('1')
+    for origine, destination in ((devise_origine, devise_destination), (devise_destination, devise_origine)):
+        taux = HistoriqueTauxChange.objects.filter(
+            devise_origine=origine, devise_destination=destination, date_effet__lte=instant
+        ).order_by('-date_effet').values_list('taux', flat=True).first()
+        if taux:
+            return taux if origine == devise_origine else 1 / taux
+    return None
+
+
+def annoter_taux_marche(queryset):
+    """
+    TransactionInternationale annotées de `taux_marche`, le taux en vigueur à leur
+    création : une sous-requête par ligne sur l'index de l'historique.
+    """
+    historique = HistoriqueTauxChange.objects.filter(
+        devise_origine=OuterRef('pays_origine__devise'),
+        devise_destination=OuterRef('pays_destination__devise'),
+        date_effet__lte=OuterRef('created_at'),
+    ).order_by('-date_effet').values('taux')[:1]
+    return queryset.annotate(taux_marche=Case(
+        When(pays_origine__devise=F('pays_destination__devise'), then=Value(Decimal('1'))),
+        default=Subquery(historique),
+        output_field=DecimalField(max_digits=24, decimal_places=12),
+    ))
+
+
+def compacter(avant):
+    """
+    Supprimer les observations antérieures à `avant` qui répètent le taux
+    précédent de la paire : taux_a() donne la même réponse, l'historique ne
+    garde que les changements.
+    """
+    repetitions = HistoriqueTauxChange.objects.filter(date_effet__lt=avant).annotate(
+        precedent=Window(Lag('taux'), partition_by=[F('devise_origine'), F('devise_destination')],
+                         order_by=F('date_effet').asc())
+    ).filter(precedent=F('taux')).values_list('pk', flat=True)
+
+    ids = list(repetitions)
+    for debut in range(0, len(ids), 10000):
+        HistoriqueTauxChange.objects.filter(pk__in=ids[debut:debut + 10000]).delete()
+    logger.info(f"🗜️ Historique des taux compacté: {len(ids)} observations supprimées")
+    return len(ids)
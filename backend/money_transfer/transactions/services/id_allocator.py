@@ -0,0 +1,141 @@
+# transactions/services/id_allocator.py
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, models, transaction as db_transaction
+from django.db.models import F
+
+# Séquences nommées : (modèle, champ) servent à initialiser la séquence au-dessus
+# des valeurs déjà présentes, `debut` est la valeur utilisée sur une table vide.
+SEQUENCES = {
+    'transaction': {'modele': 'transactions.Transaction', 'champ': 'idTransaction', 'debut': 100000001},
+}
+
+
+def valeur_initiale(nom):
+    """Première valeur libre d'une séquence : max(champ) + 1 ou la valeur de départ"""
+    definition = SEQUENCES.get(nom, {})
+    debut = definition.get('debut', 1)
+    if 'modele' not in definition:
+        return debut
+
+    modele = apps.get_model(definition['modele'])
+    max_id = modele.objects.aggregate(max_id=models.Max(definition['champ']))['max_id']
+    return max(debut, max_id + 1) if max_id else debut
+
+
+class IdAllocator:
+    """Interface commune : distribuer des identifiants numériques uniques par séquence"""
+
+    def allocate(self, nom='transaction'):
+        """Réserver un identifiant"""
+        return self.allocate_many(1, nom)[0]
+
+    def allocate_many(self, nombre, nom='transaction'):
+        """Réserver `nombre` identifiants (croissants, pas forcément contigus)"""
+        raise NotImplementedError
+
+
+class SequenceIdAllocator(IdAllocator):
+    """PostgreSQL : une SEQUENCE par nom, nextval() ne prend aucun verrou de table"""
+
+    def __init__(self):
+        self._creees = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def nom_sequence(nom):
+        return f"transactions_seq_{nom}"
+
+    def _assurer_sequence(self, nom):
+        if nom in self._creees:
+            return
+        with self._lock:
+            if nom in self._creees:
+                return
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"CREATE SEQUENCE IF NOT EXISTS {self.nom_sequence(nom)} START WITH %s",
+                    [valeur_initiale(nom)]
+                )
+            self._creees.add(nom)
+
+    def allocate_many(self, nombre, nom='transaction'):
+        self._assurer_sequence(nom)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT nextval('{self.nom_sequence(nom)}') FROM generate_series(1, %s)",
+                [nombre]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class BlockIdAllocator(IdAllocator):
+    """
+    SQLite / autres bases : réserve des plages de `taille_bloc` ids dans CompteurSequence.
+    
+    Une seule écriture courte par bloc, puis les ids sont servis depuis la mémoire
+    du processus. Les ids restent uniques ; une plage entamée est perdue au
+    redémarrage (trous dans la numérotation, sans conséquence).
+    """
+
+    def __init__(self, taille_bloc=None):
+        self.taille_bloc = taille_bloc or settings.TRANSACTION_ID_BLOCK_SIZE
+        self._blocs = {}  # nom → [prochain, fin)
+        self._lock = threading.Lock()
+
+    def _reserver(self, nom, nombre):
+        """Réserver une plage en base, retourne (debut, fin)"""
+        from ..models import CompteurSequence
+
+        with db_transaction.atomic():
+            mis_a_jour = CompteurSequence.objects.filter(nom=nom).update(
+                prochaine_valeur=F('prochaine_valeur') + nombre
+            )
+            if not mis_a_jour:
+                CompteurSequence.objects.get_or_create(
+                    nom=nom, defaults={'prochaine_valeur': valeur_initiale(nom)}
+                )
+                CompteurSequence.objects.filter(nom=nom).update(
+                    prochaine_valeur=F('prochaine_valeur') + nombre
+                )
+            fin = CompteurSequence.objects.values_list('prochaine_valeur', flat=True).get(nom=nom)
+        return fin - nombre, fin
+
+    def allocate_many(self, nombre, nom='transaction'):
+        if connection.in_atomic_block:
+            # Dans une transaction englobante, la réservation peut être annulée avec elle :
+            # on ne garde rien en mémoire et on réserve exactement ce qu'il faut.
+            debut, fin = self._reserver(nom, nombre)
+            return list(range(debut, fin))
+
+        ids = []
+        with self._lock:
+            prochain, fin = self._blocs.get(nom, (0, 0))
+            while len(ids) < nombre:
+                if prochain >= fin:
+                    # Les gros lots (imports) réservent leur plage en une fois
+                    prochain, fin = self._reserver(nom, max(self.taille_bloc, nombre - len(ids)))
+                pris = min(fin - prochain, nombre - len(ids))
+                ids.extend(range(prochain, prochain + pris))
+                prochain += pris
+            self._blocs[nom] = (prochain, fin)
+        return ids
+
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+
+def get_id_allocator():
+    """Allocateur adapté à la base configurée (créé à la demande)"""
+    global _allocator
+    if _allocator is None:
+        with _allocator_lock:
+            if _allocator is None:
+                if connection.vendor == 'postgresql':
+                    _allocator = SequenceIdAllocator()
+                else:
+                    _allocator = BlockIdAllocator()
+    return _allocator
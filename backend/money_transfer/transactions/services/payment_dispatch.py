@@ -0,0 +1,193 @@
+# transactions/services/payment_dispatch.py
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import close_old_connections, transaction as db_transaction
+
+from payment_gateways.services import payment_service
+from ..models import Transaction, StatutTransaction
+from . import frais
+
+logger = logging.getLogger(__name__)
+
+# Mapping type de canal → type de gateway simulé
+GATEWAY_MAPPING = {
+    'WAVE': 'WAVE',
+    'ORANGE_MONEY': 'ORANGE_MONEY',
+}
+
+
+def get_gateway_type(canal_type):
+    """Mapper le type de canal vers le type de gateway"""
+    return GATEWAY_MAPPING.get(canal_type)
+
+
+def appliquer_succes(transaction, frais_gateway):
+    """Passer la transaction à ENVOYE avec les frais réels du gateway (sans sauvegarder)"""
+    montant_converti = Decimal(str(transaction.montantEnvoye)) - frais_gateway
+
+    transaction.montantConverti = float(montant_converti)
+    transaction.montantRecu = float(montant_converti)
+    transaction.frais = f"{frais_gateway:.2f} XOF"
+    transaction.statusTransaction = StatutTransaction.ENVOYE  # Prêt pour retrait
+
+
+def appliquer_annulation(transaction):
+    """Passer la transaction à ANNULE en conservant les frais prévus pour information (sans sauvegarder)"""
+    montant_envoye = Decimal(str(transaction.montantEnvoye))
+    frais_calcules_decimal = frais.frais_canal(transaction.canal_paiement_id, montant_envoye)
+    montant_converti = montant_envoye - frais_calcules_decimal
+
+    transaction.montantConverti = float(montant_converti)
+    transaction.montantRecu = float(montant_converti)
+    transaction.frais = f"{frais_calcules_decimal:.2f} XOF (calculé)"
+    transaction.statusTransaction = StatutTransaction.ANNULE
+
+
+def executer_paiement(transaction, gateway_type, beneficiaire_phone):
+    """
+    Appeler le gateway pour une transaction EN_ATTENTE et appliquer le résultat.
+
+    Logique unique utilisée par le mode synchrone (dans la requête) et par les
+    workers du mode asynchrone : la transaction passe à ENVOYE ou ANNULE.
+    """
+    try:
+        logger.info(f"🔄 Appel {gateway_type} pour transaction {transaction.codeTransaction}")
+
+        payment_response = payment_service.process_payment(
+            gateway_type=gateway_type,
+            phone=beneficiaire_phone,
+            amount=Decimal(str(transaction.montantEnvoye)),
+            reference=transaction.codeTransaction
+        )
+
+        if payment_response.success:
+            # ✅ SUCCÈS - Calculer les frais réels du gateway
+            frais_gateway = payment_response.fees if payment_response.fees else Decimal('0')
+            appliquer_succes(transaction, frais_gateway)
+            transaction.save()
+
+            logger.info(f"✅ {gateway_type}: Transaction {transaction.codeTransaction} SUCCESS")
+            logger.info(f"💰 Frais {gateway_type}: {frais_gateway} XOF")
+        else:
+            # ❌ ÉCHEC - Gateway a refusé
+            appliquer_annulation(transaction)
+            transaction.save()
+
+            logger.warning(f"❌ {gateway_type}: Transaction {transaction.codeTransaction} FAILED")
+            logger.warning(f"🚫 Raison: {payment_response.message}")
+
+    except Exception as e:
+        # 🔥 ERREUR TECHNIQUE
+        logger.error(f"💥 Erreur technique gateway pour {transaction.codeTransaction}: {e}")
+        appliquer_annulation(transaction)
+        transaction.save()
+
+    return transaction
+
+
+class PaymentDispatcher:
+    """
+    Pool borné de workers pour les appels gateway en mode asynchrone.
+
+    Au-delà de `max_pending` paiements en vol, `soumettre` refuse la demande
+    et l'appelant traite le paiement dans la requête (back-pressure). La place
+    n'est prise qu'au commit, quand le paiement part au pool : une transaction
+    annulée n'en occupe aucune. Si le pool s'est rempli entre la soumission et
+    le commit, le paiement est traité dans le callback de commit.
+    """
+
+    def __init__(self, max_workers=None, max_pending=None):
+        self.max_workers = max_workers or settings.PAYMENT_DISPATCH_MAX_WORKERS
+        self.max_pending = max_pending or settings.PAYMENT_DISPATCH_MAX_PENDING
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix='payment-dispatch'
+        )
+        self._lock = threading.Lock()
+        self._en_vol = 0
+
+    @property
+    def en_vol(self):
+        """Nombre de paiements planifiés ou en cours dans le pool"""
+        return self._en_vol
+
+    def soumettre(self, transaction_pk, gateway_type, beneficiaire_phone):
+        """Planifier l'appel gateway après commit, retourne False si le pool est saturé"""
+        if self._en_vol >= self.max_pending:
+            logger.warning(f"⚠️ Pool de paiement saturé ({self.max_pending}), traitement synchrone")
+            return False
+
+        # Le worker doit voir la transaction : planifier après le commit
+        # (immédiatement hors transaction)
+        db_transaction.on_commit(
+            lambda: self._planifier(transaction_pk, gateway_type, beneficiaire_phone)
+        )
+        return True
+
+    def _planifier(self, transaction_pk, gateway_type, beneficiaire_phone):
+        with self._lock:
+            sature = self._en_vol >= self.max_pending
+            if not sature:
+                self._en_vol += 1
+        if sature:
+            logger.warning("⚠️ Pool de paiement saturé au commit, traitement synchrone")
+            self._executer(transaction_pk, gateway_type, beneficiaire_phone)
+            return
+
+        try:
+            future = self._executor.submit(self._traiter, transaction_pk, gateway_type, beneficiaire_phone)
+        except RuntimeError:
+            # Executor arrêté (fin du processus)
+            self._liberer()
+            raise
+        future.add_done_callback(self._liberer)
+
+    def _liberer(self, *args):
+        with self._lock:
+            self._en_vol -= 1
+
+    def _traiter(self, transaction_pk, gateway_type, beneficiaire_phone):
+        """Exécuté dans un worker : connexion base propre au worker, rendue après l'appel"""
+        close_old_connections()
+        try:
+            self._executer(transaction_pk, gateway_type, beneficiaire_phone)
+        finally:
+            close_old_connections()
+
+    def _executer(self, transaction_pk, gateway_type, beneficiaire_phone):
+        """Recharger la transaction et appeler le gateway si elle est encore EN_ATTENTE"""
+        try:
+            transaction = Transaction.objects.select_related(
+                'canal_paiement', 'expediteur', 'destinataire'
+            ).get(pk=transaction_pk)
+
+            if transaction.statusTransaction != StatutTransaction.EN_ATTENTE:
+                logger.info(f"⏭️ Transaction {transaction.codeTransaction} déjà traitée")
+                return
+
+            executer_paiement(transaction, gateway_type, beneficiaire_phone)
+        except Exception as e:
+            logger.error(f"💥 Worker paiement: erreur pour {transaction_pk}: {e}")
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    """Instance unique du dispatcher par processus (créée à la demande)"""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = PaymentDispatcher()
+    return _dispatcher
+
+
+def dispatch_asynchrone_actif():
+    """Vrai si les appels gateway doivent sortir du cycle de la requête"""
+    return getattr(settings, 'PAYMENT_DISPATCH_MODE', 'sync') == 'async'
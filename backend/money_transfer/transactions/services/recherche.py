@@ -0,0 +1,207 @@
+# transactions/services/recherche.py
+import logging
+import re
+import uuid
+
+from django.db import connection
+from django.db.models import Q
+
+from ..models import IndexRechercheTransaction, Transaction
+from .codes import PREFIXES, code_valide
+
+logger = logging.getLogger(__name__)
+
+# Table FTS5 (tokenizer trigram) créée par la migration 0006 sur SQLite
+TABLE_FTS = 'transactions_recherche_fts'
+
+# Un index trigrammes ne sert qu'à partir de 3 caractères
+TAILLE_TRIGRAMME = 3
+
+# Au-delà, une requête numérique ne peut pas être un idTransaction
+CHIFFRES_ID_MAX = 10
+
+
+# ===== NORMALISATION =====
+
+def normaliser_code(valeur):
+    """Majuscules, sans espaces ni séparateurs"""
+    return re.sub(r'[^0-9A-Z]', '', (valeur or '').upper())
+
+
+def normaliser_telephone(valeur):
+    """Chiffres seuls, indicatif sans '+' ni '00'"""
+    valeur = (valeur or '').strip()
+    chiffres = re.sub(r'\D', '', valeur)
+    return chiffres[2:] if valeur.startswith('00') else chiffres
+
+
+def entree_index(valeurs):
+    """Ligne d'IndexRechercheTransaction depuis les colonnes d'une transaction (dict d'attnames)"""
+    return {
+        'transaction_id': valeurs['id'],
+        'expediteur_id': valeurs['expediteur_id'],
+        'destinataire_id': valeurs['destinataire_id'],
+        'code': normaliser_code(valeurs['codeTransaction']),
+        'telephone': normaliser_telephone(valeurs['destinataire_phone']),
+        'created_at': valeurs['created_at'],
+    }
+
+
+# ===== SYNCHRONISATION =====
+
+def indexer(transaction, created=False):
+    """Créer ou mettre à jour l'entrée d'une transaction sauvegardée"""
+    entree = entree_index(transaction.__dict__)
+    transaction_id = entree.pop('transaction_id')
+    if created or not IndexRechercheTransaction.objects.filter(transaction_id=transaction_id).update(**entree):
+        IndexRechercheTransaction.objects.create(transaction_id=transaction_id, **entree)
+
+
+def reindexer(transaction_ids):
+    """Reconstruire les entrées depuis la base (instances aux champs différés)"""
+    champs = ['id', 'expediteur_id', 'destinataire_id', 'codeTransaction', 'destinataire_phone', 'created_at']
+    for valeurs in Transaction.objects.filter(id__in=transaction_ids).values(*champs):
+        entree = entree_index(valeurs)
+        IndexRechercheTransaction.objects.update_or_create(
+            transaction_id=entree.pop('transaction_id'), defaults=entree
+        )
+
+
+# ===== MOTEURS =====
+
+def portee(user):
+    """Transactions envoyées ou reçues par l'utilisateur"""
+    return Q(expediteur_id=user.pk) | Q(destinataire_id=user.pk)
+
+
+class MoteurRecherche:
+    """
+    PostgreSQL / autres bases : LIKE sur l'index de recherche.
+
+    Sur PostgreSQL, les index GIN pg_trgm de la migration servent aussi bien
+    les préfixes (LIKE 'x%') que les fragments (LIKE '%x%').
+    """
+
+    def prefixe(self, user, champ, valeur, limite):
+        return self._ids(
+            IndexRechercheTransaction.objects.filter(portee(user), **{f'{champ}__startswith': valeur}), limite
+        )
+
+    def fragment(self, user, valeur, limite):
+        return self._ids(
+            IndexRechercheTransaction.objects.filter(
+                portee(user), Q(code__contains=valeur) | Q(telephone__contains=valeur)
+            ),
+            limite
+        )
+
+    @staticmethod
+    def _ids(queryset, limite):
+        return list(queryset.order_by('-created_at').values_list('transaction_id', flat=True)[:limite])
+
+
+class MoteurSQLite(MoteurRecherche):
+    """
+    SQLite : LIKE n'y utilise pas les index (insensible à la casse).
+
+    Préfixes : intervalle [valeur, borne) par rôle, les plus récents d'abord ;
+    l'optimiseur choisit entre l'index (utilisateur, clé) pour un préfixe
+    sélectif et (utilisateur, date) pour un préfixe large. Fragments : table FTS5 trigram parcourue par rowid décroissant.
+    """
+
+    def prefixe(self, user, champ, valeur, limite):
+        borne = valeur[:-1] + chr(ord(valeur[-1]) + 1)
+        ids = []
+        for role in ('expediteur_id', 'destinataire_id'):
+            ids.extend(
+                IndexRechercheTransaction.objects.filter(
+                    **{role: user.pk, f'{champ}__gte': valeur, f'{champ}__lt': borne}
+                ).order_by('-created_at').values_list('transaction_id', flat=True)[:limite]
+            )
+        return ids
+
+    def fragment(self, user, valeur, limite):
+        table = connection.ops.quote_name(IndexRechercheTransaction._meta.db_table)
+        champ_transaction = IndexRechercheTransaction._meta.get_field('transaction')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT i.transaction_id FROM {TABLE_FTS} f JOIN {table} i ON i.id = f.rowid "
+                f"WHERE {TABLE_FTS} MATCH %s AND (i.expediteur_id = %s OR i.destinataire_id = %s) "
+                f"ORDER BY f.rowid DESC LIMIT %s",
+                ['{code telephone}: "%s"' % valeur, user.pk, user.pk, limite]
+            )
+            return [champ_transaction.to_python(ligne[0]) for ligne in cursor.fetchall()]
+
+
+def get_moteur_recherche():
+    """Moteur adapté à la base configurée"""
+    return MoteurSQLite() if connection.vendor == 'sqlite' else MoteurRecherche()
+
+
+# ===== ROUTAGE =====
+
+def _uuid(valeur):
+    """UUID de la requête, None si elle n'en est pas un"""
+    try:
+        return uuid.UUID(valeur)
+    except ValueError:
+        return None
+
+
+def forme_requete(requete):
+    """
+    uuid      : identifiant de la transaction → recherche exacte
+    code      : code complet avec chiffre de contrôle valide → recherche exacte
+    telephone : commence par '+' ou '00' → préfixe du numéro international
+    prefixe   : commence par un préfixe de code connu (TXN, RET...) → préfixe du code
+    numerique : chiffres seuls → idTransaction exact + fragment
+    fragment  : le reste → sous-chaîne du code ou du téléphone
+    """
+    brute = (requete or '').strip()
+    normalisee = normaliser_code(brute)
+    if not normalisee:
+        return None
+    if _uuid(brute):
+        return 'uuid'
+    if code_valide(normalisee):
+        return 'code'
+    if brute.startswith(('+', '00')) and normalisee.isdigit():
+        return 'telephone'
+    if normalisee[:3] in PREFIXES:
+        return 'prefixe'
+    if normalisee.isdigit():
+        return 'numerique'
+    return 'fragment'
+
+
+def rechercher(user, requete, limite=10):
+    """Transactions de l'utilisateur correspondant à la requête, les plus récentes d'abord"""
+    forme = forme_requete(requete)
+    if forme is None:
+        return Transaction.objects.none()
+
+    valeur = normaliser_code(requete)
+    transactions = Transaction.objects.filter(portee(user))
+    if forme == 'uuid':
+        # Clé primaire
+        return transactions.filter(id=_uuid(requete.strip()))
+    if forme == 'code':
+        # Index unique sur codeTransaction
+        return transactions.filter(codeTransaction=valeur)
+
+    moteur = get_moteur_recherche()
+    ids = []
+    if forme == 'telephone':
+        ids = moteur.prefixe(user, 'telephone', normaliser_telephone(requete), limite)
+    elif forme == 'prefixe':
+        ids = moteur.prefixe(user, 'code', valeur, limite)
+    else:
+        if forme == 'numerique' and len(valeur) <= CHIFFRES_ID_MAX:
+            ids.extend(transactions.filter(idTransaction=int(valeur)).values_list('id', flat=True))
+        if len(valeur) >= TAILLE_TRIGRAMME:
+            ids.extend(moteur.fragment(user, valeur, limite))
+        else:
+            ids.extend(moteur.prefixe(user, 'code', valeur, limite))
+            ids.extend(moteur.prefixe(user, 'telephone', valeur, limite))
+
+    return Transaction.objects.filter(id__in=ids).order_by('-created_at')[:limite]
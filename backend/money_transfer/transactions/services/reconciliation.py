@@ -0,0 +1,196 @@
+# transactions/services/reconciliation.py
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+from payment_gateways.services import payment_service, PaymentStatus
+from ..models import Transaction, StatutTransaction
+from .payment_dispatch import appliquer_succes, appliquer_annulation, get_gateway_type
+from ..signals import signaler_changement_etat
+
+logger = logging.getLogger(__name__)
+
+# Statuts pour lesquels le gateway n'a pas encore donné de réponse définitive
+STATUTS_A_RECONCILIER = [StatutTransaction.EN_ATTENTE, StatutTransaction.ACCEPTE]
+
+# Réponses techniques qui ne disent rien du paiement : on revérifiera plus tard
+CODES_NON_CONCLUANTS = {'GATEWAY_NOT_AVAILABLE', 'TECHNICAL_ERROR'}
+
+CHAMPS_MIS_A_JOUR = ['montantConverti', 'montantRecu', 'frais', 'statusTransaction', 'updated_at']
+
+
+@dataclass
+class RapportReconciliation:
+    """Compteurs d'une passe de réconciliation"""
+    verifiees: int = 0
+    envoyees: int = 0
+    annulees: int = 0
+    inchangees: int = 0
+    erreurs: int = 0
+    deja_traitees: int = 0
+    lignes_mises_a_jour: int = 0
+    duree: float = 0.0
+    par_gateway: dict = field(default_factory=dict)
+
+    @property
+    def debit(self):
+        """Vérifications par seconde"""
+        return self.verifiees / self.duree if self.duree else 0.0
+
+
+class ReconciliationEngine:
+    """
+    Réconcilie les transactions restées EN_ATTENTE / ACCEPTE avec le statut gateway.
+
+    Les transactions sont lues par lots (pagination par idTransaction), vérifiées
+    en parallèle sur une boucle asyncio avec une limite de concurrence par gateway,
+    puis chaque lot est écrit avec un seul bulk_update.
+    """
+
+    def __init__(self, service=None, chunk_size=None, concurrence=None, age_minimum=None,
+                 envoyer_signaux=True):
+        self.service = service or payment_service
+        self.chunk_size = chunk_size or settings.PAYMENT_RECONCILIATION_CHUNK_SIZE
+        self.concurrence = concurrence or settings.PAYMENT_RECONCILIATION_CONCURRENCY
+        if age_minimum is None:
+            age_minimum = timedelta(minutes=settings.PAYMENT_RECONCILIATION_MIN_AGE_MINUTES)
+        self.age_minimum = age_minimum
+        # bulk_update ne déclenche pas post_save : on le renvoie pour les notifications / réceptions
+        self.envoyer_signaux = envoyer_signaux
+
+    def queryset(self):
+        """Transactions candidates, hors paiements encore en cours de traitement"""
+        return Transaction.objects.filter(
+            statusTransaction__in=STATUTS_A_RECONCILIER,
+            created_at__lte=timezone.now() - self.age_minimum,
+        )
+
+    def iter_lots(self, limite=None):
+        """Parcourir les candidates par lots, sans OFFSET"""
+        dernier_id = 0
+        restantes = limite
+        qs = self.queryset().select_related('canal_paiement').order_by('idTransaction')
+
+        while restantes is None or restantes > 0:
+            taille = self.chunk_size if restantes is None else min(self.chunk_size, restantes)
+            lot = list(qs.filter(idTransaction__gt=dernier_id)[:taille])
+            if not lot:
+                return
+            dernier_id = lot[-1].idTransaction
+            if restantes is not None:
+                restantes -= len(lot)
+            yield lot
+
+    def executer(self, limite=None):
+        """Réconcilier toutes les candidates (ou `limite` au plus), retourne le rapport"""
+        rapport = RapportReconciliation()
+        debut = time.perf_counter()
+
+        loop = asyncio.new_event_loop()
+        try:
+            for lot in self.iter_lots(limite):
+                self._traiter_lot(loop, lot, rapport)
+                logger.info(
+                    f"🔁 Réconciliation: {rapport.verifiees} vérifiées "
+                    f"({rapport.verifiees / (time.perf_counter() - debut):.0f}/s)"
+                )
+        finally:
+            loop.close()
+
+        rapport.duree = time.perf_counter() - debut
+        return rapport
+
+    def _traiter_lot(self, loop, lot, rapport):
+        reponses = loop.run_until_complete(self._verifier_lot(lot))
+
+        modifiees = []
+        maintenant = timezone.now()
+        for transaction, (gateway_type, reponse) in zip(lot, reponses):
+            if gateway_type is None:
+                # Canal sans gateway simulé (ex. international) : rien à vérifier
+                rapport.inchangees += 1
+                continue
+
+            rapport.verifiees += 1
+            rapport.par_gateway[gateway_type] = rapport.par_gateway.get(gateway_type, 0) + 1
+
+            if reponse is None:
+                rapport.erreurs += 1
+                continue
+
+            if reponse.status == PaymentStatus.SUCCESS:
+                gateway = self.service.gateways[gateway_type]
+                appliquer_succes(transaction, gateway.calculate_fees(transaction.montantEnvoye))
+            elif (reponse.status in (PaymentStatus.FAILED, PaymentStatus.CANCELLED)
+                  and reponse.error_code not in CODES_NON_CONCLUANTS):
+                appliquer_annulation(transaction)
+            else:
+                rapport.inchangees += 1
+                continue
+
+            transaction.updated_at = maintenant
+            modifiees.append(transaction)
+
+        if not modifiees:
+            return
+
+        # Relire sous verrou les transactions encore en attente : celles terminées
+        # entre-temps par le pool de paiement ne sont ni écrasées ni re-signalées
+        with db_transaction.atomic():
+            en_attente = set(Transaction.objects.select_for_update().filter(
+                pk__in=[transaction.pk for transaction in modifiees],
+                statusTransaction__in=STATUTS_A_RECONCILIER,
+            ).values_list('pk', flat=True))
+            ecrites = [transaction for transaction in modifiees if transaction.pk in en_attente]
+            if ecrites:
+                # Un seul UPDATE par lot
+                rapport.lignes_mises_a_jour += Transaction.objects.bulk_update(
+                    ecrites, CHAMPS_MIS_A_JOUR, batch_size=self.chunk_size
+                )
+
+        rapport.deja_traitees += len(modifiees) - len(ecrites)
+        for transaction in ecrites:
+            if transaction.statusTransaction == StatutTransaction.ENVOYE:
+                rapport.envoyees += 1
+            else:
+                rapport.annulees += 1
+
+        if self.envoyer_signaux:
+            for transaction in ecrites:
+                post_save.send(
+                    sender=Transaction, instance=transaction, created=False,
+                    update_fields=frozenset(CHAMPS_MIS_A_JOUR), raw=False, using='default'
+                )
+        else:
+            # Sans post_save, les compteurs (statistiques, dashboard) restent à jour
+            for transaction in ecrites:
+                signaler_changement_etat(transaction)
+
+    async def _verifier_lot(self, lot):
+        """Vérifier un lot : [(gateway_type, réponse ou None)] dans l'ordre du lot"""
+        semaphores = {
+            gateway_type: asyncio.Semaphore(self.concurrence)
+            for gateway_type in self.service.gateways
+        }
+
+        async def verifier(transaction):
+            gateway_type = get_gateway_type(transaction.canal_paiement.type_canal)
+            if gateway_type not in semaphores:
+                return None, None
+            async with semaphores[gateway_type]:
+                try:
+                    return gateway_type, await self.service.acheck_payment_status(
+                        gateway_type, transaction.codeTransaction
+                    )
+                except Exception as e:
+                    logger.error(f"💥 Réconciliation {transaction.codeTransaction}: {e}")
+                    return gateway_type, None
+
+        return await asyncio.gather(*(verifier(transaction) for transaction in lot))
@@ -0,0 +1,85 @@
+# transactions/services/serveur_taux_local.py
+import json
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Taux XOF de démonstration (ordre de grandeur réel)
+TAUX_XOF = {
+    'XOF': 1, 'XAF': 1, 'EUR': 0.001524, 'USD': 0.00165, 'GBP': 0.0013, 'CAD': 0.00225,
+    'MAD': 0.0165, 'CDF': 4.7, 'NGN': 2.55, 'GHS': 0.0205, 'GNF': 14.2,
+}
+
+
+class ServeurTauxLocal:
+    """
+    Faux service de taux au format exchangerate-api v4, pour les tests et le développement.
+
+    GET {url}/{BASE} renvoie toute la table de BASE, déduite des taux XOF.
+    `latence` simule un service lent, `en_panne` le fait répondre 503 ;
+    `requetes` compte les appels reçus.
+    """
+
+    def __init__(self, taux_xof=None, port=0, latence=0.0):
+        self.taux_xof = dict(TAUX_XOF if taux_xof is None else taux_xof)
+        self.latence = latence
+        self.en_panne = False
+        self.requetes = 0
+        self._serveur = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._serveur.server_address[1]}/v4/latest"
+
+    def table(self, base):
+        reference = self.taux_xof.get(base)
+        if not reference:
+            return None
+        return {devise: valeur / reference for devise, valeur in self.taux_xof.items()}
+
+    def _handler(self):
+        serveur = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                serveur.requetes += 1
+                time.sleep(serveur.latence)
+                base = self.path.rstrip('/').rsplit('/', 1)[-1].upper()
+                taux = serveur.table(base)
+                if serveur.en_panne:
+                    self._repondre(503, {'result': 'error', 'error-type': 'unavailable'})
+                elif taux is None:
+                    self._repondre(404, {'result': 'error', 'error-type': 'unsupported-code'})
+                else:
+                    self._repondre(200, {'base': base, 'date': date.today().isoformat(),
+                                         'time_last_updated': int(time.time()), 'rates': taux})
+
+            def _repondre(self, statut, contenu):
+                corps = json.dumps(contenu).encode()
+                self.send_response(statut)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(corps)))
+                self.end_headers()
+                self.wfile.write(corps)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def demarrer(self):
+        self._thread = threading.Thread(target=self._serveur.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def arreter(self):
+        self._serveur.shutdown()
+        self._serveur.server_close()
+
+    def __enter__(self):
+        return self.demarrer()
+
+    def __exit__(self, *exc):
+        self.arreter()
@@ -0,0 +1,147 @@
+# transactions/services/statistiques.py
+import logging
+from collections import defaultdict
+
+from django.db import transaction as db_transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from ..models import CanalPaiement, StatistiquesUtilisateur, StatutTransaction, Transaction, TypeTransaction
+
+logger = logging.getLogger(__name__)
+
+COMPTEURS = [
+    'total_transactions', 'montant_total', 'transactions_terminees', 'transactions_en_attente',
+    'transactions_annulees', 'envois', 'receptions', 'retraits', 'transactions_wave',
+    'transactions_orange_money',
+]
+
+CHAMPS_STATUT = {
+    StatutTransaction.TERMINE: 'transactions_terminees',
+    StatutTransaction.EN_ATTENTE: 'transactions_en_attente',
+    StatutTransaction.ANNULE: 'transactions_annulees',
+}
+
+CHAMPS_CANAL = {
+    'WAVE': 'transactions_wave',
+    'ORANGE_MONEY': 'transactions_orange_money',
+}
+
+
+def agreger(user_id):
+    """Tous les compteurs d'un utilisateur en une seule requête (agrégation conditionnelle)"""
+    valeurs = Transaction.objects.filter(
+        Q(expediteur_id=user_id) | Q(destinataire_id=user_id)
+    ).aggregate(
+        total_transactions=Count('id'),
+        montant_total=Sum('montantEnvoye'),
+        transactions_terminees=Count('id', filter=Q(statusTransaction=StatutTransaction.TERMINE)),
+        transactions_en_attente=Count('id', filter=Q(statusTransaction=StatutTransaction.EN_ATTENTE)),
+        transactions_annulees=Count('id', filter=Q(statusTransaction=StatutTransaction.ANNULE)),
+        envois=Count('id', filter=Q(expediteur_id=user_id)),
+        receptions=Count('id', filter=Q(destinataire_id=user_id)),
+        retraits=Count('id', filter=Q(typeTransaction=TypeTransaction.RETRAIT)),
+        transactions_wave=Count('id', filter=Q(canal_paiement__type_canal='WAVE')),
+        transactions_orange_money=Count('id', filter=Q(canal_paiement__type_canal='ORANGE_MONEY')),
+    )
+    return {champ: valeur or 0 for champ, valeur in valeurs.items()}
+
+
+def statistiques_utilisateur(user):
+    """
+    Ligne de statistiques de l'utilisateur, calculée à la première demande.
+
+    La ligne est d'abord créée vide et validée : une transaction écrite ensuite
+    applique son delta au lieu d'être perdue. Le comptage se fait sous verrou de
+    la ligne, les deltas concurrents s'appliquent après lui.
+    """
+    statistiques = StatistiquesUtilisateur.objects.filter(user_id=user.pk).first()
+    if statistiques is not None:
+        return statistiques
+
+    StatistiquesUtilisateur.objects.bulk_create([StatistiquesUtilisateur(user_id=user.pk)], ignore_conflicts=True)
+    with db_transaction.atomic():
+        statistiques = StatistiquesUtilisateur.objects.select_for_update().get(user_id=user.pk)
+        for champ, valeur in agreger(user.pk).items():
+            setattr(statistiques, champ, valeur)
+        statistiques.save(update_fields=[*COMPTEURS, 'updated_at'])
+    return statistiques
+
+
+def contribution(etat, types_canaux):
+    """Compteurs apportés par une transaction (état de etat_statistiques) à chaque utilisateur"""
+    expediteur_id, destinataire_id, canal_id, type_transaction, statut, montant = etat
+    contributions = {}
+    for user_id in {expediteur_id, destinataire_id} - {None}:
+        compteurs = {'total_transactions': 1, 'montant_total': montant or 0}
+        if statut in CHAMPS_STATUT:
+            compteurs[CHAMPS_STATUT[statut]] = 1
+        if type_transaction == TypeTransaction.RETRAIT:
+            compteurs['retraits'] = 1
+        champ_canal = CHAMPS_CANAL.get(types_canaux.get(canal_id))
+        if champ_canal:
+            compteurs[champ_canal] = 1
+        if user_id == expediteur_id:
+            compteurs['envois'] = 1
+        if user_id == destinataire_id:
+            compteurs['receptions'] = 1
+        contributions[user_id] = compteurs
+    return contributions
+
+
+def deltas(ancien, nouveau):
+    """{user_id: {compteur: delta}} entre deux états (None = transaction absente)"""
+    if ancien and nouveau and ancien[:3] == nouveau[:3]:
+        # Mêmes utilisateurs et même canal : les compteurs par canal s'annulent
+        types_canaux = {}
+    else:
+        canaux = {etat[2] for etat in (ancien, nouveau) if etat}
+        types_canaux = dict(CanalPaiement.objects.filter(id__in=canaux).values_list('id', 'type_canal'))
+
+    totaux = defaultdict(lambda: defaultdict(int))
+    for signe, etat in ((-1, ancien), (1, nouveau)):
+        if etat is None:
+            continue
+        for user_id, compteurs in contribution(etat, types_canaux).items():
+            for champ, valeur in compteurs.items():
+                totaux[user_id][champ] += signe * valeur
+
+    return {
+        user_id: {champ: valeur for champ, valeur in compteurs.items() if valeur}
+        for user_id, compteurs in totaux.items()
+        if any(compteurs.values())
+    }
+
+
+def appliquer_changement(ancien, nouveau):
+    """Appliquer les deltas avec F() : une requête par utilisateur concerné"""
+    maintenant = timezone.now()
+    for user_id, delta in deltas(ancien, nouveau).items():
+        # Ligne absente : rien à faire, elle sera calculée à la première lecture
+        StatistiquesUtilisateur.objects.filter(user_id=user_id).update(
+            updated_at=maintenant,
+            **{champ: F(champ) + valeur for champ, valeur in delta.items()}
+        )
+
+
+def invalider(user_ids):
+    """Supprimer les lignes devenues fausses (écritures sans signal) : recalcul à la lecture"""
+    user_ids = list(user_ids)
+    for debut in range(0, len(user_ids), 500):
+        StatistiquesUtilisateur.objects.filter(user_id__in=user_ids[debut:debut + 500]).delete()
+
+
+def reparer(user_id):
+    """Recompter les compteurs d'une ligne existante ; renvoie les champs corrigés {champ: (avant, après)}"""
+    ligne = StatistiquesUtilisateur.objects.filter(user_id=user_id).first()
+    if ligne is None:
+        return {}
+    valeurs = agreger(user_id)
+    ecarts = {
+        champ: (getattr(ligne, champ), valeur) for champ, valeur in valeurs.items()
+        # montant_total est un flottant cumulé par deltas
+        if abs(getattr(ligne, champ) - valeur) > 0.005
+    }
+    if ecarts:
+        StatistiquesUtilisateur.objects.filter(user_id=user_id).update(updated_at=timezone.now(), **valeurs)
+    return ecarts
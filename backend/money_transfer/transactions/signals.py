@@ -1,8 +1,9 @@
 # transactions/signals.py - NOUVEAU FICHIER POUR NOTIFICATIONS AUTOMATIQUES
 
-from django.db.models.signals import post_save
-from django.dispatch import receiver
-from .models import Transaction, StatutTransaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+from .models import Transaction, StatutTransaction, CanalPaiement, CorridorTransfert, Pays, ServicePaiementInternational
+from .services import frais
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,98 +13,95 @@ def send_transaction_notifications(sender, instance, created, **kwargs):
     """
     Signal pour envoyer des notifications automatiques lors des changements de transaction.
     S'intègre avec le système de notifications du Dev 1.
+
+    Les notifications sont publiées dans l'outbox : créées par lots après le commit,
+    sans requête dans la sauvegarde (noms de l'expéditeur et du canal résolus à l'insertion).
     """
+    from notifications.services.outbox import CANAL, EXPEDITEUR, Intention, publier
+    from notifications.services.temps_reel import diffuser_apres_commit
+
+    # Statut déjà notifié (ou chargé tel quel) : sauvegarde intermédiaire, rien à notifier
+    if not created and instance.statusTransaction == getattr(instance, '_statut_notifie', None):
+        return
+    instance._statut_notifie = instance.statusTransaction
+
+    # Statut poussé aux connexions ouvertes de l'expéditeur et du destinataire
+    diffuser_apres_commit([instance.expediteur_id, instance.destinataire_id], 'transaction', {
+        'code': instance.codeTransaction, 'statut': instance.statusTransaction,
+    })
+
+    expediteur = instance.expediteur_id
+    destinataire = instance.destinataire_id
+    intentions = []
+
+    if created:
+        # ===== NOTIFICATION CRÉATION DE TRANSACTION =====
+        logger.info(f"📨 Envoi notification création transaction {instance.codeTransaction}")
+
+        # Notification à l'expéditeur
+        intentions.append(Intention(
+            expediteur, "💸 Transaction initiée",
+            f"Votre transaction de {instance.montantEnvoye:,.0f} {instance.deviseEnvoi} vers {instance.destinataire_phone} a été créée. Code: {instance.codeTransaction}",
+            'TRANSACTION',
+        ))
+
+        # Notification au destinataire (si inscrit)
+        if destinataire:
+            intentions.append(Intention(
+                destinataire, "💰 Argent reçu",
+                f"Vous avez reçu {instance.montantRecu:,.0f} {instance.deviseReception} de {EXPEDITEUR}. Code de retrait: {instance.codeTransaction}",
+                'TRANSACTION', expediteur_id=expediteur,
+            ))
+
+    # ===== NOTIFICATIONS CHANGEMENT DE STATUT =====
+
+    elif instance.statusTransaction == StatutTransaction.ENVOYE:
+        logger.info(f"📨 Notification transaction envoyée {instance.codeTransaction}")
+
+        intentions.append(Intention(
+            expediteur, "✅ Transaction envoyée",
+            f"Votre transaction {instance.codeTransaction} a été traitée avec succès via {CANAL}. Le destinataire peut maintenant retirer l'argent.",
+            'TRANSACTION', canal_id=instance.canal_paiement_id,
+        ))
+        if destinataire:
+            intentions.append(Intention(
+                destinataire, "💰 Retrait disponible",
+                f"L'argent de {EXPEDITEUR} est maintenant disponible pour retrait. Montant: {instance.montantRecu:,.0f} {instance.deviseReception}. Code: {instance.codeTransaction}",
+                'TRANSACTION', expediteur_id=expediteur,
+            ))
+
+    elif instance.statusTransaction == StatutTransaction.TERMINE:
+        logger.info(f"📨 Notification transaction terminée {instance.codeTransaction}")
+
+        intentions.append(Intention(
+            expediteur, "🎉 Transaction terminée",
+            f"Votre transaction {instance.codeTransaction} a été retirée avec succès. L'argent a été remis au destinataire.",
+            'TRANSACTION',
+        ))
+        if destinataire:
+            intentions.append(Intention(
+                destinataire, "✅ Retrait confirmé",
+                f"Vous avez retiré avec succès {instance.montantRecu:,.0f} {instance.deviseReception} de {EXPEDITEUR}.",
+                'TRANSACTION', expediteur_id=expediteur,
+            ))
+
+    elif instance.statusTransaction == StatutTransaction.ANNULE:
+        logger.info(f"📨 Notification transaction annulée {instance.codeTransaction}")
+
+        intentions.append(Intention(
+            expediteur, "❌ Transaction annulée",
+            f"Votre transaction {instance.codeTransaction} a été annulée. Si des frais ont été prélevés, ils seront remboursés sous 24h.",
+            'ALERT',
+        ))
+        if destinataire:
+            intentions.append(Intention(
+                destinataire, "ℹ️ Transaction annulée",
+                f"La transaction de {EXPEDITEUR} ({instance.codeTransaction}) a été annulée.",
+                'INFO', expediteur_id=expediteur,
+            ))
+
     try:
-        # Import dynamique pour éviter les problèmes de dépendances circulaires
-        from notifications.views import NotificationChannelFactory
-        
-        # Créer le canal de notification
-        notification_channel = NotificationChannelFactory.get_channel('database')
-        
-        if created:
-            # ===== NOTIFICATION CRÉATION DE TRANSACTION =====
-            logger.info(f"📨 Envoi notification création transaction {instance.codeTransaction}")
-            
-            # Notification à l'expéditeur
-            notification_channel.send(
-                user=instance.expediteur,
-                title="💸 Transaction initiée",
-                message=f"Votre transaction de {instance.montantEnvoye:,.0f} {instance.deviseEnvoi} vers {instance.destinataire_phone} a été créée. Code: {instance.codeTransaction}",
-                notification_type='TRANSACTION'
-            )
-            
-            # Notification au destinataire (si inscrit)
-            if instance.destinataire:
-                notification_channel.send(
-                    user=instance.destinataire,
-                    title="💰 Argent reçu",
-                    message=f"Vous avez reçu {instance.montantRecu:,.0f} {instance.deviseReception} de {instance.expediteur.get_full_name()}. Code de retrait: {instance.codeTransaction}",
-                    notification_type='TRANSACTION'
-                )
-        
-        else:
-            # ===== NOTIFICATIONS CHANGEMENT DE STATUT =====
-            
-            if instance.statusTransaction == StatutTransaction.ENVOYE:
-                logger.info(f"📨 Notification transaction envoyée {instance.codeTransaction}")
-                
-                # Notification à l'expéditeur
-                notification_channel.send(
-                    user=instance.expediteur,
-                    title="✅ Transaction envoyée",
-                    message=f"Votre transaction {instance.codeTransaction} a été traitée avec succès via {instance.canal_paiement.canal_name}. Le destinataire peut maintenant retirer l'argent.",
-                    notification_type='TRANSACTION'
-                )
-                
-                # Notification au destinataire (si inscrit)
-                if instance.destinataire:
-                    notification_channel.send(
-                        user=instance.destinataire,
-                        title="💰 Retrait disponible",
-                        message=f"L'argent de {instance.expediteur.get_full_name()} est maintenant disponible pour retrait. Montant: {instance.montantRecu:,.0f} {instance.deviseReception}. Code: {instance.codeTransaction}",
-                        notification_type='TRANSACTION'
-                    )
-            
-            elif instance.statusTransaction == StatutTransaction.TERMINE:
-                logger.info(f"📨 Notification transaction terminée {instance.codeTransaction}")
-                
-                # Notification à l'expéditeur
-                notification_channel.send(
-                    user=instance.expediteur,
-                    title="🎉 Transaction terminée",
-                    message=f"Votre transaction {instance.codeTransaction} a été retirée avec succès. L'argent a été remis au destinataire.",
-                    notification_type='TRANSACTION'
-                )
-                
-                # Notification au destinataire (si inscrit)
-                if instance.destinataire:
-                    notification_channel.send(
-                        user=instance.destinataire,
-                        title="✅ Retrait confirmé",
-                        message=f"Vous avez retiré avec succès {instance.montantRecu:,.0f} {instance.deviseReception} de {instance.expediteur.get_full_name()}.",
-                        notification_type='TRANSACTION'
-                    )
-            
-            elif instance.statusTransaction == StatutTransaction.ANNULE:
-                logger.info(f"📨 Notification transaction annulée {instance.codeTransaction}")
-                
-                # Notification à l'expéditeur
-                notification_channel.send(
-                    user=instance.expediteur,
-                    title="❌ Transaction annulée",
-                    message=f"Votre transaction {instance.codeTransaction} a été annulée. Si des frais ont été prélevés, ils seront remboursés sous 24h.",
-                    notification_type='ALERT'
-                )
-                
-                # Notification au destinataire (si inscrit)
-                if instance.destinataire:
-                    notification_channel.send(
-                        user=instance.destinataire,
-                        title="ℹ️ Transaction annulée",
-                        message=f"La transaction de {instance.expediteur.get_full_name()} ({instance.codeTransaction}) a été annulée.",
-                        notification_type='INFO'
-                    )
-    
+        publier(intentions)
     except Exception as e:
         # Ne pas faire échouer la transaction si les notifications échouent
         logger.error(f"❌ Erreur envoi notification pour transaction {instance.codeTransaction}: {e}")
@@ -115,19 +113,108 @@ def log_transaction_gateway_info(sender, instance, created, **kwargs):
     Signal pour logger les informations de gateway pour monitoring.
     """
     if not created and instance.statusTransaction in [StatutTransaction.ENVOYE, StatutTransaction.ANNULE]:
-        gateway_name = instance.canal_paiement.canal_name
+        # Pas de requête pour un log : identifiant du canal s'il n'est pas déjà chargé
+        canal_charge = instance._meta.get_field('canal_paiement').is_cached(instance)
+        gateway_name = instance.canal_paiement.canal_name if canal_charge else instance.canal_paiement_id
         status = "SUCCESS" if instance.statusTransaction == StatutTransaction.ENVOYE else "FAILED"
         
         logger.info(f"🏦 Gateway {gateway_name}: Transaction {instance.codeTransaction} → {status}")
         logger.info(f"💰 Montant: {instance.montantEnvoye} {instance.deviseEnvoi}, Frais: {instance.frais}")
 
 
+
+# ===== CHANGEMENTS D'ÉTAT POUR LES COMPTEURS =====
+
+# Émis à chaque création / modification / suppression de transaction avec
+# instance, ancien, nouveau (tuples etat_statistiques, None = transaction
+# absente) et created. Hors création, ancien=None signifie état d'origine inconnu.
+etat_transaction_change = Signal()
+
+# Émis par les écritures en masse qui n'envoient pas de signal par ligne : jours, user_ids
+transactions_importees = Signal()
+
+
+def signaler_changement_etat(instance, created=False):
+    """Émettre etat_transaction_change si l'état compté a changé depuis le chargement"""
+    nouveau = instance.etat_statistiques()
+    ancien = None if created else getattr(instance, '_etat_stats', None)
+    if created or ancien != nouveau:
+        for receveur, resultat in etat_transaction_change.send_robust(
+            sender=Transaction, instance=instance, ancien=ancien, nouveau=nouveau, created=created
+        ):
+            if isinstance(resultat, Exception):
+                logger.error(f"❌ Erreur compteurs ({receveur.__name__}) pour transaction {instance.codeTransaction}: {resultat}")
+    instance._etat_stats = nouveau
+
+
+@receiver(post_save, sender=Transaction)
+def diffuser_changement_etat(sender, instance, created, **kwargs):
+    signaler_changement_etat(instance, created)
+
+
+@receiver(post_delete, sender=Transaction)
+def diffuser_suppression(sender, instance, **kwargs):
+    ancien = getattr(instance, '_etat_stats', None) or instance.etat_statistiques()
+    for receveur, resultat in etat_transaction_change.send_robust(
+        sender=Transaction, instance=instance, ancien=ancien, nouveau=None, created=False
+    ):
+        if isinstance(resultat, Exception):
+            logger.error(f"❌ Erreur compteurs ({receveur.__name__}) suppression {instance.codeTransaction}: {resultat}")
+
+
+@receiver(etat_transaction_change)
+def mettre_a_jour_statistiques(sender, instance, ancien, nouveau, created, **kwargs):
+    """Appliquer à StatistiquesUtilisateur le delta entre l'état chargé et l'état sauvegardé"""
+    from .services import statistiques
+
+    if ancien is None and not created:
+        # État d'origine inconnu (instance construite à la main, champs différés)
+        statistiques.invalider({instance.expediteur_id, instance.destinataire_id} - {None})
+    else:
+        statistiques.appliquer_changement(ancien, nouveau)
+
+
+@receiver(transactions_importees)
+def invalider_statistiques_importees(sender, user_ids, **kwargs):
+    """Insertions sans signal : compteurs recalculés à la prochaine lecture"""
+    from .services import statistiques
+
+    statistiques.invalider(user_ids)
+
+
+# ===== INDEX DE RECHERCHE =====
+
+@receiver(post_save, sender=Transaction)
+def indexer_recherche(sender, instance, created, **kwargs):
+    """Une écriture dans l'index à la création, puis seulement si code / téléphone / parties changent"""
+    from .services import recherche
+
+    cles = instance.cles_recherche()
+    try:
+        if cles is None:
+            recherche.reindexer([instance.pk])
+        elif created or cles != getattr(instance, '_cles_recherche', None):
+            recherche.indexer(instance, created)
+    except Exception as e:
+        logger.error(f"❌ Erreur index de recherche pour transaction {instance.codeTransaction}: {e}")
+    instance._cles_recherche = cles
+
+
+
+# ===== TABLES DE FRAIS DU MOTEUR DE DEVIS =====
+
+# Toute modification de la configuration des frais (admin compris) recharge les tables
+for modele in (CanalPaiement, ServicePaiementInternational, CorridorTransfert, Pays):
+    post_save.connect(frais.invalider, sender=modele, dispatch_uid=f'frais_{modele.__name__}_save')
+    post_delete.connect(frais.invalider, sender=modele, dispatch_uid=f'frais_{modele.__name__}_delete')
+
+
 # ===== INTEGRATION AVEC LE SYSTÈME DE NOTIFICATIONS DU DEV 1 =====
 """
 Ce fichier s'intègre parfaitement avec le travail du Dev 1 :
 
-1. ✅ Utilise NotificationChannelFactory du Dev 1
-2. ✅ Créé des notifications en base de données automatiquement
+1. ✅ Crée les notifications du Dev 1 via l'outbox (notifications/services/outbox.py)
+2. ✅ Créé des notifications en base de données automatiquement, par lots après commit
 3. ✅ Suit les types de notification définis (TRANSACTION, ALERT, INFO)
 4. ✅ Notifications pour expéditeur ET destinataire
 5. ✅ Logging pour monitoring
@@ -135,8 +222,10 @@ Ce fichier s'intègre parfaitement avec le travail du Dev 1 :
 WORKFLOW COMPLET :
 Transaction créée → Signal → Notification automatique → Utilisateur notifié
 
+CANAUX DE DIFFUSION (notifications/services/dispatcher.py) :
+- SMS et push : envoyés par lots après insertion (CanalSMS, CanalPush)
+- Temps réel : flux des connexions ouvertes (notifications/services/temps_reel.py)
+
 PROCHAINES ÉTAPES (futures) :
-- SMS notifications (Dev 1 peut ajouter SMSNotificationChannel)
-- Push notifications (Dev 1 peut ajouter FCMNotificationChannel)
 - Email notifications (Dev 1 peut ajouter EmailNotificationChannel)
 """
\ No newline at end of file
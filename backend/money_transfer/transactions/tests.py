@@ -1,3 +1,1063 @@
-from django.test import TestCase
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from importlib.util import find_spec
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.admin.sites import site
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection, transaction as db_transaction
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from money_transfer.cache import CacheDeuxNiveaux
+from money_transfer.serveur_redis_local import ServeurRedisLocal
+from notifications.models import Notification
+from payment_gateways.services import PaymentProcessingService, PaymentResponse, PaymentStatus, payment_service
+
+from .admin import marquer_comme_annule, marquer_comme_termine
+from .models import (
+    CanalPaiement, CorridorTransfert, HistoriqueTauxChange, Pays, ServicePaiementInternational, StatistiquesUtilisateur,
+    StatutTransaction, TauxChange, Transaction, TransactionInternationale,
+)
+from .services import exchange_rates, frais, historique_taux
+from .services.bulk_import import TransactionImporter, lire_lignes
+from .services.codes import _cle_permutation, code_depuis_id, code_valide
+from .services.id_allocator import BlockIdAllocator
+from .services.payment_dispatch import PaymentDispatcher
+from .services.reconciliation import ReconciliationEngine
+from .services.recherche import reindexer
+from .services.serveur_taux_local import ServeurTauxLocal
+from .services.statistiques import agreger, statistiques_utilisateur
+
+User = get_user_model()
+
+
+@override_settings(NOTIFICATION_OUTBOX_MODE='sync')
+class PaymentDispatchTests(TransactionTestCase):
+    """Appels gateway planifiés au commit sur un pool borné"""
+
+    def setUp(self):
+        self.latence = payment_service.gateways['WAVE'].latency_factor
+        payment_service.gateways['WAVE'].latency_factor = 0
+        self.user = User.objects.create_user(
+            phone_number='+221770000003', email='e@example.com', first_name='Awa', last_name='Ba', password='x'
+        )
+        self.canal = CanalPaiement.objects.create(
+            canal_name='Wave', type_canal='WAVE', country='Sénégal', fees_percentage=Decimal('1.00')
+        )
+        self.dispatcher = PaymentDispatcher(max_workers=2, max_pending=2)
+
+    def tearDown(self):
+        payment_service.gateways['WAVE'].latency_factor = self.latence
+        self.dispatcher._executor.shutdown(wait=True)
+
+    def creer(self):
+        return Transaction.objects.create(
+            expediteur=self.user, destinataire=self.user, destinataire_phone='+221770000099',
+            canal_paiement=self.canal, montantEnvoye=5000, montantConverti=4950, montantRecu=4950,
+        )
+
+    def attendre_fin(self):
+        limite = time.monotonic() + 10
+        while self.dispatcher.en_vol and time.monotonic() < limite:
+            time.sleep(0.01)
+        self.assertEqual(self.dispatcher.en_vol, 0)
+
+    def statuts(self, transactions):
+        return [Transaction.objects.get(pk=t.pk).statusTransaction for t in transactions]
+
+    def test_planifie_au_commit_et_borne(self):
+        bloque = threading.Event()
+        principal = threading.current_thread()
+        executer = self.dispatcher._executer
+
+        def executer_bloque(*args):
+            # Les workers attendent le feu vert, le thread de la requête traite tout de suite
+            if threading.current_thread() is not principal:
+                bloque.wait(5)
+            return executer(*args)
+
+        self.dispatcher._executer = executer_bloque
+
+        transactions = [self.creer() for _ in range(3)]
+        soumis = [self.dispatcher.soumettre(t.pk, 'WAVE', '+221770000099') for t in transactions]
+        self.assertEqual(soumis, [True, True, False])
+        self.assertEqual(self.dispatcher.en_vol, 2)
+        bloque.set()
+        self.attendre_fin()
+        bloque.clear()
+
+        # Dans une transaction rien ne part avant le commit ; au commit le pool
+        # prend deux paiements et le troisième est traité dans le callback
+        with db_transaction.atomic():
+            transactions = [self.creer() for _ in range(3)]
+            soumis = [self.dispatcher.soumettre(t.pk, 'WAVE', '+221770000099') for t in transactions]
+            self.assertEqual(soumis, [True, True, True])
+            self.assertEqual(self.dispatcher.en_vol, 0)
+        self.assertEqual(self.dispatcher.en_vol, 2)
+        statuts = self.statuts(transactions)
+        self.assertEqual(statuts[:2], [StatutTransaction.EN_ATTENTE] * 2)
+        self.assertNotEqual(statuts[2], StatutTransaction.EN_ATTENTE)
+
+        bloque.set()
+        self.attendre_fin()
+        self.assertNotIn(StatutTransaction.EN_ATTENTE, self.statuts(transactions))
+
+    def test_aucune_place_prise_si_la_transaction_est_annulee(self):
+        with self.assertRaises(RuntimeError):
+            with db_transaction.atomic():
+                transaction = self.creer()
+                self.assertTrue(self.dispatcher.soumettre(transaction.pk, 'WAVE', '+221770000099'))
+                raise RuntimeError('rollback')
+
+        self.assertEqual(self.dispatcher.en_vol, 0)
+        self.assertEqual(Transaction.objects.filter(pk=transaction.pk).count(), 0)
+
+
+class ServiceStatutsScenario(PaymentProcessingService):
+    """Statuts gateway imposés par référence ; `pendant` s'exécute pendant la vérification"""
+
+    def __init__(self, statuts, pendant=None):
+        super().__init__()
+        self.statuts = statuts
+        self.pendant = pendant
+
+    async def acheck_payment_status(self, gateway_type, gateway_reference):
+        if self.pendant:
+            await sync_to_async(self.pendant, thread_sensitive=False)(gateway_reference)
+        statut, code = self.statuts[gateway_reference]
+        return PaymentResponse(
+            success=statut == PaymentStatus.SUCCESS, transaction_id=gateway_reference, gateway_reference='',
+            status=statut, amount=Decimal('0'), currency='XOF', message='', error_code=code,
+        )
+
+
+@override_settings(NOTIFICATION_OUTBOX_MODE='sync')
+class ReconciliationTests(TransactionTestCase):
+    """Réconciliation par lots : une seule écriture et un seul jeu d'effets de bord par transaction"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            phone_number='+221770000004', email='f@example.com', first_name='Ndeye', last_name='Gaye', password='x'
+        )
+        canal = CanalPaiement.objects.create(
+            canal_name='Wave', type_canal='WAVE', country='Sénégal', fees_percentage=Decimal('1.00')
+        )
+        self.transactions = [
+            Transaction.objects.create(
+                expediteur=self.user, destinataire=self.user, destinataire_phone='+221770000099',
+                canal_paiement=canal, montantEnvoye=5000, montantConverti=4950, montantRecu=4950,
+            )
+            for _ in range(4)
+        ]
+
+    def test_transaction_terminee_pendant_le_lot(self):
+        succes, refus, panne, course = (t.codeTransaction for t in self.transactions)
+
+        def pool_de_paiement(reference):
+            # Le pool de paiement conclut `course` pendant que le lot est vérifié
+            if reference == course:
+                transaction = Transaction.objects.get(codeTransaction=course)
+                transaction.statusTransaction = StatutTransaction.ENVOYE
+                transaction.save()
+
+        service = ServiceStatutsScenario({
+            succes: (PaymentStatus.SUCCESS, None),
+            refus: (PaymentStatus.FAILED, 'INSUFFICIENT_FUNDS'),
+            panne: (PaymentStatus.FAILED, 'TECHNICAL_ERROR'),
+            course: (PaymentStatus.SUCCESS, None),
+        }, pendant=pool_de_paiement)
+        rapport = ReconciliationEngine(service=service, age_minimum=timedelta(0)).executer()
+
+        statuts = dict(Transaction.objects.values_list('codeTransaction', 'statusTransaction'))
+        self.assertEqual(statuts, {
+            succes: StatutTransaction.ENVOYE, refus: StatutTransaction.ANNULE,
+            panne: StatutTransaction.EN_ATTENTE, course: StatutTransaction.ENVOYE,
+        })
+        self.assertEqual((rapport.verifiees, rapport.envoyees, rapport.annulees), (4, 1, 1))
+        self.assertEqual((rapport.inchangees, rapport.deja_traitees, rapport.lignes_mises_a_jour), (1, 1, 2))
+
+        # Une seule notification "envoyée" pour la transaction conclue par le pool
+        envoyees = Notification.objects.filter(title='✅ Transaction envoyée')
+        self.assertEqual(envoyees.filter(message__contains=course).count(), 1)
+        self.assertEqual(envoyees.filter(message__contains=succes).count(), 1)
+
+        ligne = statistiques_utilisateur(self.user)
+        ligne.refresh_from_db()
+        for champ, valeur in agreger(self.user.pk).items():
+            self.assertEqual(getattr(ligne, champ), valeur, champ)
+
+        # Deuxième passe : il ne reste que la transaction sans réponse concluante
+        self.assertEqual(ReconciliationEngine(service=service, age_minimum=timedelta(0)).executer().verifiees, 1)
+
+
+class IdAllocatorTests(TransactionTestCase):
+    """Identifiants réservés par blocs : uniques entre processus, threads et blocs"""
+
+    def test_unicite_entre_blocs_et_allocateurs(self):
+        # Deux allocateurs = deux processus qui se partagent le compteur
+        allocateurs = [BlockIdAllocator(taille_bloc=7), BlockIdAllocator(taille_bloc=7)]
+        resultats = []
+
+        def allouer(allocateur):
+            ids = []
+            try:
+                for _ in range(25):
+                    ids.extend(allocateur.allocate_many(3, 'test'))
+            finally:
+                connection.close()
+            resultats.append(ids)
+
+        threads = [threading.Thread(target=allouer, args=(allocateurs[i % 2],)) for i in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        tous = [i for ids in resultats for i in ids]
+        self.assertEqual(len(tous), 6 * 25 * 3)
+        self.assertEqual(len(set(tous)), len(tous))
+        for ids in resultats:
+            self.assertEqual(ids, sorted(ids))
+
+    def test_dans_une_transaction_rien_n_est_garde_en_memoire(self):
+        allocateur = BlockIdAllocator(taille_bloc=100)
+        with db_transaction.atomic():
+            premiers = allocateur.allocate_many(2, 'test')
+        suivant = allocateur.allocate('test')
+
+        self.assertEqual(premiers, [premiers[0], premiers[0] + 1])
+        self.assertEqual(suivant, premiers[1] + 1)
+        self.assertEqual(allocateur.allocate('test'), suivant + 1)
+
+
+class CodeTransactionTests(SimpleTestCase):
+    """Codes dérivés des identifiants de séquence"""
+
+    def test_codes_sans_collision(self):
+        # Échantillon ; le million et son débit : manage.py benchmark_codes
+        codes = {code_depuis_id('TXN', 100000001 + i, annee=2026) for i in range(50_000)}
+
+        self.assertEqual(len(codes), 50_000)
+        # Permutation affine : a premier avec 10 garantit l'absence de collision sur 10^10 ids
+        for nom in ('transaction', 'retrait', 'reception'):
+            self.assertEqual(math.gcd(_cle_permutation(nom)[0], 10), 1)
+
+    def test_format_et_controle(self):
+        code = code_depuis_id('WTH', 42, nom='retrait', annee=2026)
+
+        self.assertEqual(len(code), 18)
+        self.assertTrue(code.startswith('WTH2026'))
+        self.assertTrue(code_valide(code))
+
+        # Une faute de frappe sur un chiffre est détectée par le chiffre de contrôle
+        faute = code[:10] + str((int(code[10]) + 1) % 10) + code[11:]
+        self.assertFalse(code_valide(faute))
+
+    def test_codes_non_sequentiels(self):
+        premier = code_depuis_id('TXN', 100000001, annee=2026)
+        suivant = code_depuis_id('TXN', 100000002, annee=2026)
+
+        self.assertNotEqual(int(suivant[7:17]) - int(premier[7:17]), 1)
+
+
+class ImportEnMasseTests(TestCase):
+    """Import en masse : lignes illisibles rejetées, effets de bord des chunks écrits même si l'import s'arrête"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            phone_number='+221770000005', email='g@example.com', first_name='Aliou', last_name='Cisse', password='x'
+        )
+        cls.autre = User.objects.create_user(
+            phone_number='+221770000006', email='h@example.com', first_name='Binta', last_name='Kane', password='x'
+        )
+        CanalPaiement.objects.create(
+            canal_name='Wave', type_canal='WAVE', country='Sénégal', fees_percentage=Decimal('1.00')
+        )
+
+    def ligne(self, montant=5000, **kwargs):
+        return {'expediteur_phone': self.user.phone_number, 'destinataire_phone': self.autre.phone_number,
+                'canal': 'WAVE', 'montantEnvoye': montant, 'statusTransaction': 'TERMINE', **kwargs}
+
+    def assertStatistiquesCoherentes(self):
+        ligne = statistiques_utilisateur(self.user)
+        ligne.refresh_from_db()
+        for champ, valeur in agreger(self.user.pk).items():
+            self.assertEqual(getattr(ligne, champ), valeur, champ)
+
+    def test_lignes_illisibles_et_montants_non_finis(self):
+        contenu = [
+            json.dumps(self.ligne()),
+            '{"expediteur_phone": "+221770000005", ',
+            '[1, 2]',
+            json.dumps(self.ligne(montant='NaN')),
+            json.dumps(self.ligne(montant='Infinity')),
+            json.dumps(self.ligne(montantRecu='nan')),
+            json.dumps(self.ligne(montant=7000)),
+        ]
+        with tempfile.TemporaryDirectory() as dossier:
+            chemin = os.path.join(dossier, 'import.jsonl')
+            with open(chemin, 'w', encoding='utf-8') as fichier:
+                fichier.write('\n'.join(contenu) + '\n')
+            importer = TransactionImporter(chunk_size=2)
+            rapport = importer.importer(lire_lignes(chemin))
+
+        self.assertEqual((rapport.lues, rapport.importees, rapport.rejetees), (7, 2, 5))
+        self.assertEqual([rejet['ligne'] for rejet in importer.rejets], [2, 3, 4, 5, 6])
+        self.assertEqual(rapport.notifications, 4)
+        self.assertStatistiquesCoherentes()
+
+    def test_import_interrompu(self):
+        def lignes():
+            for numero in range(1, 4):
+                yield numero, self.ligne()
+            raise OSError('fichier tronqué')
+
+        with self.assertRaises(OSError):
+            TransactionImporter(chunk_size=2).importer(lignes())
+
+        # Le chunk écrit a ses notifications et ses compteurs ; la ligne en attente n'est pas importée
+        self.assertEqual(Transaction.objects.count(), 2)
+        self.assertEqual(Notification.objects.filter(title='💸 Transaction initiée').count(), 2)
+        self.assertStatistiquesCoherentes()
+
+    def test_rejets_ecrits_au_fil_de_l_import(self):
+        lignes = [(numero, self.ligne(montant='NaN')) for numero in range(1, 51)]
+        sortie = StringIO()
+        importer = TransactionImporter(chunk_size=10, sortie_rejets=sortie)
+        rapport = importer.importer(iter(lignes))
+
+        # Tous les rejets dans le fichier, seulement un échantillon en mémoire
+        self.assertEqual(rapport.rejetees, 50)
+        self.assertEqual(len(sortie.getvalue().splitlines()), 50)
+        self.assertEqual(len(importer.rejets), TransactionImporter.ECHANTILLON_REJETS)
+        self.assertEqual(json.loads(sortie.getvalue().splitlines()[-1])['ligne'], 50)
+
+    def test_erreur_de_finalisation_ne_masque_pas_l_interruption(self):
+        def lignes():
+            for numero in range(1, 4):
+                yield numero, self.ligne()
+            raise OSError('fichier tronqué')
+
+        importer = TransactionImporter(chunk_size=2)
+        with mock.patch.object(importer, '_finaliser', side_effect=RuntimeError('notifications')):
+            with self.assertRaisesMessage(OSError, 'fichier tronqué'):
+                importer.importer(lignes())
+
+
+class TransactionListPaginationTests(TestCase):
+    """Liste des transactions paginée par curseur, sans N+1"""
+
+    URL = '/api/v1/transactions/transactions/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            phone_number='+221770000001', email='a@example.com', first_name='Awa', last_name='Diop', password='x'
+        )
+        cls.autre = User.objects.create_user(
+            phone_number='+221770000002', email='b@example.com', first_name='Moussa', last_name='Fall', password='x'
+        )
+        canal = CanalPaiement.objects.create(
+            canal_name='Wave', type_canal='WAVE', country='Sénégal', fees_percentage=Decimal('1.00')
+        )
+        for i in range(30):
+            expediteur, destinataire = (cls.user, cls.autre) if i % 2 else (cls.autre, cls.user)
+            Transaction.objects.create(
+                expediteur=expediteur, destinataire=destinataire, destinataire_phone=destinataire.phone_number,
+                canal_paiement=canal, montantEnvoye=1000 + i, montantConverti=990 + i, montantRecu=990 + i,
+            )
+        # Dates identiques : l'id doit départager
+        premiere = Transaction.objects.order_by('created_at').first()
+        Transaction.objects.filter(montantEnvoye__lt=1010).update(created_at=premiere.created_at)
+
+    def setUp(self):
+        self.client = APIClient(SERVER_NAME='localhost')
+        self.client.force_authenticate(user=self.user)
+
+    def test_nombre_de_requetes_constant(self):
+        nombres = []
+        for page_size in (5, 30):
+            with CaptureQueriesContext(connection) as requetes:
+                response = self.client.get(self.URL, {'page_size': page_size})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results']), page_size)
+            nombres.append(len(requetes))
+
+        self.assertEqual(nombres[0], nombres[1])
+        self.assertLessEqual(nombres[0], 1)
+
+    def test_parcours_complet_puis_retour(self):
+        attendus = list(Transaction.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        vus = []
+        pages = []
+        url, params = self.URL, {'page_size': 7}
+        while url:
+            response = self.client.get(url, params)
+            pages.append(response.data)
+            vus.extend(ligne['id'] for ligne in response.data['results'])
+            url, params = response.data['next'], None
+
+        self.assertEqual(vus, [str(pk) for pk in attendus])
+        self.assertIsNone(pages[0]['previous'])
+
+        # Le lien "previous" de la deuxième page ramène la première
+        response = self.client.get(pages[1]['previous'])
+        self.assertEqual(response.data['results'], pages[0]['results'])
+
+
+class StatistiquesUtilisateurTests(TestCase):
+    """Compteurs incrémentaux égaux au recalcul complet"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            phone_number='+221770000011', email='c@example.com', first_name='Fatou', last_name='Sow', password='x'
+        )
+        self.autre = User.objects.create_user(
+            phone_number='+221770000012', email='d@example.com', first_name='Ibou', last_name='Ndiaye', password='x'
+        )
+        self.wave = CanalPaiement.objects.create(
+            canal_name='Wave', type_canal='WAVE', country='Sénégal', fees_percentage=Decimal('1.00')
+        )
+        self.orange = CanalPaiement.objects.create(
+            canal_name='Orange Money', type_canal='ORANGE_MONEY', country='Sénégal', fees_percentage=Decimal('1.00')
+        )
+
+    def creer(self, expediteur, destinataire, canal, **kwargs):
+        return Transaction.objects.create(
+            expediteur=expediteur, destinataire=destinataire, destinataire_phone='+221770000099',
+            canal_paiement=canal, montantEnvoye=5000, montantConverti=4950, montantRecu=4950, **kwargs
+        )
+
+    def assertCoherent(self, user):
+        ligne = statistiques_utilisateur(user)
+        ligne.refresh_from_db()
+        for champ, valeur in agreger(user.pk).items():
+            self.assertEqual(getattr(ligne, champ), valeur, champ)
+
+    def test_creation_changement_de_statut_et_suppression(self):
+        self.creer(self.user, self.autre, self.wave)
+        statistiques_utilisateur(self.user)
+        statistiques_utilisateur(self.autre)
+
+        transaction = self.creer(self.autre, self.user, self.orange, typeTransaction='RETRAIT')
+        self.creer(self.user, None, self.wave)
+        self.assertCoherent(self.user)
+
+        # Rechargée depuis la base : le delta part de l'état chargé
+        transaction = Transaction.objects.get(pk=transaction.pk)
+        transaction.statusTransaction = StatutTransaction.TERMINE
+        transaction.save()
+        transaction.statusTransaction = StatutTransaction.ANNULE
+        transaction.save()
+        self.assertCoherent(self.user)
+        self.assertCoherent(self.autre)
+
+        transaction.delete()
+        self.assertCoherent(self.user)
+        self.assertCoherent(self.autre)
+
+    def test_actions_admin_et_reparation(self):
+        for _ in range(3):
+            self.creer(self.user, self.autre, self.wave)
+        statistiques_utilisateur(self.user)
+
+        modeladmin = site._registry[Transaction]
+        modeladmin.message_user = lambda *args, **kwargs: None
+        deux = list(Transaction.objects.values_list('pk', flat=True)[:2])
+        marquer_comme_termine(modeladmin, None, Transaction.objects.filter(pk__in=deux))
+        marquer_comme_annule(modeladmin, None, Transaction.objects.filter(statusTransaction='EN_ATTENTE'))
+        self.assertCoherent(self.user)
+
+        # Écriture hors signaux : la commande de réparation recompte
+        Transaction.objects.update(statusTransaction=StatutTransaction.EN_ATTENTE)
+        call_command('reparer_statistiques_utilisateurs', stdout=StringIO())
+        self.assertCoherent(self.user)
+
+    def test_premiere_lecture_cree_la_ligne_avant_de_compter(self):
+        self.creer(self.user, self.autre, self.wave)
+        vrai_agreger = agreger
+
+        def agreger_pendant_une_ecriture(user_id):
+            # La ligne existe déjà : la transaction écrite pendant le calcul lui applique son delta
+            self.assertTrue(StatistiquesUtilisateur.objects.filter(user_id=user_id).exists())
+            self.creer(self.user, self.autre, self.orange)
+            return vrai_agreger(user_id)
+
+        with mock.patch('transactions.services.statistiques.agreger', side_effect=agreger_pendant_une_ecriture):
+            ligne = statistiques_utilisateur(self.user)
+
+        self.assertEqual(ligne.total_transactions, 2)
+        self.assertCoherent(self.user)
+
+    def test_endpoint_en_une_requete(self):
+        for _ in range(3):
+            self.creer(self.user, self.autre, self.wave)
+        statistiques_utilisateur(self.user)
+
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(user=self.user)
+        with CaptureQueriesContext(connection) as requetes:
+            response = client.get('/api/v1/transactions/transactions/statistics/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_transactions'], 3)
+        self.assertEqual(response.data['wave_transactions'], 3)
+        self.assertEqual(len(requetes), 1)
+
+
+class TransactionSearchTests(TestCase):
+    """Recherche exacte, par préfixe ou par fragment via l'index de recherche"""
+
+    URL = '/api/v1/transactions/search/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            phone_number='+221770000031', email='h@example.com', first_name='Aminata', last_name='Kane', password='x'
+        )
+        cls.autre = User.objects.create_user(
+            phone_number='+221770000032', email='i@example.com', first_name='Cheikh', last_name='Gueye', password='x'
+        )
+        canal = CanalPaiement.objects.create(
+            canal_name='Wave', type_canal='WAVE', country='Sénégal', fees_percentage=Decimal('1.00')
+        )
+        cls.transactions = [
+            Transaction.objects.create(
+                expediteur=cls.user, destinataire_phone=phone, canal_paiement=canal,
+                montantEnvoye=1000, montantConverti=990, montantRecu=990,
+            )
+            for phone in ('+221 77 123 45 67', '+221781112233', '+22376543210')
+        ]
+        # Transaction d'un autre utilisateur vers le même numéro : jamais visible
+        Transaction.objects.create(
+            expediteur=cls.autre, destinataire_phone='+221771234567', canal_paiement=canal,
+            montantEnvoye=1000, montantConverti=990, montantRecu=990,
+        )
+
+    def setUp(self):
+        self.client = APIClient(SERVER_NAME='localhost')
+        self.client.force_authenticate(user=self.user)
+
+    def rechercher(self, requete):
+        response = self.client.get(self.URL, {'q': requete})
+        self.assertEqual(response.status_code, 200)
+        return response.data['mode'], {ligne['codeTransaction'] for ligne in response.data['results']}
+
+    def test_routage_selon_la_forme(self):
+        premiere, seconde, troisieme = self.transactions
+
+        self.assertEqual(self.rechercher(premiere.codeTransaction.lower()), ('code', {premiere.codeTransaction}))
+        self.assertEqual(self.rechercher('+221 77'), ('telephone', {premiere.codeTransaction}))
+        self.assertEqual(self.rechercher('0022178'), ('telephone', {seconde.codeTransaction}))
+        self.assertEqual(
+            self.rechercher(premiere.codeTransaction[:7]),
+            ('prefixe', {t.codeTransaction for t in self.transactions})
+        )
+        self.assertEqual(self.rechercher('1234567'), ('numerique', {premiere.codeTransaction}))
+        self.assertEqual(self.rechercher(str(troisieme.idTransaction)), ('numerique', {troisieme.codeTransaction}))
+
+    def test_identifiant_et_plus_recentes_d_abord(self):
+        premiere = self.transactions[0]
+        self.assertEqual(self.rechercher(str(premiere.id)), ('uuid', {premiere.codeTransaction}))
+        self.assertEqual(self.rechercher(str(premiere.id).upper())[1], {premiere.codeTransaction})
+
+        # Numéros croissants avec le temps : l'ordre du numéro donnerait les plus anciennes
+        codes = []
+        for i in range(15):
+            transaction = Transaction.objects.create(
+                expediteur=self.user, destinataire_phone=f'+2217000000{i:02d}', canal_paiement=premiere.canal_paiement,
+                montantEnvoye=1000, montantConverti=990, montantRecu=990,
+            )
+            Transaction.objects.filter(pk=transaction.pk).update(created_at=timezone.now() + timedelta(minutes=i))
+            codes.append(transaction.codeTransaction)
+        reindexer(Transaction.objects.filter(codeTransaction__in=codes).values_list('id', flat=True))
+
+        self.assertEqual(self.rechercher('+22170'), ('telephone', set(codes[-10:])))
+
+    def test_index_suit_les_modifications(self):
+        transaction = Transaction.objects.get(pk=self.transactions[1].pk)
+        transaction.destinataire_phone = '+221709998877'
+        transaction.save()
+
+        self.assertEqual(self.rechercher('9998877')[1], {transaction.codeTransaction})
+        self.assertEqual(self.rechercher('1112233')[1], set())
+
+
+class MoteurDevisTests(TestCase):
+    """Devis calculés depuis les tables de frais en mémoire"""
+
+    def setUp(self):
+        senegal = Pays.objects.create(code_iso='SEN', nom='Sénégal', devise='XOF', prefixe_tel='+221')
+        mali = Pays.objects.create(code_iso='MLI', nom='Mali', devise='XOF', prefixe_tel='+223')
+        congo = Pays.objects.create(code_iso='COG', nom='Congo', devise='CDF', prefixe_tel='+243')
+        self.canal = CanalPaiement.objects.create(
+            canal_name='Wave', type_canal='WAVE', country='Sénégal', fees_percentage=Decimal('1.00')
+        )
+        self.corridor = CorridorTransfert.objects.create(
+            pays_origine=senegal, pays_destination=mali, temps_livraison_min=5, temps_livraison_max=30,
+            commission_percentage=Decimal('0.50'), commission_fixe=Decimal('100'),
+            montant_min_corridor=Decimal('500'), montant_max_corridor=Decimal('1000000'),
+        )
+        CorridorTransfert.objects.create(
+            pays_origine=senegal, pays_destination=congo, temps_livraison_min=15, temps_livraison_max=60,
+            montant_min_corridor=Decimal('1000'), montant_max_corridor=Decimal('500000'),
+        )
+        for pays, code in ((mali, 'OM_ML'), (congo, 'MTN_CG')):
+            ServicePaiementInternational.objects.create(
+                pays=pays, nom=code, type_service='ORANGE_MONEY', code_service=code,
+                frais_percentage=Decimal('1.50'), frais_fixe=Decimal('25'), frais_min=Decimal('100'),
+                frais_max=Decimal('2000'), limite_min=Decimal('100'), limite_max=Decimal('1000000'), regex_telephone='.*',
+            )
+
+    def test_devis_identique_aux_methodes_des_modeles(self):
+        service = ServicePaiementInternational.objects.get(code_service='OM_ML')
+        montant = Decimal('50000')
+        frais.get_tables()
+
+        with CaptureQueriesContext(connection) as requetes:
+            devis = frais.devis(montant, 'SEN_TO_MLI', 'OM_ML')
+        self.assertEqual(len(requetes), 0)
+
+        commission = (montant * Decimal('0.005') + 100).quantize(Decimal('0.01'))
+        net = montant - self.canal.calculate_fees(montant) - commission
+        self.assertEqual(devis.commission_corridor, commission)
+        self.assertEqual(devis.frais_change, 0)
+        self.assertEqual(devis.montant_converti, net)
+        self.assertEqual(devis.montant_recu, net - service.calculate_fees(net))
+
+    def test_modification_admin_invalide_les_tables(self):
+        avant = frais.devis(Decimal('10000'), 'SEN_TO_MLI', 'OM_ML')
+        self.corridor.commission_fixe = Decimal('300')
+        self.corridor.save()
+
+        apres = frais.devis(Decimal('10000'), 'SEN_TO_MLI', 'OM_ML')
+        self.assertEqual(apres.commission_corridor - avant.commission_corridor, 200)
+
+        self.corridor.delete()
+        with self.assertRaises(frais.FraisIndisponibles):
+            frais.devis(Decimal('10000'), 'SEN_TO_MLI', 'OM_ML')
+
+    def test_canal_inactif_refuse(self):
+        self.assertEqual(frais.devis(Decimal('10000'), 'SEN_TO_MLI', 'OM_ML', canal=self.canal.pk).canal,
+                         str(self.canal.pk))
+        self.canal.is_active = False
+        self.canal.save()
+
+        with self.assertRaisesMessage(frais.FraisIndisponibles, 'inactif'):
+            frais.devis(Decimal('10000'), 'SEN_TO_MLI', 'OM_ML', canal=self.canal.pk)
+        with self.assertRaises(frais.FraisIndisponibles):
+            frais.devis_lot([(Decimal('10000'), 'SEN_TO_MLI', 'OM_ML', self.canal.pk)])
+
+    def test_regles_d_envoi(self):
+        # Limites du corridor (500 - 1 000 000) et du service (100 - 1 000 000)
+        with self.assertRaisesMessage(frais.DevisRefuse, 'Montant doit être entre 500.00 et 1000000.00'):
+            frais.devis(Decimal('400'), 'SEN_TO_MLI', 'OM_ML')
+        with self.assertRaises(frais.DevisRefuse):
+            frais.devis_lot([(Decimal('1000001'), 'SEN_TO_MLI', 'OM_ML')])
+        ServicePaiementInternational.objects.filter(code_service='OM_ML').update(limite_max=Decimal('20000'))
+        frais.invalider()
+        with self.assertRaisesMessage(frais.DevisRefuse, 'entre 500.00 et 20000.00'):
+            frais.devis(Decimal('30000'), 'SEN_TO_MLI', 'OM_ML')
+
+        # Les frais absorbent tout le montant
+        self.corridor.commission_fixe = Decimal('900')
+        self.corridor.save()
+        with self.assertRaisesMessage(frais.DevisRefuse, 'Montant insuffisant'):
+            frais.devis(Decimal('1000'), 'SEN_TO_MLI', 'OM_ML')
+
+        # Corridor hors du pays d'origine
+        CorridorTransfert.objects.create(
+            pays_origine=Pays.objects.get(code_iso='MLI'), pays_destination=Pays.objects.get(code_iso='COG'),
+            temps_livraison_min=5, temps_livraison_max=30,
+            montant_min_corridor=Decimal('500'), montant_max_corridor=Decimal('1000000'),
+        )
+        with self.assertRaisesMessage(frais.DevisRefuse, 'non ouvert'):
+            frais.devis(Decimal('10000'), 'MLI_TO_COG', 'MTN_CG', taux=Decimal('4.5'))
+
+    def test_envoi_sans_devis_soumis_aux_memes_regles(self):
+        user = User.objects.create_user(
+            phone_number='+221770000034', email='s@example.com', first_name='Mame', last_name='Diouf', password='x'
+        )
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(user=user)
+        calcul = client.post('/api/v1/transactions/international/calculate-fees/', {
+            'montant': '400', 'corridor': 'SEN_TO_MLI', 'service_destination': 'OM_ML'
+        }, format='json')
+        envoi = client.post('/api/v1/transactions/international/send-money/', {
+            'montant': '400', 'pays_destination': 'MLI', 'service_destination': 'OM_ML',
+            'canal_paiement_id': str(self.canal.pk), 'destinataire_phone': '+22370000000',
+        }, format='json')
+
+        self.assertEqual((calcul.status_code, envoi.status_code), (400, 400))
+        self.assertIn('Montant doit être entre 500', str(envoi.data['errors']))
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_lot_et_taux(self):
+        demandes = [(Decimal(montant), corridor, service) for montant in (1000, 25000, 400000)
+                    for corridor, service in (('SEN_TO_MLI', 'OM_ML'), ('SEN_TO_COG', 'MTN_CG'))]
+        with self.assertRaises(frais.FraisIndisponibles):
+            frais.devis_lot(demandes)  # taux XOF→CDF manquant
+
+        lot = frais.devis_lot(demandes, taux={('XOF', 'CDF'): Decimal('4.5')})
+        self.assertEqual(lot, [frais.devis(*demande, taux=Decimal('4.5')) for demande in demandes])
+        self.assertEqual(lot[1].frais_change, Decimal('20.00'))
+
+    def test_endpoint_calculateur(self):
+        client = APIClient(SERVER_NAME='localhost')
+        response = client.post('/api/v1/transactions/international/calculate-fees/', {
+            'montant': '50000', 'corridor': 'SEN_TO_MLI', 'service_destination': 'OM_ML'
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        attendu = frais.devis(Decimal('50000'), 'SEN_TO_MLI', 'OM_ML').detail()
+        self.assertEqual(response.data['calculs'], attendu)
+
+    def test_envoi_sur_devis(self):
+        user = User.objects.create_user(
+            phone_number='+221770000031', email='q@example.com', first_name='Awa', last_name='Fall', password='x'
+        )
+        ServicePaiementInternational.objects.create(
+            pays=Pays.objects.get(code_iso='SEN'), nom='Wave Sénégal', type_service='WAVE', code_service='WAVE_SN',
+            frais_percentage=Decimal('1'), frais_min=Decimal('0'), frais_max=Decimal('1000'),
+            limite_min=Decimal('100'), limite_max=Decimal('1000000'), regex_telephone='.*',
+        )
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(user=user)
+        quote_id = client.post('/api/v1/transactions/international/calculate-fees/', {
+            'montant': '50000', 'corridor': 'SEN_TO_MLI', 'service_destination': 'OM_ML'
+        }, format='json').data['quote_id']
+        attendu = frais.devis_enregistre(quote_id).devis
+
+        # Configuration modifiée après le devis : l'envoi garde le prix annoncé
+        self.corridor.commission_fixe = Decimal('900')
+        self.corridor.save()
+        frais.get_tables()
+
+        with CaptureQueriesContext(connection) as requetes:
+            response = client.post('/api/v1/transactions/international/send-money/', {
+                'quote_id': quote_id, 'destinataire_phone': '+22370000000'
+            }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['montant_recu_destination'], float(attendu.montant_recu))
+        tables_lues = [r['sql'] for r in requetes if r['sql'].startswith('SELECT') and (
+            'corridortransfert' in r['sql'] or 'servicepaiementinternational' in r['sql'])]
+        self.assertEqual(tables_lues, [])
+
+        extension = Transaction.objects.get(pk=response.data['transaction_id']).extension_internationale
+        self.assertEqual(extension.commission_corridor, attendu.commission_corridor)
+        self.assertEqual(extension.service_origine.code_service, 'WAVE_SN')
+
+        response = client.post('/api/v1/transactions/international/send-money/', {
+            'quote_id': quote_id, 'destinataire_phone': '+22370000000', 'montant': '60000'
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        frais.cache.delete(f'devis:{quote_id}')
+        response = client.post('/api/v1/transactions/international/send-money/', {
+            'quote_id': quote_id, 'destinataire_phone': '+22370000000'
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+    def test_envoi_sans_devis_au_taux_du_calculateur(self):
+        user = User.objects.create_user(
+            phone_number='+221770000033', email='r@example.com', first_name='Ousmane', last_name='Ba', password='x'
+        )
+        ServicePaiementInternational.objects.create(
+            pays=Pays.objects.get(code_iso='SEN'), nom='Wave Sénégal', type_service='WAVE', code_service='WAVE_SN',
+            frais_percentage=Decimal('1'), frais_min=Decimal('0'), frais_max=Decimal('1000'),
+            limite_min=Decimal('100'), limite_max=Decimal('1000000'), regex_telephone='.*',
+        )
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(user=user)
+
+        with mock.patch.object(exchange_rates.ExchangeRateService, 'get_rate', return_value=Decimal('4.5')):
+            calculs = client.post('/api/v1/transactions/international/calculate-fees/', {
+                'montant': '50000', 'corridor': 'SEN_TO_COG', 'service_destination': 'MTN_CG',
+                'canal_paiement_id': str(self.canal.pk),
+            }, format='json').data['calculs']
+            response = client.post('/api/v1/transactions/international/send-money/', {
+                'montant': '50000', 'pays_destination': 'COG', 'service_destination': 'MTN_CG',
+                'canal_paiement_id': str(self.canal.pk), 'destinataire_phone': '+243810000000',
+            }, format='json')
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['taux_applique'], float(calculs['taux_applique']))
+        self.assertEqual(response.data['montant_recu_destination'], float(calculs['montant_recu']))
+        transaction = Transaction.objects.get(pk=response.data['transaction_id'])
+        self.assertEqual((transaction.deviseEnvoi, transaction.deviseReception), ('XOF', 'CDF'))
+
+
+class CacheTauxChangeTests(TransactionTestCase):
+    """Tables de taux servies depuis le cache, rafraîchies en arrière-plan (service de taux local)"""
+
+    def setUp(self):
+        self.serveur = ServeurTauxLocal().demarrer()
+        self.addCleanup(self.serveur.arreter)
+        reglages = self.settings(EXCHANGE_RATES_API_URL=self.serveur.url, EXCHANGE_RATES_BASE_CURRENCIES=['XOF'])
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        exchange_rates._tables.clear()
+        exchange_rates._prochain_essai.clear()
+        exchange_rates.cache.clear()
+        self.service = exchange_rates.ExchangeRateService()
+
+    def vieillir(self, secondes):
+        """Table reçue il y a `secondes`, dans ce processus comme dans le cache partagé"""
+        table = exchange_rates._tables['XOF']._replace(recue_a=time.time() - secondes)
+        exchange_rates._tables['XOF'] = table
+        exchange_rates.cache.set(exchange_rates._cle_table('XOF'), table)
+
+    def lire(self, from_currency, to_currency):
+        """get_rate chronométré : ne doit jamais attendre le service lent"""
+        debut = time.perf_counter()
+        taux = self.service.get_rate(from_currency, to_currency)
+        self.assertLess(time.perf_counter() - debut, 0.2)
+        return taux
+
+    def test_demarrage_a_froid_et_taux_croises(self):
+        TauxChange.objects.create(devise_origine='XOF', devise_destination='CDF', taux=Decimal('4'),
+                                  taux_inverse=Decimal('0.25'))
+        self.serveur.latence = 0.5
+
+        # Rien en cache : TauxChange tout de suite, table récupérée en arrière-plan
+        self.assertEqual(self.lire('XOF', 'CDF'), Decimal('4'))
+        self.assertEqual(self.lire('CDF', 'XOF'), Decimal('0.25'))
+        self.service.attendre_rafraichissements()
+
+        self.assertEqual(self.lire('XOF', 'CDF'), Decimal('4.7'))
+        self.assertEqual(self.lire('EUR', 'USD'), Decimal('0.00165') / Decimal('0.001524'))
+        for _ in range(1000):
+            self.service.get_rate('GBP', 'NGN')
+        self.assertEqual(self.serveur.requetes, 1)
+        self.assertEqual(TauxChange.objects.get(devise_origine='XOF', devise_destination='EUR').taux,
+                         Decimal('0.001524'))
+
+    def test_table_perimee_servie_pendant_le_rafraichissement(self):
+        self.service.rafraichir('XOF')
+        self.serveur.taux_xof['CDF'] = 5
+        self.serveur.latence = 0.5
+
+        self.vieillir(250)  # pas encore expirée, mais dans la fenêtre de rafraîchissement anticipé
+        self.assertEqual(self.lire('XOF', 'CDF'), Decimal('4.7'))
+        self.service.attendre_rafraichissements()
+        self.assertEqual(self.lire('XOF', 'CDF'), Decimal('5'))
+        self.assertEqual(self.serveur.requetes, 2)
+
+    def test_api_en_panne(self):
+        self.service.rafraichir('XOF')
+        self.serveur.en_panne = True
+        self.vieillir(1000)
+
+        for _ in range(100):
+            self.assertEqual(self.lire('XOF', 'CDF'), Decimal('4.7'))
+            self.service.attendre_rafraichissements()
+        # Un seul nouvel essai : les suivants attendent EXCHANGE_RATES_RETRY_DELAY
+        self.assertEqual(self.serveur.requetes, 2)
+
+    def test_un_seul_worker_interroge_l_api(self):
+        self.service.rafraichir('XOF')
+        self.vieillir(250)
+        # Un autre worker rafraîchit la table : ce processus ne fait pas d'appel
+        exchange_rates.cache.add(exchange_rates._cle_verrou('XOF'), 0)
+        self.assertEqual(self.lire('XOF', 'CDF'), Decimal('4.7'))
+        self.service.attendre_rafraichissements()
+        self.assertEqual(self.serveur.requetes, 1)
+
+        # ... puis publie sa table dans le cache partagé : reprise sans appel
+        self.serveur.taux_xof['CDF'] = 5
+        exchange_rates.cache.set(exchange_rates._cle_table('XOF'), exchange_rates.TableTaux(
+            'XOF', {'XOF': Decimal('1'), 'CDF': Decimal('5')}, time.time(), '', exchange_rates.SOURCE_API))
+        exchange_rates.cache.delete(exchange_rates._cle_verrou('XOF'))
+        exchange_rates._prochain_essai.clear()
+        self.lire('XOF', 'CDF')
+        self.service.attendre_rafraichissements()
+        self.assertEqual(self.lire('XOF', 'CDF'), Decimal('5'))
+        self.assertEqual(self.serveur.requetes, 1)
+
+    def test_vue_servie_depuis_le_cache(self):
+        self.service.rafraichir('XOF')
+        client = APIClient(SERVER_NAME='localhost')
+        response = client.get('/api/v1/transactions/international/exchange-rates/', {'to': 'eur'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['rate'], Decimal('0.001524'))
+        self.assertEqual(self.serveur.requetes, 1)
+
+
+@skipUnless(find_spec('redis'), 'paquet redis non installé')
+class CachePartageTests(SimpleTestCase):
+    """Caches à deux niveaux de deux workers devant le même cache Redis (faux serveur local)"""
+
+    def setUp(self):
+        self.serveur = ServeurRedisLocal().demarrer()
+        self.addCleanup(self.serveur.arreter)
+        worker = {'BACKEND': 'money_transfer.cache.CacheDeuxNiveaux', 'OPTIONS': {'PARTAGE': 'partage', 'L1_TTL': 60}}
+        reglages = self.settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'partage': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': self.serveur.url},
+            'worker_1': {**worker, 'LOCATION': 'tests-worker-1'},
+            'worker_2': {**worker, 'LOCATION': 'tests-worker-2'},
+        })
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.worker_1, self.worker_2 = caches['worker_1'], caches['worker_2']
+        self.addCleanup(self.worker_1.clear)
+        self.addCleanup(self.worker_2.clear)
+
+    def test_lectures_servies_par_le_niveau_1(self):
+        devis = {'montant': Decimal('50000.00'), 'devise': 'XOF'}
+        self.worker_1.set('devis:abc', devis)
+        self.assertEqual(self.worker_2.get('devis:abc'), devis)
+
+        commandes = self.serveur.commandes
+        for _ in range(100):
+            self.assertEqual(self.worker_2.get('devis:abc'), devis)
+        self.assertEqual(self.serveur.commandes, commandes)
+        self.assertEqual(self.worker_2.statistiques['l2'], 1)
+        self.assertGreaterEqual(self.worker_2.statistiques['l1'], 100)
+
+        # Les absences ne sont pas gardées : une clé écrite ailleurs est vue aussitôt
+        self.assertIsNone(self.worker_2.get('devis:def'))
+        self.worker_1.set('devis:def', devis)
+        self.assertEqual(self.worker_2.get('devis:def'), devis)
+
+    def test_operations_du_backend_redis(self):
+        self.worker_1.set_many({'a': 1, 'b': 'deux'}, timeout=60)
+        self.assertEqual(self.worker_2.get_many(['a', 'b', 'c']), {'a': 1, 'b': 'deux'})
+        self.assertFalse(self.worker_2.add('a', 10))
+        self.assertTrue(self.worker_2.add('c', 3))
+        self.assertEqual(self.worker_2.incr('a', 5), 6)
+        self.assertEqual(self.worker_1.incr('a'), 7)
+        self.assertTrue(self.worker_1.touch('b', 120))
+        self.assertTrue(self.worker_2.has_key('c'))
+
+        self.worker_1.delete_many(['a', 'b'])
+        self.assertIsNone(self.worker_1.get('a'))
+        self.assertIsNone(caches['partage'].get(self.worker_1.make_key('b')))
+        self.worker_2.clear()
+        self.assertEqual(self.serveur.donnees, {})
+
+    def test_clear_limite_au_prefixe(self):
+        devis = CacheDeuxNiveaux('tests-devis', {'KEY_PREFIX': 'devis', 'OPTIONS': {'PARTAGE': 'partage'}})
+        self.worker_1.set('a', 1)
+        devis.set('a', 2)
+        caches['partage'].set('session', 3)
+
+        # Ni FLUSHDB ni les clés des autres alias
+        devis.clear()
+        self.assertIsNone(devis.get('a'))
+        self.assertEqual(caches['partage'].get(self.worker_1.make_key('a')), 1)
+        self.assertEqual(caches['partage'].get('session'), 3)
+        caches['partage'].delete('session')
+
+
+class HistoriqueTauxTests(TestCase):
+    """Historique des taux : écriture en lot, taux en vigueur à un instant, compaction"""
+
+    def table(self, **taux):
+        return exchange_rates.TableTaux('XOF', {'XOF': Decimal('1'), **taux}, time.time(), '', 'api')
+
+    def test_enregistrement_en_lot_et_taux_en_vigueur(self):
+        TauxChange.objects.create(devise_origine='XOF', devise_destination='CDF', taux=Decimal('4'),
+                                  taux_inverse=Decimal('0.25'), is_active=False)
+        devises = {f'D{i:02d}': Decimal(i) / 7 for i in range(1, 151)}
+        debut = timezone.now() - timedelta(hours=3)
+
+        with CaptureQueriesContext(connection) as requetes:
+            historique_taux.enregistrer_table(self.table(CDF=Decimal('4.7'), **devises), debut)
+        self.assertLessEqual(len(requetes), 6)  # INSERT et upsert par lots (limite de paramètres SQLite)
+        historique_taux.enregistrer_table(self.table(CDF=Decimal('5.1')), debut + timedelta(hours=2))
+
+        self.assertEqual(HistoriqueTauxChange.objects.count(), 152)
+        dernier = TauxChange.objects.get(devise_origine='XOF', devise_destination='CDF')
+        self.assertEqual((dernier.taux, dernier.is_active), (Decimal('5.1'), False))
+
+        self.assertIsNone(historique_taux.taux_a('XOF', 'CDF', debut - timedelta(minutes=1)))
+        self.assertEqual(historique_taux.taux_a('XOF', 'CDF', debut + timedelta(hours=1)), Decimal('4.7'))
+        self.assertEqual(historique_taux.taux_a('XOF', 'CDF', timezone.now()), Decimal('5.1'))
+        self.assertEqual(historique_taux.taux_a('CDF', 'XOF', timezone.now()), 1 / Decimal('5.1'))
+
+        client = APIClient(SERVER_NAME='localhost')
+        response = client.get('/api/v1/transactions/international/exchange-rates/history/', {
+            'from': 'XOF', 'to': 'CDF', 'at': (debut + timedelta(hours=1)).isoformat()
+        })
+        self.assertEqual(response.data['rate'], Decimal('4.7'))
+        for instant in ('hier', '2025-13-01T00:00:00', '2025-02-30T12:00:00Z'):
+            response = client.get('/api/v1/transactions/international/exchange-rates/history/', {
+                'from': 'XOF', 'to': 'CDF', 'at': instant
+            })
+            self.assertEqual(response.status_code, 400, instant)
+
+    def test_taux_extremes_hors_du_dernier_taux(self):
+        historique_taux.enregistrer_table(self.table(
+            AAA=Decimal('0.000001'), BBB=Decimal('0.0000010000000000001'), CCC=Decimal('999999.9999999'),
+            DDD=Decimal('0.0000011'), EEE=Decimal('999999'),
+        ))
+
+        # Inverse ou taux arrondi à 1 000 000 : absents de TauxChange, gardés dans l'historique
+        self.assertEqual(sorted(TauxChange.objects.values_list('devise_destination', flat=True)), ['DDD', 'EEE'])
+        self.assertEqual(HistoriqueTauxChange.objects.count(), 5)
+        self.assertLess(TauxChange.objects.get(devise_destination='DDD').taux_inverse, historique_taux.TAUX_MAX)
+
+    def test_compaction_sans_perte(self):
+        debut = timezone.now() - timedelta(days=3)
+        for heure, taux in enumerate(['4.7', '4.7', '4.7', '4.8', '4.8', '4.7', '4.7']):
+            historique_taux.enregistrer_table(self.table(CDF=Decimal(taux)), debut + timedelta(hours=heure))
+        instants = [debut + timedelta(hours=heure, minutes=30) for heure in range(-1, 7)]
+        avant = [historique_taux.taux_a('XOF', 'CDF', instant) for instant in instants]
+
+        self.assertEqual(historique_taux.compacter(timezone.now()), 4)
+        self.assertEqual([historique_taux.taux_a('XOF', 'CDF', instant) for instant in instants], avant)
+
+    def test_audit_taux_appliques(self):
+        senegal = Pays.objects.create(code_iso='SEN', nom='Sénégal', devise='XOF', prefixe_tel='+221')
+        congo = Pays.objects.create(code_iso='COG', nom='Congo', devise='CDF', prefixe_tel='+243')
+        corridor = CorridorTransfert.objects.create(
+            pays_origine=senegal, pays_destination=congo, temps_livraison_min=5, temps_livraison_max=30,
+            montant_min_corridor=Decimal('500'), montant_max_corridor=Decimal('1000000'),
+        )
+        service = ServicePaiementInternational.objects.create(
+            pays=congo, nom='MTN', type_service='MTN_MONEY', code_service='MTN_CG', frais_percentage=Decimal('1'),
+            frais_min=Decimal('0'), frais_max=Decimal('1000'), limite_min=Decimal('1'), limite_max=Decimal('1000000'),
+            regex_telephone='.*',
+        )
+        canal = CanalPaiement.objects.create(canal_name='Wave', type_canal='WAVE', country='Sénégal',
+                                             fees_percentage=Decimal('1.00'))
+        user = User.objects.create_user(phone_number='+221770000041', email='h@example.com', first_name='Modou',
+                                        last_name='Diop', password='x')
+        historique_taux.enregistrer_table(self.table(CDF=Decimal('4.7')), timezone.now() - timedelta(days=1))
+
+        for taux in ('4.7', '9.9'):
+            transaction = Transaction.objects.create(
+                expediteur=user, destinataire_phone='+243810000000', canal_paiement=canal, montantEnvoye=5000,
+                montantConverti=4950, montantRecu=4950,
+            )
+            TransactionInternationale.objects.create(
+                transaction_locale=transaction, pays_origine=senegal, pays_destination=congo, corridor=corridor,
+                service_origine=service, service_destination=service, taux_applique=Decimal(taux),
+                montant_origine=5000, montant_destination=20000, frais_service_origine=0,
+                frais_service_destination=0, commission_corridor=0, temps_traitement_estime=30,
+                date_livraison_estimee=timezone.now(),
+            )
+
+        with CaptureQueriesContext(connection) as requetes:
+            suspectes = list(historique_taux.annoter_taux_marche(TransactionInternationale.objects.all()).exclude(
+                taux_applique=F('taux_marche')
+            ).values_list('taux_applique', flat=True))
+        self.assertEqual(suspectes, [Decimal('9.9')])
+        self.assertEqual(len(requetes), 1)
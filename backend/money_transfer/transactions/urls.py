@@ -48,6 +48,7 @@ urlpatterns = [
     
     # Taux de change
     path('international/exchange-rates/', views.ExchangeRateView.as_view(), name='exchange-rates-international'),
+    path('international/exchange-rates/history/', views.taux_en_vigueur, name='exchange-rates-history'),
     #path('international/exchange-rates/<str:from_currency>/<str:to_currency>/', views.get, name='specific-exchange-rate'),
     
     # Suivi transactions internationales
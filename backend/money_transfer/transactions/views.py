@@ -15,9 +15,15 @@ import requests
 import time
 import logging
 from datetime import timedelta  # ← AJOUT MANQUANT
+from django.utils.dateparse import parse_datetime
 from django.utils import timezone
 
 from .models import Transaction, Beneficiaire, CanalPaiement, StatutTransaction, Pays, ServicePaiementInternational, CorridorTransfert, TransactionInternationale,TypeTransaction
+from .pagination import TransactionCursorPagination
+from .services import frais, historique_taux
+from .services.exchange_rates import ExchangeRateService
+from .services.recherche import forme_requete, rechercher
+from .services.statistiques import statistiques_utilisateur
 from .serializers import (
     TransactionSerializers,
     TransactionDetailSerializer,
@@ -44,6 +50,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
     """ViewSet pour les transactions CRUD complet - AVEC GATEWAYS SIMULÉS"""
     
     permission_classes = [IsAuthenticated]
+    pagination_class = TransactionCursorPagination
     
     def get_queryset(self):
         """Filtrer les transactions par utilisateur"""
@@ -51,9 +58,10 @@ class TransactionViewSet(viewsets.ModelViewSet):
             return Transaction.objects.none()
         
         # L'utilisateur voit ses transactions envoyées ET reçues
+        # select_related : relations lues par TransactionDetailSerializer (pas de N+1)
         return Transaction.objects.filter(
             Q(expediteur=self.request.user) | Q(destinataire=self.request.user)
-        ).order_by('-created_at')
+        ).select_related('expediteur', 'destinataire', 'canal_paiement').order_by('-created_at', '-id')
     
     def get_serializer_class(self):
         """Choisir le serializer selon l'action"""
@@ -86,9 +94,10 @@ class TransactionViewSet(viewsets.ModelViewSet):
                 success = False
                 status_code = status.HTTP_400_BAD_REQUEST
             else:
+                # Mode asynchrone : le gateway est appelé par le pool de workers
                 message = "Transaction en cours de traitement..."
                 success = True
-                status_code = status.HTTP_201_CREATED
+                status_code = status.HTTP_202_ACCEPTED
             
             return Response({
                 'success': success,
@@ -103,7 +112,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
         }, status=status.HTTP_400_BAD_REQUEST)
     
     def list(self, request, *args, **kwargs):
-        """Lister toutes les transactions de l'utilisateur"""
+        """Lister les transactions de l'utilisateur, paginées par curseur"""
         queryset = self.get_queryset()
         
         # Filtrage optionnel par statut
@@ -123,6 +132,11 @@ class TransactionViewSet(viewsets.ModelViewSet):
         if gateway_filter:
             queryset = queryset.filter(canal_paiement__type_canal=gateway_filter)
         
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
     
@@ -162,36 +176,27 @@ class TransactionViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """Endpoint pour les statistiques des transactions avec gateways"""
-        user_transactions = self.get_queryset()
-        
-        stats = user_transactions.aggregate(
-            total_transactions=Count('id'),
-            total_amount=Sum('montantEnvoye'),
-            completed_transactions=Count('id', filter=models.Q(statusTransaction='TERMINE')),
-            pending_transactions=Count('id', filter=models.Q(statusTransaction='EN_ATTENTE')),
-            cancelled_transactions=Count('id', filter=models.Q(statusTransaction='ANNULE')),
-            average_amount=Avg('montantEnvoye')
-        )
-        
-        # Stats par type
-        stats['envois_count'] = user_transactions.filter(expediteur=request.user).count()
-        stats['receptions_count'] = user_transactions.filter(destinataire=request.user).count()
-        stats['retraits_count'] = user_transactions.filter(
-            typeTransaction='RETRAIT'
-        ).count()
+        # Compteurs tenus à jour par les signals : une lecture par clé primaire
+        compteurs = statistiques_utilisateur(request.user)
         
-        # Stats par gateway
-        stats['wave_transactions'] = user_transactions.filter(
-            canal_paiement__type_canal='WAVE'
-        ).count()
-        stats['orange_money_transactions'] = user_transactions.filter(
-            canal_paiement__type_canal='ORANGE_MONEY'
-        ).count()
-        
-        # Gérer les valeurs nulles
-        for key, value in stats.items():
-            if value is None:
-                stats[key] = 0
+        stats = {
+            'total_transactions': compteurs.total_transactions,
+            'total_amount': compteurs.montant_total,
+            'completed_transactions': compteurs.transactions_terminees,
+            'pending_transactions': compteurs.transactions_en_attente,
+            'cancelled_transactions': compteurs.transactions_annulees,
+            'average_amount': (
+                compteurs.montant_total / compteurs.total_transactions
+                if compteurs.total_transactions else 0
+            ),
+            # Stats par type
+            'envois_count': compteurs.envois,
+            'receptions_count': compteurs.receptions,
+            'retraits_count': compteurs.retraits,
+            # Stats par gateway
+            'wave_transactions': compteurs.transactions_wave,
+            'orange_money_transactions': compteurs.transactions_orange_money,
+        }
         
         serializer = TransactionStatsSerializer(stats)
         return Response(serializer.data)
@@ -345,9 +350,10 @@ class SendMoneyView(APIView):
                     message = f"❌ Transaction {canal_nom} échouée - Veuillez réessayer"
                     status_code = status.HTTP_400_BAD_REQUEST
                 else:
+                    # Mode asynchrone : le client suit le statut via le code transaction
                     success = True
                     message = f"⏳ Transaction {canal_nom} en cours..."
-                    status_code = status.HTTP_201_CREATED
+                    status_code = status.HTTP_202_ACCEPTED
                 
                 # Réponse unifiée
                 response_data = {
@@ -393,49 +399,71 @@ class ExchangeRateView(APIView):
         # Paramètres optionnels
         target_currency = request.query_params.get('to', None)
         
-        try:
-            # Récupérer TOUS les taux depuis XOF
-            response = requests.get(
-                'https://api.exchangerate-api.com/v4/latest/XOF',
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                if target_currency:
-                    # Retourner juste une devise spécifique
-                    rate = data['rates'].get(target_currency.upper())
-                    if rate:
-                        return Response({
-                            'from': 'XOF',
-                            'to': target_currency.upper(),
-                            'rate': rate,
-                            'last_updated': data.get('date')
-                        })
-                    else:
-                        return Response({
-                            'error': f'Devise {target_currency} non supportée'
-                        }, status=400)
-                
-                else:
-                    # Retourner les principales devises
-                    main_rates = {
-                        'XOF_TO_EUR': data['rates'].get('EUR'),
-                        'XOF_TO_USD': data['rates'].get('USD'), 
-                        'XOF_TO_GBP': data['rates'].get('GBP'),
-                        'XOF_TO_CAD': data['rates'].get('CAD'),
-                        'XOF_TO_MAD': data['rates'].get('MAD'),
-                        'XOF_TO_NGN': data['rates'].get('NGN'),
-                        'all_currencies': list(data['rates'].keys()),
-                        'total_supported': len(data['rates']),
-                        'last_updated': data.get('date')
-                    }
-                    
-                    return Response(main_rates)
-        
-        except requests.RequestException:
+        # Table XOF en cache, rafraîchie en arrière-plan : pas d'appel API dans la requête
+        table = ExchangeRateService().table('XOF')
+        if table is None:
             return Response({'error': 'Service de change temporairement indisponible'}, status=503)
+        rates = table.taux
+        
+        if target_currency:
+            # Retourner juste une devise spécifique
+            rate = rates.get(target_currency.upper())
+            if rate:
+                return Response({
+                    'from': 'XOF',
+                    'to': target_currency.upper(),
+                    'rate': rate,
+                    'last_updated': table.date
+                })
+            else:
+                return Response({
+                    'error': f'Devise {target_currency} non supportée'
+                }, status=400)
+        
+        else:
+            # Retourner les principales devises
+            main_rates = {
+                'XOF_TO_EUR': rates.get('EUR'),
+                'XOF_TO_USD': rates.get('USD'), 
+                'XOF_TO_GBP': rates.get('GBP'),
+                'XOF_TO_CAD': rates.get('CAD'),
+                'XOF_TO_MAD': rates.get('MAD'),
+                'XOF_TO_NGN': rates.get('NGN'),
+                'all_currencies': list(rates.keys()),
+                'total_supported': len(rates),
+                'last_updated': table.date
+            }
+            
+            return Response(main_rates)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def taux_en_vigueur(request):
+    """Taux en vigueur à un instant (?from=XOF&to=CDF&at=2025-06-01T12:00:00Z, par défaut maintenant)"""
+    devise_origine = request.query_params.get('from', 'XOF').upper()
+    devise_destination = request.query_params.get('to', '').upper()
+    instant = timezone.now()
+    if 'at' in request.query_params:
+        try:
+            instant = parse_datetime(request.query_params['at'])
+        except ValueError:
+            # Bien formé mais hors limites (mois 13, 30 février...)
+            instant = None
+        if instant is None:
+            return Response({'error': 'Paramètre at invalide (format ISO 8601 attendu)'}, status=400)
+        if timezone.is_naive(instant):
+            instant = timezone.make_aware(instant)
+    
+    taux = historique_taux.taux_a(devise_origine, devise_destination, instant)
+    if taux is None:
+        return Response({'error': f'Aucun taux {devise_origine} → {devise_destination} connu à cette date'}, status=404)
+    return Response({
+        'from': devise_origine,
+        'to': devise_destination,
+        'at': instant,
+        'rate': taux
+    })
 
 
 class TransactionSearchView(APIView):
@@ -453,19 +481,17 @@ class TransactionSearchView(APIView):
                 'results': []
             })
         
-        # Recherche dans les transactions de l'utilisateur
-        transactions = Transaction.objects.filter(
-            Q(expediteur=request.user) | Q(destinataire=request.user)
-        ).filter(
-            Q(codeTransaction__icontains=query) |
-            Q(idTransaction__icontains=query) |
-            Q(destinataire_phone__icontains=query)
-        ).order_by('-created_at')[:10]
+        # Recherche exacte, par préfixe ou par fragment selon la forme de la requête
+        # (index de recherche, voir services/recherche.py)
+        transactions = rechercher(request.user, query).select_related(
+            'expediteur', 'destinataire', 'canal_paiement'
+        )
         
         serializer = TransactionDetailSerializer(transactions, many=True)
         
         return Response({
             'query': query,
+            'mode': forme_requete(query),
             'count': len(serializer.data),
             'results': serializer.data
         })
@@ -852,10 +878,12 @@ def calculer_frais_international(request):
     
     if serializer.is_valid():
         try:
-            calculs = serializer.calculate_all_fees()
+            devis_client = serializer.creer_devis()
             return Response({
                 'success': True,
-                'calculs': calculs
+                'quote_id': devis_client.quote_id,
+                'expire_le': devis_client.expire_le,
+                'calculs': devis_client.devis.detail()
             })
         except Exception as e:
             return Response({
@@ -878,107 +906,73 @@ def send_money_international(request):
         try:
             # Récupérer les données validées
             data = serializer.validated_data
-            corridor = data['corridor']
-            service_dest = data['service_destination_obj']
             
             # ===== CORRECTION 1: PAS DE GATEWAY POUR L'INTERNATIONAL =====
             # Pour l'international, on ne passe PAS par les simulateurs Wave/OM
             # On crée directement la transaction en statut ACCEPTE
             
+            # ===== CORRECTION 2: CALCULS FINANCIERS CORRECTS =====
+            # Devis du calculateur (quote_id) ou calculé à la validation, tout en Decimal
+            devis_client = data['devis_client']
+            devis = devis_client.devis
+            
             # Créer transaction locale de base
             transaction = Transaction.objects.create(
                 expediteur=request.user,
                 destinataire_phone=data['destinataire_phone'],
                 destinataire_nom=data.get('destinataire_nom', f"Contact {data['destinataire_phone']}"),
                 typeTransaction=TypeTransaction.ENVOI,
-                montantEnvoye=float(data['montant']),
+                montantEnvoye=float(devis.montant_envoye),
                 montantConverti=0,  # Sera calculé
                 montantRecu=0,      # Sera calculé  
                 frais="0 XOF",      # Sera calculé
-                deviseEnvoi=data['devise_envoi'],
-                deviseReception=corridor.pays_destination.devise,
+                deviseEnvoi=devis.devise_origine,  # devise du devis, pas le défaut 'XOF' de la requête
+                deviseReception=devis.devise_destination,
                 statusTransaction=StatutTransaction.ACCEPTE,  # Pas de gateway, donc ACCEPTE directement
-                canal_paiement_id=data['canal_paiement_id'],
+                canal_paiement_id=devis.canal,
             )
             
-            # ===== CORRECTION 2: CALCULS FINANCIERS CORRECTS =====
-            from decimal import Decimal
-            
-            montant = Decimal(str(data['montant']))
-            
-            # 1. Frais canal origine (Wave/OM Sénégal)
-            canal_origine = CanalPaiement.objects.get(id=data['canal_paiement_id'])
-            frais_origine = canal_origine.calculate_fees(montant)
-            
-            # 2. Commission corridor
-            commission_corridor = (montant * corridor.commission_percentage / 100) + corridor.commission_fixe
-            
-            # 3. Taux de change (simplifié pour le moment)
-            if corridor.pays_origine.devise != corridor.pays_destination.devise:
-                # Taux fixe pour simulation (à remplacer par API externe)
-                taux_change = Decimal('0.45') if corridor.pays_destination.devise == 'CDF' else Decimal('1.0')
-                frais_change = montant * Decimal('0.02')  # 2% frais de change
-            else:
-                taux_change = Decimal('1.0')
-                frais_change = Decimal('0')
-            
-            # 4. Montant après déduction des frais origine
-            montant_net = montant - frais_origine - commission_corridor - frais_change
-            
-            # 5. Conversion
-            montant_destination = montant_net * taux_change
-            
-            # 6. Frais service destination
-            frais_destination = service_dest.calculate_fees(montant_destination)
-            
-            # 7. Montant final reçu
-            montant_final = montant_destination - frais_destination
-            
             # Mettre à jour la transaction
-            transaction.montantConverti = float(montant_net)
-            transaction.montantRecu = float(montant_final) 
-            transaction.frais = f"{float(frais_origine + commission_corridor + frais_change):.2f} XOF"
+            transaction.montantConverti = float(devis.montant_net)
+            transaction.montantRecu = float(devis.montant_recu) 
+            transaction.frais = f"{float(devis.frais_total):.2f} XOF"
             transaction.statusTransaction = StatutTransaction.ENVOYE  # Prêt pour retrait international
             transaction.save()
             
             # ===== CORRECTION 3: CRÉER EXTENSION INTERNATIONALE =====
             extension = TransactionInternationale.objects.create(
                 transaction_locale=transaction,
-                pays_origine=corridor.pays_origine,
-                pays_destination=corridor.pays_destination, 
-                corridor=corridor,
-                service_origine=ServicePaiementInternational.objects.filter(
-                    pays=corridor.pays_origine, 
-                    type_service='WAVE'
-                ).first() or ServicePaiementInternational.objects.filter(
-                    pays=corridor.pays_origine
-                ).first(),
-                service_destination=service_dest,
-                taux_applique=taux_change,
-                montant_origine=montant,
-                montant_destination=montant_final,
-                frais_service_origine=frais_origine,
-                frais_service_destination=frais_destination,
-                commission_corridor=commission_corridor,
-                frais_change=frais_change,
-                temps_traitement_estime=corridor.temps_livraison_max,
-                date_livraison_estimee=timezone.now() + timedelta(minutes=corridor.temps_livraison_max),
+                pays_origine_id=devis_client.pays_origine_id,
+                pays_destination_id=devis_client.pays_destination_id, 
+                corridor_id=devis_client.corridor_id,
+                service_origine_id=devis_client.service_origine_id,
+                service_destination_id=devis_client.service_id,
+                taux_applique=devis.taux_applique,
+                montant_origine=devis.montant_envoye,
+                montant_destination=devis.montant_recu,
+                frais_service_origine=devis.frais_origine,
+                frais_service_destination=devis.frais_destination,
+                commission_corridor=devis.commission_corridor,
+                frais_change=devis.frais_change,
+                temps_traitement_estime=devis.temps_max,
+                date_livraison_estimee=timezone.now() + timedelta(minutes=devis.temps_max),
             )
             
             return Response({
                 'success': True,
-                'message': f'💰 Transfert international vers {corridor.pays_destination.nom} initialisé',
+                'message': f'💰 Transfert international vers {devis_client.pays_destination} initialisé',
                 'transaction_id': str(transaction.id),
                 'code_transaction': transaction.codeTransaction,
-                'corridor': corridor.code_corridor,
-                'montant_envoye': float(montant),
-                'frais_total': float(frais_origine + commission_corridor + frais_change),
-                'taux_applique': float(taux_change),
-                'montant_recu_destination': float(montant_final),
-                'devise_destination': corridor.pays_destination.devise,
-                'temps_estime': f"{corridor.temps_livraison_min}-{corridor.temps_livraison_max} minutes",
-                'pays_destination': corridor.pays_destination.nom,
-                'service_destination': service_dest.nom,
+                'corridor': devis.corridor,
+                'quote_id': devis_client.quote_id,
+                'montant_envoye': float(devis.montant_envoye),
+                'frais_total': float(devis.frais_total),
+                'taux_applique': float(devis.taux_applique),
+                'montant_recu_destination': float(devis.montant_recu),
+                'devise_destination': devis.devise_destination,
+                'temps_estime': f"{devis.temps_min}-{devis.temps_max} minutes",
+                'pays_destination': devis_client.pays_destination,
+                'service_destination': devis_client.service_nom,
                 'status': 'ENVOYE',
                 'ready_for_international_withdrawal': True
             })
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class WithdrawalsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'withdrawals'
+    
+    def ready(self):
+        """Import signals when the app is ready."""
+        import withdrawals.signals
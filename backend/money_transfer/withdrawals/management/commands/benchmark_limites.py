@@ -0,0 +1,115 @@
+import random
+import statistics
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from django.utils import timezone
+
+from agents.models import AgentLocal
+from withdrawals.models import StatutRetrait, Withdrawal
+from withdrawals.services import limites
+
+User = get_user_model()
+
+# Numéros réservés au benchmark : +22174XXXXXXX
+PREFIXE_BENCH = '+22174'
+
+
+def verifier_en_base(agent, beneficiaire_id, montant):
+    """Sans compteurs : somme des retraits du jour à chaque vérification"""
+    debut = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    retraits = Withdrawal.objects.filter(date_demande__gte=debut).exclude(statut=StatutRetrait.ANNULE)
+    total_agent = retraits.filter(agent=agent).aggregate(total=Sum('montant_retire'))['total'] or 0
+    total_beneficiaire = retraits.filter(beneficiaire_id=beneficiaire_id).aggregate(
+        total=Sum('montant_retire'))['total'] or 0
+    return total_agent + montant <= agent.limite_retrait_journalier and total_beneficiaire + montant <= 2000000
+
+
+class Command(BaseCommand):
+    help = 'Mesurer le débit des vérifications de limites journalières de retrait'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--agents', type=int, default=200)
+        parser.add_argument('--utilisateurs', type=int, default=5000)
+        parser.add_argument('--retraits', type=int, default=200000, help='Historique (30 derniers jours)')
+        parser.add_argument('--verifications', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.stdout.write('🚦 Benchmark limites de retrait...')
+        agents, users = self._preparer(options)
+        try:
+            aleatoire = random.Random(1)
+            demandes = [
+                (aleatoire.choice(agents), aleatoire.choice(users).pk, Decimal(aleatoire.randint(1, 100) * 1000))
+                for _ in range(options['verifications'])
+            ]
+
+            # ===== RÉSUMÉ =====
+            self.stdout.write('')
+            self._mesurer('somme en base', lambda d: verifier_en_base(*d), demandes[:500])
+            limites.cache.clear()
+            self._mesurer('compteurs (cache froid)', lambda d: limites.verifier(*d), demandes)
+            self._mesurer('compteurs (cache chaud)', lambda d: limites.verifier(*d), demandes)
+            self.stdout.write(self.style.SUCCESS('✅ Benchmark terminé'))
+        finally:
+            self._nettoyer()
+
+    def _mesurer(self, nom, verification, demandes):
+        durees = []
+        debut_total = time.perf_counter()
+        for demande in demandes:
+            debut = time.perf_counter()
+            verification(demande)
+            durees.append((time.perf_counter() - debut) * 1000)
+        debit = len(demandes) / (time.perf_counter() - debut_total)
+        centiles = statistics.quantiles(durees, n=100)
+        self.stdout.write(f'  {nom:<26} {debit:>9,.0f} vérifications/s   '
+                          f'p50 {centiles[49]:7.3f} ms   p99 {centiles[98]:7.3f} ms')
+
+    def _preparer(self, options):
+        self._nettoyer()
+        mot_de_passe = make_password(None)
+        users = User.objects.bulk_create([
+            User(phone_number=f'{PREFIXE_BENCH}{i:07d}', email=f'bench-limites-{i}@example.com',
+                 first_name='Bench', last_name=f'Limites {i}', password=mot_de_passe, kyc_status='VERIFIED')
+            for i in range(options['agents'] + options['utilisateurs'])
+        ])
+        agents = AgentLocal.objects.bulk_create([
+            AgentLocal(user=user, nom=user.last_name, prenom='Agent', telephone=user.phone_number,
+                       email=user.email, adresse='Benchmark', kyc_user_verifie=True,
+                       limite_retrait_journalier=Decimal('5000000'))
+            for user in users[:options['agents']]
+        ])
+        clients = users[options['agents']:]
+
+        debut = time.perf_counter()
+        maintenant = timezone.now()
+        aleatoire = random.Random(0)
+        for lot in range(0, options['retraits'], 10000):
+            # bulk_create : pas de save() ni de signal, codes fournis ici
+            retraits = Withdrawal.objects.bulk_create([
+                Withdrawal(
+                    agent=aleatoire.choice(agents), beneficiaire=aleatoire.choice(clients),
+                    montant_retire=Decimal(aleatoire.randint(1, 100) * 1000),
+                    code_retrait=f'BENCH{i:010d}', qr_code=str(uuid.uuid4()),
+                    statut=StatutRetrait.TERMINE,
+                )
+                for i in range(lot, min(lot + 10000, options['retraits']))
+            ])
+            # auto_now_add impose la date d'insertion : historique réparti sur 30 jours ensuite
+            for retrait in retraits:
+                retrait.date_demande = maintenant - timedelta(seconds=aleatoire.randint(0, 30 * 86400))
+            Withdrawal.objects.bulk_update(retraits, ['date_demande'], batch_size=1000)
+        self.stdout.write(f"  {options['retraits']} retraits créés en {time.perf_counter() - debut:.1f}s")
+        return agents, clients
+
+    def _nettoyer(self):
+        Withdrawal.objects.filter(code_retrait__startswith='BENCH').delete()
+        AgentLocal.objects.filter(telephone__startswith=PREFIXE_BENCH).delete()
+        User.objects.filter(phone_number__startswith=PREFIXE_BENCH).delete()
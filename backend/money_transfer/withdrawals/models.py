@@ -1,6 +1,6 @@
 # withdrawals/models.py - VERSION CORRIGÉE POUR INTÉGRATION
 
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.utils import timezone
 import uuid
@@ -157,17 +157,9 @@ class Withdrawal(models.Model):
         super().save(*args, **kwargs)
     
     def generer_code_retrait(self):
-        """Générer un code de retrait unique"""
-        max_attempts = 10
-        for _ in range(max_attempts):
-            # Format compatible avec vos transactions: TXN ou WTH
-            code = f"WTH{timezone.now().year}{random.randint(100000, 999999)}"
-            if not Withdrawal.objects.filter(code_retrait=code).exists():
-                return code
-        
-        # Fallback avec timestamp
-        timestamp = int(timezone.now().timestamp())
-        return f"WTH{timestamp}"
+        """Générer un code de retrait unique (séquence dédiée, sans requête de vérification)"""
+        from transactions.services.codes import generer_code
+        return generer_code('WTH', 'retrait')
     
     def __str__(self):
         return f"Retrait {self.code_retrait} - {self.montant_retire} XOF"
@@ -235,29 +227,44 @@ class Withdrawal(models.Model):
         if self.agent.user != agent_user:
             return False, "Seul l'agent assigné peut finaliser"
         
-        # Marquer comme terminé
-        self.statut = StatutRetrait.TERMINE
-        self.date_retrait = timezone.now()
-        
-        # Ajouter données de vérification si fournies
-        if verification_data:
-            self.piece_identite_verifie = verification_data.get('piece_identite_verifie', False)
-            self.code_sms_verifie = verification_data.get('code_sms_verifie', False)
-            self.notes_verification = verification_data.get('notes', '')
-            self.latitude_retrait = verification_data.get('latitude')
-            self.longitude_retrait = verification_data.get('longitude')
-        
-        self.save()
+        from agents.services.solde import debiter_retrait
         
-        # ===== INTÉGRATION AVEC VOTRE SYSTÈME =====
-        # Mettre à jour la transaction d'origine si elle existe
-        if self.transaction_origine:
-            from transactions.models import StatutTransaction
-            self.transaction_origine.statusTransaction = StatutTransaction.TERMINE
-            self.transaction_origine.save()
+        with transaction.atomic():
+            # Passage ACCEPTE → TERMINE conditionnel : une seule finalisation débite l'agent
+            if not Withdrawal.objects.filter(pk=self.pk, statut=StatutRetrait.ACCEPTE).update(
+                statut=StatutRetrait.TERMINE
+            ):
+                return False, "Retrait déjà traité"
+            
+            # Débit du solde agent (solde et limite journalière vérifiés par la base)
+            debite, message = debiter_retrait(self)
+            if not debite:
+                transaction.set_rollback(True)
+                return False, message
             
-            # Déclencher notifications automatiques via signals
-            # Les signals du Dev 1 vont automatiquement notifier les utilisateurs
+            # Marquer comme terminé
+            self.statut = StatutRetrait.TERMINE
+            self.date_retrait = timezone.now()
+            
+            # Ajouter données de vérification si fournies
+            if verification_data:
+                self.piece_identite_verifie = verification_data.get('piece_identite_verifie', False)
+                self.code_sms_verifie = verification_data.get('code_sms_verifie', False)
+                self.notes_verification = verification_data.get('notes', '')
+                self.latitude_retrait = verification_data.get('latitude')
+                self.longitude_retrait = verification_data.get('longitude')
+            
+            self.save()
+            
+            # ===== INTÉGRATION AVEC VOTRE SYSTÈME =====
+            # Mettre à jour la transaction d'origine si elle existe
+            if self.transaction_origine:
+                from transactions.models import StatutTransaction
+                self.transaction_origine.statusTransaction = StatutTransaction.TERMINE
+                self.transaction_origine.save()
+                
+                # Déclencher notifications automatiques via signals
+                # Les signals du Dev 1 vont automatiquement notifier les utilisateurs
         
         return True, "Retrait finalisé avec succès"
     
@@ -266,10 +273,19 @@ class Withdrawal(models.Model):
         if not self.peut_etre_annule():
             return False, "Retrait ne peut pas être annulé"
         
+        # Passage conditionnel : le retrait ne sort qu'une fois des compteurs journaliers
+        if not Withdrawal.objects.filter(
+            pk=self.pk, statut__in=[StatutRetrait.EN_ATTENTE, StatutRetrait.ACCEPTE]
+        ).update(statut=StatutRetrait.ANNULE):
+            return False, "Retrait ne peut pas être annulé"
+        
         self.statut = StatutRetrait.ANNULE
         self.notes_verification = f"Annulé: {raison}"
         self.save()
         
+        from .services import limites
+        limites.annuler(self)
+        
         # Mettre à jour transaction d'origine si nécessaire
         if self.transaction_origine:
             from transactions.models import StatutTransaction
@@ -303,6 +319,7 @@ class Withdrawal(models.Model):
    - Calcul commission automatique
    - Vérifications sécurité intégrées
    - Workflow complet accepter → finaliser
+   - Finalisation : débit atomique du solde agent (agents.services.solde)
 
 5. 🔔 NOTIFICATIONS INTÉGRÉES :
    - Met à jour statut transaction → déclenche signals
@@ -57,13 +57,25 @@ class WithdrawalCreateSerializer(serializers.ModelSerializer):
         montant = validated_data['montant_retire']
         commission = montant * (agent.commission_pourcentage / 100)
         
+        # Limites journalières de l'agent et du bénéficiaire : montant réservé avant la création
+        from .services import limites
+        autorise, message, reservation = limites.reserver(agent, self.context['request'].user.pk, montant)
+        if not autorise:
+            raise serializers.ValidationError(message)
+        
         # Créer le retrait
-        withdrawal = Withdrawal.objects.create(
+        withdrawal = Withdrawal(
             agent=agent,
             beneficiaire=self.context['request'].user,
             montant_retire=montant,
             commission_agent=commission,
             notes_verification=validated_data.get('notes', ''),
         )
+        withdrawal.limites_reservees = True
+        try:
+            withdrawal.save()
+        except Exception:
+            limites.liberer(reservation)
+            raise
         
         return withdrawal
\ No newline at end of file
@@ -0,0 +1,148 @@
+# withdrawals/services/limites.py
+import logging
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Sum
+from django.utils import timezone
+
+from agents.models import zone
+
+from ..models import StatutRetrait, Withdrawal
+
+logger = logging.getLogger(__name__)
+
+# Compteurs dans un cache dédié (durée de vie : TIMEOUT du cache 'limites')
+cache = caches['limites']
+
+
+def _centimes(montant):
+    """Montants stockés en centimes entiers : cache.incr() n'accepte que des entiers"""
+    return int(Decimal(montant) * 100)
+
+
+def _bornes(jour, fuseau):
+    debut = datetime.combine(jour, time.min, tzinfo=fuseau)
+    return debut, datetime.combine(jour + timedelta(days=1), time.min, tzinfo=fuseau)
+
+
+def compteurs(agent, beneficiaire_id, instant=None):
+    """
+    Les deux compteurs du jour qui concernent un retrait : [(clé, filtre de recalcul)].
+
+    Le jour de l'agent suit son fuseau horaire, celui du bénéficiaire le fuseau du
+    projet. La date fait partie de la clé : à minuit on passe simplement à un
+    nouveau compteur, recalculé depuis la base (vide en début de journée).
+    """
+    instant = instant or timezone.now()
+    fuseau_agent = zone(agent.fuseau_horaire)
+    jour_agent = timezone.localtime(instant, fuseau_agent).date()
+    jour_beneficiaire = timezone.localdate(instant)
+
+    debut, fin = _bornes(jour_agent, fuseau_agent)
+    cle_agent = f'retraits:agent:{agent.pk}:{jour_agent.isoformat()}'
+    filtre_agent = {'agent_id': agent.pk, 'date_demande__gte': debut, 'date_demande__lt': fin}
+
+    debut, fin = _bornes(jour_beneficiaire, timezone.get_current_timezone())
+    cle_beneficiaire = f'retraits:beneficiaire:{beneficiaire_id}:{jour_beneficiaire.isoformat()}'
+    filtre_beneficiaire = {'beneficiaire_id': beneficiaire_id, 'date_demande__gte': debut, 'date_demande__lt': fin}
+
+    return [(cle_agent, filtre_agent), (cle_beneficiaire, filtre_beneficiaire)]
+
+
+def _recalculer(cle, filtre):
+    """Compteur absent du cache (expiré, évincé, autre processus) : somme du jour en base"""
+    total = Withdrawal.objects.filter(**filtre).exclude(statut=StatutRetrait.ANNULE).aggregate(
+        total=Sum('montant_retire')
+    )['total'] or 0
+    # add() : si un autre processus vient de l'initialiser, on garde sa valeur
+    cache.add(cle, _centimes(total))
+    valeur = cache.get(cle)
+    return _centimes(total) if valeur is None else valeur
+
+
+def totaux_du_jour(agent, beneficiaire_id, instant=None):
+    """(total agent, total bénéficiaire) demandés ce jour, retraits annulés exclus"""
+    cles = compteurs(agent, beneficiaire_id, instant)
+    valeurs = cache.get_many([cle for cle, _ in cles])
+    return tuple(
+        Decimal(valeurs[cle] if cle in valeurs else _recalculer(cle, filtre)) / 100
+        for cle, filtre in cles
+    )
+
+
+def _incrementer(cle, filtre, centimes):
+    """incr() atomique ; compteur absent : recalculé depuis la base puis incrémenté"""
+    try:
+        return cache.incr(cle, centimes)
+    except ValueError:
+        _recalculer(cle, filtre)
+        return cache.incr(cle, centimes)
+
+
+def reserver(agent, beneficiaire_id, montant, instant=None):
+    """
+    (autorisé, message, réservation) : réserver le montant dans les compteurs du jour.
+
+    Le montant est ajouté par incr() avant la création du retrait, puis comparé à
+    la limite : deux demandes simultanées ne peuvent pas la dépasser ensemble.
+    Refus ou création échouée : liberer() rend la réservation.
+    """
+    centimes = _centimes(montant)
+    (cle_agent, filtre_agent), (cle_beneficiaire, filtre_beneficiaire) = compteurs(agent, beneficiaire_id, instant)
+    reservation = []
+    for cle, filtre, limite, message in (
+        (cle_agent, filtre_agent, agent.limite_retrait_journalier,
+         "Montant dépasse la limite journalière de l'agent"),
+        (cle_beneficiaire, filtre_beneficiaire, settings.WITHDRAWAL_DAILY_LIMIT_PER_USER,
+         "Limite journalière de retrait du bénéficiaire atteinte"),
+    ):
+        total = _incrementer(cle, filtre, centimes)
+        reservation.append((cle, centimes))
+        if total > _centimes(limite):
+            liberer(reservation)
+            return False, message, []
+    return True, "Retrait possible", reservation
+
+
+def liberer(reservation):
+    """Rendre une réservation dont le retrait n'a pas été créé"""
+    for cle, centimes in reservation:
+        try:
+            cache.incr(cle, -centimes)
+        except ValueError:
+            # Compteur absent : le recalcul depuis la base n'inclut pas ce retrait
+            pass
+
+
+def verifier(agent, beneficiaire_id, montant, instant=None):
+    """(autorisé, message) : le retrait tient-il dans les limites journalières ? (lecture seule, voir reserver())"""
+    total_agent, total_beneficiaire = totaux_du_jour(agent, beneficiaire_id, instant)
+    if total_agent + montant > agent.limite_retrait_journalier:
+        return False, "Montant dépasse la limite journalière de l'agent"
+    if total_beneficiaire + montant > settings.WITHDRAWAL_DAILY_LIMIT_PER_USER:
+        return False, "Limite journalière de retrait du bénéficiaire atteinte"
+    return True, "Retrait possible"
+
+
+def _ajouter(retrait, signe):
+    for cle, filtre in compteurs(retrait.agent, retrait.beneficiaire_id, retrait.date_demande):
+        try:
+            cache.incr(cle, signe * _centimes(retrait.montant_retire))
+        except ValueError:
+            # Compteur absent : le recalcul depuis la base inclut déjà ce changement
+            _recalculer(cle, filtre)
+
+
+def enregistrer(retrait):
+    """Nouveau retrait : ajouté aux compteurs de son jour, sauf s'il y a déjà été réservé"""
+    if getattr(retrait, 'limites_reservees', False):
+        return
+    _ajouter(retrait, 1)
+
+
+def annuler(retrait):
+    """Retrait annulé : retiré des compteurs de son jour"""
+    _ajouter(retrait, -1)
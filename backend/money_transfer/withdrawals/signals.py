@@ -0,0 +1,20 @@
+# withdrawals/signals.py - Compteurs de limites journalières tenus à jour
+import logging
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Withdrawal
+from .services import limites
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Withdrawal)
+def compter_retrait(sender, instance, created, **kwargs):
+    if not created:
+        return
+    try:
+        limites.enregistrer(instance)
+    except Exception as e:
+        logger.error(f"❌ Limites: erreur compteur retrait {instance.pk}: {e}")
@@ -1,3 +1,176 @@
-from django.test import TestCase
+import threading
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from agents.models import AgentLocal, MouvementSolde, TypeMouvement
+from agents.services.solde import ecart_grand_livre
+
+from .models import StatutRetrait, Withdrawal
+from .services import limites
+
+User = get_user_model()
+
+
+class FinalisationConcurrenteTests(TransactionTestCase):
+    """100 retraits finalisés en même temps auprès d'un seul agent"""
+
+    def preparer(self, solde, limite, nombre=100, montant=Decimal('10000')):
+        agent_user = User.objects.create_user(phone_number='+221770000010', email='agent@example.com',
+                                              password='x', first_name='Agent', last_name='Occupé',
+                                              kyc_status='VERIFIED')
+        agent = AgentLocal.objects.create(
+            user=agent_user, nom='Occupé', prenom='Agent', telephone=agent_user.phone_number,
+            email=agent_user.email, adresse='Dakar', solde_compte=solde, limite_retrait_journalier=limite,
+            heure_ouverture=time(0, 0), heure_fermeture=time(23, 59),
+        )
+        client = User.objects.create_user(phone_number='+221770000011', email='client@example.com',
+                                          password='x', first_name='Client', last_name='Pressé')
+        retraits = [
+            Withdrawal.objects.create(agent=agent, beneficiaire=client, montant_retire=montant,
+                                      statut=StatutRetrait.ACCEPTE)
+            for _ in range(nombre)
+        ]
+        return agent, agent_user, retraits
+
+    def finaliser_en_parallele(self, retraits, agent_user):
+        depart = threading.Barrier(len(retraits))
+        resultats = []
+
+        def finaliser(retrait):
+            try:
+                depart.wait()
+                resultats.append(retrait.finaliser_retrait(agent_user))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=finaliser, args=(retrait,)) for retrait in retraits]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return resultats
+
+    def verifier(self, agent, retraits, attendus, motif):
+        agent.refresh_from_db()
+        self.assertEqual(Withdrawal.objects.filter(statut=StatutRetrait.TERMINE).count(), attendus)
+        self.assertEqual(MouvementSolde.objects.filter(agent=agent, type_mouvement=TypeMouvement.RETRAIT).count(),
+                         attendus)
+        self.assertGreaterEqual(agent.solde_compte, 0)
+        self.assertLessEqual(agent.retraits_jour, agent.limite_retrait_journalier)
+        self.assertEqual(ecart_grand_livre(agent.pk), 0)
+        refus = [message for succes, message in self.resultats if not succes]
+        self.assertEqual(len(refus), len(retraits) - attendus)
+        self.assertEqual(set(refus), {motif})
+
+    def test_solde_jamais_negatif(self):
+        agent, agent_user, retraits = self.preparer(solde=Decimal('500000'), limite=Decimal('5000000'))
+        self.resultats = self.finaliser_en_parallele(retraits, agent_user)
+        self.verifier(agent, retraits, 50, 'Solde agent insuffisant')
+        self.assertEqual(agent.solde_compte, 0)
+
+    def test_limite_journaliere_respectee(self):
+        agent, agent_user, retraits = self.preparer(solde=Decimal('5000000'), limite=Decimal('300000'))
+        self.resultats = self.finaliser_en_parallele(retraits, agent_user)
+        self.verifier(agent, retraits, 30, 'Montant dépasse la limite journalière')
+        self.assertEqual(agent.retraits_jour, Decimal('300000'))
+        self.assertEqual(agent.peut_effectuer_retrait(Decimal('1000')),
+                         (False, 'Montant dépasse la limite journalière'))
+
+
+@override_settings(WITHDRAWAL_DAILY_LIMIT_PER_USER=150000)
+class LimitesJournalieresTests(TestCase):
+    """Compteurs journaliers par agent et par bénéficiaire"""
+
+    def setUp(self):
+        limites.cache.clear()
+        self.agents = []
+        for i, fuseau in enumerate(['Africa/Dakar', 'Asia/Dubai']):
+            user = User.objects.create_user(phone_number=f'+22177000002{i}', email=f'agent{i}@example.com',
+                                            password='x', first_name='Agent', last_name=str(i))
+            self.agents.append(AgentLocal.objects.create(
+                user=user, nom=str(i), prenom='Agent', telephone=user.phone_number, email=user.email,
+                adresse='Dakar', limite_retrait_journalier=Decimal('100000'), fuseau_horaire=fuseau,
+            ))
+        self.client_user = User.objects.create_user(phone_number='+221770000029', email='client@example.com',
+                                                    password='x', first_name='Client', last_name='Limité')
+
+    def retirer(self, agent, montant):
+        return Withdrawal.objects.create(agent=agent, beneficiaire=self.client_user, montant_retire=Decimal(montant))
+
+    def test_limites_agent_et_beneficiaire(self):
+        dakar, dubai = self.agents
+        retrait = self.retirer(dakar, '60000')
+        self.assertEqual(limites.verifier(dakar, self.client_user.pk, Decimal('50000'))[1],
+                         "Montant dépasse la limite journalière de l'agent")
+        self.assertTrue(limites.verifier(dakar, self.client_user.pk, Decimal('40000'))[0])
+
+        self.retirer(dubai, '80000')
+        self.assertEqual(limites.verifier(dubai, self.client_user.pk, Decimal('20000'))[1],
+                         "Limite journalière de retrait du bénéficiaire atteinte")
+
+        # Compteurs perdus : recalculés depuis la base
+        limites.cache.clear()
+        self.assertEqual(limites.totaux_du_jour(dakar, self.client_user.pk), (Decimal('60000'), Decimal('140000')))
+
+        retrait.annuler_retrait('client absent')
+        self.assertEqual(limites.totaux_du_jour(dakar, self.client_user.pk), (Decimal('0'), Decimal('80000')))
+        self.assertFalse(retrait.annuler_retrait('deux fois')[0])
+        self.assertEqual(limites.totaux_du_jour(dakar, self.client_user.pk), (Decimal('0'), Decimal('80000')))
+
+    def test_minuit_dans_le_fuseau_de_l_agent(self):
+        dubai = self.agents[1]
+        # 19h30 UTC : 23h30 à Dubaï, 19h30 à Dakar
+        instant = datetime(2026, 3, 10, 19, 30, tzinfo=dt_timezone.utc)
+        retrait = self.retirer(dubai, '70000')
+        Withdrawal.objects.filter(pk=retrait.pk).update(date_demande=instant)
+        limites.cache.clear()
+
+        self.assertEqual(limites.totaux_du_jour(dubai, self.client_user.pk, instant),
+                         (Decimal('70000'), Decimal('70000')))
+        # Une heure plus tard : nouveau jour à Dubaï, même jour à Dakar
+        self.assertEqual(limites.totaux_du_jour(dubai, self.client_user.pk, instant + timedelta(hours=1)),
+                         (Decimal('0'), Decimal('70000')))
+
+    def test_reservations_simultanees(self):
+        dakar = self.agents[0]
+        # Compteurs initialisés : les threads ne touchent que le cache
+        limites.totaux_du_jour(dakar, self.client_user.pk)
+        barriere = threading.Barrier(10)
+        resultats = []
+
+        def reserver():
+            barriere.wait()
+            resultats.append(limites.reserver(dakar, self.client_user.pk, Decimal('20000'))[0])
+
+        threads = [threading.Thread(target=reserver) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Limite agent 100 000 : exactement cinq réservations, refus sans trace dans les compteurs
+        self.assertEqual(resultats.count(True), 5)
+        self.assertEqual(limites.totaux_du_jour(dakar, self.client_user.pk), (Decimal('100000'), Decimal('100000')))
+
+    def test_reservation_rendue_si_la_creation_echoue(self):
+        dakar = self.agents[0]
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(user=self.client_user)
+        donnees = {'agent_id': dakar.pk, 'montant_retire': '60000'}
+
+        with mock.patch.object(Withdrawal, 'save', side_effect=RuntimeError('base indisponible')):
+            with self.assertRaises(RuntimeError):
+                client.post('/api/v1/withdrawals/', donnees, format='json')
+        self.assertEqual(limites.totaux_du_jour(dakar, self.client_user.pk), (Decimal('0'), Decimal('0')))
+
+        # Créé une seule fois dans les compteurs, puis refusé au-delà de la limite
+        self.assertEqual(client.post('/api/v1/withdrawals/', donnees, format='json').status_code, 201)
+        self.assertEqual(limites.totaux_du_jour(dakar, self.client_user.pk), (Decimal('60000'), Decimal('60000')))
+        self.assertEqual(client.post('/api/v1/withdrawals/', donnees, format='json').status_code, 400)
+        self.assertEqual(limites.totaux_du_jour(dakar, self.client_user.pk), (Decimal('60000'), Decimal('60000')))
@@ -0,0 +1,31 @@
+// lib/models/responses/transaction_page_response.dart
+
+import 'package:json_annotation/json_annotation.dart';
+import '../transaction.dart';
+
+part 'transaction_page_response.g.dart';
+
+/// Page de la liste des transactions (pagination par curseur côté API)
+@JsonSerializable()
+class TransactionPageResponse {
+  final String? next;
+  final String? previous;
+  final List<Transaction> results;
+
+  TransactionPageResponse({
+    this.next,
+    this.previous,
+    required this.results,
+  });
+
+  factory TransactionPageResponse.fromJson(Map<String, dynamic> json) =>
+      _$TransactionPageResponseFromJson(json);
+
+  Map<String, dynamic> toJson() => _$TransactionPageResponseToJson(this);
+
+  bool get hasNext => next != null;
+
+  /// Curseur à repasser à getTransactions pour la page suivante
+  String? get nextCursor =>
+      next == null ? null : Uri.parse(next!).queryParameters['cursor'];
+}
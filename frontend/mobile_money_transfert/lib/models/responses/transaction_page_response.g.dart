@@ -0,0 +1,26 @@
+// GENERATED CODE - DO NOT MODIFY BY HAND
+
+part of 'transaction_page_response.dart';
+
+// **************************************************************************
+// JsonSerializableGenerator
+// **************************************************************************
+
+TransactionPageResponse _$TransactionPageResponseFromJson(
+  Map<String, dynamic> json,
+) => TransactionPageResponse(
+  next: json['next'] as String?,
+  previous: json['previous'] as String?,
+  results:
+      (json['results'] as List<dynamic>)
+          .map((e) => Transaction.fromJson(e as Map<String, dynamic>))
+          .toList(),
+);
+
+Map<String, dynamic> _$TransactionPageResponseToJson(
+  TransactionPageResponse instance,
+) => <String, dynamic>{
+  'next': instance.next,
+  'previous': instance.previous,
+  'results': instance.results,
+};
@@ -8,6 +8,7 @@ import '../../models/responses/transaction_stats_response.dart';
 import '../../models/responses/exchange_rate_response.dart';
 import '../../models/responses/transaction_status_response.dart';
 import '../../models/responses/search_response.dart';
+import '../../models/responses/transaction_page_response.dart';
 import '../../models/responses/api_error_response.dart';
 import 'package:dio/dio.dart';
 
@@ -40,10 +41,26 @@ class TransactionRepository {
   }
 
   // 📋 TRANSACTIONS
-  Future<Result<List<Transaction>>> getTransactions({String? status}) async {
+  // Première page (les plus récentes)
+  Future<Result<List<Transaction>>> getTransactions({String? status, int? pageSize}) async {
     try {
-      final transactions = await _service.getTransactions(status: status);
-      return Result.success(transactions);
+      final page = await _service.getTransactions(status: status, pageSize: pageSize);
+      return Result.success(page.results);
+    } on DioException catch (e) {
+      final error = ApiService().handleError(e);
+      return Result.error(error);
+    }
+  }
+
+  // Page suivante : passer page.nextCursor de la page précédente
+  Future<Result<TransactionPageResponse>> getTransactionsPage({
+    String? status,
+    String? cursor,
+    int? pageSize,
+  }) async {
+    try {
+      final page = await _service.getTransactions(status: status, cursor: cursor, pageSize: pageSize);
+      return Result.success(page);
     } on DioException catch (e) {
       final error = ApiService().handleError(e);
       return Result.error(error);
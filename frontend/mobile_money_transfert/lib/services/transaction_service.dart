@@ -12,6 +12,7 @@ import '../models/responses/transaction_stats_response.dart';
 import '../models/responses/exchange_rate_response.dart';
 import '../models/responses/transaction_status_response.dart';
 import '../models/responses/search_response.dart';
+import '../models/responses/transaction_page_response.dart';
 
 part 'transaction_service.g.dart';
 
@@ -20,9 +21,12 @@ abstract class TransactionService {
   factory TransactionService(Dio dio) = _TransactionService;
 
   // 💰 TRANSACTIONS
+  // Liste paginée par curseur : {next, previous, results}
   @GET('/transactions/')
-  Future<List<Transaction>> getTransactions({
+  Future<TransactionPageResponse> getTransactions({
     @Query('status') String? status,
+    @Query('cursor') String? cursor,
+    @Query('page_size') int? pageSize,
   });
 
   @GET('/transactions/{id}/')
@@ -18,13 +18,21 @@ class _TransactionService implements TransactionService {
   final ParseErrorLogger? errorLogger;
 
   @override
-  Future<List<Transaction>> getTransactions({String? status}) async {
+  Future<TransactionPageResponse> getTransactions({
+    String? status,
+    String? cursor,
+    int? pageSize,
+  }) async {
     final _extra = <String, dynamic>{};
-    final queryParameters = <String, dynamic>{r'status': status};
+    final queryParameters = <String, dynamic>{
+      r'status': status,
+      r'cursor': cursor,
+      r'page_size': pageSize,
+    };
     queryParameters.removeWhere((k, v) => v == null);
     final _headers = <String, dynamic>{};
     const Map<String, dynamic>? _data = null;
-    final _options = _setStreamType<List<Transaction>>(
+    final _options = _setStreamType<TransactionPageResponse>(
       Options(method: 'GET', headers: _headers, extra: _extra)
           .compose(
             _dio.options,
@@ -34,15 +42,10 @@ class _TransactionService implements TransactionService {
           )
           .copyWith(baseUrl: _combineBaseUrls(_dio.options.baseUrl, baseUrl)),
     );
-    final _result = await _dio.fetch<List<dynamic>>(_options);
-    late List<Transaction> _value;
+    final _result = await _dio.fetch<Map<String, dynamic>>(_options);
+    late TransactionPageResponse _value;
     try {
-      _value =
-          _result.data!
-              .map(
-                (dynamic i) => Transaction.fromJson(i as Map<String, dynamic>),
-              )
-              .toList();
+      _value = TransactionPageResponse.fromJson(_result.data!);
     } on Object catch (e, s) {
       errorLogger?.logError(e, s, _options);
       rethrow;